@@ -178,6 +178,8 @@ DOC_ONLY_VARS: Set[str] = {
     "OPENMEMORY_BASE_URL",
     "MINIO_AUDIT_WEBHOOK_AUTH_TOKEN",
     "MINIO_AUDIT_MAX_PAYLOAD_SIZE",
+    "GITLAB_WEBHOOK_SECRET_TOKEN",
+    "GITLAB_WEBHOOK_MAX_PAYLOAD_SIZE",
     # Gateway 启动与治理配置（有合理默认值）
     "AUTO_MIGRATE_ON_STARTUP",
     "LOGBOOK_CHECK_ON_STARTUP",
@@ -186,6 +188,16 @@ DOC_ONLY_VARS: Set[str] = {
     # Gateway Evidence Refs 校验配置（有合理默认值）
     "VALIDATE_EVIDENCE_REFS",
     "STRICT_MODE_ENFORCE_VALIDATE_REFS",
+    # Gateway 降级查询配置（有合理默认值）
+    "MEMORY_FALLBACK_MODE",
+    # Logbook 语义检索配置（有合理默认值）
+    "ENGRAM_EMBEDDER",
+    # Logbook 语句级埋点（默认关闭）
+    "ENGRAM_DB_INSTRUMENTATION",
+    "ENGRAM_DB_SLOW_QUERY_MS",
+    "ENGRAM_DB_STATS_FILE",
+    # Logbook 热点语句预备模式（有合理默认值）
+    "ENGRAM_DB_PREPARE",
     # SCM Claim 配置（有合理默认值）
     "SCM_CLAIM_ENABLE_TENANT_FAIR_CLAIM",
     "SCM_CLAIM_MAX_CONSECUTIVE_SAME_TENANT",
@@ -128,6 +128,10 @@ CREATE TABLE IF NOT EXISTS logbook.kv (
   PRIMARY KEY(namespace, key)
 );
 
+-- 按更新时间增量扫描某个命名空间（增量调度检测游标变化）
+CREATE INDEX IF NOT EXISTS idx_kv_namespace_updated_at
+  ON logbook.kv(namespace, updated_at);
+
 -- 用于 Step2 写入失败时的补偿队列（outbox）
 CREATE TABLE IF NOT EXISTS logbook.outbox_memory (
   outbox_id          bigserial PRIMARY KEY,
@@ -495,70 +499,8 @@ CREATE TABLE IF NOT EXISTS governance.promotion_queue (
 
 -- ---------- scm.v_facts：统一事实视图 ----------
 -- 将 svn_revisions、git_commits、mrs 统一为一个视图，便于跨来源查询
--- 使用 MATERIALIZED VIEW 以支持索引和提升查询性能
--- 注意：需要定期执行 REFRESH MATERIALIZED VIEW CONCURRENTLY scm.v_facts;
-
-DROP MATERIALIZED VIEW IF EXISTS scm.v_facts;
-
-CREATE MATERIALIZED VIEW scm.v_facts AS
-SELECT 
-  'svn'::text AS source_type,
-  source_id,
-  repo_id,
-  ts,
-  author_raw,
-  NULL::text AS author_user_id,
-  is_bulk,
-  bulk_reason,
-  meta_json
-FROM scm.svn_revisions
-WHERE source_id IS NOT NULL
-
-UNION ALL
-
-SELECT 
-  'git'::text AS source_type,
-  source_id,
-  repo_id,
-  ts,
-  author_raw,
-  NULL::text AS author_user_id,
-  is_bulk,
-  bulk_reason,
-  meta_json
-FROM scm.git_commits
-WHERE source_id IS NOT NULL
-
-UNION ALL
-
-SELECT 
-  'mr'::text AS source_type,
-  source_id,
-  repo_id,
-  created_at AS ts,
-  NULL::text AS author_raw,
-  author_user_id,
-  false AS is_bulk,
-  NULL::text AS bulk_reason,
-  meta_json
-FROM scm.mrs
-WHERE source_id IS NOT NULL;
-
--- v_facts 索引：按 repo_id 查询优化
-CREATE UNIQUE INDEX IF NOT EXISTS idx_v_facts_source_id 
-  ON scm.v_facts(source_id);
-
-CREATE INDEX IF NOT EXISTS idx_v_facts_repo_id 
-  ON scm.v_facts(repo_id);
-
-CREATE INDEX IF NOT EXISTS idx_v_facts_repo_ts 
-  ON scm.v_facts(repo_id, ts DESC);
-
-CREATE INDEX IF NOT EXISTS idx_v_facts_ts 
-  ON scm.v_facts(ts DESC);
-
-CREATE INDEX IF NOT EXISTS idx_v_facts_source_type 
-  ON scm.v_facts(source_type, repo_id);
+-- 由 17_scm_facts_table.sql 定义：scm.facts 表由来源表触发器增量维护，
+-- scm.v_facts 为其上的普通视图，无需 REFRESH
 
 -- ---------- scm.sync_rate_limits: 分布式 Token Bucket 限流表 ----------
 -- 用于控制对外部 API（如 GitLab）的请求速率
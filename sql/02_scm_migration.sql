@@ -378,78 +378,10 @@ CREATE INDEX IF NOT EXISTS idx_review_events_mr_source
 
 
 -- ============================================================
--- scm.v_facts 统一事实视图（Materialized View）
--- 将 svn_revisions、git_commits、mrs 统一为一个视图
+-- scm.v_facts 统一事实视图
+-- 已迁移到 17_scm_facts_table.sql（scm.facts 增量维护 + 兼容视图）
 -- ============================================================
 
--- 删除旧视图（如存在），重新创建以确保结构更新
--- SAFE: 幂等重建视图，无数据丢失风险（视图不存储数据）
-DROP MATERIALIZED VIEW IF EXISTS scm.v_facts;
-
-CREATE MATERIALIZED VIEW scm.v_facts AS
-SELECT 
-  'svn'::text AS source_type,
-  source_id,
-  repo_id,
-  ts,
-  author_raw,
-  NULL::text AS author_user_id,
-  is_bulk,
-  bulk_reason,
-  meta_json
-FROM scm.svn_revisions
-WHERE source_id IS NOT NULL
-
-UNION ALL
-
-SELECT 
-  'git'::text AS source_type,
-  source_id,
-  repo_id,
-  ts,
-  author_raw,
-  NULL::text AS author_user_id,
-  is_bulk,
-  bulk_reason,
-  meta_json
-FROM scm.git_commits
-WHERE source_id IS NOT NULL
-
-UNION ALL
-
-SELECT 
-  'mr'::text AS source_type,
-  source_id,
-  repo_id,
-  created_at AS ts,
-  NULL::text AS author_raw,
-  author_user_id,
-  false AS is_bulk,
-  NULL::text AS bulk_reason,
-  meta_json
-FROM scm.mrs
-WHERE source_id IS NOT NULL;
-
--- v_facts 索引：source_id 唯一索引（支持 REFRESH CONCURRENTLY）
-CREATE UNIQUE INDEX IF NOT EXISTS idx_v_facts_source_id 
-  ON scm.v_facts(source_id);
-
--- v_facts 索引：按 repo_id 查询
-CREATE INDEX IF NOT EXISTS idx_v_facts_repo_id 
-  ON scm.v_facts(repo_id);
-
--- v_facts 索引：按 repo_id + ts 查询（常用场景）
-CREATE INDEX IF NOT EXISTS idx_v_facts_repo_ts 
-  ON scm.v_facts(repo_id, ts DESC);
-
--- v_facts 索引：按 ts 全局时间线查询
-CREATE INDEX IF NOT EXISTS idx_v_facts_ts 
-  ON scm.v_facts(ts DESC);
-
--- v_facts 索引：按 source_type + repo_id 查询
-CREATE INDEX IF NOT EXISTS idx_v_facts_source_type 
-  ON scm.v_facts(source_type, repo_id);
-
 
 COMMIT;
 
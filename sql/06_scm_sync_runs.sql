@@ -94,6 +94,11 @@ CREATE INDEX IF NOT EXISTS idx_sync_runs_status
 CREATE INDEX IF NOT EXISTS idx_sync_runs_started_at
     ON scm.sync_runs(started_at DESC);
 
+-- 按结束时间查询（增量调度检测自上次水位线以来结束的运行）
+CREATE INDEX IF NOT EXISTS idx_sync_runs_finished_at
+    ON scm.sync_runs(finished_at)
+    WHERE finished_at IS NOT NULL;
+
 -- 按仓库查询最新运行（用于获取当前同步状态）
 CREATE INDEX IF NOT EXISTS idx_sync_runs_repo_latest
     ON scm.sync_runs(repo_id, started_at DESC);
@@ -55,6 +55,13 @@ CREATE INDEX IF NOT EXISTS idx_sync_jobs_tenant_id_active
     ON scm.sync_jobs(tenant_id)
     WHERE status IN ('pending', 'running') AND tenant_id IS NOT NULL;
 
+-- 租户公平 claim 索引：skip-scan 逐个枚举 tenant，并按 (priority, created_at) 取每个 tenant 的队首任务
+-- 使 claim 代价与 tenant 数成正比而非与待处理任务数成正比
+-- 注意：表达式需与 scm_sync_queue._TENANT_KEY 保持一致，否则查询无法使用该索引
+CREATE INDEX IF NOT EXISTS idx_sync_jobs_tenant_claim
+    ON scm.sync_jobs((COALESCE(tenant_id, payload_json ->> 'tenant_id', '')), priority ASC, created_at ASC)
+    WHERE status IN ('pending', 'running', 'failed');
+
 -- ============================================================
 -- 回填现有数据（从 repos 表获取并更新）
 -- 注意：仅更新活跃任务（pending/running），历史任务不回填
@@ -0,0 +1,77 @@
+-- ============================================================================
+-- 15_knowledge_candidates_embedding.sql - knowledge_candidates 向量列与 ANN 索引
+-- ============================================================================
+--
+-- 本迁移为 analysis.knowledge_candidates 表添加语义检索能力：
+--   1. embedding: pgvector 向量列（维度固定为 256，与 engram.logbook.embedding.EMBEDDING_DIM 一致）
+--   2. embedding_model: 生成该向量的 embedder 名称（用于识别需要重新回填的行）
+--   3. embedded_at: 向量写入时间
+--
+-- 使用场景：
+--   - memory_query 降级路径（OpenMemory 不可用）按语义相似度回退查询
+--   - 由 backfill_candidate_embeddings 批量回填存量行
+--
+-- 依赖：
+--   - 03_pgvector_extension.sql（vector 扩展）
+--
+-- 索引策略：
+--   - pgvector >= 0.5.0: HNSW（vector_cosine_ops），无需训练，适合增量写入
+--   - pgvector <  0.5.0: 回退到 IVFFlat（lists = 100）
+--
+-- ============================================================================
+
+-- 添加 embedding 列：向量（256 维）
+ALTER TABLE analysis.knowledge_candidates
+  ADD COLUMN IF NOT EXISTS embedding vector(256);
+
+-- 添加 embedding_model 列：记录生成向量的 embedder 名称
+ALTER TABLE analysis.knowledge_candidates
+  ADD COLUMN IF NOT EXISTS embedding_model text;
+
+-- 添加 embedded_at 列：记录向量写入时间
+ALTER TABLE analysis.knowledge_candidates
+  ADD COLUMN IF NOT EXISTS embedded_at timestamptz;
+
+-- ============================================================================
+-- 索引
+-- ============================================================================
+
+-- 向量索引：按 pgvector 版本选择 HNSW 或 IVFFlat
+DO $$
+DECLARE
+  ext_version TEXT;
+BEGIN
+  IF to_regclass('analysis.idx_knowledge_candidates_embedding') IS NOT NULL THEN
+    RETURN;
+  END IF;
+
+  SELECT extversion INTO ext_version FROM pg_extension WHERE extname = 'vector';
+
+  IF string_to_array(split_part(ext_version, '-', 1), '.')::int[] >= ARRAY[0, 5, 0] THEN
+    CREATE INDEX idx_knowledge_candidates_embedding
+      ON analysis.knowledge_candidates
+      USING hnsw (embedding vector_cosine_ops);
+  ELSE
+    CREATE INDEX idx_knowledge_candidates_embedding
+      ON analysis.knowledge_candidates
+      USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+  END IF;
+END $$;
+
+-- 待回填索引：支持回填任务快速定位未向量化的行
+CREATE INDEX IF NOT EXISTS idx_knowledge_candidates_embedding_pending
+  ON analysis.knowledge_candidates (candidate_id)
+  WHERE embedding IS NULL;
+
+-- ============================================================================
+-- 注释
+-- ============================================================================
+
+COMMENT ON COLUMN analysis.knowledge_candidates.embedding IS
+  '语义向量（256 维，cosine 距离），由 engram.logbook.embedding 中的 embedder 生成';
+
+COMMENT ON COLUMN analysis.knowledge_candidates.embedding_model IS
+  '生成 embedding 的 embedder 名称（如 hashing-v1），与当前 embedder 不一致时需重新回填';
+
+COMMENT ON COLUMN analysis.knowledge_candidates.embedded_at IS
+  'embedding 写入时间';
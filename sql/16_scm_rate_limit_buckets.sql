@@ -0,0 +1,59 @@
+-- ============================================================================
+-- 16_scm_rate_limit_buckets.sql - 速率限制桶迁移到 scm.sync_rate_limits（可重复执行）
+-- ============================================================================
+--
+-- 背景：
+--   令牌桶原先以 JSON 存放在 logbook.kv（namespace = 'scm.rate_limit', key = 'bucket:<instance_key>'），
+--   每次消费需要 SELECT ... FOR UPDATE + Python 计算 + 回写两条语句。
+--   现在 PostgresRateLimiter 直接在 scm.sync_rate_limits（01_logbook_schema.sql）上
+--   以单条语句完成 补充 + 判断 + 扣减。
+--
+-- 本迁移：
+--   1. 将 kv 中已有的桶（tokens/rate/burst/last_refill/paused_until/meta_json）搬到 scm.sync_rate_limits
+--      - last_refill -> updated_at（updated_at 即最后补充时间）
+--      - paused_until（Unix 时间戳，0 表示未暂停）-> paused_until timestamptz
+--      - pause_reason / paused_at 合并进 meta_json
+--      - 表中已存在的实例不覆盖
+--   2. 删除已迁移的 kv 记录
+--
+-- 执行方式：psql -d <your_db> -f 16_scm_rate_limit_buckets.sql
+--
+-- ============================================================================
+
+BEGIN;
+
+INSERT INTO scm.sync_rate_limits
+    (instance_key, tokens, rate, burst, updated_at, paused_until, meta_json)
+SELECT
+    substr(kv.key, length('bucket:') + 1),
+    GREATEST(0, LEAST(
+        COALESCE((kv.value_json ->> 'burst')::float8, 20),
+        COALESCE((kv.value_json ->> 'tokens')::float8, (kv.value_json ->> 'burst')::float8, 20)
+    )),
+    COALESCE((kv.value_json ->> 'rate')::float8, 10.0),
+    COALESCE((kv.value_json ->> 'burst')::float8, 20)::int,
+    COALESCE(to_timestamp((kv.value_json ->> 'last_refill')::float8), kv.updated_at),
+    CASE
+        WHEN COALESCE((kv.value_json ->> 'paused_until')::float8, 0) > 0
+        THEN to_timestamp((kv.value_json ->> 'paused_until')::float8)
+    END,
+    CASE
+        WHEN jsonb_typeof(kv.value_json -> 'meta_json') = 'object' THEN kv.value_json -> 'meta_json'
+        ELSE '{}'::jsonb
+    END
+    || jsonb_strip_nulls(jsonb_build_object(
+        'pause_reason', kv.value_json -> 'pause_reason',
+        'paused_at', kv.value_json -> 'paused_at'
+    ))
+FROM logbook.kv AS kv
+WHERE kv.namespace = 'scm.rate_limit'
+  AND kv.key LIKE 'bucket:%'
+  AND jsonb_typeof(kv.value_json) = 'object'
+ON CONFLICT (instance_key) DO NOTHING;
+
+DELETE FROM logbook.kv AS kv
+USING scm.sync_rate_limits AS b
+WHERE kv.namespace = 'scm.rate_limit'
+  AND kv.key = 'bucket:' || b.instance_key;
+
+COMMIT;
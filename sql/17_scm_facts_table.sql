@@ -0,0 +1,281 @@
+-- ============================================================================
+-- 17_scm_facts_table.sql - scm.facts 增量维护的统一事实表（可重复执行）
+-- ============================================================================
+--
+-- 背景：
+--   scm.v_facts 原为 MATERIALIZED VIEW（01/02 中定义），每次同步后执行
+--   REFRESH MATERIALIZED VIEW [CONCURRENTLY] scm.v_facts，需要重算 svn_revisions、
+--   git_commits、mrs 三张表的全部行；CONCURRENTLY 模式还要与旧结果逐行 diff。
+--   大库下单次刷新耗时随总行数增长，而每次同步实际只变化少量行。
+--
+-- 本迁移：
+--   1. 创建 scm.facts 普通表（列与原 v_facts 一致，source_id 为主键），
+--      保留 repo_id / repo_id+ts / ts / source_type 索引
+--   2. 在三张来源表上创建语句级触发器（transition table），
+--      INSERT/UPDATE/DELETE 时只对本语句涉及的行 upsert/删除对应事实
+--   3. scm.facts 为空时从来源表一次性回填
+--   4. 删除旧的物化视图，scm.v_facts 改为 scm.facts 上的普通视图，读取方无需改动
+--
+-- 一致性校验：
+--   engram-scm-sync admin facts reconcile [--repo-id N] [--repair]
+--   （对比来源表与 scm.facts，报告/修复缺失、过期与孤儿行）
+--
+-- 注意：
+--   - 来源表的 TRUNCATE 不会同步到 scm.facts，执行后需运行 facts reconcile --repair
+--   - 触发器与来源表写入在同一事务内，回滚时事实表一并回滚
+--
+-- 执行方式：psql -d <your_db> -f 17_scm_facts_table.sql
+--
+-- ============================================================================
+
+BEGIN;
+
+-- ---------- scm.facts：统一事实表 ----------
+
+CREATE TABLE IF NOT EXISTS scm.facts (
+  source_id       text PRIMARY KEY,          -- svn:/git:/mr: 前缀，全局唯一
+  source_type     text NOT NULL,             -- svn | git | mr
+  repo_id         bigint NOT NULL,
+  ts              timestamptz,               -- svn/git: 提交时间；mr: created_at
+  author_raw      text,
+  author_user_id  text,
+  is_bulk         boolean NOT NULL DEFAULT false,
+  bulk_reason     text,
+  meta_json       jsonb NOT NULL DEFAULT '{}'::jsonb,
+  updated_at      timestamptz NOT NULL DEFAULT now()
+);
+
+-- facts 索引：按 repo_id 查询
+CREATE INDEX IF NOT EXISTS idx_facts_repo_id
+  ON scm.facts(repo_id);
+
+-- facts 索引：按 repo_id + ts 查询（常用场景）
+CREATE INDEX IF NOT EXISTS idx_facts_repo_ts
+  ON scm.facts(repo_id, ts DESC);
+
+-- facts 索引：按 ts 全局时间线查询
+CREATE INDEX IF NOT EXISTS idx_facts_ts
+  ON scm.facts(ts DESC);
+
+-- facts 索引：按 source_type + repo_id 查询
+CREATE INDEX IF NOT EXISTS idx_facts_source_type
+  ON scm.facts(source_type, repo_id);
+
+-- ---------- 触发器函数：svn_revisions / git_commits ----------
+-- TG_ARGV[0] 为 source_type（'svn' 或 'git'），两张表列结构一致
+-- 删除与 upsert 均只涉及 transition table 中的行；内容未变化的 upsert 不写入
+
+CREATE OR REPLACE FUNCTION scm.facts_sync_commits()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    -- SAFE: 仅删除本语句删除的来源行对应的事实
+    DELETE FROM scm.facts f
+    USING old_rows o
+    WHERE f.source_id = o.source_id;
+    RETURN NULL;
+  END IF;
+
+  IF TG_OP = 'UPDATE' THEN
+    -- SAFE: source_id 被修改或置空时删除旧事实
+    DELETE FROM scm.facts f
+    USING old_rows o
+    WHERE f.source_id = o.source_id
+      AND NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.source_id = o.source_id);
+  END IF;
+
+  INSERT INTO scm.facts AS f
+    (source_id, source_type, repo_id, ts, author_raw, author_user_id,
+     is_bulk, bulk_reason, meta_json)
+  SELECT DISTINCT ON (n.source_id)
+    n.source_id, TG_ARGV[0], n.repo_id, n.ts, n.author_raw, NULL,
+    n.is_bulk, n.bulk_reason, n.meta_json
+  FROM new_rows n
+  WHERE n.source_id IS NOT NULL
+  ON CONFLICT (source_id) DO UPDATE SET
+    source_type = EXCLUDED.source_type,
+    repo_id = EXCLUDED.repo_id,
+    ts = EXCLUDED.ts,
+    author_raw = EXCLUDED.author_raw,
+    author_user_id = EXCLUDED.author_user_id,
+    is_bulk = EXCLUDED.is_bulk,
+    bulk_reason = EXCLUDED.bulk_reason,
+    meta_json = EXCLUDED.meta_json,
+    updated_at = now()
+  WHERE (f.source_type, f.repo_id, f.ts, f.author_raw, f.author_user_id,
+         f.is_bulk, f.bulk_reason, f.meta_json)
+        IS DISTINCT FROM
+        (EXCLUDED.source_type, EXCLUDED.repo_id, EXCLUDED.ts, EXCLUDED.author_raw,
+         EXCLUDED.author_user_id, EXCLUDED.is_bulk, EXCLUDED.bulk_reason, EXCLUDED.meta_json);
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ---------- 触发器函数：mrs ----------
+-- ts 取 created_at，author_raw 为空，is_bulk 固定 false
+
+CREATE OR REPLACE FUNCTION scm.facts_sync_mrs()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    -- SAFE: 仅删除本语句删除的来源行对应的事实
+    DELETE FROM scm.facts f
+    USING old_rows o
+    WHERE f.source_id = o.source_id;
+    RETURN NULL;
+  END IF;
+
+  IF TG_OP = 'UPDATE' THEN
+    -- SAFE: source_id 被修改或置空时删除旧事实
+    DELETE FROM scm.facts f
+    USING old_rows o
+    WHERE f.source_id = o.source_id
+      AND NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.source_id = o.source_id);
+  END IF;
+
+  INSERT INTO scm.facts AS f
+    (source_id, source_type, repo_id, ts, author_raw, author_user_id,
+     is_bulk, bulk_reason, meta_json)
+  SELECT DISTINCT ON (n.source_id)
+    n.source_id, 'mr', n.repo_id, n.created_at, NULL, n.author_user_id,
+    false, NULL, n.meta_json
+  FROM new_rows n
+  WHERE n.source_id IS NOT NULL
+  ON CONFLICT (source_id) DO UPDATE SET
+    source_type = EXCLUDED.source_type,
+    repo_id = EXCLUDED.repo_id,
+    ts = EXCLUDED.ts,
+    author_raw = EXCLUDED.author_raw,
+    author_user_id = EXCLUDED.author_user_id,
+    is_bulk = EXCLUDED.is_bulk,
+    bulk_reason = EXCLUDED.bulk_reason,
+    meta_json = EXCLUDED.meta_json,
+    updated_at = now()
+  WHERE (f.source_type, f.repo_id, f.ts, f.author_raw, f.author_user_id,
+         f.is_bulk, f.bulk_reason, f.meta_json)
+        IS DISTINCT FROM
+        (EXCLUDED.source_type, EXCLUDED.repo_id, EXCLUDED.ts, EXCLUDED.author_raw,
+         EXCLUDED.author_user_id, EXCLUDED.is_bulk, EXCLUDED.bulk_reason, EXCLUDED.meta_json);
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ---------- 触发器：每张来源表 INSERT / UPDATE / DELETE 各一个 ----------
+-- transition table 要求每个触发器只对应一种事件
+
+-- SAFE: 幂等重建触发器
+DROP TRIGGER IF EXISTS trg_svn_revisions_facts_insert ON scm.svn_revisions;
+CREATE TRIGGER trg_svn_revisions_facts_insert
+  AFTER INSERT ON scm.svn_revisions
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION scm.facts_sync_commits('svn');
+
+-- SAFE: 幂等重建触发器
+DROP TRIGGER IF EXISTS trg_svn_revisions_facts_update ON scm.svn_revisions;
+CREATE TRIGGER trg_svn_revisions_facts_update
+  AFTER UPDATE ON scm.svn_revisions
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION scm.facts_sync_commits('svn');
+
+-- SAFE: 幂等重建触发器
+DROP TRIGGER IF EXISTS trg_svn_revisions_facts_delete ON scm.svn_revisions;
+CREATE TRIGGER trg_svn_revisions_facts_delete
+  AFTER DELETE ON scm.svn_revisions
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION scm.facts_sync_commits('svn');
+
+-- SAFE: 幂等重建触发器
+DROP TRIGGER IF EXISTS trg_git_commits_facts_insert ON scm.git_commits;
+CREATE TRIGGER trg_git_commits_facts_insert
+  AFTER INSERT ON scm.git_commits
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION scm.facts_sync_commits('git');
+
+-- SAFE: 幂等重建触发器
+DROP TRIGGER IF EXISTS trg_git_commits_facts_update ON scm.git_commits;
+CREATE TRIGGER trg_git_commits_facts_update
+  AFTER UPDATE ON scm.git_commits
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION scm.facts_sync_commits('git');
+
+-- SAFE: 幂等重建触发器
+DROP TRIGGER IF EXISTS trg_git_commits_facts_delete ON scm.git_commits;
+CREATE TRIGGER trg_git_commits_facts_delete
+  AFTER DELETE ON scm.git_commits
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION scm.facts_sync_commits('git');
+
+-- SAFE: 幂等重建触发器
+DROP TRIGGER IF EXISTS trg_mrs_facts_insert ON scm.mrs;
+CREATE TRIGGER trg_mrs_facts_insert
+  AFTER INSERT ON scm.mrs
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION scm.facts_sync_mrs();
+
+-- SAFE: 幂等重建触发器
+DROP TRIGGER IF EXISTS trg_mrs_facts_update ON scm.mrs;
+CREATE TRIGGER trg_mrs_facts_update
+  AFTER UPDATE ON scm.mrs
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION scm.facts_sync_mrs();
+
+-- SAFE: 幂等重建触发器
+DROP TRIGGER IF EXISTS trg_mrs_facts_delete ON scm.mrs;
+CREATE TRIGGER trg_mrs_facts_delete
+  AFTER DELETE ON scm.mrs
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION scm.facts_sync_mrs();
+
+-- ---------- 首次回填 ----------
+-- 仅在 scm.facts 为空时执行；触发器已在同一事务内创建，回填期间的并发写入
+-- 会等待本事务提交，不会遗漏
+
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM scm.facts LIMIT 1) THEN
+    INSERT INTO scm.facts
+      (source_id, source_type, repo_id, ts, author_raw, author_user_id,
+       is_bulk, bulk_reason, meta_json)
+    SELECT source_id, 'svn', repo_id, ts, author_raw, NULL, is_bulk, bulk_reason, meta_json
+    FROM scm.svn_revisions
+    WHERE source_id IS NOT NULL
+    UNION ALL
+    SELECT source_id, 'git', repo_id, ts, author_raw, NULL, is_bulk, bulk_reason, meta_json
+    FROM scm.git_commits
+    WHERE source_id IS NOT NULL
+    UNION ALL
+    SELECT source_id, 'mr', repo_id, created_at, NULL, author_user_id, false, NULL, meta_json
+    FROM scm.mrs
+    WHERE source_id IS NOT NULL
+    ON CONFLICT (source_id) DO NOTHING;
+  END IF;
+END $$;
+
+-- ---------- scm.v_facts：兼容视图 ----------
+-- 旧版本为物化视图，先删除再以普通视图重建；列与旧物化视图保持一致
+
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM pg_class WHERE oid = to_regclass('scm.v_facts') AND relkind = 'm'
+  ) THEN
+    DROP MATERIALIZED VIEW scm.v_facts;
+  END IF;
+END $$;
+
+CREATE OR REPLACE VIEW scm.v_facts AS
+SELECT
+  source_type,
+  source_id,
+  repo_id,
+  ts,
+  author_raw,
+  author_user_id,
+  is_bulk,
+  bulk_reason,
+  meta_json
+FROM scm.facts;
+
+COMMIT;
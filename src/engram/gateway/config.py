@@ -109,10 +109,20 @@ class GatewayConfig:
     minio_audit_webhook_auth_token: Optional[str] = None  # MinIO audit webhook 认证 Token
     minio_audit_max_payload_size: int = 1024 * 1024  # 最大 payload 大小（默认 1MB）
 
+    # GitLab Webhook 配置
+    gitlab_webhook_secret_token: Optional[str] = None  # GitLab webhook Secret token
+    gitlab_webhook_max_payload_size: int = 1024 * 1024  # 最大 payload 大小（默认 1MB）
+
     # Evidence Refs 校验配置
     validate_evidence_refs: bool = False  # 是否校验 evidence refs 结构（默认 False，向后兼容）
     strict_mode_enforce_validate_refs: bool = True  # strict 模式下是否强制启用校验（默认 True）
 
+    # memory_query 降级查询模式
+    # keyword: ILIKE 关键词匹配（默认）
+    # vector: 按 knowledge_candidates.embedding 语义相似度检索（需先执行
+    #         backfill_candidate_embeddings 回填；无命中时自动降级为 keyword）
+    memory_fallback_mode: str = "keyword"
+
     def __post_init__(self):
         """初始化后处理"""
         # 如果未设置 default_team_space，使用 project_key 生成
@@ -154,6 +164,7 @@ def load_config() -> GatewayConfig:
     - GATEWAY_PORT: Gateway 服务端口（默认 8787）
     - DEFAULT_TEAM_SPACE: 默认团队空间（默认 team:<PROJECT_KEY>）
     - PRIVATE_SPACE_PREFIX: 私有空间前缀（默认 private:）
+    - MEMORY_FALLBACK_MODE: memory_query 降级查询模式（vector/keyword，默认 keyword）
 
     Returns:
         GatewayConfig 配置对象
@@ -222,6 +233,17 @@ def load_config() -> GatewayConfig:
             f"MINIO_AUDIT_MAX_PAYLOAD_SIZE 必须是整数，当前值: {minio_audit_max_payload_size_str}"
         )
 
+    # 解析 GitLab Webhook 配置
+    gitlab_webhook_max_payload_size_str = _get_optional_env(
+        "GITLAB_WEBHOOK_MAX_PAYLOAD_SIZE", "1048576"
+    )
+    try:
+        gitlab_webhook_max_payload_size = int(gitlab_webhook_max_payload_size_str)
+    except ValueError:
+        raise ConfigError(
+            f"GITLAB_WEBHOOK_MAX_PAYLOAD_SIZE 必须是整数，当前值: {gitlab_webhook_max_payload_size_str}"
+        )
+
     # 解析 Evidence Refs 校验配置
     validate_evidence_refs_str = _get_optional_env("VALIDATE_EVIDENCE_REFS", "false").lower()
     validate_evidence_refs = validate_evidence_refs_str in ("true", "1", "yes")
@@ -229,6 +251,15 @@ def load_config() -> GatewayConfig:
     strict_mode_enforce_str = _get_optional_env("STRICT_MODE_ENFORCE_VALIDATE_REFS", "true").lower()
     strict_mode_enforce_validate_refs = strict_mode_enforce_str in ("true", "1", "yes")
 
+    # 解析 memory_query 降级查询模式
+    memory_fallback_mode = _get_optional_env("MEMORY_FALLBACK_MODE", "keyword").lower()
+    valid_fallback_modes = ("vector", "keyword")
+    if memory_fallback_mode not in valid_fallback_modes:
+        raise ConfigError(
+            f"MEMORY_FALLBACK_MODE 值无效: {memory_fallback_mode}，"
+            f"应为: {', '.join(valid_fallback_modes)}"
+        )
+
     return GatewayConfig(
         project_key=project_key,
         postgres_dsn=postgres_dsn,
@@ -243,8 +274,11 @@ def load_config() -> GatewayConfig:
         unknown_actor_policy=unknown_actor_policy,
         minio_audit_webhook_auth_token=_get_optional_env("MINIO_AUDIT_WEBHOOK_AUTH_TOKEN") or None,
         minio_audit_max_payload_size=minio_audit_max_payload_size,
+        gitlab_webhook_secret_token=_get_optional_env("GITLAB_WEBHOOK_SECRET_TOKEN") or None,
+        gitlab_webhook_max_payload_size=gitlab_webhook_max_payload_size,
         validate_evidence_refs=validate_evidence_refs,
         strict_mode_enforce_validate_refs=strict_mode_enforce_validate_refs,
+        memory_fallback_mode=memory_fallback_mode,
     )
 
 
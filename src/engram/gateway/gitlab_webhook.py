@@ -0,0 +1,307 @@
+"""
+GitLab Webhook 处理模块
+
+提供 POST /gitlab/webhook 端点，接收 GitLab push / merge_request / note 事件，
+为对应仓库入队高优先级的增量同步任务。
+
+功能:
+- Secret token 认证 (X-Gitlab-Token，与 GITLAB_WEBHOOK_SECRET_TOKEN 比较)
+- 请求体大小限制
+- 事件 -> 任务类型映射:
+    Push Hook          -> gitlab_commits
+    Merge Request Hook -> gitlab_mrs（含 review 事件）
+    Note Hook          -> gitlab_mrs（仅 MR 上的评论）
+- 按事件中的项目 URL 匹配 scm.repos，通过 scm_sync_queue.enqueue_many 入队
+- 与活跃任务去重：已有 pending 任务时提升其优先级并提前 not_before，不重复入队
+
+配置:
+- GITLAB_WEBHOOK_SECRET_TOKEN: webhook Secret token（必须配置）
+- GITLAB_WEBHOOK_MAX_PAYLOAD_SIZE: 最大 payload 大小（默认 1MB）
+
+安全说明:
+- 未配置 GITLAB_WEBHOOK_SECRET_TOKEN 时返回 503 Service Unavailable
+
+响应约定:
+- 不支持的事件或未登记的项目返回 200（ignored），避免 GitLab 将 webhook 判定为失败并自动禁用
+
+使用方式:
+    from engram.gateway.gitlab_webhook import router as gitlab_webhook_router
+    app.include_router(gitlab_webhook_router)
+"""
+
+import hmac
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from .config import get_config
+
+logger = logging.getLogger("gateway.gitlab_webhook")
+
+# 创建路由器
+router = APIRouter(prefix="/gitlab", tags=["gitlab"])
+
+# webhook 触发任务的优先级（数值越小越优先，调度器默认 100）
+WEBHOOK_JOB_PRIORITY = 10
+
+# 事件名（X-Gitlab-Event）-> 物理任务类型
+EVENT_JOB_TYPES: Dict[str, List[str]] = {
+    "Push Hook": ["gitlab_commits"],
+    "Merge Request Hook": ["gitlab_mrs"],
+    "Note Hook": ["gitlab_mrs"],
+}
+
+
+class GitLabWebhookError(Exception):
+    """GitLab Webhook 处理错误"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+
+def _verify_secret_token(request: Request) -> None:
+    """
+    验证 X-Gitlab-Token（常量时间比较）
+
+    Raises:
+        GitLabWebhookError:
+            - 503: webhook 未配置 (GITLAB_WEBHOOK_SECRET_TOKEN 为空)
+            - 401: token 缺失
+            - 403: token 无效
+    """
+    expected_token = get_config().gitlab_webhook_secret_token
+    if not expected_token:
+        raise GitLabWebhookError(
+            "GitLab webhook 未配置，请设置 GITLAB_WEBHOOK_SECRET_TOKEN", status_code=503
+        )
+
+    token = request.headers.get("X-Gitlab-Token")
+    if not token:
+        raise GitLabWebhookError("缺少 X-Gitlab-Token", status_code=401)
+    if not hmac.compare_digest(token.encode("utf-8"), expected_token.encode("utf-8")):
+        raise GitLabWebhookError("X-Gitlab-Token 无效", status_code=403)
+
+
+async def _read_body_with_limit(request: Request) -> bytes:
+    """读取请求体并检查大小限制（超过 GITLAB_WEBHOOK_MAX_PAYLOAD_SIZE 返回 413）"""
+    max_size = get_config().gitlab_webhook_max_payload_size
+
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise GitLabWebhookError(
+            f"请求体过大: {content_length} 字节 (最大 {max_size})", status_code=413
+        )
+
+    body = b""
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_size:
+            raise GitLabWebhookError(f"请求体过大: 超过 {max_size} 字节限制", status_code=413)
+    return body
+
+
+def _parse_event(body: bytes) -> Dict[str, Any]:
+    """解析事件 JSON（必须是对象）"""
+    if not body:
+        raise GitLabWebhookError("请求体为空", status_code=400)
+    try:
+        data = json.loads(body.decode("utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise GitLabWebhookError(f"JSON 解析失败: {e}", status_code=400)
+    if not isinstance(data, dict):
+        raise GitLabWebhookError("JSON 必须是对象类型", status_code=400)
+    return data
+
+
+def resolve_job_types(event_name: str, event: Dict[str, Any]) -> List[str]:
+    """
+    根据事件确定需要入队的任务类型
+
+    Note Hook 只处理 MR 上的评论（commit/issue/snippet 评论不影响同步数据）。
+
+    Returns:
+        任务类型列表，不需要同步时为空列表
+    """
+    job_types = EVENT_JOB_TYPES.get(event_name, [])
+    if event_name == "Note Hook":
+        noteable_type = (event.get("object_attributes") or {}).get("noteable_type")
+        if noteable_type != "MergeRequest":
+            return []
+    return list(job_types)
+
+
+def project_repo_urls(project: Dict[str, Any]) -> List[str]:
+    """
+    列出事件中项目可能登记在 scm.repos 中的 URL
+
+    同步任务以 <实例 URL>/<project_id> 登记仓库，project_id 可以是数字 ID 或项目路径；
+    手工登记的仓库通常使用 web_url 或 HTTP clone 地址。
+    """
+    urls: List[str] = []
+    web_url = project.get("web_url") or ""
+    if web_url:
+        urls.append(web_url)
+    for key in ("git_http_url", "http_url"):
+        clone_url = project.get(key) or ""
+        if clone_url:
+            urls.append(clone_url[:-4] if clone_url.endswith(".git") else clone_url)
+
+    parsed = urlparse(web_url)
+    if parsed.scheme and parsed.netloc:
+        base = f"{parsed.scheme}://{parsed.netloc}"
+        if project.get("id") is not None:
+            urls.append(f"{base}/{project['id']}")
+        if project.get("path_with_namespace"):
+            urls.append(f"{base}/{project['path_with_namespace']}")
+
+    # 去重并保持顺序
+    return list(dict.fromkeys(url.rstrip("/") for url in urls))
+
+
+def _enqueue_jobs(
+    urls: List[str],
+    job_types: List[str],
+    payload: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """
+    匹配仓库并入队任务（已有 pending 任务时提升其优先级）
+
+    Returns:
+        每个 (repo_id, job_type) 的入队结果:
+        {"repo_id", "job_type", "job_id", "deduplicated"}
+        deduplicated 为 True 表示复用了已存在的活跃任务（running 任务时 job_id 为 None）
+    """
+    import psycopg
+
+    from engram.logbook.errors import DatabaseError
+    from engram.logbook.scm_db import list_repos_by_urls
+    from engram.logbook.scm_sync_queue import enqueue_many, promote_pending_job
+
+    config = get_config()
+    try:
+        conn = psycopg.connect(config.postgres_dsn)
+        try:
+            repos = list_repos_by_urls(conn, urls)
+            jobs = [
+                {
+                    "repo_id": repo["repo_id"],
+                    "job_type": job_type,
+                    "mode": "incremental",
+                    "priority": WEBHOOK_JOB_PRIORITY,
+                    "payload": payload,
+                }
+                for repo in repos
+                for job_type in job_types
+            ]
+            job_ids = enqueue_many(jobs, conn=conn)
+
+            results: List[Dict[str, Any]] = []
+            for job, job_id in zip(jobs, job_ids):
+                deduplicated = job_id is None
+                if deduplicated:
+                    job_id = promote_pending_job(
+                        job["repo_id"],
+                        job["job_type"],
+                        priority=WEBHOOK_JOB_PRIORITY,
+                        conn=conn,
+                    )
+                results.append(
+                    {
+                        "repo_id": job["repo_id"],
+                        "job_type": job["job_type"],
+                        "job_id": job_id,
+                        "deduplicated": deduplicated,
+                    }
+                )
+            return results
+        finally:
+            conn.close()
+    except (psycopg.Error, DatabaseError) as e:
+        logger.error(f"GitLab webhook 入队失败: {e}")
+        raise GitLabWebhookError(f"任务入队失败: {e}", status_code=500)
+
+
+def _build_payload(event_name: str, project: Dict[str, Any]) -> Dict[str, Any]:
+    """构建任务 payload（与调度器 payload 的元数据字段保持一致）"""
+    instance: Optional[str] = urlparse(project.get("web_url") or "").netloc.lower() or None
+    return {
+        "reason": "webhook",
+        "webhook_event": event_name,
+        "scheduled_at": datetime.now(timezone.utc).isoformat(),
+        "gitlab_instance": instance,
+    }
+
+
+def _ignored(event_name: str, reason: str) -> JSONResponse:
+    return JSONResponse(
+        content={"ok": True, "event": event_name, "ignored": True, "reason": reason},
+        status_code=200,
+    )
+
+
+@router.post("/webhook")
+async def gitlab_webhook(request: Request) -> JSONResponse:
+    """
+    GitLab Webhook 端点
+
+    认证方式:
+    - X-Gitlab-Token: <secret token>
+
+    响应:
+    - 200: 已入队（jobs 列出每个任务），或事件被忽略（ignored=true）
+    - 400: 请求体解析失败
+    - 401: 缺少 token
+    - 403: token 无效
+    - 413: 请求体过大
+    - 500: 入队失败
+    - 503: webhook 未配置
+    """
+    event_name = request.headers.get("X-Gitlab-Event", "")
+    try:
+        _verify_secret_token(request)
+        body = await _read_body_with_limit(request)
+        event = _parse_event(body)
+
+        job_types = resolve_job_types(event_name, event)
+        if not job_types:
+            return _ignored(event_name, "unsupported_event")
+
+        project = event.get("project") or {}
+        urls = project_repo_urls(project)
+        if not urls:
+            return _ignored(event_name, "missing_project")
+
+        jobs = _enqueue_jobs(urls, job_types, _build_payload(event_name, project))
+        if not jobs:
+            return _ignored(event_name, "repo_not_registered")
+
+        logger.info(
+            f"GitLab webhook 入队: event={event_name}, "
+            f"project={project.get('path_with_namespace')}, jobs={len(jobs)}"
+        )
+        return JSONResponse(
+            content={"ok": True, "event": event_name, "ignored": False, "jobs": jobs},
+            status_code=200,
+        )
+
+    except GitLabWebhookError as e:
+        if e.status_code == 503:
+            logger.info(f"GitLab webhook 未配置: {e.message}")
+        elif e.status_code < 500:
+            logger.debug(f"GitLab webhook 请求被拒绝: {e.message} (status={e.status_code})")
+        else:
+            logger.warning(f"GitLab webhook 错误: {e.message} (status={e.status_code})")
+        return JSONResponse(content={"ok": False, "error": e.message}, status_code=e.status_code)
+    except Exception as e:
+        logger.exception(f"GitLab webhook 未预期错误: {e}")
+        return JSONResponse(
+            content={"ok": False, "error": f"内部错误: {str(e)}"},
+            status_code=500,
+        )
@@ -160,6 +160,7 @@ async def memory_query_impl(
                 top_k=top_k,
                 evidence_filter=evidence_filter,
                 space_filter=space_filter,
+                mode=config.memory_fallback_mode,
             )
 
             # 将 knowledge_candidates 结果转换为统一的结果格式
@@ -1197,11 +1197,13 @@ class LogbookAdapter:
         top_k: int = 10,
         evidence_filter: Optional[str] = None,
         space_filter: Optional[str] = None,
+        mode: str = "keyword",
     ) -> List[KnowledgeCandidateRow]:
         """
         从 analysis.knowledge_candidates 表按关键词查询知识候选项
 
-        使用 ILIKE 对 title 和 content_md 进行模糊匹配。
+        keyword 模式使用 ILIKE 对 title 和 content_md 进行模糊匹配；
+        vector 模式按 embedding 语义相似度排序（无可用向量时自动降级为 keyword）。
         用于 OpenMemory 查询失败时的降级回退。
 
         Args:
@@ -1209,6 +1211,7 @@ class LogbookAdapter:
             top_k: 返回结果数量上限（默认 10）
             evidence_filter: 可选，按 evidence_refs_json 过滤
             space_filter: 可选，按 space 过滤
+            mode: 查询模式，"keyword"（默认）或 "vector"
 
         Returns:
             知识候选项列表
@@ -1219,6 +1222,7 @@ class LogbookAdapter:
             evidence_filter=evidence_filter,
             space_filter=space_filter,
             config=self._config,
+            mode=mode,
         )
 
     # ======================== 可靠性报告 ========================
@@ -2003,6 +2007,7 @@ def query_knowledge_candidates(
     top_k: int = 10,
     evidence_filter: Optional[str] = None,
     space_filter: Optional[str] = None,
+    mode: str = "keyword",
 ) -> List[KnowledgeCandidateRow]:
     """
     从 analysis.knowledge_candidates 表按关键词查询知识候选项
@@ -2014,6 +2019,7 @@ def query_knowledge_candidates(
         top_k: 返回结果数量上限（默认 10）
         evidence_filter: 可选，按 evidence_refs_json 过滤
         space_filter: 可选，按 space 过滤
+        mode: 查询模式，"keyword"（默认）或 "vector"
 
     Returns:
         知识候选项列表
@@ -2023,6 +2029,7 @@ def query_knowledge_candidates(
         top_k=top_k,
         evidence_filter=evidence_filter,
         space_filter=space_filter,
+        mode=mode,
     )
 
 
@@ -313,6 +313,7 @@ def install_middleware(app: FastAPI) -> None:
     安装内容:
     1. CorrelationIdMiddleware: 统一生成和传递 correlation_id
     2. 全局异常处理器: 捕获未处理的异常，确保返回正确格式
+    3. 向 Logbook 语句埋点注册 correlation_id 提供函数
 
     Args:
         app: FastAPI 应用实例
@@ -329,4 +330,12 @@ def install_middleware(app: FastAPI) -> None:
     # 所以 CorrelationIdMiddleware 应该最后添加，这样它最先执行
     app.add_middleware(CorrelationIdMiddleware)
 
+    # 3. 将请求级 correlation_id 提供给 Logbook 语句埋点（慢查询日志）
+    try:
+        from engram.logbook.db_instrumentation import set_correlation_id_provider
+    except ImportError:
+        logger.debug("engram.logbook.db_instrumentation 不可用，跳过 correlation_id 注册")
+    else:
+        set_correlation_id_provider(get_request_correlation_id)
+
     logger.debug("Gateway 中间件已安装")
@@ -6,8 +6,10 @@ Gateway 路由注册模块
 - /mcp: MCP 统一入口（双协议兼容）
 - /memory/*: REST 风格的记忆存取接口
 - /reliability/report: 可靠性报告
+- /metrics/db: Logbook 语句级数据库统计
 - /governance/*: 治理设置管理
 - /minio/audit: MinIO Audit Webhook
+- /gitlab/webhook: GitLab Webhook（触发增量同步任务）
 
 设计原则：
 ================
@@ -87,10 +89,12 @@ def register_routes(app: FastAPI) -> None:
 
     此函数负责注册所有路由，包括：
     - MinIO Audit Webhook (/minio/audit)
+    - GitLab Webhook (/gitlab/webhook)
     - 健康检查 (/health)
     - MCP 端点 (/mcp)
     - REST 记忆接口 (/memory/store, /memory/query)
     - 可靠性报告 (/reliability/report)
+    - 数据库语句统计 (/metrics/db)
     - 治理设置 (/governance/settings/update)
 
     设计原则：
@@ -134,6 +138,11 @@ def register_routes(app: FastAPI) -> None:
 
     app.include_router(minio_audit_router)
 
+    # 注册 GitLab Webhook 路由
+    from .gitlab_webhook import router as gitlab_webhook_router
+
+    app.include_router(gitlab_webhook_router)
+
     # 导入 ToolCallContext 用于构造工具调用上下文
     from .services.ports import ToolCallContext
 
@@ -564,6 +573,38 @@ def register_routes(app: FastAPI) -> None:
                 error_code=ReliabilityReportErrorCode.EXECUTION_FAILED,
             )
 
+    @app.get("/metrics/db")
+    async def db_metrics_endpoint(format: str = "json", top: int = 50, sort: str = "total_ms"):
+        """
+        Logbook 语句级数据库统计（需 ENGRAM_DB_INSTRUMENTATION=1）
+
+        - format=json（默认）: 按 sort 排序的前 top 个语句指纹 + 慢查询记录
+        - format=prometheus: Prometheus 文本格式
+        """
+        try:
+            from engram.logbook.db_instrumentation import (
+                format_prometheus_metrics,
+                get_registry,
+            )
+        except ImportError as e:
+            logger.warning(f"db_instrumentation 依赖导入失败: {e}")
+            return JSONResponse(
+                status_code=503,
+                content={"ok": False, "message": f"db_instrumentation 不可用: {e}"},
+            )
+
+        try:
+            snapshot = get_registry().snapshot(top=top if top > 0 else None, sort_by=sort)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"ok": False, "message": str(e)})
+
+        if format == "prometheus":
+            return Response(
+                content=format_prometheus_metrics(snapshot),
+                media_type="text/plain; version=0.0.4",
+            )
+        return {"ok": True, **snapshot}
+
     @app.post("/governance/settings/update", response_model=GovernanceSettingsUpdateResponse)
     async def governance_settings_update_endpoint(request: GovernanceSettingsUpdateRequest):
         """
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+engram_logbook.backfill_candidate_embeddings - 回填 knowledge_candidates 的 embedding
+
+按 candidate_id 升序分批读取未向量化（或由其他 embedder 生成）的行，
+批量向量化后写回 embedding/embedding_model/embedded_at，每批提交一次。
+
+用法:
+    python -m engram.logbook.backfill_candidate_embeddings --json
+    python -m engram.logbook.backfill_candidate_embeddings --embedder hashing --batch-size 500
+    python -m engram.logbook.backfill_candidate_embeddings --reembed   # 重算全部行
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import psycopg
+from psycopg.rows import dict_row
+
+from .config import Config, add_config_argument, get_config
+from .db import get_connection
+from .embedding import Embedder, candidate_text, get_embedder, to_vector_literal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def get_candidates_to_embed(
+    conn: psycopg.Connection,
+    embedding_model: str,
+    after_id: int = 0,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    reembed: bool = False,
+) -> List[Dict[str, Any]]:
+    if reembed:
+        query = """
+            SELECT candidate_id, title, content_md
+            FROM analysis.knowledge_candidates
+            WHERE candidate_id > %s
+            ORDER BY candidate_id
+            LIMIT %s
+        """
+        params: tuple[Any, ...] = (after_id, batch_size)
+    else:
+        query = """
+            SELECT candidate_id, title, content_md
+            FROM analysis.knowledge_candidates
+            WHERE candidate_id > %s
+              AND (embedding IS NULL OR embedding_model IS DISTINCT FROM %s)
+            ORDER BY candidate_id
+            LIMIT %s
+        """
+        params = (after_id, embedding_model, batch_size)
+
+    with conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+def update_candidate_embeddings(
+    conn: psycopg.Connection,
+    embedding_model: str,
+    embeddings: List[tuple[int, List[float]]],
+) -> int:
+    """
+    批量写回 embedding（单条 UPDATE ... FROM unnest）
+
+    Returns:
+        实际更新的行数
+    """
+    if not embeddings:
+        return 0
+
+    ids = [candidate_id for candidate_id, _ in embeddings]
+    vectors = [to_vector_literal(vector) for _, vector in embeddings]
+    query = """
+        UPDATE analysis.knowledge_candidates kc
+        SET embedding = v.embedding::vector,
+            embedding_model = %s,
+            embedded_at = now()
+        FROM unnest(%s::bigint[], %s::text[]) AS v(candidate_id, embedding)
+        WHERE kc.candidate_id = v.candidate_id
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (embedding_model, ids, vectors))
+        return cur.rowcount
+
+
+def backfill_embeddings(
+    conn: psycopg.Connection,
+    embedder: Embedder,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+    reembed: bool = False,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    total_processed = 0
+    total_updated = 0
+    total_failed = 0
+    last_id = 0
+
+    while limit is None or total_processed < limit:
+        fetch_size = batch_size if limit is None else min(batch_size, limit - total_processed)
+        candidates = get_candidates_to_embed(
+            conn, embedder.name, after_id=last_id, batch_size=fetch_size, reembed=reembed
+        )
+        if not candidates:
+            break
+
+        last_id = candidates[-1]["candidate_id"]
+        total_processed += len(candidates)
+
+        if dry_run:
+            total_updated += len(candidates)
+        else:
+            try:
+                vectors = embedder.embed(
+                    [candidate_text(c["title"], c["content_md"]) for c in candidates]
+                )
+                updated = update_candidate_embeddings(
+                    conn,
+                    embedder.name,
+                    [(c["candidate_id"], v) for c, v in zip(candidates, vectors)],
+                )
+                conn.commit()
+                total_updated += updated
+                total_failed += len(candidates) - updated
+            except Exception as e:
+                conn.rollback()
+                logger.error(
+                    "回填 embedding 出错 (candidate_id <= %s): %s",
+                    last_id,
+                    e,
+                )
+                total_failed += len(candidates)
+
+        logger.debug("已处理 %s 行（last_candidate_id=%s）", total_processed, last_id)
+
+        if len(candidates) < fetch_size:
+            break
+
+    return {
+        "total_processed": total_processed,
+        "total_updated": total_updated,
+        "total_failed": total_failed,
+        "last_candidate_id": last_id,
+    }
+
+
+def backfill_candidate_embeddings(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+    reembed: bool = False,
+    limit: Optional[int] = None,
+    embedder_name: Optional[str] = None,
+    config: Optional[Config] = None,
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        "success": False,
+        "dry_run": dry_run,
+        "reembed": reembed,
+        "embedder": None,
+        "knowledge_candidates": {"total_processed": 0, "total_updated": 0, "total_failed": 0},
+    }
+
+    try:
+        embedder = get_embedder(embedder_name, config=config)
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+    result["embedder"] = embedder.name
+
+    conn = get_connection(config=config)
+    try:
+        stats = backfill_embeddings(
+            conn,
+            embedder,
+            batch_size=batch_size,
+            dry_run=dry_run,
+            reembed=reembed,
+            limit=limit,
+        )
+        result["knowledge_candidates"] = stats
+        result["success"] = stats["total_failed"] == 0
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        conn.close()
+
+    return result
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="回填 knowledge_candidates 的 embedding")
+    add_config_argument(parser)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--limit", type=int, default=None, help="最多处理的行数")
+    parser.add_argument("--embedder", default=None, help="embedder 名称（默认按配置解析）")
+    parser.add_argument("--reembed", action="store_true", help="重算全部行（忽略已有向量）")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    config = get_config(args.config_path)
+    config.load()
+    res = backfill_candidate_embeddings(
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        reembed=args.reembed,
+        limit=args.limit,
+        embedder_name=args.embedder,
+        config=config,
+    )
+    if args.json:
+        print(json.dumps(res, default=str, ensure_ascii=False))
+    return 0 if res.get("success") else 1
+
+
+__all__ = ["backfill_candidate_embeddings", "main"]
+
+if __name__ == "__main__":
+    raise SystemExit(main())
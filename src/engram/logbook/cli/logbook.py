@@ -10,6 +10,7 @@ engram_logbook.cli.logbook - Logbook CLI 主入口
     engram-logbook health
     engram-logbook validate
     engram-logbook render_views
+    engram-logbook db_stats --file /tmp/engram_db_stats.json --top 20
     engram-logbook artifacts write --uri <uri> --content <content>
     engram-logbook artifacts read --uri <uri>
 
@@ -104,6 +105,22 @@ def main() -> int:
     render_parser.add_argument("--item-id")
     add_output_arguments(render_parser)
 
+    # db_stats 子命令
+    db_stats_parser = subparsers.add_parser(
+        "db_stats",
+        help="查看语句级数据库统计（读取 ENGRAM_DB_STATS_FILE 写出的快照）",
+    )
+    db_stats_parser.add_argument(
+        "--file", help="统计快照文件路径（默认读取环境变量 ENGRAM_DB_STATS_FILE）"
+    )
+    db_stats_parser.add_argument("--top", type=int, default=20, help="仅输出前 N 个语句")
+    db_stats_parser.add_argument(
+        "--sort",
+        default="total_ms",
+        help="排序字段: total_ms/mean_ms/p95_ms/max_ms/count/rows/errors",
+    )
+    add_output_arguments(db_stats_parser)
+
     args = parser.parse_args()
     opts = get_output_options(args)
 
@@ -185,6 +202,39 @@ def main() -> int:
             )
             return 1
 
+        if args.command == "db_stats":
+            import os
+
+            from engram.logbook.db_instrumentation import ENV_DB_STATS_FILE, load_snapshot
+
+            stats_file = args.file or os.environ.get(ENV_DB_STATS_FILE)
+            if not stats_file:
+                return output_invalid_args(f"缺少参数: --file（或设置 {ENV_DB_STATS_FILE}）")
+            if not os.path.exists(stats_file):
+                output_json(
+                    make_error_result(
+                        code="STATS_FILE_NOT_FOUND",
+                        message=f"统计快照不存在: {stats_file}",
+                    ),
+                    pretty=opts["pretty"],
+                    quiet=opts["quiet"],
+                    json_out=opts["json_out"],
+                )
+                return 1
+            try:
+                snapshot = load_snapshot(
+                    stats_file, top=args.top if args.top > 0 else None, sort_by=args.sort
+                )
+            except ValueError as e:
+                return output_invalid_args(str(e))
+            output_json(
+                {"ok": True, **snapshot},
+                pretty=opts["pretty"],
+                quiet=opts["quiet"],
+                json_out=opts["json_out"],
+            )
+            return 0
+
         output_json(
             make_error_result(code="UNKNOWN_COMMAND", message=f"未知命令: {args.command}"),
             pretty=opts["pretty"],
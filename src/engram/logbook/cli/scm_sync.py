@@ -39,7 +39,7 @@ import logging
 import os
 import sys
 import time
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 # ============ 共享工具函数 ============
 
@@ -73,6 +73,8 @@ def _setup_logging(verbose: bool = False) -> None:
 # 默认循环间隔（秒）
 DEFAULT_SCHEDULER_INTERVAL_SECONDS = 60
 DEFAULT_REAPER_INTERVAL_SECONDS = 60
+# 增量调度全量重建间隔（秒）
+DEFAULT_FULL_REFRESH_SECONDS = 900
 
 
 def scheduler_main(argv: Optional[List[str]] = None) -> int:
@@ -82,6 +84,7 @@ def scheduler_main(argv: Optional[List[str]] = None) -> int:
         SchedulerConfig,
     )
     from engram.logbook.scm_sync_scheduler_core import (
+        IncrementalSchedulerState,
         run_scheduler_tick,
     )
 
@@ -102,6 +105,9 @@ def scheduler_main(argv: Optional[List[str]] = None) -> int:
     # JSON 格式输出（便于日志采集）
     python -m engram.logbook.cli.scm_sync scheduler --loop --json
 
+    # 增量模式：每轮只重新评估有变化的仓库，每 15 分钟全量重建一次
+    python -m engram.logbook.cli.scm_sync scheduler --loop --incremental --full-refresh-seconds 900
+
 环境变量:
     LOGBOOK_DSN                 数据库连接字符串（优先）
     POSTGRES_DSN                数据库连接字符串（备用）
@@ -141,6 +147,18 @@ def scheduler_main(argv: Optional[List[str]] = None) -> int:
         action="store_true",
         help="干运行模式，不实际入队",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量调度：跨轮保留仓库状态，只重新评估输入有变化或游标年龄越过阈值的仓库",
+    )
+    parser.add_argument(
+        "--full-refresh-seconds",
+        type=int,
+        default=DEFAULT_FULL_REFRESH_SECONDS,
+        help=f"增量调度的全量重建间隔秒数（默认 {DEFAULT_FULL_REFRESH_SECONDS}，"
+        "--incremental 时生效）",
+    )
     parser.add_argument(
         "--json",
         action="store_true",
@@ -224,6 +242,21 @@ def scheduler_main(argv: Optional[List[str]] = None) -> int:
         scheduler_config = SchedulerConfig.from_config(config)
         cb_config = CircuitBreakerConfig.from_config(config)
 
+        incremental_state = (
+            IncrementalSchedulerState(full_refresh_interval_seconds=args.full_refresh_seconds)
+            if args.incremental
+            else None
+        )
+
+        # 循环模式下熔断状态保存在进程内，按间隔/状态迁移持久化并合并 worker 快照
+        circuit_runtime = None
+        if loop_mode:
+            from engram.logbook.scm_sync_circuit_breaker import CircuitBreakerRuntime
+
+            circuit_runtime = CircuitBreakerRuntime(
+                worker_id=f"scheduler-{os.getpid()}", config=cb_config
+            )
+
         iteration = 0
         last_exit_code = 0
 
@@ -236,6 +269,8 @@ def scheduler_main(argv: Optional[List[str]] = None) -> int:
                     cb_config=cb_config,
                     dry_run=args.dry_run,
                     logger=logger,
+                    incremental=incremental_state,
+                    circuit_runtime=circuit_runtime,
                 )
 
                 # 构建输出数据
@@ -252,6 +287,8 @@ def scheduler_main(argv: Optional[List[str]] = None) -> int:
                     else:
                         print("调度完成:")
                     print(f"  扫描仓库数: {result.repos_scanned}")
+                    if incremental_state is not None:
+                        print(f"  评估仓库数: {result.repos_evaluated}")
                     print(f"  候选任务数: {result.candidates_selected}")
                     print(f"  入队任务数: {result.jobs_enqueued}")
                     print(f"  跳过任务数: {result.jobs_skipped}")
@@ -297,6 +334,9 @@ def scheduler_main(argv: Optional[List[str]] = None) -> int:
 
 # ============ Worker CLI ============
 
+# 熔断窗口快照持久化间隔（秒）
+DEFAULT_CB_SNAPSHOT_INTERVAL_SECONDS = 5.0
+
 
 def worker_main(argv: Optional[List[str]] = None) -> int:
     """Worker CLI 入口函数"""
@@ -316,6 +356,9 @@ def worker_main(argv: Optional[List[str]] = None) -> int:
     # 只处理特定类型的任务
     python -m engram.logbook.cli.scm_sync worker --worker-id worker-1 --job-types commits,mrs
 
+    # 单进程 8 个并发槽位（共享连接池与心跳线程）
+    python -m engram.logbook.cli.scm_sync worker --worker-id worker-1 --concurrency 8
+
 环境变量:
     LOGBOOK_DSN     数据库连接字符串（优先）
     POSTGRES_DSN    数据库连接字符串（备用）
@@ -327,6 +370,12 @@ def worker_main(argv: Optional[List[str]] = None) -> int:
         required=True,
         help="Worker 标识符（必填）",
     )
+    parser.add_argument(
+        "--config",
+        "-c",
+        metavar="PATH",
+        help="配置文件路径（读取 scm.circuit_breaker.* 熔断配置）",
+    )
     parser.add_argument(
         "--dsn",
         default=_get_dsn_from_env(),
@@ -365,6 +414,30 @@ def worker_main(argv: Optional[List[str]] = None) -> int:
         default=3,
         help="最大续期失败次数（默认 3）",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="单进程并发执行的任务槽位数（默认 1）",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=60.0,
+        help="退出时等待执行中任务完成的最长时间（秒，默认 60，仅 --concurrency > 1）",
+    )
+    parser.add_argument(
+        "--no-listen",
+        action="store_true",
+        help="禁用入队通知（LISTEN scm_sync_jobs），空闲时仅按 --poll-interval 轮询",
+    )
+    parser.add_argument(
+        "--cb-snapshot-interval",
+        type=float,
+        default=DEFAULT_CB_SNAPSHOT_INTERVAL_SECONDS,
+        help="熔断窗口快照持久化间隔（秒，默认 "
+        f"{DEFAULT_CB_SNAPSHOT_INTERVAL_SECONDS:g}，<= 0 时不统计熔断结果）",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -395,6 +468,19 @@ def worker_main(argv: Optional[List[str]] = None) -> int:
     if job_types:
         logger.info(f"  job_types: {job_types}")
 
+    if args.concurrency < 1:
+        logger.error("--concurrency 必须 >= 1")
+        return 1
+
+    try:
+        circuit_runtime = _build_circuit_runtime(args)
+    except Exception as e:
+        logger.error(f"配置加载失败: {e}")
+        return 1
+
+    if args.concurrency > 1:
+        return _run_multi_slot_worker(args, job_types, worker_cfg, logger, circuit_runtime)
+
     try:
         conn = _get_connection(args.dsn)
     except Exception as e:
@@ -402,6 +488,7 @@ def worker_main(argv: Optional[List[str]] = None) -> int:
         return 1
 
     processed_count = 0
+    listener = None if args.once else _build_job_listener(args, job_types)
 
     try:
         while True:
@@ -411,6 +498,7 @@ def worker_main(argv: Optional[List[str]] = None) -> int:
                     job_types=job_types,
                     worker_cfg=worker_cfg,
                     conn=conn,
+                    circuit_breaker=circuit_runtime,
                 )
 
                 if processed:
@@ -425,8 +513,11 @@ def worker_main(argv: Optional[List[str]] = None) -> int:
                         logger.info("--once 模式，队列为空，退出")
                         break
 
-                    logger.debug(f"队列为空，等待 {args.poll_interval} 秒")
-                    time.sleep(args.poll_interval)
+                    logger.debug(f"队列为空，等待入队通知（最长 {args.poll_interval} 秒）")
+                    if listener is not None:
+                        listener.wait(args.poll_interval)
+                    else:
+                        time.sleep(args.poll_interval)
 
             except KeyboardInterrupt:
                 logger.info("收到中断信号，退出")
@@ -439,12 +530,93 @@ def worker_main(argv: Optional[List[str]] = None) -> int:
         return 0
 
     finally:
+        if listener is not None:
+            listener.close()
+        if circuit_runtime is not None:
+            circuit_runtime.close()
         try:
             conn.close()
         except Exception:
             pass
 
 
+def _build_circuit_runtime(args: argparse.Namespace):
+    """
+    构建进程内熔断运行时（--cb-snapshot-interval <= 0 时返回 None）
+
+    熔断配置与 scheduler 一致（CircuitBreakerConfig.from_config），
+    保证 worker 持久化的窗口快照与 scheduler 加载的窗口长度相同。
+    """
+    if args.cb_snapshot_interval <= 0:
+        return None
+    from engram.logbook.config import get_config
+    from engram.logbook.scm_sync_circuit_breaker import CircuitBreakerRuntime
+    from engram.logbook.scm_sync_policy import CircuitBreakerConfig
+
+    config = get_config(args.config)
+    config.load()
+    return CircuitBreakerRuntime(
+        worker_id=args.worker_id,
+        dsn=args.dsn,
+        persist_interval_seconds=args.cb_snapshot_interval,
+        config=CircuitBreakerConfig.from_config(config),
+    )
+
+
+def _build_job_listener(args: argparse.Namespace, job_types: Optional[List[str]]):
+    """构建入队通知监听器（--no-listen 时返回 None）"""
+    if args.no_listen:
+        return None
+    from engram.logbook.scm_sync_notify import JobNotificationListener
+
+    return JobNotificationListener(args.dsn, job_types=job_types)
+
+
+def _run_multi_slot_worker(
+    args: argparse.Namespace,
+    job_types: Optional[List[str]],
+    worker_cfg: Dict[str, int],
+    logger: logging.Logger,
+    circuit_runtime=None,
+) -> int:
+    """以多槽位模式运行 worker，SIGTERM/SIGINT 触发优雅退出"""
+    import signal
+
+    from engram.logbook.scm_sync_worker_pool import MultiSlotWorker
+
+    worker = MultiSlotWorker(
+        worker_id=args.worker_id,
+        concurrency=args.concurrency,
+        dsn=args.dsn,
+        job_types=job_types,
+        worker_cfg=worker_cfg,
+        poll_interval=args.poll_interval,
+        drain_timeout=args.drain_timeout,
+        circuit_breaker=circuit_runtime,
+        listener=_build_job_listener(args, job_types),
+    )
+
+    def _handle_signal(signum, frame):
+        logger.info(f"收到信号 {signum}，停止 claim 并等待执行中的任务")
+        worker.request_stop()
+
+    previous = {sig: signal.signal(sig, _handle_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+    logger.info(f"  concurrency: {args.concurrency}")
+    try:
+        processed_count = worker.run(once=args.once)
+    except Exception as e:
+        logger.error(f"Worker 运行出错: {e}", exc_info=True)
+        return 1
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        if circuit_runtime is not None:
+            circuit_runtime.close()
+
+    logger.info(f"Worker 退出，共处理 {processed_count} 个任务")
+    return 0
+
+
 # ============ Reaper CLI ============
 
 
@@ -1204,6 +1376,7 @@ def admin_main(argv: Optional[List[str]] = None) -> int:
     - pauses: 暂停管理 (set/unset/list)
     - cursors: 游标管理 (list/get/set/delete)
     - rate-limit: 速率限制管理 (buckets list/pause/unpause)
+    - facts: 统一事实表管理 (reconcile)
     """
     parser = argparse.ArgumentParser(
         prog="engram-scm-sync admin",
@@ -1216,6 +1389,7 @@ def admin_main(argv: Optional[List[str]] = None) -> int:
     pauses      暂停管理 (set/unset/list)
     cursors     游标管理 (list/get/set/delete)
     rate-limit  速率限制管理 (buckets list/pause/unpause)
+    facts       统一事实表管理 (reconcile)
 
 示例:
     # 列出 dead 任务
@@ -1236,6 +1410,9 @@ def admin_main(argv: Optional[List[str]] = None) -> int:
     # 列出速率限制桶
     engram-scm-sync admin rate-limit buckets list
 
+    # 校验并修复 scm.facts
+    engram-scm-sync admin facts reconcile --repair
+
 详细帮助:
     engram-scm-sync admin <子命令> --help
         """,
@@ -1369,6 +1546,18 @@ def admin_main(argv: Optional[List[str]] = None) -> int:
     buckets_unpause = buckets_sub.add_parser("unpause", help="取消暂停桶")
     buckets_unpause.add_argument("--instance-key", required=True, help="实例 key")
 
+    # ===== facts 子命令 =====
+    facts_parser = subparsers.add_parser("facts", help="统一事实表管理")
+    facts_sub = facts_parser.add_subparsers(dest="facts_action", help="事实表操作")
+
+    # facts reconcile
+    facts_reconcile = facts_sub.add_parser(
+        "reconcile", help="对比来源表与 scm.facts，报告缺失/过期/孤儿行"
+    )
+    facts_reconcile.add_argument("--repo-id", type=int, help="仅校验指定仓库")
+    facts_reconcile.add_argument("--repair", action="store_true", help="修复差异")
+    facts_reconcile.add_argument("--sample-limit", type=int, default=20, help="每类差异样例数量")
+
     # 解析参数
     if argv is None:
         argv = sys.argv[1:]
@@ -1422,6 +1611,8 @@ def _dispatch_admin_command(args: argparse.Namespace, conn) -> int:
         return _handle_cursors_command(args, conn, scm_db)
     elif args.admin_command == "rate-limit":
         return _handle_ratelimit_command(args, conn, scm_db)
+    elif args.admin_command == "facts":
+        return _handle_facts_command(args, conn, scm_db)
     else:
         if args.json_output:
             print(json.dumps({"error": f"未知命令: {args.admin_command}"}))
@@ -1862,6 +2053,43 @@ def _handle_buckets_command(args: argparse.Namespace, conn, scm_db) -> int:
         return 1
 
 
+def _handle_facts_command(args: argparse.Namespace, conn, scm_db) -> int:
+    """处理 facts 子命令"""
+    if args.facts_action == "reconcile":
+        result = scm_db.reconcile_facts(
+            conn,
+            repo_id=args.repo_id,
+            repair=args.repair,
+            sample_limit=args.sample_limit,
+        )
+        if args.repair:
+            conn.commit()
+        in_sync = not (result["missing"] or result["stale"] or result["orphaned"])
+
+        if args.json_output:
+            print(json.dumps({"in_sync": in_sync, **result}, ensure_ascii=False))
+        else:
+            scope = f"repo_id={args.repo_id}" if args.repo_id is not None else "全部仓库"
+            print(
+                f"scm.facts 校验 ({scope}): missing={result['missing']}, "
+                f"stale={result['stale']}, orphaned={result['orphaned']}"
+            )
+            for kind, sample in result["samples"].items():
+                if sample:
+                    print(f"  {kind}: {', '.join(sample)}")
+            if result["repaired"]:
+                print(f"已修复: upserted={result['upserted']}, deleted={result['deleted']}")
+        # 仅校验时存在差异返回 1，修复后返回 0
+        return 0 if in_sync or args.repair else 1
+
+    else:
+        if args.json_output:
+            print(json.dumps({"error": "请指定 facts 子命令: reconcile"}))
+        else:
+            print("错误: 请指定 facts 子命令: reconcile", file=sys.stderr)
+        return 1
+
+
 # ============ 统一入口 ============
 
 
@@ -1878,7 +2106,7 @@ def main(argv: Optional[List[str]] = None) -> int:
     reaper      清理器 - 回收过期任务、runs 和锁
     status      状态查询 - 查看同步健康状态与指标
     runner      运行器 - 增量同步与回填工具
-    admin       管理命令 - 运维管理工具 (jobs/locks/pauses/cursors/rate-limit)
+    admin       管理命令 - 运维管理工具 (jobs/locks/pauses/cursors/rate-limit/facts)
 
 示例:
     python -m engram.logbook.cli.scm_sync scheduler --once
@@ -1891,6 +2119,7 @@ def main(argv: Optional[List[str]] = None) -> int:
     python -m engram.logbook.cli.scm_sync admin pauses list
     python -m engram.logbook.cli.scm_sync admin cursors list
     python -m engram.logbook.cli.scm_sync admin rate-limit buckets list
+    python -m engram.logbook.cli.scm_sync admin facts reconcile
 
 详细帮助:
     python -m engram.logbook.cli.scm_sync <子命令> --help
@@ -1918,7 +2147,7 @@ def main(argv: Optional[List[str]] = None) -> int:
     # admin 子命令
     subparsers.add_parser(
         "admin",
-        help="管理命令 - 运维管理工具 (jobs/locks/pauses/cursors/rate-limit)",
+        help="管理命令 - 运维管理工具 (jobs/locks/pauses/cursors/rate-limit/facts)",
         add_help=False,
     )
 
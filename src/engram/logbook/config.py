@@ -157,6 +157,9 @@ class RateLimitConfigDict(TypedDict):
     postgres_rate_limit_rate: float
     postgres_rate_limit_burst: int
     postgres_rate_limit_max_wait: float
+    postgres_rate_limit_lease_enabled: bool
+    postgres_rate_limit_lease_workers: int
+    postgres_rate_limit_lease_ttl_seconds: float
     tenant_rate_limit_enabled: bool
     tenant_rate_limit_rate: float
     tenant_rate_limit_burst: int
@@ -2206,6 +2209,12 @@ DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_ENABLED = False  # 默认关闭，保持向
 DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_RATE = 10.0
 DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_BURST = 20
 DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_MAX_WAIT = 60.0
+# 令牌租约：每次事务预留一批令牌在本地消费，减少每请求一次的 DB 往返
+DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_ENABLED = False  # 默认关闭，保持向后兼容
+DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_WORKERS = (
+    1  # 共享同一桶的 worker 进程数（用于计算租约大小）
+)
+DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_TTL_SECONDS = 2.0  # 租约有效期，过期未用的令牌作废
 
 # Postgres 分布式速率限制（tenant 维度）
 # key 形如: gitlab:<host>:tenant:<id>
@@ -2215,6 +2224,12 @@ DEFAULT_GITLAB_TENANT_RATE_LIMIT_RATE = 5.0  # tenant 级别更保守
 DEFAULT_GITLAB_TENANT_RATE_LIMIT_BURST = 10
 DEFAULT_GITLAB_TENANT_RATE_LIMIT_MAX_WAIT = 30.0
 
+# 条件请求响应缓存：带 ETag/Last-Modified 的 GET 响应以条件请求复用，
+# 按完整 SHA 定位的 commit/diff 视为不可变资源，命中后不发网络请求
+DEFAULT_GITLAB_RESPONSE_CACHE_ENABLED = False  # 默认关闭，保持向后兼容
+DEFAULT_GITLAB_RESPONSE_CACHE_DIR = None  # None 表示仅使用进程内存
+DEFAULT_GITLAB_RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64MB
+
 
 def get_scheduler_config(config: Optional["Config"] = None) -> SchedulerConfigDict:
     """
@@ -2552,6 +2567,9 @@ def get_gitlab_rate_limit_config(config: Optional["Config"] = None) -> RateLimit
     - scm.gitlab.postgres_rate_limit_rate: Postgres 令牌补充速率，默认 10.0
     - scm.gitlab.postgres_rate_limit_burst: Postgres 最大令牌容量，默认 20
     - scm.gitlab.postgres_rate_limit_max_wait: Postgres 最大等待秒数，默认 60.0
+    - scm.gitlab.postgres_rate_limit_lease_enabled: 启用令牌租约模式，默认 False
+    - scm.gitlab.postgres_rate_limit_lease_workers: 共享同一桶的 worker 进程数，默认 1
+    - scm.gitlab.postgres_rate_limit_lease_ttl_seconds: 租约有效期（秒），默认 2.0
 
     配置示例:
         [scm.gitlab]
@@ -2565,6 +2583,9 @@ def get_gitlab_rate_limit_config(config: Optional["Config"] = None) -> RateLimit
         postgres_rate_limit_rate = 10.0
         postgres_rate_limit_burst = 20
         postgres_rate_limit_max_wait = 60.0
+        # 令牌租约：每次预留 min(burst / lease_workers, rate * lease_ttl_seconds) 个令牌
+        postgres_rate_limit_lease_enabled = false
+        postgres_rate_limit_lease_workers = 4
 
     注意:
         这两个速率限制开关默认都为 False，保持向后兼容。
@@ -2626,6 +2647,18 @@ def get_gitlab_rate_limit_config(config: Optional["Config"] = None) -> RateLimit
             "scm.gitlab.postgres_rate_limit_max_wait",
             DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_MAX_WAIT,
         ),
+        "postgres_rate_limit_lease_enabled": _get_bool_config(
+            "scm.gitlab.postgres_rate_limit_lease_enabled",
+            DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_ENABLED,
+        ),
+        "postgres_rate_limit_lease_workers": _get_with_default(
+            "scm.gitlab.postgres_rate_limit_lease_workers",
+            DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_WORKERS,
+        ),
+        "postgres_rate_limit_lease_ttl_seconds": _get_with_default(
+            "scm.gitlab.postgres_rate_limit_lease_ttl_seconds",
+            DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_TTL_SECONDS,
+        ),
         # Postgres 分布式速率限制（tenant 维度）
         # key 形如: gitlab:<host>:tenant:<id>
         "tenant_rate_limit_enabled": _get_bool_config(
@@ -27,11 +27,11 @@ engram_logbook.cursor - 游标工具模块
 
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 from typing_extensions import TypedDict
 
-from .db import get_kv, set_kv
+from .db import get_kv, get_kv_many, set_kv
 
 # === TypedDict 定义：区分不同游标类型的 watermark 与 stats ===
 
@@ -495,7 +495,34 @@ def load_cursor(
     """
     key = _build_cursor_key(cursor_type, repo_id)
     data = get_kv(KV_NAMESPACE, key, config=config)
+    return _cursor_from_kv(data, cursor_type)
 
+
+def load_cursors(
+    cursor_type: str,
+    repo_ids: Iterable[int],
+    config: Optional[Any] = None,
+) -> Dict[int, Cursor]:
+    """
+    批量加载多个仓库的游标（单条查询，语义与逐个调用 load_cursor 相同）
+
+    Args:
+        cursor_type: 游标类型 (svn/gitlab/gitlab_mr/gitlab_reviews)
+        repo_ids: 仓库 ID 列表
+        config: 可选的 Config 实例
+
+    Returns:
+        {repo_id: Cursor}，包含每个传入的 repo_id（不存在时为空 Cursor）
+    """
+    keys = {repo_id: _build_cursor_key(cursor_type, repo_id) for repo_id in repo_ids}
+    if not keys:
+        return {}
+    values = get_kv_many(KV_NAMESPACE, keys.values(), config=config)
+    return {repo_id: _cursor_from_kv(values.get(key), cursor_type) for repo_id, key in keys.items()}
+
+
+def _cursor_from_kv(data: Any, cursor_type: str) -> Cursor:
+    """将 KV 中读取的值转换为 Cursor（不存在或类型不符时返回空 Cursor）"""
     if not data:
         # 不存在，返回空游标（类型安全的空字典）
         return Cursor(
@@ -710,18 +737,22 @@ def load_gitlab_reviews_cursor(repo_id: int, config: Optional[Any] = None) -> Cu
         - last_mr_updated_at: 最后同步的 MR 更新时间 (ISO 8601)
         - last_mr_iid: 最后同步的 MR IID（MR 列表驱动模式）
         - last_event_ts: 可选的事件级水位线 (ISO 8601)
+        - mr_failures: 可选的 MR 连续失败次数 {iid: count}
+        - dead_mr_iids: 可选的因连续失败被跳过的 MR IID 列表
     """
     return load_cursor(CURSOR_TYPE_GITLAB_REVIEWS, repo_id, config)
 
 
 def save_gitlab_reviews_cursor(
     repo_id: int,
-    last_mr_updated_at: str,
+    last_mr_updated_at: Optional[str],
     last_mr_iid: Optional[int],
     synced_mr_count: int,
     synced_event_count: int,
     last_event_ts: Optional[str] = None,
     config: Optional[Any] = None,
+    mr_failures: Optional[Dict[str, int]] = None,
+    dead_mr_iids: Optional[List[int]] = None,
 ) -> bool:
     """
     保存 GitLab Reviews 游标
@@ -731,23 +762,29 @@ def save_gitlab_reviews_cursor(
 
     Args:
         repo_id: 仓库 ID
-        last_mr_updated_at: 最后同步的 MR 更新时间 (ISO 8601)
+        last_mr_updated_at: 最后同步的 MR 更新时间 (ISO 8601，首次同步前可为 None)
         last_mr_iid: 最后同步的 MR IID（可为 None）
         synced_mr_count: 本次同步的 MR 数
         synced_event_count: 本次同步的事件数
         last_event_ts: 可选的事件级水位线 (ISO 8601)
         config: 可选的 Config 实例
+        mr_failures: 可选的 MR 连续失败次数 {iid: count}
+        dead_mr_iids: 可选的因连续失败被跳过的 MR IID 列表
 
     Returns:
         True 表示成功
     """
-    watermark: Dict[str, Any] = {
-        "last_mr_updated_at": last_mr_updated_at,
-    }
+    watermark: Dict[str, Any] = {}
+    if last_mr_updated_at is not None:
+        watermark["last_mr_updated_at"] = last_mr_updated_at
     if last_mr_iid is not None:
         watermark["last_mr_iid"] = last_mr_iid
     if last_event_ts is not None:
         watermark["last_event_ts"] = last_event_ts
+    if mr_failures:
+        watermark["mr_failures"] = mr_failures
+    if dead_mr_iids:
+        watermark["dead_mr_iids"] = dead_mr_iids
 
     now_str = normalize_iso_ts_z(datetime.now(timezone.utc).isoformat()) or ""
     cursor = Cursor(
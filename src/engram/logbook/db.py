@@ -25,15 +25,17 @@ JSON 边界约定:
 from __future__ import annotations
 
 import json
-from collections.abc import Mapping, Sequence
+from collections.abc import Iterable, Iterator, Mapping, Sequence
 from datetime import datetime
 from pathlib import Path
 from typing import Any, TypedDict
 
 import psycopg
 
+from . import db_instrumentation
 from .config import Config, get_config
-from .errors import DatabaseError, DbConnectionError
+from .errors import DatabaseError, DbConnectionError, ValidationError
+from .kv import escape_like_prefix
 from .schema_context import SchemaContext, get_schema_context
 
 # ============ TypedDict 定义：数据库返回结构 ============
@@ -255,6 +257,28 @@ class Database:
             dsn=self._dsn_override,
         )
 
+    def get_kv_many(
+        self, keys: Iterable[str], namespace: str | None = None
+    ) -> dict[str, JsonValue]:
+        """批量获取 KV"""
+        ns = namespace or self.DEFAULT_KV_NAMESPACE
+        return get_kv_many(
+            namespace=ns,
+            keys=keys,
+            config=self._config,
+            dsn=self._dsn_override,
+        )
+
+    def set_kv_many(self, items: Mapping[str, JsonValue], namespace: str | None = None) -> int:
+        """批量设置 KV"""
+        ns = namespace or self.DEFAULT_KV_NAMESPACE
+        return set_kv_many(
+            namespace=ns,
+            items=items,
+            config=self._config,
+            dsn=self._dsn_override,
+        )
+
     @staticmethod
     def _mask_dsn(dsn: str) -> str:
         """隐藏 DSN 中的密码"""
@@ -447,6 +471,9 @@ def get_connection(
     1. 显式传入的 statement_timeout_ms 参数
     2. 环境变量 ENGRAM_PG_STATEMENT_TIMEOUT_MS
 
+    设置环境变量 ENGRAM_DB_INSTRUMENTATION=1 时，连接会安装语句级埋点
+    （见 db_instrumentation 模块）。
+
     Args:
         dsn: 数据库连接字符串，为 None 时从配置读取
         config: Config 实例，仅当 dsn 为 None 时使用
@@ -553,9 +580,56 @@ def get_connection(
                 {"statement_timeout_ms": timeout_ms, "error": str(e)},
             )
 
+    # 语句级埋点（ENGRAM_DB_INSTRUMENTATION 启用时安装 InstrumentedCursor）
+    db_instrumentation.maybe_install(conn)
+
     return conn
 
 
+# ---------- 热点语句预备（server-side prepared statements） ----------
+
+# 环境变量：热点语句的预备模式
+ENV_DB_PREPARE = "ENGRAM_DB_PREPARE"
+
+# - auto: 调用方传入的（长生命周期）连接上显式预备；函数内部临时连接沿用 psycopg 默认阈值
+# - on:   总是显式预备
+# - off:  总是禁用预备（如 PgBouncer transaction pooling 等不支持预备语句的部署）
+PREPARE_MODE_AUTO = "auto"
+PREPARE_MODE_ON = "on"
+PREPARE_MODE_OFF = "off"
+PREPARE_MODES = (PREPARE_MODE_AUTO, PREPARE_MODE_ON, PREPARE_MODE_OFF)
+
+
+def get_prepare_mode() -> str:
+    """读取 ENGRAM_DB_PREPARE（无效值回退为 auto）"""
+    import os
+
+    mode = os.environ.get(ENV_DB_PREPARE, PREPARE_MODE_AUTO).strip().lower()
+    return mode if mode in PREPARE_MODES else PREPARE_MODE_AUTO
+
+
+def hot_statement_prepare(long_lived: bool) -> bool | None:
+    """
+    返回热点语句 cursor.execute(..., prepare=...) 使用的参数
+
+    psycopg 的预备语句按连接缓存：只有连接被复用时，PREPARE 的额外开销才能被后续
+    执行摊薄。热点语句（claim/去重/令牌桶/审计写入）使用模块级常量 SQL，
+    保证同一过滤组合下文本稳定，从而复用同一预备语句。
+
+    Args:
+        long_lived: 连接是否由调用方传入并会被复用
+
+    Returns:
+        True/False 强制开启/关闭；None 表示沿用 psycopg 默认（执行 prepare_threshold 次后自动预备）
+    """
+    mode = get_prepare_mode()
+    if mode == PREPARE_MODE_ON:
+        return True
+    if mode == PREPARE_MODE_OFF:
+        return False
+    return True if long_lived else None
+
+
 def execute_sql_file(
     conn: psycopg.Connection[Any],
     sql_path: Path,
@@ -898,8 +972,214 @@ def get_kv(
         conn.close()
 
 
+def get_kv_many(
+    namespace: str,
+    keys: Iterable[str],
+    config: Config | None = None,
+    dsn: str | None = None,
+) -> dict[str, JsonValue]:
+    """
+    从 logbook.kv 批量获取多个键（单条 `key = ANY(%s)` 查询）
+
+    Args:
+        namespace: 命名空间
+        keys: 键名列表
+        config: 配置实例
+        dsn: 数据库连接字符串
+
+    Returns:
+        {key: value}，不存在的键不会出现在结果中
+    """
+    key_list = list(dict.fromkeys(keys))
+    if not key_list:
+        return {}
+
+    conn = get_connection(dsn=dsn, config=config)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT key, value_json FROM kv
+                WHERE namespace = %s AND key = ANY(%s)
+                """,
+                (namespace, key_list),
+            )
+            return {row[0]: row[1] for row in cur.fetchall()}
+    except psycopg.Error as e:
+        raise DatabaseError(
+            f"批量获取 KV 失败: {e}",
+            {"namespace": namespace, "key_count": len(key_list), "error": str(e)},
+        )
+    finally:
+        conn.close()
+
+
+def set_kv_many(
+    namespace: str,
+    items: Mapping[str, JsonValue],
+    config: Config | None = None,
+    dsn: str | None = None,
+) -> int:
+    """
+    在 logbook.kv 中批量设置键值对（单条多行 upsert，单个事务）
+
+    Args:
+        namespace: 命名空间
+        items: {key: value}
+        config: 配置实例
+        dsn: 数据库连接字符串
+
+    Returns:
+        写入的行数
+    """
+    if not items:
+        return 0
+
+    keys = list(items)
+    values = [json.dumps(items[key]) for key in keys]
+    conn = get_connection(dsn=dsn, config=config)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO kv (namespace, key, value_json, updated_at)
+                SELECT %s, v.key, v.value_json::jsonb, now()
+                FROM unnest(%s::text[], %s::text[]) AS v(key, value_json)
+                ON CONFLICT (namespace, key) DO UPDATE
+                SET value_json = EXCLUDED.value_json, updated_at = now()
+                """,
+                (namespace, keys, values),
+            )
+            count = cur.rowcount
+            conn.commit()
+            return count
+    except psycopg.Error as e:
+        conn.rollback()
+        raise DatabaseError(
+            f"批量设置 KV 失败: {e}",
+            {"namespace": namespace, "key_count": len(keys), "error": str(e)},
+        )
+    finally:
+        conn.close()
+
+
+def iter_kv_prefix(
+    namespace: str,
+    prefix: str = "",
+    batch_size: int = 500,
+    config: Config | None = None,
+    dsn: str | None = None,
+) -> Iterator[tuple[str, JsonValue]]:
+    """
+    按 key 前缀流式遍历 logbook.kv（服务端游标，按 key 升序）
+
+    连接在迭代结束（或生成器关闭）时释放；内存占用与 batch_size 成正比。
+
+    Args:
+        namespace: 命名空间
+        prefix: key 前缀（空字符串表示整个命名空间）
+        batch_size: 每批从服务端拉取的行数
+        config: 配置实例
+        dsn: 数据库连接字符串
+
+    Yields:
+        (key, value)
+    """
+    if batch_size <= 0:
+        raise ValidationError("batch_size 必须为正整数", {"batch_size": batch_size})
+
+    conn = get_connection(dsn=dsn, config=config)
+    try:
+        with conn.cursor(name="engram_iter_kv_prefix") as cur:
+            cur.itersize = batch_size
+            cur.execute(
+                """
+                SELECT key, value_json FROM kv
+                WHERE namespace = %s AND key LIKE %s ESCAPE '\\'
+                ORDER BY key
+                """,
+                (namespace, escape_like_prefix(prefix)),
+            )
+            for row in cur:
+                yield row[0], row[1]
+        conn.rollback()
+    except psycopg.Error as e:
+        raise DatabaseError(
+            f"遍历 KV 失败: {e}",
+            {"namespace": namespace, "prefix": prefix, "error": str(e)},
+        )
+    finally:
+        conn.close()
+
+
+def _items_filter_clause(item_type: str | None, status: str | None) -> tuple[str, list[Any]]:
+    """构造 items 的筛选条件（item_type/status），返回 (" AND ..." 片段, 参数)"""
+    clause = ""
+    params: list[Any] = []
+    if item_type:
+        clause += " AND i.item_type = %s"
+        params.append(item_type)
+    if status:
+        clause += " AND i.status = %s"
+        params.append(status)
+    return clause, params
+
+
+def _items_with_latest_event_query(
+    limit: int | None, item_type: str | None, status: str | None
+) -> tuple[str, list[Any]]:
+    """构造 items 联表最近事件的查询（limit 为 None 时不限制条数）"""
+    # 使用子查询获取每个 item 的最近事件
+    query = """
+        SELECT
+            i.item_id,
+            i.item_type,
+            i.title,
+            i.scope_json,
+            i.status,
+            i.owner_user_id,
+            i.created_at,
+            i.updated_at,
+            le.event_id AS latest_event_id,
+            le.event_type AS latest_event_type,
+            le.created_at AS latest_event_ts
+        FROM items i
+        LEFT JOIN LATERAL (
+            SELECT event_id, event_type, created_at
+            FROM events e
+            WHERE e.item_id = i.item_id
+            ORDER BY e.created_at DESC
+            LIMIT 1
+        ) le ON true
+        WHERE 1=1
+    """
+    clause, params = _items_filter_clause(item_type, status)
+    query += clause
+    query += " ORDER BY COALESCE(le.created_at, i.updated_at, i.created_at) DESC"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+
+def _row_to_item_with_latest_event(row: Sequence[Any]) -> ItemWithLatestEventRow:
+    return ItemWithLatestEventRow(
+        item_id=row[0],
+        item_type=row[1],
+        title=row[2],
+        scope_json=row[3],
+        status=row[4],
+        owner_user_id=row[5],
+        created_at=row[6],
+        updated_at=row[7],
+        latest_event_id=row[8],
+        latest_event_type=row[9],
+        latest_event_ts=row[10],
+    )
+
+
 def get_items_with_latest_event(
-    limit: int = 100,
+    limit: int | None = 100,
     item_type: str | None = None,
     status: str | None = None,
     config: Config | None = None,
@@ -909,7 +1189,7 @@ def get_items_with_latest_event(
     查询 logbook.items 并联表获取最近事件信息
 
     Args:
-        limit: 返回条目数量上限
+        limit: 返回条目数量上限（None 表示不限制）
         item_type: 按 item_type 筛选
         status: 按状态筛选
         config: 配置实例
@@ -921,66 +1201,9 @@ def get_items_with_latest_event(
     conn = get_connection(dsn=dsn, config=config)
     try:
         with conn.cursor() as cur:
-            # 使用子查询获取每个 item 的最近事件
-            query = """
-                SELECT
-                    i.item_id,
-                    i.item_type,
-                    i.title,
-                    i.scope_json,
-                    i.status,
-                    i.owner_user_id,
-                    i.created_at,
-                    i.updated_at,
-                    le.event_id AS latest_event_id,
-                    le.event_type AS latest_event_type,
-                    le.created_at AS latest_event_ts
-                FROM items i
-                LEFT JOIN LATERAL (
-                    SELECT event_id, event_type, created_at
-                    FROM events e
-                    WHERE e.item_id = i.item_id
-                    ORDER BY e.created_at DESC
-                    LIMIT 1
-                ) le ON true
-                WHERE 1=1
-            """
-            params: list[Any] = []
-
-            if item_type:
-                query += " AND i.item_type = %s"
-                params.append(item_type)
-
-            if status:
-                query += " AND i.status = %s"
-                params.append(status)
-
-            query += " ORDER BY COALESCE(le.created_at, i.updated_at, i.created_at) DESC"
-            query += " LIMIT %s"
-            params.append(limit)
-
+            query, params = _items_with_latest_event_query(limit, item_type, status)
             cur.execute(query, params)
-            rows = cur.fetchall()
-
-            results: list[ItemWithLatestEventRow] = []
-            for row in rows:
-                results.append(
-                    ItemWithLatestEventRow(
-                        item_id=row[0],
-                        item_type=row[1],
-                        title=row[2],
-                        scope_json=row[3],
-                        status=row[4],
-                        owner_user_id=row[5],
-                        created_at=row[6],
-                        updated_at=row[7],
-                        latest_event_id=row[8],
-                        latest_event_type=row[9],
-                        latest_event_ts=row[10],
-                    )
-                )
-
-            return results
+            return [_row_to_item_with_latest_event(row) for row in cur.fetchall()]
 
     except psycopg.Error as e:
         raise DatabaseError(
@@ -991,6 +1214,109 @@ def get_items_with_latest_event(
         conn.close()
 
 
+def iter_items_with_latest_event(
+    limit: int | None = None,
+    item_type: str | None = None,
+    status: str | None = None,
+    batch_size: int = 1000,
+    config: Config | None = None,
+    dsn: str | None = None,
+) -> Iterator[ItemWithLatestEventRow]:
+    """
+    流式遍历 logbook.items（联表最近事件，服务端游标）
+
+    与 get_items_with_latest_event 返回相同的行与排序，但不在内存中物化结果集；
+    连接在迭代结束（或生成器关闭）时释放，内存占用与 batch_size 成正比。
+
+    Args:
+        limit: 返回条目数量上限（None 表示不限制）
+        item_type: 按 item_type 筛选
+        status: 按状态筛选
+        batch_size: 每批从服务端拉取的行数
+        config: 配置实例
+        dsn: 数据库连接字符串
+
+    Yields:
+        ItemWithLatestEventRow
+    """
+    if batch_size <= 0:
+        raise ValidationError("batch_size 必须为正整数", {"batch_size": batch_size})
+
+    conn = get_connection(dsn=dsn, config=config)
+    try:
+        with conn.cursor(name="engram_iter_items_latest_event") as cur:
+            cur.itersize = batch_size
+            query, params = _items_with_latest_event_query(limit, item_type, status)
+            cur.execute(query, params)
+            for row in cur:
+                yield _row_to_item_with_latest_event(row)
+        conn.rollback()
+    except psycopg.Error as e:
+        raise DatabaseError(
+            f"遍历 items 失败: {e}",
+            {"limit": limit, "error": str(e)},
+        )
+    finally:
+        conn.close()
+
+
+def get_items_high_water_mark(
+    item_type: str | None = None,
+    status: str | None = None,
+    config: Config | None = None,
+    dsn: str | None = None,
+) -> dict[str, Any]:
+    """
+    获取 items/events 的高水位（用于判断视图是否需要重新渲染）
+
+    items 的新增/删除体现在 items_count 与 max_item_id，状态或内容变更体现在
+    max_item_updated_at，新事件体现在 max_event_id（events 只追加）。
+
+    Args:
+        item_type: 按 item_type 筛选
+        status: 按状态筛选
+        config: 配置实例
+        dsn: 数据库连接字符串
+
+    Returns:
+        {items_count, max_item_id, max_item_updated_at, max_event_id}（时间为 ISO 字符串）
+    """
+    clause, params = _items_filter_clause(item_type, status)
+    if clause:
+        max_event_query = f"""
+            SELECT max(e.event_id) FROM events e JOIN items i ON i.item_id = e.item_id
+            WHERE 1=1{clause}
+        """
+    else:
+        # 无筛选时直接走 events 主键索引
+        max_event_query = "SELECT max(event_id) FROM events"
+    query = f"""
+        SELECT count(*), max(i.item_id), max(i.updated_at), ({max_event_query})
+        FROM items i
+        WHERE 1=1{clause}
+    """
+    conn = get_connection(dsn=dsn, config=config)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params * 2 if clause else params)
+            row = cur.fetchone()
+            if row is None:
+                raise DatabaseError("查询 items 高水位失败: 未返回结果", {})
+            return {
+                "items_count": row[0],
+                "max_item_id": row[1],
+                "max_item_updated_at": row[2].isoformat() if row[2] else None,
+                "max_event_id": row[3],
+            }
+    except psycopg.Error as e:
+        raise DatabaseError(
+            f"查询 items 高水位失败: {e}",
+            {"item_type": item_type, "status": status, "error": str(e)},
+        )
+    finally:
+        conn.close()
+
+
 def get_item_by_id(
     item_id: int,
     config: Config | None = None,
@@ -1044,6 +1370,96 @@ def get_item_by_id(
 
 # ============ Analysis 操作函数 ============
 
+# query_knowledge_candidates 支持的查询模式
+# - keyword: ILIKE 关键词匹配（默认，兼容未执行 15 号迁移的库）
+# - vector: 按 embedding cosine 距离排序（需要 15_knowledge_candidates_embedding.sql）
+KNOWLEDGE_QUERY_MODE_KEYWORD = "keyword"
+KNOWLEDGE_QUERY_MODE_VECTOR = "vector"
+KNOWLEDGE_QUERY_MODES = (KNOWLEDGE_QUERY_MODE_KEYWORD, KNOWLEDGE_QUERY_MODE_VECTOR)
+
+# vector 模式的 cosine 距离上限（0 相同，1 正交，2 相反）；超过上限的行视为不相关
+DEFAULT_KNOWLEDGE_VECTOR_MAX_DISTANCE = 0.8
+
+_KNOWLEDGE_CANDIDATE_COLUMNS = """
+                    kc.candidate_id,
+                    kc.run_id,
+                    kc.kind,
+                    kc.title,
+                    kc.content_md,
+                    kc.confidence,
+                    kc.evidence_refs_json,
+                    kc.promote_suggested,
+                    kc.created_at
+"""
+
+
+def _knowledge_candidate_filters(
+    evidence_filter: str | None,
+    space_filter: str | None,
+) -> tuple[str, list[Any]]:
+    """构造 knowledge_candidates 的附加过滤条件（evidence/space）"""
+    clauses = ""
+    params: list[Any] = []
+
+    # 添加 evidence_filter（如果提供）
+    if evidence_filter:
+        # 使用 JSONB 包含操作符 @> 或文本匹配
+        clauses += " AND kc.evidence_refs_json::text ILIKE %s"
+        params.append(f"%{evidence_filter}%")
+
+    # 添加 space_filter（如果提供，需要关联 write_audit）
+    # 注意：knowledge_candidates 本身没有 space 字段，
+    # 但可以通过 evidence_refs_json 中的引用或其他关联方式过滤
+    # 这里简化为通过 evidence_refs_json 文本匹配
+    if space_filter:
+        clauses += " AND kc.evidence_refs_json::text ILIKE %s"
+        params.append(f"%{space_filter}%")
+
+    return clauses, params
+
+
+def _to_knowledge_candidate_rows(rows: Sequence[Any]) -> list[KnowledgeCandidateRow]:
+    return [
+        KnowledgeCandidateRow(
+            candidate_id=row[0],
+            run_id=row[1],
+            kind=row[2],
+            title=row[3],
+            content_md=row[4],
+            confidence=row[5],
+            evidence_refs_json=row[6],
+            promote_suggested=row[7],
+            created_at=row[8],
+        )
+        for row in rows
+    ]
+
+
+def _keyword_candidate_rows(
+    cur: Any,
+    keyword: str,
+    top_k: int,
+    filter_sql: str,
+    filter_params: list[Any],
+) -> list[KnowledgeCandidateRow]:
+    """按 ILIKE 匹配 title/content_md（filter_sql 可附加额外条件）"""
+    like_pattern = f"%{keyword}%"
+    cur.execute(
+        f"""
+        SELECT {_KNOWLEDGE_CANDIDATE_COLUMNS}
+        FROM analysis.knowledge_candidates kc
+        WHERE (
+            kc.title ILIKE %s
+            OR kc.content_md ILIKE %s
+        )
+        {filter_sql}
+        ORDER BY kc.created_at DESC
+        LIMIT %s
+        """,
+        [like_pattern, like_pattern, *filter_params, top_k],
+    )
+    return _to_knowledge_candidate_rows(cur.fetchall())
+
 
 def query_knowledge_candidates(
     keyword: str,
@@ -1052,91 +1468,93 @@ def query_knowledge_candidates(
     space_filter: str | None = None,
     config: Config | None = None,
     dsn: str | None = None,
+    mode: str = KNOWLEDGE_QUERY_MODE_KEYWORD,
+    max_distance: float = DEFAULT_KNOWLEDGE_VECTOR_MAX_DISTANCE,
 ) -> list[KnowledgeCandidateRow]:
     """
     从 analysis.knowledge_candidates 表按关键词查询知识候选项
 
-    使用 ILIKE 对 title 和 content_md 进行模糊匹配。
+    keyword 模式使用 ILIKE 对 title 和 content_md 进行模糊匹配。
+
+    vector 模式使用当前 embedder（见 engram.logbook.embedding）将 keyword 向量化，
+    返回 cosine 距离不超过 max_distance 的行（按距离排序，走 HNSW/IVFFlat 索引）。
+    不足 top_k 时，用尚未回填 embedding 的行的关键词匹配结果补足，避免新写入的候选项被漏掉。
+    以下情况直接使用 keyword 模式：
+    - 库中尚未执行 15_knowledge_candidates_embedding.sql（embedding 列不存在）
+    - 查询向量为零向量（空查询或没有可识别的 token，cosine 距离无意义）
+    - 没有任何行落在距离上限内
 
     Args:
-        keyword: 搜索关键词（将使用 ILIKE 匹配 title 和 content_md）
+        keyword: 搜索关键词（keyword 模式下用 ILIKE 匹配，vector 模式下作为查询文本）
         top_k: 返回结果数量上限（默认 10）
         evidence_filter: 可选，按 evidence_refs_json 过滤（使用 JSON 包含匹配）
         space_filter: 可选，按 target_space 过滤（需要关联 write_audit 表）
         config: 配置实例
         dsn: 数据库连接字符串
+        mode: 查询模式，"keyword"（默认）或 "vector"
+        max_distance: vector 模式的 cosine 距离上限
 
     Returns:
         KnowledgeCandidateRow 类型列表
     """
+    if mode not in KNOWLEDGE_QUERY_MODES:
+        raise ValidationError(
+            f"不支持的查询模式: {mode}",
+            {"mode": mode, "valid_modes": list(KNOWLEDGE_QUERY_MODES)},
+        )
+
+    filter_sql, filter_params = _knowledge_candidate_filters(evidence_filter, space_filter)
+
     conn = get_connection(dsn=dsn, config=config)
     try:
-        with conn.cursor() as cur:
-            # 构建基础查询
-            query = """
-                SELECT
-                    kc.candidate_id,
-                    kc.run_id,
-                    kc.kind,
-                    kc.title,
-                    kc.content_md,
-                    kc.confidence,
-                    kc.evidence_refs_json,
-                    kc.promote_suggested,
-                    kc.created_at
-                FROM analysis.knowledge_candidates kc
-                WHERE (
-                    kc.title ILIKE %s
-                    OR kc.content_md ILIKE %s
-                )
-            """
-            # 构建 ILIKE 模式
-            like_pattern = f"%{keyword}%"
-            params: list[Any] = [like_pattern, like_pattern]
-
-            # 添加 evidence_filter（如果提供）
-            if evidence_filter:
-                # 使用 JSONB 包含操作符 @> 或文本匹配
-                query += " AND kc.evidence_refs_json::text ILIKE %s"
-                params.append(f"%{evidence_filter}%")
-
-            # 添加 space_filter（如果提供，需要关联 write_audit）
-            # 注意：knowledge_candidates 本身没有 space 字段，
-            # 但可以通过 evidence_refs_json 中的引用或其他关联方式过滤
-            # 这里简化为通过 evidence_refs_json 文本匹配
-            if space_filter:
-                query += " AND kc.evidence_refs_json::text ILIKE %s"
-                params.append(f"%{space_filter}%")
-
-            # 按创建时间降序排列，并限制返回数量
-            query += " ORDER BY kc.created_at DESC LIMIT %s"
-            params.append(top_k)
+        if mode == KNOWLEDGE_QUERY_MODE_VECTOR:
+            from .embedding import get_embedder, to_vector_literal
 
-            cur.execute(query, params)
-            rows = cur.fetchall()
-
-            results: list[KnowledgeCandidateRow] = []
-            for row in rows:
-                results.append(
-                    KnowledgeCandidateRow(
-                        candidate_id=row[0],
-                        run_id=row[1],
-                        kind=row[2],
-                        title=row[3],
-                        content_md=row[4],
-                        confidence=row[5],
-                        evidence_refs_json=row[6],
-                        promote_suggested=row[7],
-                        created_at=row[8],
-                    )
-                )
+            embedder = get_embedder(config=config)
+            values = embedder.embed([keyword])[0]
+            try:
+                if any(values):
+                    query_vector = to_vector_literal(values)
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            f"""
+                            SELECT {_KNOWLEDGE_CANDIDATE_COLUMNS}
+                            FROM analysis.knowledge_candidates kc
+                            WHERE kc.embedding IS NOT NULL
+                              AND kc.embedding <=> %s::vector <= %s
+                            {filter_sql}
+                            ORDER BY kc.embedding <=> %s::vector
+                            LIMIT %s
+                            """,
+                            [query_vector, max_distance, *filter_params, query_vector, top_k],
+                        )
+                        rows = _to_knowledge_candidate_rows(cur.fetchall())
+                        if rows and len(rows) < top_k:
+                            # 补充尚未回填 embedding 的行（关键词匹配）
+                            rows += _keyword_candidate_rows(
+                                cur,
+                                keyword,
+                                top_k - len(rows),
+                                f"AND kc.embedding IS NULL {filter_sql}",
+                                filter_params,
+                            )
+                    if rows:
+                        return rows
+            except (
+                psycopg.errors.UndefinedColumn,
+                psycopg.errors.UndefinedObject,
+                psycopg.errors.UndefinedFunction,
+            ):
+                # 未执行 15 号迁移：回滚失败的语句后降级为关键词查询
+                conn.rollback()
 
-            return results
+        with conn.cursor() as cur:
+            return _keyword_candidate_rows(cur, keyword, top_k, filter_sql, filter_params)
 
     except psycopg.Error as e:
         raise DatabaseError(
             f"查询 knowledge_candidates 失败: {e}",
-            {"keyword": keyword, "top_k": top_k, "error": str(e)},
+            {"keyword": keyword, "top_k": top_k, "mode": mode, "error": str(e)},
         )
     finally:
         conn.close()
@@ -0,0 +1,467 @@
+"""
+engram_logbook.db_instrumentation - 语句级数据库埋点与慢查询日志
+
+由 db.get_connection() 在启用时为连接安装 InstrumentedCursor（psycopg cursor_factory），
+按语句指纹（归一化后的 SQL）聚合：
+- count / errors: 执行次数与失败次数
+- total_ms / mean_ms / p95_ms / max_ms: 耗时统计（p95 基于最近 N 次样本）
+- rows: 累计返回/影响行数（cursor.rowcount）
+
+超过阈值的语句写入慢查询日志（logger "engram.logbook.db.slow"），并附带当前 correlation_id。
+
+开关（环境变量）:
+- ENGRAM_DB_INSTRUMENTATION: 1/true/yes 启用（默认关闭；关闭时连接不安装任何钩子）
+- ENGRAM_DB_SLOW_QUERY_MS: 慢查询阈值（毫秒，默认 500）
+- ENGRAM_DB_STATS_FILE: 进程退出时将统计快照写入该 JSON 文件（供 `engram-logbook db_stats` 读取）
+
+correlation_id 来源:
+- 通过 set_correlation_id_provider() 注册（Gateway 注册请求级 correlation_id）
+- 或在当前上下文中调用 set_correlation_id()（CLI/worker 场景）
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+import psycopg
+from psycopg import sql
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("engram.logbook.db.slow")
+
+# 环境变量名称
+ENV_DB_INSTRUMENTATION = "ENGRAM_DB_INSTRUMENTATION"
+ENV_DB_SLOW_QUERY_MS = "ENGRAM_DB_SLOW_QUERY_MS"
+ENV_DB_STATS_FILE = "ENGRAM_DB_STATS_FILE"
+
+# 默认慢查询阈值（毫秒）
+DEFAULT_SLOW_QUERY_MS = 500.0
+
+# 每个指纹保留的耗时样本数（用于 p95）
+LATENCY_SAMPLE_SIZE = 512
+
+# 保留的慢查询记录数
+SLOW_QUERY_LOG_SIZE = 200
+
+# 指纹中保留的 SQL 文本最大长度
+MAX_QUERY_TEXT_LENGTH = 500
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+# SQL 归一化规则：字符串/数字字面量 -> ?，IN 列表折叠，空白合并
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "engram_db_correlation_id", default=None
+)
+_correlation_id_provider: Optional[Callable[[], Optional[str]]] = None
+
+
+# ============ correlation_id ============
+
+
+def set_correlation_id(correlation_id: Optional[str]) -> contextvars.Token[Optional[str]]:
+    """设置当前上下文的 correlation_id（返回 token 供 reset 使用）"""
+    return _correlation_id.set(correlation_id)
+
+
+def set_correlation_id_provider(provider: Optional[Callable[[], Optional[str]]]) -> None:
+    """注册 correlation_id 提供函数（优先于 set_correlation_id 设置的值）"""
+    global _correlation_id_provider
+    _correlation_id_provider = provider
+
+
+def current_correlation_id() -> Optional[str]:
+    """获取当前 correlation_id（provider 异常或返回空时回退到上下文变量）"""
+    if _correlation_id_provider is not None:
+        try:
+            value = _correlation_id_provider()
+        except Exception:
+            value = None
+        if value:
+            return value
+    return _correlation_id.get()
+
+
+# ============ 指纹 ============
+
+
+def normalize_query(query: str) -> str:
+    """
+    归一化 SQL 文本（用于按语句聚合）
+
+    字面量替换为 ?，IN 列表折叠为 IN (...)，合并空白。
+    """
+    text = _STRING_LITERAL.sub("?", query)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _IN_LIST.sub("IN (...)", text)
+
+
+def fingerprint_query(normalized: str) -> str:
+    """归一化 SQL 的短指纹（12 位十六进制）"""
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify(query: str) -> tuple[str, str]:
+    """(fingerprint, 截断后的归一化文本)；手写 SQL 多为常量字符串，缓存避免重复正则"""
+    normalized = normalize_query(query)
+    return fingerprint_query(normalized), normalized[:MAX_QUERY_TEXT_LENGTH]
+
+
+# ============ 统计 ============
+
+
+@dataclass
+class StatementStats:
+    """单个语句指纹的聚合统计"""
+
+    fingerprint: str
+    query: str
+    count: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    samples: deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLE_SIZE))
+
+    def p95_ms(self) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "query": self.query,
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p95_ms": round(self.p95_ms(), 3),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+        }
+
+
+class QueryStatsRegistry:
+    """进程内语句统计注册表（线程安全）"""
+
+    def __init__(self, slow_query_ms: float = DEFAULT_SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._stats: dict[str, StatementStats] = {}
+        self._slow_queries: deque[dict[str, Any]] = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self._lock = threading.Lock()
+        self._started_at = datetime.now(timezone.utc)
+
+    def record(
+        self,
+        query: str,
+        duration_ms: float,
+        rows: int,
+        *,
+        error: bool = False,
+    ) -> None:
+        """记录一次语句执行"""
+        fingerprint, normalized = _classify(query)
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = StatementStats(fingerprint=fingerprint, query=normalized)
+                self._stats[fingerprint] = stats
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.samples.append(duration_ms)
+            if error:
+                stats.errors += 1
+            elif rows > 0:
+                stats.rows += rows
+
+        if duration_ms >= self.slow_query_ms:
+            entry = {
+                "fingerprint": fingerprint,
+                "query": normalized,
+                "duration_ms": round(duration_ms, 3),
+                "rows": rows,
+                "error": error,
+                "correlation_id": current_correlation_id(),
+                "at": datetime.now(timezone.utc).isoformat(),
+            }
+            with self._lock:
+                self._slow_queries.append(entry)
+            slow_query_logger.warning(
+                "慢查询: %.1fms fingerprint=%s correlation_id=%s query=%s",
+                duration_ms,
+                fingerprint,
+                entry["correlation_id"],
+                entry["query"],
+            )
+
+    def snapshot(self, *, top: Optional[int] = None, sort_by: str = "total_ms") -> dict[str, Any]:
+        """
+        导出统计快照
+
+        Args:
+            top: 仅返回排序后的前 N 个语句
+            sort_by: 排序字段（total_ms/mean_ms/p95_ms/max_ms/count/rows/errors）
+        """
+        with self._lock:
+            statements = [stats.to_dict() for stats in self._stats.values()]
+            slow_queries = list(self._slow_queries)
+        return build_snapshot(
+            statements,
+            slow_queries,
+            slow_query_ms=self.slow_query_ms,
+            started_at=self._started_at.isoformat(),
+            top=top,
+            sort_by=sort_by,
+        )
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._stats.clear()
+            self._slow_queries.clear()
+            self._started_at = datetime.now(timezone.utc)
+
+
+SORT_FIELDS = ("total_ms", "mean_ms", "p95_ms", "max_ms", "count", "rows", "errors")
+
+
+def build_snapshot(
+    statements: list[dict[str, Any]],
+    slow_queries: list[dict[str, Any]],
+    *,
+    slow_query_ms: float,
+    started_at: Optional[str] = None,
+    top: Optional[int] = None,
+    sort_by: str = "total_ms",
+) -> dict[str, Any]:
+    """按 sort_by 排序并截断语句列表，组装快照字典"""
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"无效的排序字段: {sort_by}（可选: {', '.join(SORT_FIELDS)}）")
+    ordered = sorted(statements, key=lambda s: s.get(sort_by, 0), reverse=True)
+    return {
+        "enabled": is_enabled(),
+        "slow_query_ms": slow_query_ms,
+        "started_at": started_at,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "statement_count": len(statements),
+        "total_ms": round(sum(s.get("total_ms", 0.0) for s in statements), 3),
+        "statements": ordered[:top] if top else ordered,
+        "slow_queries": slow_queries,
+    }
+
+
+# ============ 游标 ============
+
+
+def _query_text(query: Any, conn: Any) -> str:
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    if isinstance(query, sql.Composable):
+        try:
+            return query.as_string(conn)
+        except Exception:
+            return repr(query)
+    return str(query)
+
+
+class InstrumentedCursor(psycopg.Cursor[Any]):
+    """记录 execute/executemany 耗时与行数的 psycopg 游标"""
+
+    def execute(self, query: Any, params: Any = None, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        error = False
+        try:
+            return super().execute(query, params, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            _record(self, query, start, error)
+
+    def executemany(self, query: Any, params_seq: Any, **kwargs: Any) -> None:
+        start = time.perf_counter()
+        error = False
+        try:
+            super().executemany(query, params_seq, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            _record(self, query, start, error)
+
+
+def _record(cur: psycopg.Cursor[Any], query: Any, start: float, error: bool) -> None:
+    duration_ms = (time.perf_counter() - start) * 1000.0
+    try:
+        get_registry().record(
+            _query_text(query, cur.connection), duration_ms, cur.rowcount, error=error
+        )
+    except Exception:
+        # 埋点失败不影响业务语句
+        logger.debug("记录语句统计失败", exc_info=True)
+
+
+# ============ 全局开关 ============
+
+_registry: Optional[QueryStatsRegistry] = None
+_registry_lock = threading.Lock()
+_atexit_registered = False
+
+
+def is_enabled() -> bool:
+    """是否启用语句埋点（ENGRAM_DB_INSTRUMENTATION）"""
+    return os.environ.get(ENV_DB_INSTRUMENTATION, "").strip().lower() in _TRUE_VALUES
+
+
+def _slow_query_ms_from_env() -> float:
+    raw = os.environ.get(ENV_DB_SLOW_QUERY_MS)
+    if raw:
+        try:
+            return float(raw)
+        except ValueError:
+            logger.warning(
+                "无效的 %s=%r，使用默认值 %s", ENV_DB_SLOW_QUERY_MS, raw, DEFAULT_SLOW_QUERY_MS
+            )
+    return DEFAULT_SLOW_QUERY_MS
+
+
+def get_registry() -> QueryStatsRegistry:
+    """获取全局统计注册表（首次调用时按环境变量初始化）"""
+    global _registry, _atexit_registered
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = QueryStatsRegistry(slow_query_ms=_slow_query_ms_from_env())
+                if os.environ.get(ENV_DB_STATS_FILE) and not _atexit_registered:
+                    atexit.register(_dump_on_exit)
+                    _atexit_registered = True
+    return _registry
+
+
+def reset_registry() -> None:
+    """丢弃全局注册表（测试隔离用，下次 get_registry 按环境变量重新初始化）"""
+    global _registry
+    with _registry_lock:
+        _registry = None
+
+
+def install(conn: psycopg.Connection[Any]) -> None:
+    """为连接安装 InstrumentedCursor（仅影响客户端游标）"""
+    get_registry()
+    conn.cursor_factory = InstrumentedCursor
+
+
+def maybe_install(conn: psycopg.Connection[Any]) -> None:
+    """启用时安装埋点；关闭时仅一次环境变量检查"""
+    if is_enabled():
+        install(conn)
+
+
+# ============ 快照持久化 ============
+
+
+def dump_snapshot(path: str | Path, snapshot: Optional[dict[str, Any]] = None) -> None:
+    """将统计快照写入 JSON 文件（原子替换）"""
+    target = Path(path)
+    data = snapshot if snapshot is not None else get_registry().snapshot()
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, default=str), encoding="utf-8")
+    tmp.replace(target)
+
+
+def load_snapshot(
+    path: str | Path, *, top: Optional[int] = None, sort_by: str = "total_ms"
+) -> dict[str, Any]:
+    """读取 dump_snapshot 写入的快照，并按 sort_by 重新排序/截断"""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    snapshot = build_snapshot(
+        data.get("statements", []),
+        data.get("slow_queries", []),
+        slow_query_ms=data.get("slow_query_ms", DEFAULT_SLOW_QUERY_MS),
+        started_at=data.get("started_at"),
+        top=top,
+        sort_by=sort_by,
+    )
+    snapshot["enabled"] = data.get("enabled", False)
+    snapshot["generated_at"] = data.get("generated_at")
+    return snapshot
+
+
+def _dump_on_exit() -> None:
+    path = os.environ.get(ENV_DB_STATS_FILE)
+    if not path or _registry is None:
+        return
+    try:
+        dump_snapshot(path)
+    except Exception as e:
+        logger.warning("写入数据库语句统计失败: %s", e)
+
+
+# ============ Prometheus ============
+
+
+def format_prometheus_metrics(snapshot: dict[str, Any]) -> str:
+    """将快照格式化为 Prometheus 文本格式"""
+    lines: list[str] = []
+    for stmt in snapshot.get("statements", []):
+        label = f'fingerprint="{stmt["fingerprint"]}"'
+        lines.append(f"engram_db_statement_calls_total{{{label}}} {stmt['count']}")
+        lines.append(f"engram_db_statement_errors_total{{{label}}} {stmt['errors']}")
+        lines.append(f"engram_db_statement_duration_ms_total{{{label}}} {stmt['total_ms']}")
+        lines.append(f"engram_db_statement_duration_ms_mean{{{label}}} {stmt['mean_ms']}")
+        lines.append(f"engram_db_statement_duration_ms_p95{{{label}}} {stmt['p95_ms']}")
+        lines.append(f"engram_db_statement_rows_total{{{label}}} {stmt['rows']}")
+    lines.append(f"engram_db_slow_queries {len(snapshot.get('slow_queries', []))}")
+    return "\n".join(lines) + "\n"
+
+
+__all__ = [
+    "ENV_DB_INSTRUMENTATION",
+    "ENV_DB_SLOW_QUERY_MS",
+    "ENV_DB_STATS_FILE",
+    "DEFAULT_SLOW_QUERY_MS",
+    "SORT_FIELDS",
+    "InstrumentedCursor",
+    "QueryStatsRegistry",
+    "StatementStats",
+    "normalize_query",
+    "fingerprint_query",
+    "set_correlation_id",
+    "set_correlation_id_provider",
+    "current_correlation_id",
+    "is_enabled",
+    "get_registry",
+    "reset_registry",
+    "install",
+    "maybe_install",
+    "dump_snapshot",
+    "load_snapshot",
+    "format_prometheus_metrics",
+]
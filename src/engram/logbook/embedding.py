@@ -0,0 +1,241 @@
+"""
+engram_logbook.embedding - 文本向量化（embedder）模块
+
+为 analysis.knowledge_candidates 的语义检索提供可插拔的 embedder。
+
+设计要点:
+- 向量维度固定为 EMBEDDING_DIM（与 sql/15_knowledge_candidates_embedding.sql 中的
+  vector(256) 列保持一致），所有 embedder 必须输出该维度的向量
+- 默认使用 HashingEmbedder：基于特征哈希的确定性本地实现，无需模型文件、无网络依赖，
+  同一文本在任意进程/机器上得到相同向量
+- 外部 embedder 通过 register_embedder() 注册，或以 "package.module:factory" 形式
+  在配置中指定
+
+选择 embedder 的优先级（高到低）:
+1. get_embedder() 的 name 参数
+2. 环境变量 ENGRAM_EMBEDDER
+3. 配置文件 analysis.embedder
+4. 默认 "hashing"
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import math
+import os
+import re
+from collections import Counter
+from collections.abc import Callable, Sequence
+from typing import TYPE_CHECKING, Optional, Protocol
+
+from .errors import ConfigError, ValidationError
+
+if TYPE_CHECKING:
+    from .config import Config
+
+# 向量维度（必须与 analysis.knowledge_candidates.embedding 列定义一致）
+EMBEDDING_DIM = 256
+
+# 环境变量名称
+ENV_EMBEDDER = "ENGRAM_EMBEDDER"
+
+# 默认 embedder 名称
+DEFAULT_EMBEDDER = "hashing"
+
+# 英文/数字 token 与 CJK 字符的切分规则
+_WORD_PATTERN = re.compile(r"[a-z0-9_]+")
+_CJK_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+class Embedder(Protocol):
+    """
+    Embedder 协议（抽象接口）
+
+    所有 embedder 都应实现此协议。
+    """
+
+    # embedder 名称（写入 knowledge_candidates.embedding_model，用于识别需要重新回填的行）
+    name: str
+
+    # 输出向量维度
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        """
+        将一批文本转换为向量
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            与 texts 等长的向量列表，每个向量长度为 dim
+        """
+        ...
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    将文本切分为 token
+
+    - 英文/数字：小写后按 [a-z0-9_]+ 切分
+    - CJK：单字 + 相邻双字（bigram），兼顾召回与区分度
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        token 列表（保留重复，用于词频统计）
+    """
+    lowered = text.lower()
+    tokens = _WORD_PATTERN.findall(lowered)
+    for run in _CJK_PATTERN.findall(lowered):
+        tokens.extend(run)
+        tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class HashingEmbedder:
+    """
+    基于特征哈希（hashing trick）的确定性 embedder
+
+    每个 token 通过 blake2b 映射到一个维度和符号，权重为次线性词频 1 + log(tf)，
+    最后做 L2 归一化，使 pgvector 的 cosine 距离等价于归一化点积。
+
+    不依赖语料统计（无 IDF），因此新增行无需重算存量向量。
+    """
+
+    name = "hashing-v1"
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        if dim <= 0:
+            raise ValidationError("embedding 维度必须为正整数", {"dim": dim})
+        self.dim = dim
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "big")
+        index = value % self.dim
+        sign = 1.0 if (value >> 63) & 1 else -1.0
+        return index, sign
+
+    def embed_one(self, text: str) -> list[float]:
+        """将单条文本转换为向量（空文本返回零向量）"""
+        vector = [0.0] * self.dim
+        for token, tf in Counter(tokenize(text or "")).items():
+            index, sign = self._bucket(token)
+            vector[index] += sign * (1.0 + math.log(tf))
+
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm > 0:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        return [self.embed_one(text) for text in texts]
+
+
+# ============ Embedder 注册表 ============
+
+EmbedderFactory = Callable[[], Embedder]
+
+_EMBEDDER_REGISTRY: dict[str, EmbedderFactory] = {
+    DEFAULT_EMBEDDER: HashingEmbedder,
+}
+
+
+def register_embedder(name: str, factory: EmbedderFactory) -> None:
+    """
+    注册 embedder 工厂
+
+    Args:
+        name: embedder 名称（用于 ENGRAM_EMBEDDER / analysis.embedder 配置）
+        factory: 无参工厂函数，返回 Embedder 实例
+    """
+    if not name:
+        raise ValueError("embedder 名称不能为空")
+    _EMBEDDER_REGISTRY[name] = factory
+
+
+def _load_factory(spec: str) -> EmbedderFactory:
+    """按 "package.module:factory" 形式加载外部 embedder 工厂"""
+    module_name, _, attr = spec.partition(":")
+    try:
+        module = importlib.import_module(module_name)
+        factory: EmbedderFactory = getattr(module, attr)
+    except (ImportError, AttributeError) as e:
+        raise ConfigError(
+            f"无法加载 embedder: {spec}",
+            {"embedder": spec, "error": str(e)},
+        )
+    return factory
+
+
+def get_embedder(name: Optional[str] = None, config: Optional["Config"] = None) -> Embedder:
+    """
+    获取 embedder 实例
+
+    Args:
+        name: embedder 名称或 "package.module:factory"，为 None 时按环境变量/配置解析
+        config: 可选的 Config 实例
+
+    Returns:
+        Embedder 实例
+
+    Raises:
+        ConfigError: embedder 未注册、无法加载或维度与 EMBEDDING_DIM 不一致
+    """
+    if name is None:
+        name = os.environ.get(ENV_EMBEDDER)
+    if name is None:
+        if config is None:
+            from .config import get_config
+
+            config = get_config()
+        name = str(config.get("analysis.embedder", DEFAULT_EMBEDDER) or DEFAULT_EMBEDDER)
+
+    if name in _EMBEDDER_REGISTRY:
+        factory = _EMBEDDER_REGISTRY[name]
+    elif ":" in name:
+        factory = _load_factory(name)
+    else:
+        raise ConfigError(
+            f"未知的 embedder: {name}",
+            {"embedder": name, "available": sorted(_EMBEDDER_REGISTRY)},
+        )
+
+    embedder = factory()
+    if embedder.dim != EMBEDDING_DIM:
+        raise ConfigError(
+            f"embedder 维度 {embedder.dim} 与 embedding 列维度 {EMBEDDING_DIM} 不一致",
+            {"embedder": name, "dim": embedder.dim, "expected_dim": EMBEDDING_DIM},
+        )
+    return embedder
+
+
+def to_vector_literal(vector: Sequence[float]) -> str:
+    """
+    将向量转换为 pgvector 文本字面量（如 "[0.1,0.2]"），配合 %s::vector 使用
+
+    避免引入 pgvector Python 适配器依赖。
+    """
+    return "[" + ",".join(repr(float(v)) for v in vector) + "]"
+
+
+def candidate_text(title: Optional[str], content_md: Optional[str]) -> str:
+    """构造 knowledge_candidates 行的向量化文本（标题 + 正文）"""
+    return f"{title or ''}\n{content_md or ''}"
+
+
+__all__ = [
+    "EMBEDDING_DIM",
+    "ENV_EMBEDDER",
+    "DEFAULT_EMBEDDER",
+    "Embedder",
+    "HashingEmbedder",
+    "tokenize",
+    "register_embedder",
+    "get_embedder",
+    "to_vector_literal",
+    "candidate_text",
+]
@@ -7,6 +7,9 @@ engram_logbook.gitlab_client - 可复用的 GitLab REST API 客户端
 - 对 5xx/连接错误按策略重试
 - 对 401/403 触发 TokenProvider.invalidate() 后重试一次
 - 返回结构化错误信息供上层降级/计数
+- iter_pages()/iter_commits() 按 X-Next-Page / Link 头逐页遍历，内存占用为单页大小
+- 可选的条件请求响应缓存（ResponseCache）：携带 If-None-Match / If-Modified-Since，
+  304 复用缓存；按完整 SHA 定位的 commit/diff 命中后不发请求、不消耗限流令牌
 
 配置项:
     [scm.http]
@@ -17,19 +20,43 @@ engram_logbook.gitlab_client - 可复用的 GitLab REST API 客户端
 
     [scm.gitlab]
     max_concurrency = 5           # 可选，最大并发数
+    response_cache_enabled = false            # 可选，启用条件请求响应缓存
+    response_cache_dir = "/var/cache/engram"  # 可选，磁盘缓存目录（默认仅内存）
+    response_cache_max_bytes = 67108864       # 可选，缓存总容量（默认 64MB）
 """
 
+import base64
+import hashlib
 import json
 import logging
+import os
 import random
+import re
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Protocol, Union, cast
-from urllib.parse import quote
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+from urllib.parse import parse_qs, quote, urlsplit
 
 import requests
+from requests.structures import CaseInsensitiveDict
 
 from .errors import EngramError
 
@@ -181,6 +208,42 @@ class ConcurrencyLimiter:
             }
 
 
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+def map_bounded(
+    fn: Callable[[_T], _R],
+    items: Sequence[_T],
+    *,
+    max_workers: int,
+    concurrency_limiter: Optional[ConcurrencyLimiter] = None,
+) -> List[_R]:
+    """
+    使用有界线程池并发执行 fn，结果顺序与 items 一致
+
+    线程数不超过 max_workers、len(items) 以及 concurrency_limiter 的最大并发数
+    （请求本身仍在 GitLabClient._request 中获取并发槽位与限流令牌，
+    多出的线程只会在信号量上等待）。任一调用抛出异常时向上传播。
+
+    Args:
+        fn: 对单个元素执行的函数（需线程安全）
+        items: 输入序列
+        max_workers: 最大线程数
+        concurrency_limiter: 客户端的并发限制器（可选）
+
+    Returns:
+        与 items 一一对应的结果列表
+    """
+    workers = min(max_workers, len(items))
+    if concurrency_limiter is not None:
+        workers = min(workers, concurrency_limiter.max_concurrency)
+    if workers <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gitlab-fetch") as pool:
+        return list(pool.map(fn, items))
+
+
 class RateLimiter:
     """
     速率限制器（基于令牌桶算法）
@@ -396,6 +459,12 @@ class PostgresRateLimiter:
     - 多 worker 并发同步
     - 需要跨进程共享限流状态
     - 需要持久化限流配置
+
+    租约模式（lease_enabled=True）:
+    - 每次 DB 事务预留一批令牌（lease_size）在本地消费，DB 往返降为 1/lease_size
+    - 预留的令牌已从共享桶扣除，全局速率仍受桶约束；租约 lease_ttl_seconds 后作废，
+      release() 归还未用完的令牌
+    - 收到 429 时立即作废本地租约（同进程内共享此限流器的所有槽位同时停止）
     """
 
     # 默认暂停时间（秒）
@@ -412,6 +481,10 @@ class PostgresRateLimiter:
         rate: float = 10.0,
         burst: int = 20,
         max_wait_seconds: float = 60.0,
+        lease_enabled: bool = False,
+        lease_workers: int = 1,
+        lease_ttl_seconds: float = 2.0,
+        lease_size: Optional[int] = None,
     ):
         """
         初始化 Postgres 限流器
@@ -422,6 +495,11 @@ class PostgresRateLimiter:
             rate: 令牌补充速率（tokens/sec）
             burst: 最大令牌容量
             max_wait_seconds: 最大等待时间
+            lease_enabled: 启用令牌租约模式
+            lease_workers: 共享同一桶的 worker 进程数（用于计算租约大小）
+            lease_ttl_seconds: 租约有效期（秒）
+            lease_size: 每次预留的令牌数，None 时按
+                        min(burst / lease_workers, rate * lease_ttl_seconds) 计算
         """
         self._instance_key = instance_key
         self._dsn = dsn
@@ -430,11 +508,23 @@ class PostgresRateLimiter:
         self._max_wait_seconds = max_wait_seconds
         self._lock = threading.Lock()
 
+        # 租约状态
+        self._lease_enabled = lease_enabled
+        self._lease_workers = max(1, lease_workers)
+        self._lease_ttl_seconds = lease_ttl_seconds
+        self._lease_size = lease_size
+        self._lease_tokens = 0
+        self._lease_expires_at = 0.0
+
         # 统计信息
         self._total_requests = 0
         self._total_wait_time_ms = 0.0
         self._throttled_count = 0
         self._rejected_count = 0
+        self._db_round_trips = 0
+        self._leased_tokens = 0
+        self._expired_lease_tokens = 0
+        self._returned_lease_tokens = 0
 
         # 本地缓存最后一次 429 暂停信息（便于 status 查询）
         self._last_pause_until: Optional[float] = None
@@ -455,6 +545,21 @@ class PostgresRateLimiter:
         """突发容量"""
         return self._burst
 
+    @property
+    def lease_size(self) -> int:
+        """
+        每次预留的令牌数
+
+        不超过 burst / lease_workers（所有 worker 同时持有租约也不会超出桶容量），
+        也不超过 rate * lease_ttl_seconds（租约有效期内能按全局速率用完）。
+        """
+        if self._lease_size:
+            return max(1, self._lease_size)
+        return max(
+            1,
+            int(min(self._burst / self._lease_workers, self._rate * self._lease_ttl_seconds)),
+        )
+
     def _get_conn(self):
         """获取数据库连接"""
         import os
@@ -465,7 +570,11 @@ class PostgresRateLimiter:
 
         import psycopg
 
-        return psycopg.connect(dsn, autocommit=True)
+        from engram.logbook import db_instrumentation
+
+        conn = psycopg.connect(dsn, autocommit=True)
+        db_instrumentation.maybe_install(conn)
+        return conn
 
     def acquire(self, timeout: Optional[float] = None) -> bool:
         """
@@ -479,6 +588,9 @@ class PostgresRateLimiter:
         Returns:
             True 如果成功获取，False 如果超时或被拒绝
         """
+        if self._lease_enabled:
+            return self._acquire_leased(timeout)
+
         # 延迟导入避免循环依赖
         from engram.logbook.scm_db import consume_rate_limit_token
 
@@ -503,6 +615,9 @@ class PostgresRateLimiter:
                         default_burst=self._burst,
                     )
 
+                with self._lock:
+                    self._db_round_trips += 1
+
                 if result.allowed:
                     with self._lock:
                         self._total_requests += 1
@@ -526,6 +641,104 @@ class PostgresRateLimiter:
                 logger.warning(f"Postgres 限流器操作失败: {e}，允许请求通过")
                 return True  # 失败时允许通过，避免阻塞
 
+    def _acquire_leased(self, timeout: Optional[float] = None) -> bool:
+        """租约模式的 acquire：优先消费本地租约，用完后一次预留一批"""
+        from engram.logbook.scm_db import lease_rate_limit_tokens
+
+        max_wait = timeout if timeout is not None else self._max_wait_seconds
+        start_time = time.time()
+
+        while True:
+            now = time.time()
+            elapsed = now - start_time
+            with self._lock:
+                if self._take_leased_token(now):
+                    self._total_requests += 1
+                    self._total_wait_time_ms += elapsed * 1000
+                    return True
+                # 本进程收到过 429：暂停期间不再访问 DB
+                pause_remaining = (self._last_pause_until or 0.0) - now
+
+            if elapsed >= max_wait:
+                with self._lock:
+                    self._rejected_count += 1
+                logger.debug(f"Postgres 限流器: 等待超时 ({elapsed:.2f}s >= {max_wait}s)")
+                return False
+
+            if pause_remaining > 0:
+                wait_seconds = min(pause_remaining, max_wait - elapsed, 1.0)
+            else:
+                try:
+                    with self._get_conn() as conn:
+                        result = lease_rate_limit_tokens(
+                            conn,
+                            self._instance_key,
+                            self.lease_size,
+                            default_rate=self._rate,
+                            default_burst=self._burst,
+                        )
+                except Exception as e:
+                    logger.warning(f"Postgres 限流器预留令牌失败: {e}，允许请求通过")
+                    return True  # 失败时允许通过，避免阻塞
+
+                with self._lock:
+                    self._db_round_trips += 1
+                    if result.granted >= 1:
+                        self._leased_tokens += result.granted
+                        self._lease_tokens = result.granted - 1
+                        self._lease_expires_at = time.time() + self._lease_ttl_seconds
+                        self._total_requests += 1
+                        self._total_wait_time_ms += elapsed * 1000
+                        return True
+                wait_seconds = min(result.wait_seconds, max_wait - elapsed, 1.0)
+
+            if wait_seconds <= 0:
+                with self._lock:
+                    self._rejected_count += 1
+                return False
+
+            with self._lock:
+                self._throttled_count += 1
+            logger.debug(f"Postgres 限流器: 等待 {wait_seconds:.2f}s")
+            time.sleep(wait_seconds)
+
+    def _take_leased_token(self, now: float) -> bool:
+        """从本地租约取一个令牌（调用方持有 self._lock），过期的租约作废"""
+        if self._lease_tokens <= 0:
+            return False
+        if now >= self._lease_expires_at:
+            self._expired_lease_tokens += self._lease_tokens
+            self._lease_tokens = 0
+            return False
+        self._lease_tokens -= 1
+        return True
+
+    def release(self) -> int:
+        """
+        归还本地未用完且未过期的租约令牌（worker 退出、客户端关闭时调用）
+
+        Returns:
+            归还的令牌数
+        """
+        with self._lock:
+            tokens = self._lease_tokens if time.time() < self._lease_expires_at else 0
+            self._lease_tokens = 0
+            self._lease_expires_at = 0.0
+        if tokens <= 0:
+            return 0
+
+        from engram.logbook.scm_db import return_rate_limit_tokens
+
+        try:
+            with self._get_conn() as conn:
+                return_rate_limit_tokens(conn, self._instance_key, tokens)
+        except Exception as e:
+            logger.warning(f"Postgres 限流器: 归还租约令牌失败: {e}")
+            return 0
+        with self._lock:
+            self._returned_lease_tokens += tokens
+        return tokens
+
     def _clamp_pause_seconds(self, seconds: float) -> float:
         """
         对暂停秒数做 clamp 处理
@@ -594,10 +807,12 @@ class PostgresRateLimiter:
             pause_seconds = self.DEFAULT_PAUSE_SECONDS
             source = "default"
 
-        # 记录本地缓存（便于 status 查询）
+        # 记录本地缓存（便于 status 查询），并立即作废本地租约（不归还，实例已超限）
         with self._lock:
             self._last_pause_until = now + pause_seconds
             self._last_pause_source = source
+            self._lease_tokens = 0
+            self._lease_expires_at = 0.0
 
         try:
             with self._get_conn() as conn:
@@ -605,7 +820,10 @@ class PostgresRateLimiter:
                     conn,
                     self._instance_key,
                     pause_seconds,
+                    reason=f"429:{source}",
                     record_429=True,
+                    default_rate=self._rate,
+                    default_burst=self._burst,
                 )
             logger.info(f"Postgres 限流器: 收到 429，暂停 {pause_seconds:.1f}s (来源: {source})")
         except Exception as e:
@@ -627,6 +845,13 @@ class PostgresRateLimiter:
                 else 0,
                 "last_pause_until": self._last_pause_until,
                 "last_pause_source": self._last_pause_source,
+                "db_round_trips": self._db_round_trips,
+                "lease_enabled": self._lease_enabled,
+                "lease_size": self.lease_size if self._lease_enabled else None,
+                "lease_tokens": self._lease_tokens,
+                "leased_tokens": self._leased_tokens,
+                "expired_lease_tokens": self._expired_lease_tokens,
+                "returned_lease_tokens": self._returned_lease_tokens,
             }
 
     def get_bucket_status(self) -> Optional[Dict[str, Any]]:
@@ -809,6 +1034,9 @@ class RequestStats:
     retry_after: Optional[float] = None  # Retry-After 头的值（秒）
     rate_limit_reset: Optional[float] = None  # RateLimit-Reset 头的值（Unix 时间戳）
     rate_limit_remaining: Optional[int] = None  # RateLimit-Remaining 头的值
+    # 条件请求：304 Not Modified 时复用缓存内容
+    not_modified: bool = False
+    cache_bytes_saved: int = 0  # 复用缓存节省的响应体字节数
 
 
 @dataclass
@@ -832,6 +1060,11 @@ class ClientStats:
     timeout_count: int = 0  # 超时次数（limiter 等待超时）
     avg_wait_time_ms: float = 0.0  # 平均等待时间（limiter acquire）
 
+    # 响应缓存统计
+    cache_hits: int = 0  # 不可变资源命中（未发请求，未消耗限流令牌）
+    cache_not_modified: int = 0  # 304 复用缓存（仍计入 GitLab 请求数）
+    cache_bytes_saved: int = 0  # 未传输的响应体字节数
+
     # 线程安全锁
     _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
@@ -858,8 +1091,22 @@ class ClientStats:
                     self.last_rate_limit_remaining = stats.rate_limit_remaining
             if stats.attempt_count > 1:
                 self.total_retries += stats.attempt_count - 1
+            if stats.not_modified:
+                self.cache_not_modified += 1
+                # 304 响应携带当前的限流头（缓存内容中的是旧值）
+                if stats.rate_limit_reset is not None:
+                    self.last_rate_limit_reset = stats.rate_limit_reset
+                if stats.rate_limit_remaining is not None:
+                    self.last_rate_limit_remaining = stats.rate_limit_remaining
+            self.cache_bytes_saved += stats.cache_bytes_saved
             self.request_history.append(stats)
 
+    def record_cache_hit(self, size: int) -> None:
+        """记录一次不可变资源缓存命中（未发出请求，不计入 total_requests）"""
+        with self._lock:
+            self.cache_hits += 1
+            self.cache_bytes_saved += size
+
     def set_limiter_stats(
         self,
         timeout_count: int = 0,
@@ -893,6 +1140,10 @@ class ClientStats:
         - avg_duration_ms: 平均耗时（毫秒）
         - timeout_count: 超时次数（limiter）
         - avg_wait_time_ms: 平均等待时间（limiter）
+
+        启用响应缓存且有命中时额外包含:
+        - cache_hits / cache_not_modified / cache_bytes_saved
+        - rate_limit_tokens_saved: 未消耗的限流令牌数（等于 cache_hits，304 仍消耗令牌）
         """
         with self._lock:
             result: Dict[str, Any] = {
@@ -917,6 +1168,12 @@ class ClientStats:
                 result["last_rate_limit_reset"] = self.last_rate_limit_reset
             if self.last_rate_limit_remaining is not None:
                 result["last_rate_limit_remaining"] = self.last_rate_limit_remaining
+            # 添加响应缓存统计（仅在有命中时）
+            if self.cache_hits or self.cache_not_modified:
+                result["cache_hits"] = self.cache_hits
+                result["cache_not_modified"] = self.cache_not_modified
+                result["cache_bytes_saved"] = self.cache_bytes_saved
+                result["rate_limit_tokens_saved"] = self.cache_hits
             # 添加详细 limiter 统计（可选，用于调试）
             if self._limiter_stats:
                 result["limiter_stats"] = self._limiter_stats
@@ -936,6 +1193,9 @@ class ClientStats:
             self.last_rate_limit_remaining = None
             self.timeout_count = 0
             self.avg_wait_time_ms = 0.0
+            self.cache_hits = 0
+            self.cache_not_modified = 0
+            self.cache_bytes_saved = 0
             self._limiter_stats = None
             self.request_history.clear()
 
@@ -996,6 +1256,63 @@ class GitLabAPIResult:
         return result
 
 
+@dataclass
+class GitLabPage:
+    """
+    分页接口的一页结果（由 iter_pages / iter_commits 逐页产出）
+
+    调用方处理完一页后可持久化 next_page（或 next_params），
+    之后以 start_page（或 params）恢复遍历。
+    """
+
+    items: List[Any]
+    page: int  # 当前页码（keyset 分页时为从 start_page 起的顺序号）
+    next_page: Optional[int] = None  # 下一页页码（最后一页或 keyset 分页时为 None）
+    next_params: Optional[Dict[str, Any]] = None  # 请求下一页使用的完整参数（最后一页为 None）
+
+    @property
+    def is_last(self) -> bool:
+        return self.next_params is None
+
+
+def resolve_next_page(
+    response: Optional[requests.Response],
+    params: Dict[str, Any],
+    items_count: int,
+    per_page: int,
+) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+    """
+    根据响应头确定下一页
+
+    优先级:
+    1. X-Next-Page（offset 分页；空值表示最后一页）
+    2. Link rel="next"（keyset 分页只返回此头，参数中包含游标）
+    3. 无分页头时按是否满页推断
+
+    Returns:
+        (next_page, next_params)，最后一页返回 (None, None)
+    """
+    headers = response.headers if response is not None else {}
+    if "X-Next-Page" in headers:
+        value = (headers.get("X-Next-Page") or "").strip()
+        if value.isdigit():
+            return int(value), {**params, "page": int(value)}
+        return None, None
+
+    links = getattr(response, "links", None) or {}
+    next_url = links.get("next", {}).get("url")
+    if next_url:
+        query = parse_qs(urlsplit(next_url).query)
+        next_params: Dict[str, Any] = {key: values[-1] for key, values in query.items()}
+        page_value = str(next_params.get("page", ""))
+        return (int(page_value) if page_value.isdigit() else None), next_params
+
+    if items_count >= per_page > 0:
+        next_page = int(params.get("page", 1)) + 1
+        return next_page, {**params, "page": next_page}
+    return None, None
+
+
 class GitLabAPIError(EngramError):
     """GitLab API 错误"""
 
@@ -1160,12 +1477,19 @@ class HttpConfig:
     postgres_rate_limit_rate: float = 10.0  # 令牌补充速率
     postgres_rate_limit_burst: int = 20  # 最大令牌容量
     postgres_rate_limit_max_wait: float = 60.0  # 最大等待时间
+    postgres_rate_limit_lease_enabled: bool = False  # 令牌租约模式（本地消费预留的令牌）
+    postgres_rate_limit_lease_workers: int = 1  # 共享同一桶的 worker 进程数
+    postgres_rate_limit_lease_ttl_seconds: float = 2.0  # 租约有效期
     # Postgres 限流配置（分布式版，tenant 维度）
     # key 形如: gitlab:<host>:tenant:<id>
     tenant_rate_limit_enabled: bool = False  # 是否启用 tenant 维度限流
     tenant_rate_limit_rate: float = 5.0  # tenant 级别更保守
     tenant_rate_limit_burst: int = 10  # tenant 级别的令牌容量
     tenant_rate_limit_max_wait: float = 30.0  # tenant 级别的最大等待时间
+    # 条件请求响应缓存（ETag / Last-Modified + 不可变资源）
+    response_cache_enabled: bool = False  # 是否启用响应缓存
+    response_cache_dir: Optional[str] = None  # 磁盘缓存目录（为空时仅使用内存）
+    response_cache_max_bytes: int = 64 * 1024 * 1024  # 缓存总容量
 
     @classmethod
     def from_config(cls, config: Optional["Config"] = None) -> "HttpConfig":
@@ -1180,11 +1504,17 @@ class HttpConfig:
         from .config import (
             DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_BURST,
             DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_ENABLED,
+            DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_ENABLED,
+            DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_TTL_SECONDS,
+            DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_WORKERS,
             DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_MAX_WAIT,
             DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_RATE,
             DEFAULT_GITLAB_RATE_LIMIT_BURST_SIZE,
             DEFAULT_GITLAB_RATE_LIMIT_ENABLED,
             DEFAULT_GITLAB_RATE_LIMIT_REQUESTS_PER_SECOND,
+            DEFAULT_GITLAB_RESPONSE_CACHE_DIR,
+            DEFAULT_GITLAB_RESPONSE_CACHE_ENABLED,
+            DEFAULT_GITLAB_RESPONSE_CACHE_MAX_BYTES,
             DEFAULT_GITLAB_TENANT_RATE_LIMIT_BURST,
             DEFAULT_GITLAB_TENANT_RATE_LIMIT_ENABLED,
             DEFAULT_GITLAB_TENANT_RATE_LIMIT_MAX_WAIT,
@@ -1238,6 +1568,18 @@ class HttpConfig:
                 "scm.gitlab.postgres_rate_limit_max_wait",
                 DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_MAX_WAIT,
             ),
+            postgres_rate_limit_lease_enabled=config.get(
+                "scm.gitlab.postgres_rate_limit_lease_enabled",
+                DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_ENABLED,
+            ),
+            postgres_rate_limit_lease_workers=config.get(
+                "scm.gitlab.postgres_rate_limit_lease_workers",
+                DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_WORKERS,
+            ),
+            postgres_rate_limit_lease_ttl_seconds=config.get(
+                "scm.gitlab.postgres_rate_limit_lease_ttl_seconds",
+                DEFAULT_GITLAB_POSTGRES_RATE_LIMIT_LEASE_TTL_SECONDS,
+            ),
             # Postgres 限流配置（tenant 维度）
             tenant_rate_limit_enabled=config.get(
                 "scm.gitlab.tenant_rate_limit_enabled", DEFAULT_GITLAB_TENANT_RATE_LIMIT_ENABLED
@@ -1251,8 +1593,309 @@ class HttpConfig:
             tenant_rate_limit_max_wait=config.get(
                 "scm.gitlab.tenant_rate_limit_max_wait", DEFAULT_GITLAB_TENANT_RATE_LIMIT_MAX_WAIT
             ),
+            # 条件请求响应缓存
+            response_cache_enabled=config.get(
+                "scm.gitlab.response_cache_enabled", DEFAULT_GITLAB_RESPONSE_CACHE_ENABLED
+            ),
+            response_cache_dir=config.get(
+                "scm.gitlab.response_cache_dir", DEFAULT_GITLAB_RESPONSE_CACHE_DIR
+            ),
+            response_cache_max_bytes=config.get(
+                "scm.gitlab.response_cache_max_bytes", DEFAULT_GITLAB_RESPONSE_CACHE_MAX_BYTES
+            ),
+        )
+
+
+# ============ 条件请求响应缓存 ============
+
+# 不可变资源：按完整 SHA 定位的 commit / commit diff，内容永不变化，命中后不发网络请求
+_IMMUTABLE_ENDPOINT_RE = re.compile(
+    r"/repository/commits/(?:[0-9a-f]{40}|[0-9a-f]{64})(?:/diff)?$", re.IGNORECASE
+)
+
+# 缓存条目保留的响应头（条件请求校验与分页解析所需）
+_CACHED_RESPONSE_HEADERS = (
+    "Content-Type",
+    "ETag",
+    "Last-Modified",
+    "Link",
+    "X-Next-Page",
+    "X-Page",
+    "X-Per-Page",
+    "X-Prev-Page",
+    "X-Total",
+    "X-Total-Pages",
+)
+
+
+def is_immutable_endpoint(endpoint: str) -> bool:
+    """判断端点是否为不可变资源（按完整 SHA 定位的 commit / diff）"""
+    return bool(_IMMUTABLE_ENDPOINT_RE.search(endpoint.split("?", 1)[0]))
+
+
+@dataclass
+class CachedResponse:
+    """缓存的 GET 响应（响应体 + 校验/分页相关响应头）"""
+
+    url: str
+    content: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    status_code: int = 200
+    immutable: bool = False
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("ETag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("Last-Modified")
+
+    @classmethod
+    def from_response(
+        cls, response: requests.Response, immutable: bool = False
+    ) -> "CachedResponse":
+        headers = {
+            name: response.headers[name]
+            for name in _CACHED_RESPONSE_HEADERS
+            if name in response.headers
+        }
+        return cls(
+            url=response.url or "",
+            content=response.content,
+            headers=headers,
+            status_code=response.status_code,
+            immutable=immutable,
         )
 
+    def validators(self) -> Dict[str, str]:
+        """条件请求头（If-None-Match / If-Modified-Since）"""
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self) -> requests.Response:
+        """重建 requests.Response（供 JSON 解析、分页头解析和 diff 大小检查复用）"""
+        response = requests.Response()
+        response.status_code = self.status_code
+        response._content = self.content
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response.encoding = "utf-8"
+        return response
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "content": base64.b64encode(self.content).decode("ascii"),
+            "headers": self.headers,
+            "status_code": self.status_code,
+            "immutable": self.immutable,
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "CachedResponse":
+        return cls(
+            url=data["url"],
+            content=base64.b64decode(data["content"]),
+            headers=dict(data.get("headers") or {}),
+            status_code=int(data.get("status_code", 200)),
+            immutable=bool(data.get("immutable", False)),
+        )
+
+
+class ResponseCache:
+    """
+    GitLab GET 响应缓存（容量受限，LRU 淘汰，线程安全）
+
+    - 带 ETag / Last-Modified 的响应：下次请求携带 If-None-Match / If-Modified-Since，
+      304 时直接使用缓存内容（仍消耗一次 GitLab 请求，但不传输响应体）
+    - 不可变资源（按完整 SHA 定位的 commit / diff）：命中后直接返回，不发网络请求、不消耗限流令牌
+
+    存储:
+    - cache_dir 为空时仅保存在进程内存中
+    - 指定 cache_dir 时每个条目一个 JSON 文件（临时文件 + os.replace 原子写入），
+      进程重启后按文件 mtime 恢复 LRU 顺序；多个进程共享目录时各自按 max_bytes 淘汰（近似上限）
+
+    缓存 key 包含 token 指纹，不同凭据之间不共享条目。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, cache_dir: Optional[str] = None):
+        """
+        Args:
+            max_bytes: 缓存总容量（响应体字节数），超过时淘汰最久未使用的条目
+            cache_dir: 磁盘缓存目录（可选，为空时仅使用内存）
+        """
+        self._max_bytes = max(0, int(max_bytes))
+        self._cache_dir = cache_dir
+        self._lock = threading.Lock()
+        # key -> 条目大小（按 LRU 顺序，最近使用的在末尾）
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._memory: Dict[str, CachedResponse] = {}
+        self._total_bytes = 0
+        self._evictions = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_index()
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sizes)
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Any] = None, token: Optional[str] = None) -> str:
+        """根据 URL、排序后的查询参数与 token 指纹生成缓存 key"""
+        items: List[Tuple[str, str]] = []
+        if isinstance(params, dict):
+            items = sorted((str(k), str(v)) for k, v in params.items() if v is not None)
+        elif params:
+            items = sorted((str(k), str(v)) for k, v in params)
+        token_fingerprint = hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+        raw = json.dumps([url, items, token_fingerprint], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        assert self._cache_dir is not None
+        return os.path.join(self._cache_dir, f"{key}.json")
+
+    def _load_index(self) -> None:
+        """扫描磁盘目录，按 mtime 恢复 LRU 顺序"""
+        assert self._cache_dir is not None
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self._cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[: -len(".json")], st.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict_locked()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """读取缓存条目（命中时刷新 LRU 顺序）"""
+        with self._lock:
+            if key not in self._sizes:
+                return None
+            self._sizes.move_to_end(key)
+            if not self._cache_dir:
+                return self._memory.get(key)
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = CachedResponse.from_json(json.load(f))
+            os.utime(path)
+            return entry
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug(f"读取响应缓存失败，丢弃条目: {e}")
+            self.discard(key)
+            return None
+
+    def put(self, key: str, entry: CachedResponse) -> bool:
+        """
+        写入缓存条目（超过总容量的单个条目不缓存）
+
+        Returns:
+            是否已写入
+        """
+        if not self._cache_dir:
+            size = entry.size
+            if size > self._max_bytes:
+                self.discard(key)
+                return False
+            with self._lock:
+                self._remove_locked(key)
+                self._memory[key] = entry
+                self._sizes[key] = size
+                self._total_bytes += size
+                self._evict_locked()
+            return True
+
+        payload = json.dumps(entry.to_json()).encode("utf-8")
+        size = len(payload)
+        if size > self._max_bytes:
+            self.discard(key)
+            return False
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            with self._lock:
+                os.replace(tmp_path, path)
+                self._forget_locked(key)
+                self._sizes[key] = size
+                self._total_bytes += size
+                self._evict_locked()
+            return True
+        except OSError as e:
+            logger.debug(f"写入响应缓存失败: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+
+    def discard(self, key: str) -> None:
+        """删除缓存条目（不存在时忽略）"""
+        with self._lock:
+            self._remove_locked(key)
+
+    def _forget_locked(self, key: str) -> None:
+        """从索引中移除条目（不删除文件）"""
+        size = self._sizes.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+        self._memory.pop(key, None)
+
+    def _remove_locked(self, key: str) -> None:
+        known = key in self._sizes
+        self._forget_locked(key)
+        if known and self._cache_dir:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _evict_locked(self) -> None:
+        """淘汰最久未使用的条目，直到总容量不超过 max_bytes"""
+        while self._sizes and self._total_bytes > self._max_bytes:
+            key = next(iter(self._sizes))
+            self._remove_locked(key)
+            self._evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._sizes),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self._max_bytes,
+                "evictions": self._evictions,
+                "storage": "disk" if self._cache_dir else "memory",
+            }
+
 
 # 前向声明（避免循环导入）
 Config = Any
@@ -1286,6 +1929,7 @@ class GitLabClient:
         postgres_rate_limiter: Optional["PostgresRateLimiter"] = None,
         tenant_id: Optional[str] = None,
         tenant_rate_limiter: Optional["PostgresRateLimiter"] = None,
+        response_cache: Optional[ResponseCache] = None,
     ):
         """
         初始化 GitLab 客户端
@@ -1301,6 +1945,7 @@ class GitLabClient:
             postgres_rate_limiter: Postgres 限流器（可选，默认根据配置创建）
             tenant_id: 租户 ID（可选，用于 tenant 维度限流）
             tenant_rate_limiter: Tenant 维度的 Postgres 限流器（可选，默认根据配置创建）
+            response_cache: 条件请求响应缓存（可选，默认根据配置创建）
         """
         self.base_url = base_url.rstrip("/")
 
@@ -1359,6 +2004,9 @@ class GitLabClient:
                 rate=self.http_config.postgres_rate_limit_rate,
                 burst=self.http_config.postgres_rate_limit_burst,
                 max_wait_seconds=self.http_config.postgres_rate_limit_max_wait,
+                lease_enabled=self.http_config.postgres_rate_limit_lease_enabled,
+                lease_workers=self.http_config.postgres_rate_limit_lease_workers,
+                lease_ttl_seconds=self.http_config.postgres_rate_limit_lease_ttl_seconds,
             )
 
         # Postgres 限流器（分布式版，tenant 维度，声明类型以支持 None）
@@ -1376,6 +2024,19 @@ class GitLabClient:
                 rate=self.http_config.tenant_rate_limit_rate,
                 burst=self.http_config.tenant_rate_limit_burst,
                 max_wait_seconds=self.http_config.tenant_rate_limit_max_wait,
+                lease_enabled=self.http_config.postgres_rate_limit_lease_enabled,
+                lease_workers=self.http_config.postgres_rate_limit_lease_workers,
+                lease_ttl_seconds=self.http_config.postgres_rate_limit_lease_ttl_seconds,
+            )
+
+        # 条件请求响应缓存（声明类型以支持 None）
+        self._response_cache: Optional[ResponseCache] = None
+        if response_cache is not None:
+            self._response_cache = response_cache
+        elif self.http_config.response_cache_enabled:
+            self._response_cache = ResponseCache(
+                max_bytes=self.http_config.response_cache_max_bytes,
+                cache_dir=self.http_config.response_cache_dir,
             )
 
     def _extract_instance_key(self, url: str) -> str:
@@ -1491,6 +2152,11 @@ class GitLabClient:
         """获取 Tenant 维度的 Postgres 限流器"""
         return self._tenant_rate_limiter
 
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """获取条件请求响应缓存"""
+        return self._response_cache
+
     @property
     def tenant_id(self) -> Optional[str]:
         """获取当前 tenant ID"""
@@ -1817,6 +2483,18 @@ class GitLabClient:
         url = f"{self.base_url}/api/v4{endpoint}"
         kwargs.setdefault("timeout", self.http_config.timeout_seconds)
 
+        # 响应缓存：不可变资源命中时直接返回（在获取并发槽位与限流令牌之前）
+        cache_key: Optional[str] = None
+        if self._response_cache is not None and method.upper() == "GET":
+            cache_key = self._response_cache.make_key(
+                url, kwargs.get("params"), self.token_provider.get_token()
+            )
+            if is_immutable_endpoint(endpoint):
+                cached = self._response_cache.get(cache_key)
+                if cached is not None and cached.immutable:
+                    self.stats.record_cache_hit(cached.size)
+                    return self._result_from_cache(cached, url)
+
         # 获取并发槽位
         if self._concurrency_limiter:
             self._concurrency_limiter.acquire()
@@ -1858,16 +2536,61 @@ class GitLabClient:
             self._rate_limiter.acquire()
 
         try:
-            return self._do_request(method, endpoint, url, raise_on_error, **kwargs)
+            return self._do_request(
+                method, endpoint, url, raise_on_error, cache_key=cache_key, **kwargs
+            )
         finally:
             # 释放并发槽位
             if self._concurrency_limiter:
                 self._concurrency_limiter.release()
 
+    def _result_from_cache(self, cached: CachedResponse, url: str) -> GitLabAPIResult:
+        """由缓存条目构建成功结果"""
+        response = cached.to_response()
+        try:
+            data = response.json()
+        except (json.JSONDecodeError, ValueError):
+            data = response.text
+        return GitLabAPIResult(
+            success=True,
+            data=data,
+            response=response,
+            status_code=response.status_code,
+            endpoint=url,
+        )
+
+    def _store_response(self, cache_key: str, endpoint: str, response: requests.Response) -> None:
+        """缓存 200 响应（需带 ETag/Last-Modified 或为不可变资源），否则丢弃旧条目"""
+        assert self._response_cache is not None
+        immutable = is_immutable_endpoint(endpoint)
+        if response.status_code == 200 and (
+            immutable or "ETag" in response.headers or "Last-Modified" in response.headers
+        ):
+            self._response_cache.put(
+                cache_key, CachedResponse.from_response(response, immutable=immutable)
+            )
+        else:
+            self._response_cache.discard(cache_key)
+
     def _do_request(
-        self, method: str, endpoint: str, url: str, raise_on_error: bool, **kwargs
+        self,
+        method: str,
+        endpoint: str,
+        url: str,
+        raise_on_error: bool,
+        cache_key: Optional[str] = None,
+        **kwargs,
     ) -> GitLabAPIResult:
-        """实际执行 HTTP 请求（带重试逻辑）"""
+        """
+        实际执行 HTTP 请求（带重试逻辑）
+
+        传入 cache_key 且存在缓存条目时发送条件请求，304 响应复用缓存内容。
+        缓存键包含 token：认证失败刷新 token 后按新 token 重新计算键并查找缓存条目。
+        """
+        cached: Optional[CachedResponse] = None
+        if cache_key is not None and self._response_cache is not None:
+            cached = self._response_cache.get(cache_key)
+
         attempt = 0
         last_result: Optional[GitLabAPIResult] = None
         auth_retry_attempted = False
@@ -1882,14 +2605,43 @@ class GitLabClient:
 
             # 更新 token
             token = self.token_provider.get_token()
+            if cache_key is not None and self._response_cache is not None:
+                attempt_key = self._response_cache.make_key(url, kwargs.get("params"), token)
+                if attempt_key != cache_key:
+                    cache_key = attempt_key
+                    cached = self._response_cache.get(cache_key)
             headers = kwargs.pop("headers", {})
             headers["PRIVATE-TOKEN"] = token
+            if cache_key is not None:
+                # 换 token 后缓存条目可能不同，先去掉上一次附加的条件请求头
+                headers.pop("If-None-Match", None)
+                headers.pop("If-Modified-Since", None)
+            if cached is not None:
+                headers.update(cached.validators())
             kwargs["headers"] = headers
 
             response = None
+            not_modified = False
+            success_rate_limit_reset = last_rate_limit_reset
+            success_rate_limit_remaining = last_rate_limit_remaining
             try:
                 response = self.session.request(method, url, **kwargs)
+                if cached is not None and response.status_code == 304:
+                    # 限流头以实际的 304 响应为准，再替换为缓存内容
+                    success_rate_limit_reset, success_rate_limit_remaining = (
+                        self._parse_rate_limit_headers(response)
+                    )
+                    fresh_headers = {
+                        k: v
+                        for k, v in response.headers.items()
+                        if k.lower().startswith("ratelimit-")
+                    }
+                    response = cached.to_response()
+                    response.headers.update(fresh_headers)
+                    not_modified = True
                 response.raise_for_status()
+                if cache_key is not None and not not_modified:
+                    self._store_response(cache_key, endpoint, response)
 
                 # 解析 JSON 响应
                 try:
@@ -1917,8 +2669,10 @@ class GitLabClient:
                         hit_429=hit_429,
                         success=True,
                         retry_after=last_retry_after,
-                        rate_limit_reset=last_rate_limit_reset,
-                        rate_limit_remaining=last_rate_limit_remaining,
+                        rate_limit_reset=success_rate_limit_reset,
+                        rate_limit_remaining=success_rate_limit_remaining,
+                        not_modified=not_modified,
+                        cache_bytes_saved=cached.size if cached and not_modified else 0,
                     )
                 )
 
@@ -2136,6 +2890,117 @@ class GitLabClient:
         result = self._request("GET", endpoint, params=params)
         return result.data or []
 
+    def iter_pages(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        *,
+        per_page: int = 100,
+        start_page: int = 1,
+        max_pages: Optional[int] = None,
+    ) -> Iterator[GitLabPage]:
+        """
+        逐页遍历 GitLab 列表接口
+
+        每页请求都经过 _request()，因此同样受并发/速率限制器约束并带自动重试；
+        同一时刻只持有一页数据。
+
+        Args:
+            endpoint: API 端点（如 /projects/:id/repository/commits）
+            params: 查询参数（不含 page/per_page）
+            per_page: 每页数量
+            start_page: 起始页码（用于断点续传）
+            max_pages: 最多获取的页数（None 表示直到最后一页）
+
+        Yields:
+            GitLabPage
+
+        Raises:
+            GitLabAPIError: 请求失败或返回非列表数据
+        """
+        request_params: Dict[str, Any] = dict(params or {})
+        request_params["per_page"] = per_page
+        request_params["page"] = start_page
+        page_no = start_page
+        fetched = 0
+
+        while True:
+            result = self._request("GET", endpoint, params=request_params)
+            items = result.data if result.data is not None else []
+            if not isinstance(items, list):
+                raise GitLabAPIError(
+                    "分页接口返回了非列表数据",
+                    details={"endpoint": endpoint, "page": page_no},
+                    endpoint=result.endpoint,
+                    category=GitLabErrorCategory.PARSE_ERROR,
+                )
+
+            next_page, next_params = resolve_next_page(
+                result.response, request_params, len(items), per_page
+            )
+            # 空页不再继续翻页（防止异常的分页头导致死循环）
+            if not items:
+                next_page, next_params = None, None
+
+            yield GitLabPage(
+                items=items, page=page_no, next_page=next_page, next_params=next_params
+            )
+
+            fetched += 1
+            if next_params is None or (max_pages is not None and fetched >= max_pages):
+                return
+            request_params = next_params
+            page_no = next_page if next_page is not None else page_no + 1
+
+    def iter_commits(
+        self,
+        project_id: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        ref_name: Optional[str] = None,
+        per_page: int = 100,
+        start_page: int = 1,
+        max_pages: Optional[int] = None,
+        with_stats: bool = True,
+    ) -> Iterator[GitLabPage]:
+        """
+        逐页获取项目的 commits（get_commits 的分页版本）
+
+        API: GET /projects/:id/repository/commits
+
+        GitLab 按提交时间倒序返回；窗口 [since, until] 固定时，页码在遍历期间保持稳定，
+        调用方可在每页处理完成后记录 page.next_page 作为检查点。
+
+        Args:
+            project_id: 项目 ID 或路径
+            since: ISO 8601 格式的起始时间
+            until: ISO 8601 格式的结束时间
+            ref_name: 分支/tag 名称
+            per_page: 每页数量（GitLab 上限 100）
+            start_page: 起始页码（用于断点续传）
+            max_pages: 最多获取的页数
+            with_stats: 是否返回 stats（additions/deletions）
+
+        Yields:
+            GitLabPage（items 为原始 commit 字典列表）
+        """
+        encoded_id = self._encode_project_id(project_id)
+        endpoint = f"/projects/{encoded_id}/repository/commits"
+
+        params: Dict[str, Any] = {}
+        if with_stats:
+            params["with_stats"] = "true"
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
+        if ref_name:
+            params["ref_name"] = ref_name
+
+        return self.iter_pages(
+            endpoint, params, per_page=per_page, start_page=start_page, max_pages=max_pages
+        )
+
     def get_commit_diff(self, project_id: str, sha: str) -> List[Dict[str, Any]]:
         """
         获取 commit 的 diff
@@ -2334,6 +3199,110 @@ class GitLabClient:
         result = self._request("GET", endpoint, params=params)
         return result.data or []
 
+    def iter_mr_discussions(
+        self, project_id: str, mr_iid: int, per_page: int = 100
+    ) -> Iterator[GitLabPage]:
+        """
+        逐页获取 MR 的全部 discussions（get_mr_discussions 的分页版本）
+
+        API: GET /projects/:id/merge_requests/:merge_request_iid/discussions
+        """
+        encoded_id = self._encode_project_id(project_id)
+        endpoint = f"/projects/{encoded_id}/merge_requests/{mr_iid}/discussions"
+        return self.iter_pages(endpoint, per_page=per_page)
+
+    def iter_mr_notes(
+        self, project_id: str, mr_iid: int, per_page: int = 100
+    ) -> Iterator[GitLabPage]:
+        """
+        逐页获取 MR 的全部 notes（get_mr_notes 的分页版本，按创建时间升序）
+
+        API: GET /projects/:id/merge_requests/:merge_request_iid/notes
+        """
+        encoded_id = self._encode_project_id(project_id)
+        endpoint = f"/projects/{encoded_id}/merge_requests/{mr_iid}/notes"
+        return self.iter_pages(endpoint, {"sort": "asc"}, per_page=per_page)
+
+    def iter_mr_resource_state_events(
+        self, project_id: str, mr_iid: int, per_page: int = 100
+    ) -> Iterator[GitLabPage]:
+        """
+        逐页获取 MR 的全部状态变更事件（get_mr_resource_state_events 的分页版本）
+
+        API: GET /projects/:id/merge_requests/:merge_request_iid/resource_state_events
+        """
+        encoded_id = self._encode_project_id(project_id)
+        endpoint = f"/projects/{encoded_id}/merge_requests/{mr_iid}/resource_state_events"
+        return self.iter_pages(endpoint, per_page=per_page)
+
+
+# ============ 共享客户端 ============
+
+
+class GitLabClientRegistry:
+    """
+    按 (实例, token) 复用 GitLabClient
+
+    多槽位 worker 中同一 GitLab 实例的任务共享一个客户端，复用 HTTP 会话（连接池）
+    以及限流/并发状态，而不是每个任务各建一个会话。
+    """
+
+    def __init__(self, factory: Optional[Callable[[str, str], GitLabClient]] = None):
+        self._factory = factory or (
+            lambda base_url, token: GitLabClient(base_url, private_token=token)
+        )
+        self._clients: Dict[Tuple[str, str], GitLabClient] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str, token: str) -> GitLabClient:
+        """获取（必要时创建）该实例与 token 对应的客户端"""
+        from .scm_sync_keys import normalize_instance_key
+
+        instance = normalize_instance_key(base_url) or base_url.rstrip("/")
+        key = (instance, hashlib.sha256(token.encode("utf-8")).hexdigest())
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._factory(base_url, token)
+                self._clients[key] = client
+            return client
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def close(self) -> None:
+        """关闭所有客户端的 HTTP 会话，归还限流器租约令牌"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            try:
+                client.session.close()
+            except Exception:
+                pass
+            # 归还 Postgres 限流器未用完的租约令牌
+            for limiter in (client.postgres_rate_limiter, client.tenant_rate_limiter):
+                if limiter is not None:
+                    limiter.release()
+
+
+_shared_registry: Optional[GitLabClientRegistry] = None
+
+
+def set_shared_client_registry(registry: Optional[GitLabClientRegistry]) -> None:
+    """安装（或以 None 卸载）进程级共享客户端注册表"""
+    global _shared_registry
+    _shared_registry = registry
+
+
+def get_shared_client(base_url: str, token: str) -> Optional[GitLabClient]:
+    """已安装共享注册表时返回共享客户端，否则返回 None（由调用方自行创建）"""
+    registry = _shared_registry
+    if registry is None:
+        return None
+    return registry.get(base_url, token)
+
 
 # ============ 工厂函数 ============
 
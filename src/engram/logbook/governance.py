@@ -28,7 +28,7 @@ import psycopg
 from typing_extensions import NotRequired, TypedDict
 
 from .config import Config
-from .db import get_connection
+from .db import get_connection, hot_statement_prepare
 from .errors import DatabaseError, ValidationError
 from .uri import (
     EvidenceRefsJson as UriEvidenceRefsJson,
@@ -723,6 +723,22 @@ def _validate_evidence_refs_json(evidence_refs: Union[EvidenceRefsJson, Dict[str
                 )
 
 
+# 热点语句（文本保持稳定，以便在复用的连接上作为预备语句执行）
+_ENSURE_AUDIT_ACTOR_SQL = """
+    INSERT INTO identity.users (user_id, display_name)
+    VALUES (%s, %s)
+    ON CONFLICT (user_id) DO NOTHING
+"""
+
+_INSERT_WRITE_AUDIT_SQL = """
+    INSERT INTO write_audit
+        (actor_user_id, target_space, action, reason, payload_sha, evidence_refs_json,
+         correlation_id, status)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING audit_id
+"""
+
+
 def insert_write_audit(
     actor_user_id: Optional[str],
     target_space: str,
@@ -734,6 +750,7 @@ def insert_write_audit(
     status: str = "success",
     config: Optional[Config] = None,
     validate_refs: bool = False,
+    conn: Optional[psycopg.Connection] = None,
 ) -> int:
     """
     在 write_audit 中插入写入审计记录
@@ -749,6 +766,7 @@ def insert_write_audit(
         status: 审计状态（success/failed/redirected/pending）
         config: 配置实例
         validate_refs: 是否验证 evidence_refs_json 结构（默认 False）
+        conn: 可选的数据库连接（传入时复用该连接，并以预备语句执行；仍会提交事务）
 
     Returns:
         创建的 audit_id
@@ -785,26 +803,20 @@ def insert_write_audit(
     if validate_refs and evidence_refs:
         _validate_evidence_refs_json(evidence_refs)
 
-    conn = get_connection(config=config)
+    should_close = conn is None
+    if conn is None:
+        conn = get_connection(config=config)
+    prepare = hot_statement_prepare(long_lived=not should_close)
     try:
         with conn.cursor() as cur:
             if actor_user_id:
                 cur.execute(
-                    """
-                    INSERT INTO identity.users (user_id, display_name)
-                    VALUES (%s, %s)
-                    ON CONFLICT (user_id) DO NOTHING
-                    """,
+                    _ENSURE_AUDIT_ACTOR_SQL,
                     (actor_user_id, actor_user_id),
+                    prepare=prepare,
                 )
             cur.execute(
-                """
-                INSERT INTO write_audit
-                    (actor_user_id, target_space, action, reason, payload_sha, evidence_refs_json,
-                     correlation_id, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING audit_id
-                """,
+                _INSERT_WRITE_AUDIT_SQL,
                 (
                     actor_user_id,
                     target_space,
@@ -815,6 +827,7 @@ def insert_write_audit(
                     correlation_id,
                     status or "success",
                 ),
+                prepare=prepare,
             )
             result = cur.fetchone()
             conn.commit()
@@ -831,7 +844,8 @@ def insert_write_audit(
             {"target_space": target_space, "action": action, "error": str(e)},
         )
     finally:
-        conn.close()
+        if should_close:
+            conn.close()
 
 
 def write_audit(
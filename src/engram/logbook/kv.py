@@ -4,17 +4,39 @@ kv - logbook.kv 轻量 KV 工具
 
 本模块提供面向“已有 psycopg 连接”的 KV 读写能力（不负责建立连接/提交事务）。
 
+批量接口：
+- kv_get_many / kv_set_many: 单条 SQL 读写多个 key（`key = ANY(%s)` / unnest 多行 upsert）
+- kv_scan_prefix: 按 key 前缀流式扫描（服务端游标，内存占用与 batch_size 成正比）
+- KVReadThroughCache: 进程内读穿缓存，按 updated_at 版本失效
+
 备注：
-- 如果你希望使用 DSN/config 驱动的 KV 操作，请使用 `engram.logbook.db.set_kv/get_kv`。
+- 如果你希望使用 DSN/config 驱动的 KV 操作，请使用 `engram.logbook.db.set_kv/get_kv`
+  （批量版本为 `get_kv_many/set_kv_many/iter_kv_prefix`）。
 """
 
 from __future__ import annotations
 
+import itertools
 import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Any, Optional, cast
 
 import psycopg
 
+# kv_scan_prefix 默认每批从服务端游标拉取的行数
+DEFAULT_SCAN_BATCH_SIZE = 500
+
+# KVReadThroughCache 默认最多缓存的 key 数（超出时淘汰最久未使用的 key）
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+
+# 服务端游标名序号（同一连接上可能并存多个扫描）
+_scan_cursor_seq = itertools.count(1)
+
 
 def kv_set_json(
     conn: psycopg.Connection[Any],
@@ -82,7 +104,294 @@ def kv_get_json(
             return None
 
 
+@dataclass(frozen=True)
+class KVEntry:
+    """logbook.kv 中的一行（value 为 DB 返回的 JSON 值）"""
+
+    key: str
+    value: Any
+    updated_at: Optional[datetime]
+
+    @property
+    def updated_at_ts(self) -> Optional[float]:
+        """updated_at 的 Unix 时间戳（秒）"""
+        return self.updated_at.timestamp() if self.updated_at else None
+
+
+def _decode_json(value_json: Any) -> Any:
+    if isinstance(value_json, str):
+        return json.loads(value_json)
+    return value_json
+
+
+def escape_like_prefix(prefix: str) -> str:
+    """转义 LIKE 通配符，返回可直接用于 `LIKE %s ESCAPE '\\'` 的前缀模式"""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def kv_get_many(
+    conn: psycopg.Connection[Any],
+    namespace: str,
+    keys: Iterable[str],
+) -> dict[str, KVEntry]:
+    """
+    单条查询批量读取多个 key
+
+    Args:
+        conn: 数据库连接
+        namespace: 命名空间
+        keys: key 列表（重复 key 会被去重）
+
+    Returns:
+        {key: KVEntry}，不存在的 key 不会出现在结果中
+    """
+    if not namespace:
+        raise ValueError("namespace 不能为空")
+    key_list = list(dict.fromkeys(keys))
+    if not key_list:
+        return {}
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT key, value_json, updated_at
+            FROM logbook.kv
+            WHERE namespace = %s AND key = ANY(%s)
+            """,
+            (namespace, key_list),
+        )
+        return {
+            row[0]: KVEntry(key=row[0], value=_decode_json(row[1]), updated_at=row[2])
+            for row in cur.fetchall()
+        }
+
+
+def kv_set_many(
+    conn: psycopg.Connection[Any],
+    namespace: str,
+    items: Mapping[str, Any],
+) -> dict[str, datetime]:
+    """
+    单条多行 upsert 批量写入（不提交事务）
+
+    Args:
+        conn: 数据库连接
+        namespace: 命名空间
+        items: {key: value}，value 需可 JSON 序列化
+
+    Returns:
+        {key: 写入后的 updated_at}
+    """
+    if not namespace:
+        raise ValueError("namespace 不能为空")
+    if not items:
+        return {}
+    if any(not key for key in items):
+        raise ValueError("key 不能为空")
+
+    keys = list(items)
+    values = [json.dumps(items[key]) for key in keys]
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO logbook.kv (namespace, key, value_json)
+            SELECT %s, v.key, v.value_json::jsonb
+            FROM unnest(%s::text[], %s::text[]) AS v(key, value_json)
+            ON CONFLICT (namespace, key) DO UPDATE
+            SET value_json = EXCLUDED.value_json,
+                updated_at = now()
+            RETURNING key, updated_at
+            """,
+            (namespace, keys, values),
+        )
+        return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def kv_scan_prefix(
+    conn: psycopg.Connection[Any],
+    namespace: str,
+    prefix: str = "",
+    *,
+    batch_size: int = DEFAULT_SCAN_BATCH_SIZE,
+) -> Iterator[KVEntry]:
+    """
+    按 key 前缀流式扫描（按 key 升序）
+
+    使用服务端命名游标分批拉取，调用方逐行消费，不会一次性加载整个命名空间。
+    autocommit 连接上使用 WITH HOLD 游标（DECLARE 需要事务块）。
+
+    Args:
+        conn: 数据库连接
+        namespace: 命名空间
+        prefix: key 前缀（空字符串表示整个命名空间）
+        batch_size: 每批拉取行数
+
+    Yields:
+        KVEntry
+    """
+    if not namespace:
+        raise ValueError("namespace 不能为空")
+    if batch_size <= 0:
+        raise ValueError("batch_size 必须为正整数")
+
+    cursor_name = f"engram_kv_scan_{next(_scan_cursor_seq)}"
+    with conn.cursor(name=cursor_name, withhold=conn.autocommit) as cur:
+        cur.itersize = batch_size
+        cur.execute(
+            """
+            SELECT key, value_json, updated_at
+            FROM logbook.kv
+            WHERE namespace = %s AND key LIKE %s ESCAPE '\\'
+            ORDER BY key
+            """,
+            (namespace, escape_like_prefix(prefix)),
+        )
+        for row in cur:
+            yield KVEntry(key=row[0], value=_decode_json(row[1]), updated_at=row[2])
+
+
+class KVReadThroughCache:
+    """
+    logbook.kv 进程内读穿缓存（单命名空间）
+
+    每个缓存项记录其 updated_at 版本。get_many 用一条查询完成重新校验：
+    把已缓存的 (key, updated_at) 传给 DB，只有版本变化的 key 才回传 value，
+    未缓存的 key 同时被加载，DB 中已删除的 key 从缓存中剔除。
+
+    ttl_seconds > 0 时，在 TTL 内的缓存项直接命中、不做校验（适合一次调度 tick
+    内多次读取同一批 key 的场景）；默认 0 表示每次都校验版本，结果始终与 DB 一致。
+
+    缓存项数不超过 max_entries，超出时按 LRU 淘汰。
+
+    线程安全：内部状态由锁保护，但 DB 查询在锁外执行。
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        ttl_seconds: float = 0.0,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+    ):
+        if not namespace:
+            raise ValueError("namespace 不能为空")
+        if max_entries <= 0:
+            raise ValueError("max_entries 必须为正整数")
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[KVEntry, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, conn: psycopg.Connection[Any], key: str) -> Optional[KVEntry]:
+        """读取单个 key（不存在返回 None）"""
+        return self.get_many(conn, [key]).get(key)
+
+    def get_many(
+        self,
+        conn: psycopg.Connection[Any],
+        keys: Iterable[str],
+    ) -> dict[str, KVEntry]:
+        """
+        批量读取（最多一条查询）
+
+        Returns:
+            {key: KVEntry}，不存在的 key 不会出现在结果中
+        """
+        key_list = list(dict.fromkeys(keys))
+        if not key_list:
+            return {}
+
+        now = time.monotonic()
+        result: dict[str, KVEntry] = {}
+        to_check: list[str] = []
+        seen_versions: list[Optional[datetime]] = []
+        with self._lock:
+            for key in key_list:
+                cached = self._entries.get(key)
+                if cached and self.ttl_seconds > 0 and now - cached[1] < self.ttl_seconds:
+                    result[key] = cached[0]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                else:
+                    to_check.append(key)
+                    seen_versions.append(cached[0].updated_at if cached else None)
+
+        if not to_check:
+            return result
+
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT c.key, kv.updated_at,
+                       CASE WHEN kv.updated_at IS DISTINCT FROM c.seen
+                            THEN kv.value_json END AS value_json,
+                       kv.updated_at IS DISTINCT FROM c.seen AS changed
+                FROM unnest(%s::text[], %s::timestamptz[]) AS c(key, seen)
+                JOIN logbook.kv kv ON kv.namespace = %s AND kv.key = c.key
+                """,
+                (to_check, seen_versions, self.namespace),
+            )
+            rows = cur.fetchall()
+
+        with self._lock:
+            found = set()
+            for key, updated_at, value_json, changed in rows:
+                found.add(key)
+                cached = self._entries.get(key)
+                if changed or cached is None:
+                    entry = KVEntry(key=key, value=_decode_json(value_json), updated_at=updated_at)
+                    self.misses += 1
+                else:
+                    entry = cached[0]
+                    self.hits += 1
+                self._store(key, entry, now)
+                result[key] = entry
+            for key in to_check:
+                if key not in found:
+                    self._entries.pop(key, None)
+        return result
+
+    def _store(self, key: str, entry: KVEntry, now: float) -> None:
+        """写入缓存项并按 LRU 淘汰（调用方持有锁）"""
+        self._entries[key] = (entry, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set_many(self, conn: psycopg.Connection[Any], items: Mapping[str, Any]) -> None:
+        """写穿：通过 kv_set_many 写入并以返回的 updated_at 更新缓存（不提交事务）"""
+        versions = kv_set_many(conn, self.namespace, items)
+        now = time.monotonic()
+        with self._lock:
+            for key, updated_at in versions.items():
+                entry = KVEntry(key=key, value=items[key], updated_at=updated_at)
+                self._store(key, entry, now)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """使单个 key（或全部缓存）失效"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
 __all__ = [
+    "DEFAULT_CACHE_MAX_ENTRIES",
+    "DEFAULT_SCAN_BATCH_SIZE",
+    "KVEntry",
+    "KVReadThroughCache",
+    "escape_like_prefix",
     "kv_set_json",
     "kv_get_json",
+    "kv_get_many",
+    "kv_set_many",
+    "kv_scan_prefix",
 ]
@@ -81,7 +81,26 @@ DEFAULT_SCHEMA_SUFFIXES = ["identity", "logbook", "scm", "analysis", "governance
 # 11: sync_jobs 添加维度列（编号 10 已废弃）
 # 12: artifact 操作审计表
 # 13: 对象存储审计事件表
-DDL_SCRIPT_PREFIXES = {"01", "02", "03", "06", "07", "08", "09", "11", "12", "13", "14"}
+# 14: write_audit 关联追踪与状态列
+# 15: knowledge_candidates 向量列与 ANN 索引
+# 16: 速率限制桶从 logbook.kv 迁移到 scm.sync_rate_limits
+# 17: scm.facts 增量维护的统一事实表（scm.v_facts 改为其上的视图）
+DDL_SCRIPT_PREFIXES = {
+    "01",
+    "02",
+    "03",
+    "06",
+    "07",
+    "08",
+    "09",
+    "11",
+    "12",
+    "13",
+    "14",
+    "15",
+    "16",
+    "17",
+}
 # 可选执行：权限脚本（需要 admin/superuser）
 PERMISSION_SCRIPT_PREFIXES = {"04", "05"}
 # 验证脚本：仅通过 --verify 执行
@@ -114,6 +133,7 @@ REQUIRED_TABLE_TEMPLATES = [
     ("scm", "patch_blobs"),
     ("scm", "mrs"),
     ("scm", "review_events"),
+    ("scm", "facts"),
     ("scm", "sync_rate_limits"),
     ("scm", "sync_runs"),
     ("scm", "sync_jobs"),
@@ -143,11 +163,11 @@ REQUIRED_COLUMN_TEMPLATES = [
 
 # 需要验证的关键索引模板（格式：schema_suffix, index_name）
 REQUIRED_INDEX_TEMPLATES = [
-    ("scm", "idx_v_facts_source_id"),
-    ("scm", "idx_v_facts_repo_id"),
-    ("scm", "idx_v_facts_repo_ts"),
+    ("scm", "idx_facts_repo_id"),
+    ("scm", "idx_facts_repo_ts"),
     ("logbook", "idx_logbook_events_item_time"),
     ("logbook", "idx_outbox_memory_pending"),
+    ("logbook", "idx_kv_namespace_updated_at"),
     # governance - security_events 索引
     ("governance", "idx_security_events_ts"),
     ("governance", "idx_security_events_action"),
@@ -162,17 +182,23 @@ REQUIRED_INDEX_TEMPLATES = [
     # scm - sync_jobs 维度列索引（11_sync_jobs_dimension_columns.sql）
     ("scm", "idx_sync_jobs_gitlab_instance_active"),
     ("scm", "idx_sync_jobs_tenant_id_active"),
+    ("scm", "idx_sync_jobs_tenant_claim"),
+    # scm - sync_runs 增量调度索引（06_scm_sync_runs.sql）
+    ("scm", "idx_sync_runs_finished_at"),
 ]
 
 # 需要验证的关键触发器模板（格式：schema_suffix, table_name, trigger_name）
 REQUIRED_TRIGGER_TEMPLATES = [
     ("scm", "patch_blobs", "trg_patch_blobs_updated_at"),
+    # scm.facts 增量维护触发器（17_scm_facts_table.sql）
+    ("scm", "svn_revisions", "trg_svn_revisions_facts_insert"),
+    ("scm", "git_commits", "trg_git_commits_facts_insert"),
+    ("scm", "mrs", "trg_mrs_facts_insert"),
 ]
 
 # 需要验证的物化视图模板（格式：schema_suffix, view_name）
-REQUIRED_MATVIEW_TEMPLATES = [
-    ("scm", "v_facts"),
-]
+# scm.v_facts 已改为 scm.facts 上的普通视图（17_scm_facts_table.sql），不再是物化视图
+REQUIRED_MATVIEW_TEMPLATES: list[tuple[str, str]] = []
 
 
 # ============================================================================
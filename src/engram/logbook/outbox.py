@@ -21,7 +21,7 @@ import psycopg
 from typing_extensions import TypedDict
 
 from .config import Config
-from .db import get_connection
+from .db import get_connection, hot_statement_prepare
 from .errors import DatabaseError
 from .hashing import sha256
 
@@ -72,10 +72,47 @@ class DedupResult(TypedDict, total=False):
     updated_at: datetime
 
 
+# 热点语句（文本保持稳定，以便在复用的连接上作为预备语句执行）
+_CHECK_DEDUP_SQL = """
+    SELECT outbox_id, target_space, payload_sha, status, last_error, created_at, updated_at
+    FROM outbox_memory
+    WHERE target_space = %s
+      AND payload_sha = %s
+      AND status = 'sent'
+    LIMIT 1
+"""
+
+# 使用 CTE: 先 SELECT FOR UPDATE SKIP LOCKED，再 UPDATE 设置锁定信息
+# 条件：pending 状态 + 到达重试时间 + (未锁定 OR 锁已过期)
+# 注意：PostgreSQL 的 interval 需要使用 make_interval 或乘法实现参数化
+_CLAIM_OUTBOX_SQL = """
+    WITH candidates AS (
+        SELECT outbox_id
+        FROM outbox_memory
+        WHERE status = 'pending'
+          AND next_attempt_at <= now()
+          AND (locked_at IS NULL OR locked_at < now() - make_interval(secs := %s))
+        ORDER BY next_attempt_at ASC, created_at ASC
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE outbox_memory o
+    SET locked_by = %s,
+        locked_at = now(),
+        updated_at = now()
+    FROM candidates c
+    WHERE o.outbox_id = c.outbox_id
+    RETURNING o.outbox_id, o.item_id, o.target_space, o.payload_md, o.payload_sha,
+              o.status, o.retry_count, o.next_attempt_at, o.locked_at, o.locked_by,
+              o.last_error, o.created_at, o.updated_at
+"""
+
+
 def check_dedup(
     target_space: str,
     payload_sha: str,
     config: Optional[Config] = None,
+    conn: Optional[psycopg.Connection] = None,
 ) -> Optional[DedupResult]:
     """
     检查是否存在已成功写入的重复记录（幂等去重）
@@ -86,23 +123,20 @@ def check_dedup(
         target_space: 目标空间 (team:<project> / private:<user> / org:shared)
         payload_sha: payload 的 SHA256 哈希
         config: 配置实例
+        conn: 可选的数据库连接（传入时复用该连接，并以预备语句执行）
 
     Returns:
         如果存在已成功写入的记录，返回 DedupResult；不存在返回 None
     """
-    conn = get_connection(config=config)
+    should_close = conn is None
+    if conn is None:
+        conn = get_connection(config=config)
     try:
         with conn.cursor() as cur:
             cur.execute(
-                """
-                SELECT outbox_id, target_space, payload_sha, status, last_error, created_at, updated_at
-                FROM outbox_memory
-                WHERE target_space = %s
-                  AND payload_sha = %s
-                  AND status = 'sent'
-                LIMIT 1
-                """,
+                _CHECK_DEDUP_SQL,
                 (target_space, payload_sha),
+                prepare=hot_statement_prepare(long_lived=not should_close),
             )
             row = cur.fetchone()
             if row:
@@ -123,7 +157,8 @@ def check_dedup(
             {"target_space": target_space, "payload_sha": payload_sha, "error": str(e)},
         )
     finally:
-        conn.close()
+        if should_close:
+            conn.close()
 
 
 def enqueue_memory(
@@ -514,6 +549,7 @@ def claim_outbox(
     limit: int = 10,
     lease_seconds: int = 60,
     config: Optional[Config] = None,
+    conn: Optional[psycopg.Connection] = None,
 ) -> List[OutboxRow]:
     """
     并发安全地获取并锁定待处理的 outbox 记录（Lease 协议）
@@ -532,39 +568,20 @@ def claim_outbox(
         limit: 返回记录数量上限
         lease_seconds: 租约有效期（秒）
         config: 配置实例
+        conn: 可选的数据库连接（传入时复用该连接，并以预备语句执行；仍会提交事务）
 
     Returns:
         已锁定的 outbox 记录列表（List[OutboxRow]）
     """
-    conn = get_connection(config=config)
+    should_close = conn is None
+    if conn is None:
+        conn = get_connection(config=config)
     try:
         with conn.cursor() as cur:
-            # 使用 CTE: 先 SELECT FOR UPDATE SKIP LOCKED，再 UPDATE 设置锁定信息
-            # 条件：pending 状态 + 到达重试时间 + (未锁定 OR 锁已过期)
-            # 注意：PostgreSQL 的 interval 需要使用 make_interval 或乘法实现参数化
             cur.execute(
-                """
-                WITH candidates AS (
-                    SELECT outbox_id
-                    FROM outbox_memory
-                    WHERE status = 'pending'
-                      AND next_attempt_at <= now()
-                      AND (locked_at IS NULL OR locked_at < now() - make_interval(secs := %s))
-                    ORDER BY next_attempt_at ASC, created_at ASC
-                    LIMIT %s
-                    FOR UPDATE SKIP LOCKED
-                )
-                UPDATE outbox_memory o
-                SET locked_by = %s,
-                    locked_at = now(),
-                    updated_at = now()
-                FROM candidates c
-                WHERE o.outbox_id = c.outbox_id
-                RETURNING o.outbox_id, o.item_id, o.target_space, o.payload_md, o.payload_sha,
-                          o.status, o.retry_count, o.next_attempt_at, o.locked_at, o.locked_by,
-                          o.last_error, o.created_at, o.updated_at
-                """,
+                _CLAIM_OUTBOX_SQL,
                 (float(lease_seconds), limit, worker_id),
+                prepare=hot_statement_prepare(long_lived=not should_close),
             )
             rows = cur.fetchall()
             conn.commit()
@@ -596,7 +613,8 @@ def claim_outbox(
             {"worker_id": worker_id, "limit": limit, "error": str(e)},
         )
     finally:
-        conn.close()
+        if should_close:
+            conn.close()
 
 
 def ack_sent(
@@ -14,13 +14,18 @@ from __future__ import annotations
 
 import json
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple, cast
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, cast
 
 import psycopg
 from psycopg.rows import DictRow, dict_row
 
+from engram.logbook import db_instrumentation
+from engram.logbook.db import hot_statement_prepare
+from engram.logbook.kv import KVReadThroughCache, escape_like_prefix, kv_get_many, kv_scan_prefix
+from engram.logbook.scm_sync_notify import notify_jobs_enqueued, payloads_for_jobs
 from engram.logbook.scm_sync_policy import build_circuit_breaker_key as _build_cb_key
 
 MATERIALIZE_STATUS_PENDING = "pending"
@@ -78,6 +83,28 @@ class RepoPauseRecord:
         )
 
 
+@dataclass
+class BulkUpsertResult:
+    """
+    批量写入结果
+
+    ids 与输入行一一对应（输入中重复的冲突键对应同一 id；DO NOTHING 跳过的行为 None）。
+    """
+
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    ids: List[Any] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated
+
+
+# 单条批量 SQL 的最大行数（限制参数数组大小）
+BULK_UPSERT_CHUNK_SIZE = 1000
+
+
 def _dict_cursor(conn: psycopg.Connection[Any]) -> psycopg.Cursor[DictRow]:
     """返回 dict_row 工厂的游标，行为 DictRow 类型"""
     return conn.cursor(row_factory=dict_row)
@@ -101,7 +128,9 @@ def _parse_pause_key(key: str) -> Optional[Tuple[int, str]]:
 
 
 def get_conn(dsn: str) -> psycopg.Connection:
-    return psycopg.connect(dsn, autocommit=False)
+    conn = psycopg.connect(dsn, autocommit=False)
+    db_instrumentation.maybe_install(conn)
+    return conn
 
 
 def upsert_repo(
@@ -158,6 +187,40 @@ def get_repo_by_url(
         return dict(row) if row else None
 
 
+def list_repos_by_urls(
+    conn: psycopg.Connection[Any], urls: List[str], *, exclude_repo_type: Optional[str] = "svn"
+) -> List[Dict[str, Any]]:
+    """
+    按 URL 列表查询仓库（忽略末尾斜杠，按 repo_id 排序）
+
+    用于 webhook 等外部事件只知道项目 URL 的场景；同一项目可能以多种 URL
+    （web_url、<实例>/<项目 ID>、<实例>/<项目路径>）登记，调用方传入全部候选。
+
+    Args:
+        conn: 数据库连接
+        urls: 候选 URL 列表
+        exclude_repo_type: 排除的仓库类型（默认排除 svn）
+
+    Returns:
+        仓库信息字典列表
+    """
+    candidates = sorted({url.rstrip("/") for url in urls if url})
+    if not candidates:
+        return []
+    with _dict_cursor(conn) as cur:
+        cur.execute(
+            """
+            SELECT repo_id, repo_type, url, project_key, default_branch, created_at
+            FROM scm.repos
+            WHERE rtrim(url, '/') = ANY(%s::text[])
+              AND (%s::text IS NULL OR repo_type <> %s::text)
+            ORDER BY repo_id
+            """,
+            (candidates, exclude_repo_type, exclude_repo_type),
+        )
+        return [dict(row) for row in cur.fetchall()]
+
+
 def get_repo_by_id(conn: psycopg.Connection[Any], repo_id: int) -> Optional[Dict[str, Any]]:
     """
     通过 repo_id 查询仓库
@@ -222,17 +285,19 @@ def insert_review_event(
     source_event_id: str,
     reviewer_user_id: Optional[str] = None,
     payload_json: Optional[Dict[str, Any]] = None,
+    ts=None,
 ) -> Optional[int]:
     payload_json = payload_json or {}
     with conn.cursor() as cur:
         cur.execute(
             """
-            INSERT INTO scm.review_events (mr_id, source_event_id, reviewer_user_id, event_type, payload_json)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO scm.review_events
+                (mr_id, source_event_id, reviewer_user_id, event_type, payload_json, ts)
+            VALUES (%s, %s, %s, %s, %s, COALESCE(%s::timestamptz, now()))
             ON CONFLICT (mr_id, source_event_id) DO NOTHING
             RETURNING id
             """,
-            (mr_id, source_event_id, reviewer_user_id, event_type, json.dumps(payload_json)),
+            (mr_id, source_event_id, reviewer_user_id, event_type, json.dumps(payload_json), ts),
         )
         row = cur.fetchone()
         return row[0] if row else None
@@ -335,19 +400,274 @@ def upsert_git_commit(
         return int(row[0])
 
 
-def upsert_patch_blob(
+def _ts_text(ts: Any) -> Optional[str]:
+    if ts is None:
+        return None
+    if isinstance(ts, datetime):
+        return ts.isoformat()
+    return str(ts)
+
+
+def _bulk_write(
+    conn,
+    rows: List[Dict[str, Any]],
+    key: Callable[[Dict[str, Any]], Hashable],
+    execute: Callable[[Any, List[Dict[str, Any]]], None],
+    *,
+    key_len: int = 1,
+    chunk_size: int = BULK_UPSERT_CHUNK_SIZE,
+) -> BulkUpsertResult:
+    """
+    按冲突键去重后分块执行批量写入
+
+    同一冲突键出现多次时保留最后一次（与逐行 upsert 的最终结果一致，
+    也避免 ON CONFLICT DO UPDATE 在同一语句中重复影响同一行）。
+    execute 执行的 SQL 需 RETURNING (<冲突键列...>, id, inserted)。
+    """
+    result = BulkUpsertResult()
+    if not rows:
+        return result
+
+    unique: Dict[Hashable, Dict[str, Any]] = {}
+    for row in rows:
+        unique[key(row)] = row
+    pending = list(unique.values())
+
+    ids_by_key: Dict[Hashable, Any] = {}
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start : start + chunk_size]
+        with conn.cursor() as cur:
+            execute(cur, chunk)
+            for returned in cur.fetchall():
+                row_key = returned[0] if key_len == 1 else tuple(returned[:key_len])
+                ids_by_key[row_key] = returned[key_len]
+                if returned[key_len + 1]:
+                    result.inserted += 1
+                else:
+                    result.updated += 1
+
+    result.skipped = len(pending) - result.inserted - result.updated
+    result.ids = [ids_by_key.get(key(row)) for row in rows]
+    return result
+
+
+def bulk_upsert_git_commits(
+    conn,
+    repo_id: int,
+    commits: List[Dict[str, Any]],
+    *,
+    chunk_size: int = BULK_UPSERT_CHUNK_SIZE,
+) -> BulkUpsertResult:
+    """
+    批量 upsert git commits（冲突键 (repo_id, commit_sha)，语义同 upsert_git_commit）
+
+    每个元素的键与 upsert_git_commit 参数一致（commit_sha、author_raw、ts 必填）。
+    """
+
+    def _execute(cur, chunk: List[Dict[str, Any]]) -> None:
+        cur.execute(
+            """
+            INSERT INTO scm.git_commits
+                (commit_sha, repo_id, author_raw, ts, message, is_merge, is_bulk, bulk_reason,
+                 meta_json, source_id)
+            SELECT v.commit_sha, %s, v.author_raw, v.ts::timestamptz, v.message, v.is_merge,
+                   v.is_bulk, v.bulk_reason, v.meta_json::jsonb, v.source_id
+            FROM unnest(
+                %s::text[], %s::text[], %s::text[], %s::text[], %s::boolean[], %s::boolean[],
+                %s::text[], %s::text[], %s::text[]
+            ) AS v(commit_sha, author_raw, ts, message, is_merge, is_bulk, bulk_reason,
+                   meta_json, source_id)
+            ON CONFLICT (repo_id, commit_sha) DO UPDATE
+            SET author_raw = EXCLUDED.author_raw,
+                ts = EXCLUDED.ts,
+                message = EXCLUDED.message,
+                is_merge = EXCLUDED.is_merge,
+                is_bulk = EXCLUDED.is_bulk,
+                bulk_reason = EXCLUDED.bulk_reason,
+                meta_json = EXCLUDED.meta_json,
+                source_id = EXCLUDED.source_id
+            RETURNING commit_sha, git_commit_id, (xmax = 0) AS inserted
+            """,
+            (
+                repo_id,
+                [c["commit_sha"] for c in chunk],
+                [c["author_raw"] for c in chunk],
+                [_ts_text(c.get("ts")) for c in chunk],
+                [c.get("message") for c in chunk],
+                [bool(c.get("is_merge", False)) for c in chunk],
+                [bool(c.get("is_bulk", False)) for c in chunk],
+                [c.get("bulk_reason") for c in chunk],
+                [json.dumps(c.get("meta_json") or {}) for c in chunk],
+                [c.get("source_id") or f"git:{repo_id}:{c['commit_sha']}" for c in chunk],
+            ),
+        )
+
+    return _bulk_write(conn, commits, lambda c: c["commit_sha"], _execute, chunk_size=chunk_size)
+
+
+def bulk_upsert_svn_revisions(
+    conn,
+    repo_id: int,
+    revisions: List[Dict[str, Any]],
+    *,
+    chunk_size: int = BULK_UPSERT_CHUNK_SIZE,
+) -> BulkUpsertResult:
+    """
+    批量 upsert SVN revisions（冲突键 (repo_id, rev_num)，语义同 upsert_svn_revision）
+
+    每个元素的键与 upsert_svn_revision 参数一致（rev_num、author_raw、ts 必填）。
+    """
+
+    def _execute(cur, chunk: List[Dict[str, Any]]) -> None:
+        cur.execute(
+            """
+            INSERT INTO scm.svn_revisions
+                (rev_num, repo_id, author_raw, ts, message, is_bulk, bulk_reason, meta_json,
+                 source_id)
+            SELECT v.rev_num, %s, v.author_raw, v.ts::timestamptz, v.message, v.is_bulk,
+                   v.bulk_reason, v.meta_json::jsonb, v.source_id
+            FROM unnest(
+                %s::bigint[], %s::text[], %s::text[], %s::text[], %s::boolean[], %s::text[],
+                %s::text[], %s::text[]
+            ) AS v(rev_num, author_raw, ts, message, is_bulk, bulk_reason, meta_json, source_id)
+            ON CONFLICT (repo_id, rev_num) DO UPDATE
+            SET author_raw = EXCLUDED.author_raw,
+                ts = EXCLUDED.ts,
+                message = EXCLUDED.message,
+                is_bulk = EXCLUDED.is_bulk,
+                bulk_reason = EXCLUDED.bulk_reason,
+                meta_json = EXCLUDED.meta_json,
+                source_id = EXCLUDED.source_id
+            RETURNING rev_num, svn_rev_id, (xmax = 0) AS inserted
+            """,
+            (
+                repo_id,
+                [int(r["rev_num"]) for r in chunk],
+                [r["author_raw"] for r in chunk],
+                [_ts_text(r.get("ts")) for r in chunk],
+                [r.get("message") for r in chunk],
+                [bool(r.get("is_bulk", False)) for r in chunk],
+                [r.get("bulk_reason") for r in chunk],
+                [json.dumps(r.get("meta_json") or {}) for r in chunk],
+                [r.get("source_id") or f"svn:{repo_id}:{r['rev_num']}" for r in chunk],
+            ),
+        )
+
+    return _bulk_write(
+        conn, revisions, lambda r: int(r["rev_num"]), _execute, chunk_size=chunk_size
+    )
+
+
+def bulk_upsert_mrs(
+    conn,
+    mrs: List[Dict[str, Any]],
+    *,
+    chunk_size: int = BULK_UPSERT_CHUNK_SIZE,
+) -> BulkUpsertResult:
+    """
+    批量 upsert MRs（冲突键 mr_id，语义同 upsert_mr）
+
+    每个元素的键与 upsert_mr 参数一致（mr_id、repo_id、status 必填）。
+    """
+
+    def _execute(cur, chunk: List[Dict[str, Any]]) -> None:
+        source_ids = []
+        for mr in chunk:
+            source_id = mr.get("source_id")
+            if source_id is None:
+                parts = str(mr["mr_id"]).split(":")
+                if len(parts) == 2:
+                    source_id = f"mr:{parts[0]}:{parts[1]}"
+                else:
+                    source_id = f"mr:{mr['repo_id']}:{mr['mr_id']}"
+            source_ids.append(source_id)
+        cur.execute(
+            """
+            INSERT INTO scm.mrs (mr_id, repo_id, author_user_id, status, url, meta_json, source_id)
+            SELECT v.mr_id, v.repo_id, v.author_user_id, v.status, v.url, v.meta_json::jsonb,
+                   v.source_id
+            FROM unnest(
+                %s::text[], %s::bigint[], %s::text[], %s::text[], %s::text[], %s::text[],
+                %s::text[]
+            ) AS v(mr_id, repo_id, author_user_id, status, url, meta_json, source_id)
+            ON CONFLICT (mr_id) DO UPDATE
+            SET status = EXCLUDED.status,
+                url = COALESCE(EXCLUDED.url, scm.mrs.url),
+                author_user_id = COALESCE(EXCLUDED.author_user_id, scm.mrs.author_user_id),
+                meta_json = EXCLUDED.meta_json,
+                source_id = COALESCE(EXCLUDED.source_id, scm.mrs.source_id),
+                updated_at = now()
+            RETURNING mr_id, mr_id, (xmax = 0) AS inserted
+            """,
+            (
+                [str(mr["mr_id"]) for mr in chunk],
+                [int(mr["repo_id"]) for mr in chunk],
+                [mr.get("author_user_id") for mr in chunk],
+                [mr["status"] for mr in chunk],
+                [mr.get("url") for mr in chunk],
+                [json.dumps(mr.get("meta_json") or {}) for mr in chunk],
+                source_ids,
+            ),
+        )
+
+    return _bulk_write(conn, mrs, lambda mr: str(mr["mr_id"]), _execute, chunk_size=chunk_size)
+
+
+def bulk_insert_review_events(
     conn,
+    events: List[Dict[str, Any]],
+    *,
+    chunk_size: int = BULK_UPSERT_CHUNK_SIZE,
+) -> BulkUpsertResult:
+    """
+    批量插入 review events（冲突键 (mr_id, source_event_id) DO NOTHING，语义同 insert_review_event）
+
+    每个元素的键与 insert_review_event 参数一致（mr_id、event_type、source_event_id 必填）。
+    ts 可选，缺省时为写入时间。已存在的事件计入 skipped，对应 ids 为 None。
+    """
+
+    def _execute(cur, chunk: List[Dict[str, Any]]) -> None:
+        cur.execute(
+            """
+            INSERT INTO scm.review_events
+                (mr_id, source_event_id, reviewer_user_id, event_type, payload_json, ts)
+            SELECT v.mr_id, v.source_event_id, v.reviewer_user_id, v.event_type,
+                   v.payload_json::jsonb, COALESCE(v.ts, now())
+            FROM unnest(
+                %s::text[], %s::text[], %s::text[], %s::text[], %s::text[], %s::timestamptz[]
+            ) AS v(mr_id, source_event_id, reviewer_user_id, event_type, payload_json, ts)
+            ON CONFLICT (mr_id, source_event_id) DO NOTHING
+            RETURNING mr_id, source_event_id, id, true AS inserted
+            """,
+            (
+                [str(e["mr_id"]) for e in chunk],
+                [str(e["source_event_id"]) for e in chunk],
+                [e.get("reviewer_user_id") for e in chunk],
+                [e["event_type"] for e in chunk],
+                [json.dumps(e.get("payload_json") or {}) for e in chunk],
+                [e.get("ts") for e in chunk],
+            ),
+        )
+
+    return _bulk_write(
+        conn,
+        events,
+        lambda e: (str(e["mr_id"]), str(e["source_event_id"])),
+        _execute,
+        key_len=2,
+        chunk_size=chunk_size,
+    )
+
+
+def _patch_blob_meta(
     source_type: str,
     source_id: str,
     sha256: str,
-    *,
     uri: Optional[str],
-    size_bytes: Optional[int] = None,
-    format: str = "diff",
-    meta_json: Optional[Dict[str, Any]] = None,
-    evidence_uri: Optional[str] = None,
-    chunking_version: Optional[str] = None,
-) -> int:
+    meta_json: Optional[Dict[str, Any]],
+    evidence_uri: Optional[str],
+) -> Tuple[Dict[str, Any], str]:
+    """补全 patch_blob 的 meta_json 默认字段与 evidence_uri"""
     meta_json = meta_json or {}
     if "materialize_status" not in meta_json:
         meta_json["materialize_status"] = (
@@ -356,6 +676,25 @@ def upsert_patch_blob(
     meta_json.setdefault("attempts", 0)
     evidence_uri = evidence_uri or f"memory://patch_blobs/{source_type}/{source_id}/{sha256}"
     meta_json.setdefault("evidence_uri", evidence_uri)
+    return meta_json, evidence_uri
+
+
+def upsert_patch_blob(
+    conn,
+    source_type: str,
+    source_id: str,
+    sha256: str,
+    *,
+    uri: Optional[str],
+    size_bytes: Optional[int] = None,
+    format: str = "diff",
+    meta_json: Optional[Dict[str, Any]] = None,
+    evidence_uri: Optional[str] = None,
+    chunking_version: Optional[str] = None,
+) -> int:
+    meta_json, evidence_uri = _patch_blob_meta(
+        source_type, source_id, sha256, uri, meta_json, evidence_uri
+    )
 
     with conn.cursor() as cur:
         cur.execute(
@@ -393,6 +732,93 @@ def upsert_patch_blob(
         return int(existing_row[0])
 
 
+def upsert_patch_blobs(conn, blobs: List[Dict[str, Any]]) -> List[int]:
+    """
+    批量写入 patch_blobs（单条 INSERT ... SELECT FROM unnest，不提交事务）
+
+    每个元素的键与 upsert_patch_blob 参数一致（source_type、source_id、sha256 必填）。
+    已存在的 (source_type, source_id, sha256) 保持不变，返回其已有 blob_id。
+
+    Returns:
+        与 blobs 顺序一致的 blob_id 列表
+    """
+    if not blobs:
+        return []
+
+    columns: Dict[str, List[Any]] = {
+        name: []
+        for name in (
+            "source_type",
+            "source_id",
+            "uri",
+            "evidence_uri",
+            "sha256",
+            "size_bytes",
+            "format",
+            "chunking_version",
+            "meta_json",
+        )
+    }
+    for blob in blobs:
+        meta_json, evidence_uri = _patch_blob_meta(
+            blob["source_type"],
+            blob["source_id"],
+            blob["sha256"],
+            blob.get("uri"),
+            blob.get("meta_json"),
+            blob.get("evidence_uri"),
+        )
+        columns["source_type"].append(blob["source_type"])
+        columns["source_id"].append(blob["source_id"])
+        columns["uri"].append(blob.get("uri"))
+        columns["evidence_uri"].append(evidence_uri)
+        columns["sha256"].append(blob["sha256"])
+        columns["size_bytes"].append(blob.get("size_bytes"))
+        columns["format"].append(blob.get("format") or "diff")
+        columns["chunking_version"].append(blob.get("chunking_version"))
+        columns["meta_json"].append(json.dumps(meta_json))
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH v AS (
+                SELECT *
+                FROM unnest(
+                    %s::text[], %s::text[], %s::text[], %s::text[], %s::text[],
+                    %s::bigint[], %s::text[], %s::text[], %s::text[]
+                ) WITH ORDINALITY AS v(
+                    source_type, source_id, uri, evidence_uri, sha256,
+                    size_bytes, format, chunking_version, meta_json, ord
+                )
+            ),
+            ins AS (
+                INSERT INTO scm.patch_blobs
+                    (source_type, source_id, uri, evidence_uri, sha256, size_bytes, format,
+                     chunking_version, meta_json)
+                SELECT source_type, source_id, uri, evidence_uri, sha256, size_bytes, format,
+                       chunking_version, meta_json::jsonb
+                FROM v
+                ORDER BY ord
+                ON CONFLICT (source_type, source_id, sha256) DO NOTHING
+                RETURNING blob_id, source_type, source_id, sha256
+            )
+            SELECT COALESCE(ins.blob_id, p.blob_id)
+            FROM v
+            LEFT JOIN ins
+                ON ins.source_type = v.source_type
+                AND ins.source_id = v.source_id
+                AND ins.sha256 = v.sha256
+            LEFT JOIN scm.patch_blobs p
+                ON p.source_type = v.source_type
+                AND p.source_id = v.source_id
+                AND p.sha256 = v.sha256
+            ORDER BY v.ord
+            """,
+            list(columns.values()),
+        )
+        return [int(row[0]) for row in cur.fetchall()]
+
+
 def get_patch_blob(
     conn: psycopg.Connection[Any], source_type: str, source_id: str, sha256: str
 ) -> Optional[Dict[str, Any]]:
@@ -710,6 +1136,7 @@ def enqueue_sync_jobs_batch(conn, jobs: List[Dict[str, Any]]) -> List[Optional[s
 
     说明：
     - 使用 `ON CONFLICT DO NOTHING` 处理冲突（典型冲突：active job 唯一索引）
+    - 新任务在同一事务内 NOTIFY scm_sync_jobs（提交后投递给监听中的 worker）
     - 不负责提交事务（由调用方 conn.commit()）
     """
     if not jobs:
@@ -740,6 +1167,16 @@ def enqueue_sync_jobs_batch(conn, jobs: List[Dict[str, Any]]) -> List[Optional[s
             params,
         )
         inserted_rows = cur.fetchall()
+        if inserted_rows:
+            inserted_keys = {(int(r[0]), str(r[1]), str(r[2])) for r in inserted_rows}
+            notify_jobs_enqueued(
+                cur,
+                payloads_for_jobs(
+                    job
+                    for job, row in zip(jobs, normalized_rows)
+                    if (row[0], row[1], row[2]) in inserted_keys
+                ),
+            )
 
     inserted_map: Dict[Tuple[int, str, str], List[str]] = {}
     for repo_id, job_type, mode, job_id in inserted_rows:
@@ -1098,6 +1535,49 @@ def delete_circuit_breaker_state(conn, key: str) -> None:
         )
 
 
+def save_circuit_breaker_window(conn, key: str, worker_id: str, snapshot: Dict[str, Any]) -> None:
+    """写入单个进程的熔断窗口快照（见 scm_sync_circuit_breaker.CircuitBreakerRuntime）"""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO logbook.kv (namespace, key, value_json)
+            VALUES ('scm.sync_health.window', %s, %s)
+            ON CONFLICT (namespace, key) DO UPDATE
+            SET value_json = EXCLUDED.value_json,
+                updated_at = now()
+            """,
+            (f"{key}|{worker_id}", json.dumps(snapshot, separators=(",", ":"))),
+        )
+
+
+def load_circuit_breaker_windows(
+    conn, key: str, *, max_age_seconds: float
+) -> Dict[str, Dict[str, Any]]:
+    """
+    读取同一熔断 key 下各进程的窗口快照
+
+    Args:
+        conn: 数据库连接
+        key: 熔断 key
+        max_age_seconds: 超过该时长未更新的快照视为过期（进程已退出），不返回
+
+    Returns:
+        {worker_id: snapshot}
+    """
+    prefix = f"{key}|"
+    with _dict_cursor(conn) as cur:
+        cur.execute(
+            """
+            SELECT key, value_json FROM logbook.kv
+            WHERE namespace = 'scm.sync_health.window'
+              AND key LIKE %s ESCAPE '\\'
+              AND updated_at > now() - make_interval(secs => %s)
+            """,
+            (escape_like_prefix(prefix), float(max_age_seconds)),
+        )
+        return {row["key"][len(prefix) :]: row["value_json"] for row in cur.fetchall()}
+
+
 def build_circuit_breaker_key(
     project_key: str = "default",
     scope: str = "global",
@@ -1167,24 +1647,14 @@ def get_repo_job_pause(
 def list_all_pauses(conn, *, include_expired: bool = False) -> List[RepoPauseRecord]:
     """列出所有暂停记录"""
     now_ts = time.time()
-    with _dict_cursor(conn) as cur:
-        cur.execute(
-            """
-            SELECT key, value_json FROM logbook.kv
-            WHERE namespace = 'scm.sync_pauses'
-            """
-        )
-        rows = cur.fetchall()
-
     results = []
-    for row in rows:
-        parsed = _parse_pause_key(row["key"])
+    # 服务端游标流式扫描，避免暂停记录较多时一次性加载
+    for entry in kv_scan_prefix(conn, "scm.sync_pauses", "repo:"):
+        parsed = _parse_pause_key(entry.key)
         if parsed is None:
             continue
         repo_id, job_type = parsed
-        record = RepoPauseRecord.from_dict(
-            repo_id=repo_id, job_type=job_type, data=row["value_json"]
-        )
+        record = RepoPauseRecord.from_dict(repo_id=repo_id, job_type=job_type, data=entry.value)
         if include_expired or not record.is_expired(now=now_ts):
             results.append(record)
     return results
@@ -1251,11 +1721,13 @@ def list_repos_for_scheduling(
     *,
     repo_type: Optional[str] = None,
     limit: int = 1000,
+    repo_ids: Optional[Iterable[int]] = None,
 ) -> List[Dict[str, Any]]:
     """
     获取待调度的仓库列表，用于 scheduler 扫描
 
-    返回仓库基础信息和最近同步统计。
+    返回仓库基础信息和最近同步统计。repo_ids 非空时只返回这些仓库
+    （增量调度只重新加载有变化的仓库）。
     """
     query = """
         SELECT
@@ -1272,6 +1744,9 @@ def list_repos_for_scheduling(
     if repo_type:
         query += " AND r.repo_type = %s"
         params.append(repo_type)
+    if repo_ids is not None:
+        query += " AND r.repo_id = ANY(%s::bigint[])"
+        params.append(list(repo_ids))
     query += " ORDER BY r.repo_id LIMIT %s"
     params.append(limit)
 
@@ -1344,6 +1819,138 @@ def get_repo_sync_stats(
         }
 
 
+def get_repo_sync_stats_many(
+    conn: psycopg.Connection[Any],
+    repo_ids: Iterable[int],
+    *,
+    window_count: int = 10,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    批量获取多个仓库的同步统计（单条查询，返回结构同 get_repo_sync_stats）
+
+    按 repo_id 分区取最近 window_count 次运行（row_number 窗口），
+    失败/完成次数与 counts 中的 total_429_hits/total_requests 在 SQL 侧聚合。
+
+    Returns:
+        {repo_id: stats}，没有运行记录的仓库返回全零统计
+    """
+    ids = list(dict.fromkeys(int(repo_id) for repo_id in repo_ids))
+    result: Dict[int, Dict[str, Any]] = {
+        repo_id: {
+            "repo_id": repo_id,
+            "total_runs": 0,
+            "failed_count": 0,
+            "completed_count": 0,
+            "last_run_status": None,
+            "last_run_at": None,
+            "total_429_hits": 0,
+            "total_requests": 0,
+        }
+        for repo_id in ids
+    }
+    if not ids:
+        return result
+
+    with _dict_cursor(conn) as cur:
+        cur.execute(
+            """
+            WITH recent AS (
+                SELECT
+                    repo_id, status, started_at, counts,
+                    row_number() OVER (PARTITION BY repo_id ORDER BY started_at DESC) AS rn
+                FROM scm.sync_runs
+                WHERE repo_id = ANY(%s::bigint[])
+            )
+            SELECT
+                repo_id,
+                count(*) AS total_runs,
+                count(*) FILTER (WHERE status = 'failed') AS failed_count,
+                count(*) FILTER (WHERE status = 'completed') AS completed_count,
+                (array_agg(status ORDER BY rn))[1] AS last_run_status,
+                (array_agg(started_at ORDER BY rn))[1] AS last_run_at,
+                COALESCE(sum(
+                    CASE WHEN jsonb_typeof(counts -> 'total_429_hits') = 'number'
+                        THEN (counts ->> 'total_429_hits')::numeric END
+                ), 0)::bigint AS total_429_hits,
+                COALESCE(sum(
+                    CASE WHEN jsonb_typeof(counts -> 'total_requests') = 'number'
+                        THEN (counts ->> 'total_requests')::numeric END
+                ), 0)::bigint AS total_requests
+            FROM recent
+            WHERE rn <= %s
+            GROUP BY repo_id
+            """,
+            (ids, window_count),
+        )
+        for row in cur.fetchall():
+            last_run_at = row["last_run_at"]
+            result[int(row["repo_id"])].update(
+                total_runs=row["total_runs"],
+                failed_count=row["failed_count"],
+                completed_count=row["completed_count"],
+                last_run_status=row["last_run_status"],
+                last_run_at=last_run_at.timestamp() if last_run_at else None,
+                total_429_hits=row["total_429_hits"],
+                total_requests=row["total_requests"],
+            )
+    return result
+
+
+def get_scheduling_changes_since(
+    conn: psycopg.Connection[Any],
+    since: Optional[float],
+    *,
+    namespace: str = "scm.sync",
+) -> Tuple[List[int], float]:
+    """
+    获取自 since 以来调度输入发生变化的仓库（增量调度的 updated_at 水位线）
+
+    变化来源：
+    - scm.sync_runs 新开始或已结束的运行（影响失败率/429 统计）
+    - logbook.kv 中 cursor:<repo_id>:<job_type> 游标更新（影响游标年龄）
+    - scm.repos 新建的仓库
+
+    Args:
+        conn: 数据库连接
+        since: 上次水位线（epoch 秒），None 时只返回当前水位线
+        namespace: 游标所在的 KV 命名空间
+
+    Returns:
+        (有变化的 repo_id 列表, 新水位线)；水位线取数据库 clock_timestamp()
+    """
+    with conn.cursor() as cur:
+        if since is None:
+            cur.execute("SELECT extract(epoch FROM clock_timestamp())::float8")
+            row = cur.fetchone()
+            assert row is not None, "SELECT clock_timestamp() must return a row"
+            return [], float(row[0])
+
+        cur.execute(
+            """
+            SELECT
+                extract(epoch FROM clock_timestamp())::float8,
+                ARRAY(
+                    SELECT repo_id FROM scm.sync_runs WHERE started_at >= to_timestamp(%(since)s)
+                    UNION
+                    SELECT repo_id FROM scm.sync_runs WHERE finished_at >= to_timestamp(%(since)s)
+                    UNION
+                    SELECT repo_id FROM scm.repos WHERE created_at >= to_timestamp(%(since)s)
+                    UNION
+                    SELECT split_part(key, ':', 2)::bigint
+                    FROM logbook.kv
+                    WHERE namespace = %(namespace)s
+                      AND updated_at >= to_timestamp(%(since)s)
+                      AND key LIKE 'cursor:%%'
+                      AND split_part(key, ':', 2) ~ '^[0-9]+$'
+                )
+            """,
+            {"since": since, "namespace": namespace},
+        )
+        row = cur.fetchone()
+        assert row is not None, "SELECT clock_timestamp() must return a row"
+        return sorted(int(repo_id) for repo_id in row[1] or []), float(row[0])
+
+
 def get_cursor_value(
     conn,
     repo_id: int,
@@ -1370,6 +1977,40 @@ def get_cursor_value(
         }
 
 
+def get_cursor_values(
+    conn,
+    repo_ids: Iterable[int],
+    job_type: str,
+    *,
+    namespace: str = "scm.sync",
+    cache: Optional[KVReadThroughCache] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    批量获取多个仓库的同步游标（单条查询，返回结构同 get_cursor_value）
+
+    Args:
+        conn: 数据库连接
+        repo_ids: 仓库 ID 列表
+        job_type: 任务类型
+        namespace: KV 命名空间
+        cache: 可选的读穿缓存（命名空间必须与 namespace 一致）
+
+    Returns:
+        {repo_id: {"value", "updated_at"}}，无游标的仓库不在结果中
+    """
+    keys = {f"cursor:{repo_id}:{job_type}": repo_id for repo_id in repo_ids}
+    if cache is not None:
+        if cache.namespace != namespace:
+            raise ValueError(f"缓存命名空间 {cache.namespace} 与 {namespace} 不一致")
+        entries = cache.get_many(conn, keys)
+    else:
+        entries = kv_get_many(conn, namespace, keys)
+    return {
+        keys[key]: {"value": entry.value, "updated_at": entry.updated_at_ts}
+        for key, entry in entries.items()
+    }
+
+
 def get_active_job_pairs(conn) -> List[Tuple[int, str]]:
     """
     获取当前活跃的 (repo_id, job_type) 对
@@ -1449,24 +2090,30 @@ def get_budget_snapshot(conn: psycopg.Connection[Any]) -> Dict[str, Any]:
 def get_rate_limit_bucket_status(
     conn: psycopg.Connection[Any],
     instance_key: str,
-    *,
-    namespace: str = "scm.rate_limit",
 ) -> Optional[Dict[str, Any]]:
-    """获取实例级速率限制桶状态"""
-    key = f"bucket:{instance_key}"
+    """获取实例级速率限制桶状态（字段同 get_rate_limit_status）"""
+    return get_rate_limit_status(conn, instance_key)
+
+
+def get_rate_limit_bucket_statuses(
+    conn: psycopg.Connection[Any],
+    instance_keys: Iterable[str],
+) -> Dict[str, Dict[str, Any]]:
+    """批量获取实例级速率限制桶状态（单条查询，无记录的实例不在结果中）"""
+    keys = list(dict.fromkeys(instance_keys))
+    if not keys:
+        return {}
     with _dict_cursor(conn) as cur:
         cur.execute(
-            """
-            SELECT value_json, updated_at FROM logbook.kv
-            WHERE namespace = %s AND key = %s
+            f"""
+            SELECT {_BUCKET_STATUS_COLUMNS}
+            FROM scm.sync_rate_limits
+            WHERE instance_key = ANY(%s)
             """,
-            (namespace, key),
+            (keys,),
         )
-        row = cur.fetchone()
-        if not row:
-            return None
-        value = row["value_json"]
-        return cast(Dict[str, Any], value) if value else None
+        rows = cur.fetchall()
+    return {row["instance_key"]: _bucket_status_from_row(row) for row in rows}
 
 
 def get_sync_runs_health_stats(
@@ -1630,7 +2277,6 @@ def delete_cursor_value(
 def list_rate_limit_buckets(
     conn,
     *,
-    namespace: str = "scm.rate_limit",
     limit: int = 100,
 ) -> List[Dict[str, Any]]:
     """
@@ -1638,52 +2284,29 @@ def list_rate_limit_buckets(
 
     Args:
         conn: 数据库连接
-        namespace: 命名空间
         limit: 返回数量限制
 
     Returns:
-        List[Dict]: 桶状态列表
+        List[Dict]: 桶状态列表（get_rate_limit_status 字段，另含 tokens/remaining_pause_seconds）
     """
     with _dict_cursor(conn) as cur:
         cur.execute(
-            """
-            SELECT key, value_json, updated_at
-            FROM logbook.kv
-            WHERE namespace = %s AND key LIKE 'bucket:%%'
+            f"""
+            SELECT {_BUCKET_STATUS_COLUMNS}
+            FROM scm.sync_rate_limits
             ORDER BY updated_at DESC
             LIMIT %s
             """,
-            (namespace, limit),
+            (limit,),
         )
         rows = cur.fetchall()
 
     results = []
-    now_ts = time.time()
     for row in rows:
-        bucket_key = (
-            row["key"].replace("bucket:", "", 1) if row["key"].startswith("bucket:") else row["key"]
-        )
-        value = row["value_json"] or {}
-        if isinstance(value, str):
-            value = json.loads(value)
-
-        # 计算桶状态
-        paused_until = value.get("paused_until", 0)
-        is_paused = paused_until > now_ts
-
-        results.append(
-            {
-                "instance_key": bucket_key,
-                "tokens": value.get("tokens", 0),
-                "last_refill": value.get("last_refill"),
-                "paused_until": paused_until if paused_until > 0 else None,
-                "is_paused": is_paused,
-                "remaining_pause_seconds": max(0, paused_until - now_ts) if is_paused else 0,
-                "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
-                "raw_value": value,
-            }
-        )
-
+        status = _bucket_status_from_row(row)
+        status["tokens"] = status["current_tokens"]
+        status["remaining_pause_seconds"] = status["pause_remaining_seconds"]
+        results.append(status)
     return results
 
 
@@ -1693,69 +2316,60 @@ def pause_rate_limit_bucket(
     pause_duration_seconds: float,
     *,
     reason: str = "manual_pause",
-    namespace: str = "scm.rate_limit",
     record_429: bool = False,
+    default_rate: float = 10.0,
+    default_burst: int = 20,
 ) -> Dict[str, Any]:
     """
     暂停速率限制桶
 
+    桶不存在时按 default_rate/default_burst 创建满桶。
+
     Args:
         conn: 数据库连接
         instance_key: 实例 key
         pause_duration_seconds: 暂停时长（秒）
         reason: 暂停原因
-        namespace: 命名空间
+        record_429: 是否在 meta_json 中记录 429 信息
+        default_rate: 新建桶的令牌补充速率
+        default_burst: 新建桶的最大令牌容量
 
     Returns:
         Dict: 更新后的桶状态
     """
-    key = f"bucket:{instance_key}"
     now_ts = time.time()
     paused_until = now_ts + pause_duration_seconds
 
-    with _dict_cursor(conn) as cur:
-        # 先获取现有值
-        cur.execute(
-            """
-            SELECT value_json FROM logbook.kv
-            WHERE namespace = %s AND key = %s
-            """,
-            (namespace, key),
-        )
-        row = cur.fetchone()
-
-        if row:
-            value = row["value_json"] or {}
-            if isinstance(value, str):
-                value = json.loads(value)
-        else:
-            value = {}
-
-        # 更新暂停状态
-        value["paused_until"] = paused_until
-        value["pause_reason"] = reason
-        value["paused_at"] = now_ts
-
-        # 记录 429 信息（当 record_429=True）
-        if record_429:
-            meta = value.get("meta_json", {})
-            if not isinstance(meta, dict):
-                meta = {}
-            meta["last_429_at"] = now_ts
-            meta["last_retry_after"] = pause_duration_seconds
-            value["meta_json"] = meta
+    meta: Dict[str, Any] = {"pause_reason": reason, "paused_at": now_ts}
+    # 记录 429 信息（当 record_429=True）
+    if record_429:
+        meta["last_429_at"] = now_ts
+        meta["last_retry_after"] = pause_duration_seconds
 
-        # upsert
+    with _dict_cursor(conn) as cur:
         cur.execute(
-            """
-            INSERT INTO logbook.kv (namespace, key, value_json)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (namespace, key) DO UPDATE
-            SET value_json = EXCLUDED.value_json,
-                updated_at = now()
-            RETURNING value_json, updated_at
+            f"""
+            INSERT INTO scm.sync_rate_limits AS b
+                (instance_key, tokens, rate, burst, updated_at, paused_until, meta_json)
+            VALUES (
+                %s, %s, %s, %s, clock_timestamp(),
+                clock_timestamp() + make_interval(secs => %s), %s::jsonb
+            )
+            ON CONFLICT (instance_key) DO UPDATE
+            SET tokens = {_refilled_tokens_sql("clock_timestamp()", "b.")},
+                updated_at = clock_timestamp(),
+                paused_until = EXCLUDED.paused_until,
+                meta_json = b.meta_json || EXCLUDED.meta_json
+            RETURNING updated_at
             """,
-            (namespace, key, json.dumps(value)),
+            (
+                instance_key,
+                float(default_burst),
+                default_rate,
+                default_burst,
+                float(pause_duration_seconds),
+                json.dumps(meta),
+            ),
         )
         result_row = cur.fetchone()
 
@@ -1772,8 +2386,6 @@ def pause_rate_limit_bucket(
 def unpause_rate_limit_bucket(
     conn,
     instance_key: str,
-    *,
-    namespace: str = "scm.rate_limit",
 ) -> Dict[str, Any]:
     """
     取消暂停速率限制桶
@@ -1781,53 +2393,32 @@ def unpause_rate_limit_bucket(
     Args:
         conn: 数据库连接
         instance_key: 实例 key
-        namespace: 命名空间
 
     Returns:
         Dict: 更新后的桶状态
     """
-    key = f"bucket:{instance_key}"
-
     with _dict_cursor(conn) as cur:
-        # 获取现有值
-        cur.execute(
-            """
-            SELECT value_json FROM logbook.kv
-            WHERE namespace = %s AND key = %s
-            """,
-            (namespace, key),
-        )
-        row = cur.fetchone()
-
-        if not row:
-            return {"instance_key": instance_key, "status": "not_found"}
-
-        value = row["value_json"] or {}
-        if isinstance(value, str):
-            value = json.loads(value)
-
-        # 清除暂停状态
-        value["paused_until"] = 0
-        value.pop("pause_reason", None)
-        value.pop("paused_at", None)
-
         cur.execute(
-            """
-            UPDATE logbook.kv
-            SET value_json = %s, updated_at = now()
-            WHERE namespace = %s AND key = %s
+            f"""
+            UPDATE scm.sync_rate_limits
+            SET paused_until = NULL,
+                meta_json = meta_json - 'pause_reason' - 'paused_at',
+                tokens = {_refilled_tokens_sql("clock_timestamp()")},
+                updated_at = clock_timestamp()
+            WHERE instance_key = %s
             RETURNING updated_at
             """,
-            (json.dumps(value), namespace, key),
+            (instance_key,),
         )
         result_row = cur.fetchone()
 
+    if not result_row:
+        return {"instance_key": instance_key, "status": "not_found"}
+
     return {
         "instance_key": instance_key,
         "status": "unpaused",
-        "updated_at": result_row["updated_at"].isoformat()
-        if result_row and result_row["updated_at"]
-        else None,
+        "updated_at": result_row["updated_at"].isoformat() if result_row["updated_at"] else None,
     }
 
 
@@ -1989,6 +2580,142 @@ def list_jobs_by_status(
         return [dict(row) for row in cur.fetchall()]
 
 
+# 来源表按 v_facts 列投影后的期望事实（与 17_scm_facts_table.sql 触发器一致）
+_EXPECTED_FACTS_SQL = """
+    SELECT source_id, 'svn'::text AS source_type, repo_id, ts, author_raw,
+           NULL::text AS author_user_id, is_bulk, bulk_reason, meta_json
+    FROM scm.svn_revisions
+    WHERE source_id IS NOT NULL AND (%(repo_id)s::bigint IS NULL OR repo_id = %(repo_id)s)
+    UNION ALL
+    SELECT source_id, 'git', repo_id, ts, author_raw, NULL, is_bulk, bulk_reason, meta_json
+    FROM scm.git_commits
+    WHERE source_id IS NOT NULL AND (%(repo_id)s::bigint IS NULL OR repo_id = %(repo_id)s)
+    UNION ALL
+    SELECT source_id, 'mr', repo_id, created_at, NULL, author_user_id, false, NULL, meta_json
+    FROM scm.mrs
+    WHERE source_id IS NOT NULL AND (%(repo_id)s::bigint IS NULL OR repo_id = %(repo_id)s)
+"""
+
+_FACTS_FIELDS = (
+    "source_type, repo_id, ts, author_raw, author_user_id, is_bulk, bulk_reason, meta_json"
+)
+
+
+def reconcile_facts(
+    conn: psycopg.Connection[Any],
+    *,
+    repo_id: Optional[int] = None,
+    repair: bool = False,
+    sample_limit: int = 20,
+) -> Dict[str, Any]:
+    """
+    对比来源表（svn_revisions/git_commits/mrs）与 scm.facts
+
+    scm.facts 正常由触发器维护；来源表被 TRUNCATE、触发器被禁用或手工改动
+    scm.facts 后可能不一致，用本函数校验并按需修复。
+
+    Args:
+        conn: 数据库连接
+        repo_id: 仅校验指定仓库（可选）
+        repair: 是否修复（upsert 缺失/过期行，删除孤儿行）
+        sample_limit: 每类差异返回的 source_id 样例数量
+
+    Returns:
+        Dict: missing/stale/orphaned 计数、samples 样例；repair 时附带 upserted/deleted
+    """
+    params = {"repo_id": repo_id, "sample_limit": sample_limit}
+    result: Dict[str, Any] = {
+        "repo_id": repo_id,
+        "missing": 0,
+        "stale": 0,
+        "orphaned": 0,
+        "samples": {"missing": [], "stale": [], "orphaned": []},
+        "repaired": False,
+    }
+
+    with _dict_cursor(conn) as cur:
+        cur.execute(
+            f"""
+            WITH expected AS ({_EXPECTED_FACTS_SQL}),
+            actual AS (
+                SELECT source_id, {_FACTS_FIELDS}
+                FROM scm.facts
+                WHERE %(repo_id)s::bigint IS NULL OR repo_id = %(repo_id)s
+            ),
+            diff AS (
+                SELECT
+                    COALESCE(e.source_id, a.source_id) AS source_id,
+                    CASE
+                        WHEN a.source_id IS NULL THEN 'missing'
+                        WHEN e.source_id IS NULL THEN 'orphaned'
+                        ELSE 'stale'
+                    END AS kind
+                FROM expected e
+                FULL JOIN actual a ON a.source_id = e.source_id
+                WHERE e.source_id IS NULL
+                   OR a.source_id IS NULL
+                   OR (e.source_type, e.repo_id, e.ts, e.author_raw, e.author_user_id,
+                       e.is_bulk, e.bulk_reason, e.meta_json)
+                      IS DISTINCT FROM
+                      (a.source_type, a.repo_id, a.ts, a.author_raw, a.author_user_id,
+                       a.is_bulk, a.bulk_reason, a.meta_json)
+            )
+            SELECT kind, COUNT(*) AS count,
+                   (array_agg(source_id ORDER BY source_id))[1:%(sample_limit)s] AS sample
+            FROM diff
+            GROUP BY kind
+            """,
+            params,
+        )
+        for row in cur.fetchall():
+            result[row["kind"]] = int(row["count"])
+            result["samples"][row["kind"]] = list(row["sample"] or [])
+
+        if not repair:
+            return result
+
+        cur.execute(
+            f"""
+            INSERT INTO scm.facts AS f (source_id, {_FACTS_FIELDS})
+            SELECT DISTINCT ON (source_id) source_id, {_FACTS_FIELDS}
+            FROM ({_EXPECTED_FACTS_SQL}) e
+            ON CONFLICT (source_id) DO UPDATE SET
+                source_type = EXCLUDED.source_type,
+                repo_id = EXCLUDED.repo_id,
+                ts = EXCLUDED.ts,
+                author_raw = EXCLUDED.author_raw,
+                author_user_id = EXCLUDED.author_user_id,
+                is_bulk = EXCLUDED.is_bulk,
+                bulk_reason = EXCLUDED.bulk_reason,
+                meta_json = EXCLUDED.meta_json,
+                updated_at = now()
+            WHERE (f.source_type, f.repo_id, f.ts, f.author_raw, f.author_user_id,
+                   f.is_bulk, f.bulk_reason, f.meta_json)
+                  IS DISTINCT FROM
+                  (EXCLUDED.source_type, EXCLUDED.repo_id, EXCLUDED.ts, EXCLUDED.author_raw,
+                   EXCLUDED.author_user_id, EXCLUDED.is_bulk, EXCLUDED.bulk_reason,
+                   EXCLUDED.meta_json)
+            """,
+            params,
+        )
+        result["upserted"] = max(cur.rowcount, 0)
+
+        cur.execute(
+            f"""
+            DELETE FROM scm.facts f
+            WHERE (%(repo_id)s::bigint IS NULL OR f.repo_id = %(repo_id)s)
+              AND NOT EXISTS (
+                  SELECT 1 FROM ({_EXPECTED_FACTS_SQL}) e WHERE e.source_id = f.source_id
+              )
+            """,
+            params,
+        )
+        result["deleted"] = max(cur.rowcount, 0)
+        result["repaired"] = True
+
+    return result
+
+
 # ============ 健康检查辅助函数 ============
 
 
@@ -2246,6 +2973,42 @@ def get_circuit_breaker_inconsistencies(conn: psycopg.Connection[Any]) -> List[D
 # ============ 速率限制令牌桶函数（PostgresRateLimiter 使用） ============
 
 
+def _refilled_tokens_sql(ts: str, alias: str = "") -> str:
+    """
+    桶在时间 ts 的可用令牌数（SQL 表达式）
+
+    updated_at 即最后一次补充时间：写入令牌时必须同时把 updated_at 推进到计算所用的时间。
+    """
+    return (
+        f"LEAST({alias}burst, {alias}tokens + {alias}rate"
+        f" * GREATEST(0, EXTRACT(EPOCH FROM ({ts} - {alias}updated_at))::float8))"
+    )
+
+
+# 桶状态查询列（读取按 now() 计算补充后的令牌数与剩余暂停时间）
+_BUCKET_STATUS_COLUMNS = f"""
+    instance_key, rate, burst, meta_json, updated_at,
+    {_refilled_tokens_sql("now()")} AS current_tokens,
+    EXTRACT(EPOCH FROM paused_until)::float8 AS paused_until,
+    GREATEST(0, EXTRACT(EPOCH FROM (paused_until - now()))::float8) AS pause_remaining_seconds
+"""
+
+
+def _bucket_status_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    pause_remaining = float(row["pause_remaining_seconds"] or 0.0)
+    return {
+        "instance_key": row["instance_key"],
+        "rate": float(row["rate"]),
+        "burst": int(row["burst"]),
+        "current_tokens": float(row["current_tokens"]),
+        "is_paused": pause_remaining > 0,
+        "pause_remaining_seconds": pause_remaining,
+        "paused_until": row["paused_until"],
+        "meta_json": row["meta_json"] or {},
+        "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+    }
+
+
 class RateLimitTokenResult:
     """consume_rate_limit_token 的返回结果"""
 
@@ -2254,6 +3017,94 @@ class RateLimitTokenResult:
         self.wait_seconds = wait_seconds
 
 
+# 取令牌热点语句（单条语句完成 补充 + 判断 + 扣减，固定 SQL 文本，可在长连接上作为预备语句复用）
+#
+# - bucket: FOR UPDATE 锁定桶行；锁等待后返回最新版本，clock_timestamp() 在拿到锁后求值，
+#   保证 updated_at 单调前进（now() 为事务开始时间，锁等待后会回退导致重复补充）
+# - take: partial=true 时为租约模式，最多取 tokens 个整令牌；否则不足 tokens 时不扣减
+# - consumed: 仅在取到令牌时写回，拒绝/暂停时不产生写入
+_TAKE_RATE_LIMIT_TOKENS_SQL = f"""
+    WITH bucket AS (
+        SELECT instance_key, tokens, rate, burst, updated_at, paused_until,
+               clock_timestamp() AS ts
+        FROM scm.sync_rate_limits
+        WHERE instance_key = %(instance_key)s
+        FOR UPDATE
+    ),
+    refill AS (
+        SELECT instance_key, rate, paused_until, ts,
+               {_refilled_tokens_sql("ts")} AS available,
+               COALESCE(paused_until > ts, false) AS paused
+        FROM bucket
+    ),
+    take AS (
+        SELECT refill.*,
+               CASE
+                   WHEN paused THEN 0
+                   WHEN %(partial)s::boolean THEN LEAST(%(tokens)s::float8, floor(available))
+                   WHEN available >= %(tokens)s::float8 THEN %(tokens)s::float8
+                   ELSE 0
+               END AS granted
+        FROM refill
+    ),
+    consumed AS (
+        UPDATE scm.sync_rate_limits AS b
+        SET tokens = take.available - take.granted,
+            updated_at = take.ts
+        FROM take
+        WHERE b.instance_key = take.instance_key AND take.granted > 0
+    )
+    SELECT granted::float8 AS granted,
+           CASE
+               WHEN paused THEN EXTRACT(EPOCH FROM (paused_until - ts))::float8
+               WHEN granted > 0 THEN 0
+               WHEN %(partial)s::boolean THEN (1 - available) / rate
+               ELSE (%(tokens)s::float8 - available) / rate
+           END AS wait_seconds
+    FROM take
+"""
+
+_INIT_BUCKET_SQL = """
+    INSERT INTO scm.sync_rate_limits (instance_key, tokens, rate, burst, updated_at)
+    VALUES (%s, %s, %s, %s, clock_timestamp())
+    ON CONFLICT (instance_key) DO NOTHING
+"""
+
+
+def _take_rate_limit_tokens(
+    conn: psycopg.Connection[Any],
+    instance_key: str,
+    tokens: float,
+    *,
+    partial: bool,
+    default_rate: float,
+    default_burst: int,
+) -> Tuple[float, float]:
+    """
+    执行取令牌语句，桶不存在时按默认配置初始化满桶后重试
+
+    Returns:
+        (取到的令牌数, 需要等待的秒数)
+    """
+    params = {"instance_key": instance_key, "tokens": float(tokens), "partial": partial}
+    # PostgresRateLimiter 每次 acquire/租约/归还都新建连接，预备语句不会被复用，按短连接处理
+    prepare = hot_statement_prepare(long_lived=False)
+
+    with _dict_cursor(conn) as cur:
+        cur.execute(_TAKE_RATE_LIMIT_TOKENS_SQL, params, prepare=prepare)
+        row = cur.fetchone()
+        if row is None:
+            cur.execute(
+                _INIT_BUCKET_SQL,
+                (instance_key, float(default_burst), default_rate, default_burst),
+            )
+            cur.execute(_TAKE_RATE_LIMIT_TOKENS_SQL, params, prepare=prepare)
+            row = cur.fetchone()
+
+    assert row is not None, "rate limit bucket 初始化后应存在"
+    return float(row["granted"]), max(0.0, float(row["wait_seconds"]))
+
+
 def consume_rate_limit_token(
     conn: psycopg.Connection[Any],
     instance_key: str,
@@ -2261,7 +3112,6 @@ def consume_rate_limit_token(
     *,
     default_rate: float = 10.0,
     default_burst: int = 20,
-    namespace: str = "scm.rate_limit",
 ) -> RateLimitTokenResult:
     """
     从令牌桶中消费令牌（用于 PostgresRateLimiter）
@@ -2275,106 +3125,104 @@ def consume_rate_limit_token(
         conn: 数据库连接
         instance_key: 实例 key（如 gitlab:gitlab.example.com）
         tokens_needed: 需要消费的令牌数量
-        default_rate: 默认令牌补充速率（tokens/sec）
-        default_burst: 默认最大令牌容量
-        namespace: 命名空间
+        default_rate: 新建桶的令牌补充速率（tokens/sec）
+        default_burst: 新建桶的最大令牌容量
 
     Returns:
         RateLimitTokenResult: 包含 allowed 和 wait_seconds
     """
-    key = f"bucket:{instance_key}"
-    now_ts = time.time()
+    granted, wait_seconds = _take_rate_limit_tokens(
+        conn,
+        instance_key,
+        tokens_needed,
+        partial=False,
+        default_rate=default_rate,
+        default_burst=default_burst,
+    )
+    if granted > 0:
+        return RateLimitTokenResult(allowed=True, wait_seconds=0.0)
+    return RateLimitTokenResult(allowed=False, wait_seconds=wait_seconds)
 
-    with _dict_cursor(conn) as cur:
-        # 获取或初始化桶状态
-        cur.execute(
-            """
-            SELECT value_json FROM logbook.kv
-            WHERE namespace = %s AND key = %s
-            FOR UPDATE
-            """,
-            (namespace, key),
-        )
-        row = cur.fetchone()
 
-        if row and row["value_json"]:
-            value = row["value_json"]
-            if isinstance(value, str):
-                value = json.loads(value)
-        else:
-            # 初始化新桶
-            value = {
-                "tokens": float(default_burst),
-                "last_refill": now_ts,
-                "rate": default_rate,
-                "burst": default_burst,
-            }
+class RateLimitLeaseResult:
+    """lease_rate_limit_tokens 的返回结果"""
 
-        # 检查是否被暂停
-        paused_until = value.get("paused_until", 0)
-        if paused_until > now_ts:
-            wait_time = paused_until - now_ts
-            return RateLimitTokenResult(allowed=False, wait_seconds=wait_time)
-
-        # 计算令牌补充
-        rate = value.get("rate", default_rate)
-        burst = value.get("burst", default_burst)
-        last_refill = value.get("last_refill", now_ts)
-        elapsed = now_ts - last_refill
-        current_tokens = min(burst, value.get("tokens", burst) + elapsed * rate)
-
-        # 检查是否有足够令牌
-        if current_tokens >= tokens_needed:
-            # 消费令牌
-            new_tokens = current_tokens - tokens_needed
-            value["tokens"] = new_tokens
-            value["last_refill"] = now_ts
-            value["rate"] = rate
-            value["burst"] = burst
-
-            # 更新数据库
-            cur.execute(
-                """
-                INSERT INTO logbook.kv (namespace, key, value_json)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (namespace, key) DO UPDATE
-                SET value_json = EXCLUDED.value_json,
-                    updated_at = now()
-                """,
-                (namespace, key, json.dumps(value)),
-            )
+    def __init__(self, granted: int, wait_seconds: float = 0.0):
+        self.granted = granted
+        self.wait_seconds = wait_seconds
 
-            return RateLimitTokenResult(allowed=True, wait_seconds=0.0)
 
-        # 令牌不足，计算需要等待的时间
-        tokens_deficit = tokens_needed - current_tokens
-        wait_seconds = tokens_deficit / rate
+def lease_rate_limit_tokens(
+    conn: psycopg.Connection[Any],
+    instance_key: str,
+    max_tokens: int,
+    *,
+    default_rate: float = 10.0,
+    default_burst: int = 20,
+) -> RateLimitLeaseResult:
+    """
+    从令牌桶预留最多 max_tokens 个整令牌（PostgresRateLimiter 租约模式）
+
+    预留的令牌立即从共享桶扣除，由调用方在本地消费，因此全局速率仍受桶约束。
+    桶中不足 1 个令牌或被暂停时不预留，返回需要等待的时间。
+
+    Args:
+        conn: 数据库连接
+        instance_key: 实例 key（如 gitlab:gitlab.example.com）
+        max_tokens: 最多预留的令牌数
+        default_rate: 新建桶的令牌补充速率（tokens/sec）
+        default_burst: 新建桶的最大令牌容量
+
+    Returns:
+        RateLimitLeaseResult: 包含 granted（预留的令牌数）和 wait_seconds
+    """
+    granted, wait_seconds = _take_rate_limit_tokens(
+        conn,
+        instance_key,
+        max(1, max_tokens),
+        partial=True,
+        default_rate=default_rate,
+        default_burst=default_burst,
+    )
+    if granted >= 1:
+        return RateLimitLeaseResult(granted=int(granted), wait_seconds=0.0)
+    return RateLimitLeaseResult(granted=0, wait_seconds=wait_seconds)
+
+
+def return_rate_limit_tokens(
+    conn: psycopg.Connection[Any],
+    instance_key: str,
+    tokens: float,
+) -> bool:
+    """
+    归还未使用的租约令牌（单条 UPDATE，令牌数不超过 burst）
 
-        # 更新 last_refill 时间（即使没有消费，也更新令牌状态）
-        value["tokens"] = current_tokens
-        value["last_refill"] = now_ts
-        value["rate"] = rate
-        value["burst"] = burst
+    Args:
+        conn: 数据库连接
+        instance_key: 实例 key
+        tokens: 归还的令牌数
 
+    Returns:
+        桶存在并已更新时返回 True
+    """
+    if tokens <= 0:
+        return False
+    with conn.cursor() as cur:
         cur.execute(
-            """
-            INSERT INTO logbook.kv (namespace, key, value_json)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (namespace, key) DO UPDATE
-            SET value_json = EXCLUDED.value_json,
-                updated_at = now()
+            f"""
+            UPDATE scm.sync_rate_limits
+            SET tokens = LEAST(burst, {_refilled_tokens_sql("clock_timestamp()")} + %s),
+                updated_at = clock_timestamp()
+            WHERE instance_key = %s
             """,
-            (namespace, key, json.dumps(value)),
+            (float(tokens), instance_key),
         )
-
-        return RateLimitTokenResult(allowed=False, wait_seconds=wait_seconds)
+        return cur.rowcount > 0
 
 
 def get_rate_limit_status(
     conn: psycopg.Connection[Any],
     instance_key: str,
-    *,
-    namespace: str = "scm.rate_limit",
 ) -> Optional[Dict[str, Any]]:
     """
     获取速率限制桶的完整状态（用于测试和诊断）
@@ -2383,59 +3231,79 @@ def get_rate_limit_status(
     - instance_key: 实例标识
     - rate: 令牌补充速率
     - burst: 最大令牌容量
-    - current_tokens: 当前令牌数量
+    - current_tokens: 当前令牌数量（含补充）
     - is_paused: 是否被暂停
     - pause_remaining_seconds: 剩余暂停时间
+    - paused_until: 暂停截止时间（Unix 时间戳，未暂停过为 None）
     - meta_json: 元数据（包含 429 信息等）
 
     Args:
         conn: 数据库连接
         instance_key: 实例 key
-        namespace: 命名空间
 
     Returns:
         状态字典，如果桶不存在返回 None
     """
-    key = f"bucket:{instance_key}"
-    now_ts = time.time()
-
     with _dict_cursor(conn) as cur:
         cur.execute(
-            """
-            SELECT value_json, updated_at FROM logbook.kv
-            WHERE namespace = %s AND key = %s
+            f"""
+            SELECT {_BUCKET_STATUS_COLUMNS}
+            FROM scm.sync_rate_limits
+            WHERE instance_key = %s
             """,
-            (namespace, key),
+            (instance_key,),
         )
         row = cur.fetchone()
 
-        if not row or not row["value_json"]:
-            return None
+    if not row:
+        return None
+    return _bucket_status_from_row(row)
 
-        value = row["value_json"]
-        if isinstance(value, str):
-            value = json.loads(value)
 
-        # 计算当前令牌数量（考虑时间流逝的补充）
-        rate = value.get("rate", 10.0)
-        burst = value.get("burst", 20)
-        last_refill = value.get("last_refill", now_ts)
-        elapsed = now_ts - last_refill
-        current_tokens = min(burst, value.get("tokens", burst) + elapsed * rate)
+def upsert_rate_limit_bucket(
+    conn: psycopg.Connection[Any],
+    instance_key: str,
+    *,
+    rate: float = 10.0,
+    burst: float = 20,
+    current_tokens: Optional[float] = None,
+    pause_duration_seconds: Optional[float] = None,
+) -> None:
+    """
+    写入桶配置与状态（覆盖现有值，用于管理与测试）
 
-        # 检查暂停状态
-        paused_until = value.get("paused_until", 0)
-        is_paused = paused_until > now_ts
-        pause_remaining = max(0, paused_until - now_ts) if is_paused else 0
+    Args:
+        conn: 数据库连接
+        instance_key: 实例 key
+        rate: 令牌补充速率（tokens/sec）
+        burst: 最大令牌容量
+        current_tokens: 当前令牌数，None 表示满桶
+        pause_duration_seconds: 从现在起暂停的秒数，None 或 <= 0 表示不暂停
+    """
+    tokens = float(burst) if current_tokens is None else float(current_tokens)
+    pause_seconds = float(pause_duration_seconds or 0.0)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO scm.sync_rate_limits
+                (instance_key, tokens, rate, burst, updated_at, paused_until)
+            VALUES (
+                %s, %s, %s, %s, clock_timestamp(),
+                CASE WHEN %s > 0 THEN clock_timestamp() + make_interval(secs => %s) END
+            )
+            ON CONFLICT (instance_key) DO UPDATE
+            SET tokens = EXCLUDED.tokens,
+                rate = EXCLUDED.rate,
+                burst = EXCLUDED.burst,
+                updated_at = EXCLUDED.updated_at,
+                paused_until = EXCLUDED.paused_until
+            """,
+            (instance_key, tokens, float(rate), int(burst), pause_seconds, pause_seconds),
+        )
 
-        return {
-            "instance_key": instance_key,
-            "rate": rate,
-            "burst": burst,
-            "current_tokens": current_tokens,
-            "is_paused": is_paused,
-            "pause_remaining_seconds": pause_remaining,
-            "paused_until": paused_until if paused_until > 0 else None,
-            "meta_json": value.get("meta_json"),
-            "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
-        }
+
+def delete_rate_limit_bucket(conn: psycopg.Connection[Any], instance_key: str) -> bool:
+    """删除速率限制桶，返回是否存在并已删除"""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM scm.sync_rate_limits WHERE instance_key = %s", (instance_key,))
+        return cur.rowcount > 0
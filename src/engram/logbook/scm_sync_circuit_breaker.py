@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+scm_sync_circuit_breaker - 进程内熔断运行时
+
+CircuitBreakerRuntime 在进程内聚合同步结果并做熔断决策，按间隔与 kv 交换紧凑快照:
+
+- record_result: 结果计入滑动窗口计数器（内存，加锁），不访问数据库
+- decide: 基于合并后的窗口计数调用 CircuitBreakerController.check，不访问数据库
+- sync: 每 persist_interval_seconds 秒（或熔断状态迁移时立即）执行一次:
+    1. 写入本进程的窗口快照（namespace='scm.sync_health.window', key='<cb_key>|<worker_id>'）
+    2. 读取同一 cb_key 下其他进程的快照，与本进程计数合并
+    3. 与共享熔断状态（namespace='scm.sync_health', key=<cb_key>）按 changed_at 对齐:
+       其他进程更晚发生迁移则加载，本进程发生迁移则写回
+
+窗口快照格式（按 bucket_seconds 分桶，只保留窗口内的桶）:
+    {"v": 1, "bucket_seconds": 10, "updated_at": 1700000000.0,
+     "buckets": [[1699999990, runs, failed, requests, hits_429, timeouts], ...]}
+
+与 get_sync_runs_health_stats 的区别: 窗口只按时间（window_minutes）裁剪，不按 window_count。
+
+使用示例:
+    runtime = CircuitBreakerRuntime(key="default:global", worker_id="worker-1", dsn=dsn)
+    process_one_job(worker_id="worker-1", conn=conn, circuit_breaker=runtime)
+    decision = runtime.decide()
+    runtime.close()  # 退出前刷新快照
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from engram.logbook.scm_sync_errors import ErrorCategory
+from engram.logbook.scm_sync_policy import (
+    CircuitBreakerConfig,
+    CircuitBreakerController,
+    CircuitBreakerDecision,
+)
+
+logger = logging.getLogger(__name__)
+
+# 默认持久化间隔（秒）
+DEFAULT_PERSIST_INTERVAL_SECONDS = 5.0
+
+# 默认分桶粒度（秒），也是 decide() 复用同一决策的最长时间
+DEFAULT_BUCKET_SECONDS = 10
+
+# 快照格式版本
+SNAPSHOT_VERSION = 1
+
+__all__ = [
+    "DEFAULT_PERSIST_INTERVAL_SECONDS",
+    "DEFAULT_BUCKET_SECONDS",
+    "SlidingWindowCounter",
+    "health_stats_from_totals",
+    "CircuitBreakerRuntime",
+]
+
+# 计数字段顺序（快照中每个桶为 [bucket_start, *COUNTER_FIELDS]）
+COUNTER_FIELDS = ("runs", "failed", "requests", "hits_429", "timeouts")
+
+
+class SlidingWindowCounter:
+    """
+    按时间分桶的滑动窗口计数器
+
+    非线程安全，由 CircuitBreakerRuntime 加锁访问。
+
+    Args:
+        window_seconds: 窗口时长
+        bucket_seconds: 分桶粒度
+    """
+
+    def __init__(self, window_seconds: float, bucket_seconds: int = DEFAULT_BUCKET_SECONDS):
+        self.bucket_seconds = max(1, int(bucket_seconds))
+        self.window_seconds = max(float(window_seconds), float(self.bucket_seconds))
+        self._buckets: Dict[int, List[int]] = {}
+
+    def add(
+        self,
+        now: float,
+        *,
+        runs: int = 0,
+        failed: int = 0,
+        requests: int = 0,
+        hits_429: int = 0,
+        timeouts: int = 0,
+    ) -> None:
+        start = int(now // self.bucket_seconds) * self.bucket_seconds
+        bucket = self._buckets.setdefault(start, [0] * len(COUNTER_FIELDS))
+        for i, value in enumerate((runs, failed, requests, hits_429, timeouts)):
+            bucket[i] += int(value)
+
+    def prune(self, now: float) -> None:
+        """丢弃完全落在窗口之外的桶"""
+        cutoff = now - self.window_seconds
+        for start in [s for s in self._buckets if s + self.bucket_seconds <= cutoff]:
+            del self._buckets[start]
+
+    def has_data(self, now: float) -> bool:
+        self.prune(now)
+        return bool(self._buckets)
+
+    def totals(self, now: float) -> List[int]:
+        self.prune(now)
+        return self.sum_buckets(([start, *counts] for start, counts in self._buckets.items()), now)
+
+    def sum_buckets(self, buckets: Iterable[List[Any]], now: float) -> List[int]:
+        """汇总窗口内的桶（[bucket_start, *counts]，可来自其他进程的快照）"""
+        cutoff = now - self.window_seconds
+        totals = [0] * len(COUNTER_FIELDS)
+        for bucket in buckets:
+            try:
+                start = float(bucket[0])
+                counts = bucket[1 : 1 + len(COUNTER_FIELDS)]
+                if start + self.bucket_seconds <= cutoff:
+                    continue
+                for i, value in enumerate(counts):
+                    totals[i] += int(value)
+            except (TypeError, ValueError, IndexError):
+                continue
+        return totals
+
+    def to_snapshot(self, now: float) -> Dict[str, Any]:
+        self.prune(now)
+        return {
+            "v": SNAPSHOT_VERSION,
+            "bucket_seconds": self.bucket_seconds,
+            "updated_at": now,
+            "buckets": [[start, *counts] for start, counts in sorted(self._buckets.items())],
+        }
+
+
+def health_stats_from_totals(totals: List[int]) -> Dict[str, Any]:
+    """把窗口计数转换为与 get_sync_runs_health_stats 相同结构的健康统计"""
+    runs, failed, requests, hits_429, timeouts = totals
+    return {
+        "total_runs": runs,
+        "failed_count": failed,
+        "completed_count": runs - failed,
+        "failed_rate": failed / runs if runs > 0 else 0.0,
+        "rate_limit_rate": hits_429 / requests if requests > 0 else 0.0,
+        "total_429_hits": hits_429,
+        "total_requests": requests,
+        "total_timeout_count": timeouts,
+    }
+
+
+def _default_connect(dsn: Optional[str]) -> Any:
+    if dsn:
+        from engram.logbook.scm_db import get_conn
+
+        return get_conn(dsn)
+    from engram.logbook.db import get_connection
+
+    return get_connection()
+
+
+class CircuitBreakerRuntime:
+    """
+    进程内熔断运行时
+
+    可作为 process_one_job / MultiSlotWorker 的 circuit_breaker 参数（线程安全）。
+
+    Args:
+        key: 熔断 key（与调度器使用的 key 一致才能共享状态）
+        worker_id: 进程标识（快照 key 的后缀，多个进程必须不同）
+        config: 熔断配置（window_minutes 决定滑动窗口时长）
+        dsn: 数据库连接字符串；sync() 未传入 conn 时懒加载自有连接
+        persist_interval_seconds: 快照持久化间隔（秒），<= 0 时只在 flush/状态迁移时持久化
+        bucket_seconds: 分桶粒度（秒）
+        connect: 自定义连接工厂（测试用）
+        db_api: 数据库 API 模块（用于测试注入）
+    """
+
+    def __init__(
+        self,
+        key: str = "default:global",
+        *,
+        worker_id: str,
+        config: Optional[CircuitBreakerConfig] = None,
+        dsn: Optional[str] = None,
+        persist_interval_seconds: float = DEFAULT_PERSIST_INTERVAL_SECONDS,
+        bucket_seconds: int = DEFAULT_BUCKET_SECONDS,
+        connect: Optional[Callable[[Optional[str]], Any]] = None,
+        db_api=None,
+    ):
+        if db_api is None:
+            from engram.logbook import scm_db as db_api
+
+        self.key = key
+        self.worker_id = worker_id
+        self.config = config or CircuitBreakerConfig()
+        self.dsn = dsn
+        self.persist_interval_seconds = persist_interval_seconds
+        self._connect = connect or _default_connect
+        self._db_api = db_api
+
+        self._controller = CircuitBreakerController(config=self.config, key=key)
+        self._counter = SlidingWindowCounter(
+            (self.config.window_minutes or 30) * 60, bucket_seconds=bucket_seconds
+        )
+        self._peers: Dict[str, Dict[str, Any]] = {}
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._conn: Any = None
+        # 最近一次状态迁移时间；None 表示尚未与共享状态对齐
+        self._changed_at: Optional[float] = None
+        self._pending_transition = False
+        self._last_sync_at: Optional[float] = None
+        self._last_sync_failed = False
+        self._decision: Optional[CircuitBreakerDecision] = None
+        self._decision_expires_at = 0.0
+
+        self.sync_count = 0
+        self.sync_errors = 0
+
+    # ---------- 记录与决策（不访问数据库） ----------
+
+    def record_result(
+        self,
+        success: bool,
+        error_category: Optional[str] = None,
+        retry_after: Optional[float] = None,
+        counts: Optional[Dict[str, Any]] = None,
+        now: Optional[float] = None,
+    ) -> None:
+        """
+        记录一次同步结果
+
+        counts 为 sync_runs.counts（total_requests/total_429_hits/timeout_count）；
+        未提供时按 1 次请求计，error_category 为 rate_limit/timeout 时计 1 次 429/超时。
+        到达持久化间隔或发生状态迁移时触发 sync()。
+
+        Args:
+            success: 是否成功
+            error_category: 失败时的错误类别
+            retry_after: 429 的 Retry-After（仅用于日志）
+            counts: 本次运行的请求统计
+            now: 当前时间戳
+        """
+        if now is None:
+            now = time.time()
+
+        counts = counts or {}
+        requests = int(counts.get("total_requests") or 0)
+        hits_429 = int(counts.get("total_429_hits") or 0)
+        timeouts = int(counts.get("timeout_count") or counts.get("total_timeout_count") or 0)
+        if not requests:
+            requests = 1
+            hits_429 = hits_429 or int(error_category == ErrorCategory.RATE_LIMIT.value)
+            timeouts = timeouts or int(error_category == ErrorCategory.TIMEOUT.value)
+
+        with self._lock:
+            self._counter.add(
+                now,
+                runs=1,
+                failed=0 if success else 1,
+                requests=requests,
+                hits_429=hits_429,
+                timeouts=timeouts,
+            )
+            before = self._controller.state
+            self._controller.record_result(success, error_category)
+            if self._controller.state != before:
+                self._mark_transition_locked(now)
+
+        if error_category == ErrorCategory.RATE_LIMIT.value and retry_after:
+            logger.debug(f"熔断计数记录 429: key={self.key}, retry_after={retry_after}")
+
+        self.maybe_sync(now=now)
+
+    def health_stats(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """合并本进程与其他进程快照后的健康统计"""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            return self._health_stats_locked(now)
+
+    def has_samples(self, now: Optional[float] = None) -> bool:
+        """窗口内是否有任何进程记录过结果"""
+        return bool(self.health_stats(now)["total_runs"] > 0)
+
+    def decide(
+        self,
+        health_stats: Optional[Dict[str, Any]] = None,
+        now: Optional[float] = None,
+    ) -> CircuitBreakerDecision:
+        """
+        返回熔断决策（不触发持久化，状态迁移由下一次 record_result/maybe_sync 写回）
+
+        未传入 health_stats 时使用合并后的窗口统计，且同一决策最多复用 bucket_seconds 秒:
+        CircuitBreakerController.check 每次调用都会推进 EMA 平滑，
+        高吞吐下逐任务调用会让平滑失效。
+
+        Args:
+            health_stats: 外部健康统计（如 get_sync_runs_health_stats），None 时使用窗口统计
+            now: 当前时间戳
+        """
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            if health_stats is None:
+                if self._decision is not None and now < self._decision_expires_at:
+                    return self._decision
+                health_stats = self._health_stats_locked(now)
+
+            before = self._controller.state
+            decision = self._controller.check(health_stats, now=now)
+            if self._controller.state != before:
+                self._mark_transition_locked(now)
+            self._decision = decision
+            self._decision_expires_at = now + self._counter.bucket_seconds
+
+        return decision
+
+    def get_state_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._state_dict_locked()
+
+    # ---------- 持久化 ----------
+
+    def maybe_sync(self, conn=None, now: Optional[float] = None) -> bool:
+        """到达持久化间隔或有待写回的状态迁移时执行 sync()，返回是否执行"""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            if self._last_sync_at is None:
+                due = True
+            elif self._pending_transition and not self._last_sync_failed:
+                due = True
+            else:
+                interval = self.persist_interval_seconds
+                if interval <= 0 and self._last_sync_failed:
+                    interval = DEFAULT_PERSIST_INTERVAL_SECONDS
+                due = interval > 0 and now - self._last_sync_at >= interval
+        if not due:
+            return False
+        return self.sync(conn, now=now)
+
+    def sync(self, conn=None, now: Optional[float] = None) -> bool:
+        """
+        写入本进程快照、合并其他进程快照并对齐共享熔断状态
+
+        失败只记录日志（熔断统计不应影响任务执行），返回是否成功。
+        并发调用时只有一个线程执行，其他线程直接返回 False。
+
+        Args:
+            conn: 数据库连接（None 时使用自有连接，执行后提交）
+            now: 当前时间戳
+        """
+        if now is None:
+            now = time.time()
+        if not self._sync_lock.acquire(blocking=False):
+            return False
+        try:
+            own_conn = conn is None
+            if own_conn:
+                conn = self._get_conn()
+            self._sync_with(conn, now)
+            if own_conn and not getattr(conn, "autocommit", False):
+                conn.commit()
+            self.sync_count += 1
+            self._last_sync_failed = False
+            return True
+        except Exception as exc:
+            self.sync_errors += 1
+            self._last_sync_failed = True
+            with self._lock:
+                self._last_sync_at = now  # 失败后等待一个间隔再重试
+            logger.warning(f"熔断快照持久化失败: key={self.key}, error={exc}")
+            if conn is not None and conn is self._conn:
+                self._close_conn()
+            return False
+        finally:
+            self._sync_lock.release()
+
+    def flush(self, now: Optional[float] = None) -> bool:
+        """立即持久化（退出前调用）"""
+        return self.sync(now=now)
+
+    def close(self) -> None:
+        """刷新快照并关闭自有连接"""
+        with self._lock:
+            has_data = self._counter.has_data(time.time()) or self._pending_transition
+        if has_data:
+            self.flush()
+        self._close_conn()
+
+    def _sync_with(self, conn, now: float) -> None:
+        db_api = self._db_api
+
+        with self._lock:
+            snapshot = self._counter.to_snapshot(now) if self._counter.has_data(now) else None
+
+        if snapshot is not None:
+            db_api.save_circuit_breaker_window(conn, self.key, self.worker_id, snapshot)
+        peers = db_api.load_circuit_breaker_windows(
+            conn, self.key, max_age_seconds=self._counter.window_seconds
+        )
+        shared = db_api.load_circuit_breaker_state(conn, self.key)
+        shared_changed_at = float((shared or {}).get("changed_at") or 0.0)
+
+        to_save = None
+        with self._lock:
+            self._peers = {w: s for w, s in peers.items() if w != self.worker_id}
+            local_changed_at = self._changed_at
+            if self._pending_transition and shared_changed_at <= (local_changed_at or 0.0):
+                to_save = self._state_dict_locked()
+            elif shared and (local_changed_at is None or shared_changed_at > local_changed_at):
+                self._controller.load_state_dict(shared)
+                self._changed_at = shared_changed_at
+                logger.debug(
+                    f"加载共享熔断状态: key={self.key}, state={self._controller.state.value}"
+                )
+            elif local_changed_at is None:
+                self._changed_at = 0.0
+            self._pending_transition = False
+            self._last_sync_at = now
+            self._decision = None
+
+        if to_save is not None:
+            db_api.save_circuit_breaker_state(conn, self.key, to_save)
+
+    def _get_conn(self) -> Any:
+        if self._conn is None:
+            self._conn = self._connect(self.dsn)
+        return self._conn
+
+    def _close_conn(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    # ---------- 内部 ----------
+
+    def _health_stats_locked(self, now: float) -> Dict[str, Any]:
+        totals = self._counter.totals(now)
+        for snapshot in self._peers.values():
+            peer_totals = self._counter.sum_buckets(snapshot.get("buckets") or [], now)
+            totals = [a + b for a, b in zip(totals, peer_totals)]
+        return health_stats_from_totals(totals)
+
+    def _mark_transition_locked(self, now: float) -> None:
+        self._changed_at = now
+        self._pending_transition = True
+        self._decision = None
+
+    def _state_dict_locked(self) -> Dict[str, Any]:
+        state = self._controller.get_state_dict()
+        state["changed_at"] = self._changed_at
+        return state
@@ -158,6 +158,7 @@ def validate_sync_result_contract(result: Dict[str, Any]) -> tuple[bool, list[st
         "diff_none_count",
         "scanned_count",
         "inserted_count",
+        "updated_count",
         "synced_mr_count",
         "synced_event_count",
         "skipped_event_count",
@@ -248,6 +249,8 @@ def _gitlab_commits_handler(
                 update_watermark=payload.get("update_watermark", False),
                 dry_run=payload.get("dry_run", False),
                 fetch_diffs=payload.get("fetch_diffs", False),
+                # 未指定时从续传检查点继续（失败重试不会从第 1 页重新开始）
+                start_page=payload.get("start_page"),
             )
         elif mode == "probe":
             # probe 模式 - 熔断器 half_open 状态的受限增量同步
@@ -334,6 +337,11 @@ def _gitlab_mrs_handler(
                 project_id=str(project_id),
                 token=token,
                 project_key=project_key,
+                batch_size=payload.get("batch_size", 100),
+                max_workers=payload.get("detail_workers", 4),
+                max_mr_failures=payload.get("max_mr_failures", gitlab_mrs.DEFAULT_MAX_MR_FAILURES),
+                dry_run=payload.get("dry_run", False),
+                update_watermark=payload.get("update_watermark", True),
             )
 
         return result
@@ -373,6 +381,9 @@ def _svn_handler(
             batch_size=payload.get("batch_size", 100),
             overlap=payload.get("overlap", 0),
             timeout=payload.get("timeout", 120),
+            stream=bool(payload.get("stream_log", False)),
+            patch_workers=payload.get("patch_workers", 4),
+            patch_host_limit=payload.get("patch_host_limit", 4),
         )
 
         if mode == "backfill":
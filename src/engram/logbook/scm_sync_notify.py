@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+scm_sync_notify - SCM 同步任务入队通知（LISTEN/NOTIFY）
+
+入队时在同一事务内 pg_notify 到 NOTIFY_CHANNEL，事务提交后才投递；
+worker 空闲时阻塞在 LISTEN 上，收到与自身过滤条件匹配的通知后立即 claim，
+poll_interval 作为兜底超时（通知丢失、监听连接断开时仍按轮询工作）。
+
+通知 payload（JSON）:
+    {"job_type": "gitlab_commits", "instance": "gitlab.example.com", "tenant_id": "t1"}
+
+instance/tenant_id 可能为 null；无法解析的 payload 视为匹配（宁可多唤醒一次）。
+
+使用示例:
+    listener = JobNotificationListener(dsn, job_types=["gitlab_commits"])
+    while running:
+        if not process_one_job(...):
+            listener.wait(poll_interval)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import psycopg
+
+from .scm_sync_keys import normalize_instance_key
+
+logger = logging.getLogger(__name__)
+
+# 通知频道名
+NOTIFY_CHANNEL = "scm_sync_jobs"
+
+# 监听连接建立失败后的重连退避（秒）：从初始值开始每次翻倍，不超过上限
+DEFAULT_RECONNECT_INITIAL_DELAY_SECONDS = 1.0
+DEFAULT_RECONNECT_MAX_DELAY_SECONDS = 60.0
+
+__all__ = [
+    "NOTIFY_CHANNEL",
+    "build_notify_payload",
+    "notify_jobs_enqueued",
+    "payloads_for_jobs",
+    "JobNotificationListener",
+]
+
+
+def build_notify_payload(
+    job_type: str,
+    instance: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+) -> str:
+    """构建通知 payload（键排序，便于同一事务内去重）"""
+    return json.dumps(
+        {"instance": instance or None, "job_type": job_type, "tenant_id": tenant_id or None},
+        sort_keys=True,
+    )
+
+
+def notify_jobs_enqueued(cur: Any, payloads: Iterable[str]) -> int:
+    """
+    在当前事务内发送入队通知
+
+    相同 payload 只发送一次（PostgreSQL 也会对同一事务内相同的通知去重）。
+    不负责提交事务，通知在调用方 commit 后投递、rollback 时丢弃。
+
+    Args:
+        cur: 数据库游标
+        payloads: build_notify_payload 生成的 payload 列表
+
+    Returns:
+        发送的通知数
+    """
+    distinct = sorted(set(payloads))
+    if not distinct:
+        return 0
+    cur.execute(
+        "SELECT pg_notify(%s, p) FROM unnest(%s::text[]) AS p",
+        (NOTIFY_CHANNEL, distinct),
+    )
+    return len(distinct)
+
+
+def payloads_for_jobs(jobs: Iterable[Dict[str, Any]]) -> List[str]:
+    """从任务字典（job_type + payload_json/payload）提取通知 payload"""
+    result = []
+    for job in jobs:
+        payload = job.get("payload_json") or job.get("payload") or {}
+        instance = payload.get("gitlab_instance")
+        result.append(
+            build_notify_payload(
+                str(job["job_type"]),
+                normalize_instance_key(instance) if instance else None,
+                payload.get("tenant_id"),
+            )
+        )
+    return result
+
+
+class JobNotificationListener:
+    """
+    入队通知监听器
+
+    使用独立的 autocommit 连接 LISTEN NOTIFY_CHANNEL。wait() 在超时内阻塞，
+    仅当收到与 job_types/instance_allowlist/tenant_allowlist 匹配的通知时提前返回 True。
+    监听连接不可用时退化为 sleep(timeout)，按指数退避（上限 reconnect_max_delay）重连；
+    连续失败只在第一次记 WARNING，之后记 DEBUG，恢复时记 INFO。
+
+    Args:
+        dsn: 数据库连接字符串
+        job_types: worker 处理的任务类型（None 表示全部）
+        instance_allowlist: GitLab 实例白名单（None 表示全部）
+        tenant_allowlist: 租户白名单（None 表示全部）
+        connect: 自定义连接工厂（测试用）
+        reconnect_initial_delay: 首次重连退避（秒）
+        reconnect_max_delay: 重连退避上限（秒）
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str],
+        *,
+        job_types: Optional[Sequence[str]] = None,
+        instance_allowlist: Optional[Sequence[str]] = None,
+        tenant_allowlist: Optional[Sequence[str]] = None,
+        connect: Optional[Any] = None,
+        reconnect_initial_delay: float = DEFAULT_RECONNECT_INITIAL_DELAY_SECONDS,
+        reconnect_max_delay: float = DEFAULT_RECONNECT_MAX_DELAY_SECONDS,
+    ):
+        self.dsn = dsn
+        self.job_types = set(job_types) if job_types else None
+        instances = {normalize_instance_key(i) for i in instance_allowlist or []} - {None, ""}
+        self.instances = instances or None
+        self.tenants = set(tenant_allowlist) if tenant_allowlist else None
+        self._connect = connect or _default_listen_connect
+        self._conn: Any = None
+        self.reconnect_initial_delay = reconnect_initial_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self._connect_failures = 0
+        self._next_connect_at = 0.0
+
+    def matches(self, payload: str) -> bool:
+        """判断通知是否对应本 worker 可 claim 的任务"""
+        try:
+            data: Dict[str, Any] = json.loads(payload)
+        except (TypeError, ValueError):
+            return True
+        if not isinstance(data, dict):
+            return True
+
+        if self.job_types is not None and data.get("job_type") not in self.job_types:
+            return False
+        if self.instances is not None:
+            # 与 claim 一致：配置了实例白名单时，非 gitlab 任务（instance 为空）不过滤
+            instance = data.get("instance")
+            if instance and normalize_instance_key(instance) not in self.instances:
+                return False
+        if self.tenants is not None:
+            tenant_id = data.get("tenant_id")
+            if tenant_id and tenant_id not in self.tenants:
+                return False
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        """
+        等待匹配的入队通知
+
+        Returns:
+            True 表示收到匹配通知，False 表示超时（或监听不可用）
+        """
+        deadline = time.monotonic() + timeout
+        conn = self._ensure_connection()
+        if conn is None:
+            time.sleep(max(0.0, timeout))
+            return False
+
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                for notify in conn.notifies(timeout=remaining, stop_after=1):
+                    if self.matches(notify.payload):
+                        return True
+        except psycopg.Error as e:
+            logger.warning(f"入队通知监听中断，回退为轮询: {e}")
+            self.close()
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            return False
+
+    def close(self) -> None:
+        """关闭监听连接"""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "JobNotificationListener":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _ensure_connection(self) -> Any:
+        if self._conn is not None and not getattr(self._conn, "closed", False):
+            return self._conn
+        now = time.monotonic()
+        if now < self._next_connect_at:
+            return None
+        try:
+            conn = self._connect(self.dsn)
+            conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        except Exception as e:
+            self._conn = None
+            self._connect_failures += 1
+            delay = min(
+                self.reconnect_max_delay,
+                self.reconnect_initial_delay * 2 ** (self._connect_failures - 1),
+            )
+            self._next_connect_at = now + delay
+            if self._connect_failures == 1:
+                logger.warning(f"无法建立入队通知监听，回退为轮询: {e}")
+            else:
+                logger.debug(
+                    f"入队通知监听重连失败（连续 {self._connect_failures} 次，"
+                    f"{delay:g}s 后重试）: {e}"
+                )
+            return None
+        if self._connect_failures:
+            logger.info(f"入队通知监听已恢复（此前连续失败 {self._connect_failures} 次）")
+        self._connect_failures = 0
+        self._next_connect_at = 0.0
+        self._conn = conn
+        return conn
+
+
+def _default_listen_connect(dsn: Optional[str]) -> Any:
+    from .db import get_connection
+
+    return get_connection(dsn=dsn, autocommit=True)
@@ -1085,10 +1085,12 @@ class InstanceBucketStatus:
         Returns:
             InstanceBucketStatus 实例
         """
-        # 将 paused_until (datetime) 转换为 Unix timestamp
+        # paused_until 可能是 Unix timestamp 或 datetime，统一转换为 Unix timestamp
         paused_until_ts = None
         paused_until = db_status.get("paused_until")
-        if paused_until:
+        if isinstance(paused_until, (int, float)):
+            paused_until_ts = float(paused_until)
+        elif paused_until:
             try:
                 paused_until_ts = paused_until.timestamp()
             except (AttributeError, TypeError):
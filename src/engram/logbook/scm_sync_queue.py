@@ -6,12 +6,16 @@ engram_logbook.scm_sync_queue - SCM 同步任务队列模块
 
 功能:
 - enqueue: 将任务入队
+- enqueue_many: 批量入队（单条语句，报告插入/去重）
 - claim: 获取并锁定一个待执行任务
+- claim_batch: 一次获取并锁定多个待执行任务
 - ack: 确认任务完成
+- ack_batch: 批量确认任务完成
 - fail_retry: 任务失败，安排重试
 - mark_dead: 标记任务为死信（不再重试）
 - requeue_without_penalty: 无惩罚重入队（用于 lock_held 等可安全让出的场景）
 - renew_lease: 续租任务锁
+- renew_lease_batch: 批量续租任务锁（多槽位 worker 单次心跳）
 - reset_dead_jobs: 重置死信任务（管理员操作）
 
 设计原则:
@@ -52,13 +56,14 @@ engram_logbook.scm_sync_queue - SCM 同步任务队列模块
 - lease_seconds: 租约时长（秒）
 """
 
+import functools
 import json
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import psycopg
 
-from .db import get_connection
+from .db import get_connection, hot_statement_prepare
 from .errors import DatabaseError
 from .scm_auth import redact
 from .scm_sync_errors import (
@@ -67,6 +72,7 @@ from .scm_sync_errors import (
     calculate_backoff_seconds,
 )
 from .scm_sync_keys import normalize_instance_key
+from .scm_sync_notify import NOTIFY_CHANNEL, build_notify_payload, notify_jobs_enqueued
 
 # 任务状态常量
 STATUS_PENDING = "pending"
@@ -82,6 +88,45 @@ DEFAULT_LEASE_SECONDS = 300  # 5 分钟
 # DEFAULT_BACKOFF_BASE 已从 scm_sync_errors 导入
 
 
+def _job_dimensions(
+    repo_id: int,
+    job_type: str,
+    payload: Dict[str, Any],
+    strict_dimension_check: bool,
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    从 payload 提取 dimension 字段 (gitlab_instance, tenant_id)
+
+    这些字段同步写入到 DB 列，用于 claim 时的快速过滤，避免 json 解析开销。
+    gitlab_instance 会规范化；gitlab 类型任务缺少 gitlab_instance 时告警，
+    严格模式下抛出 ValueError。
+    """
+    gitlab_instance = payload.get("gitlab_instance")
+    tenant_id = payload.get("tenant_id")
+
+    # 对 gitlab_instance 进行规范化（如果提供）
+    if gitlab_instance:
+        gitlab_instance = normalize_instance_key(gitlab_instance)
+
+    # 运行时保护：gitlab 类型任务建议提供 gitlab_instance
+    # 在严格模式下，缺少 gitlab_instance 会抛出异常
+    is_gitlab_job = job_type.startswith("gitlab_")
+    if is_gitlab_job and not gitlab_instance:
+        import logging
+
+        logger = logging.getLogger(__name__)
+        warning_msg = (
+            f"gitlab 类型任务 (repo_id={repo_id}, job_type={job_type}) "
+            f"缺少 gitlab_instance，可能影响 budget 查询和 pool 过滤"
+        )
+        if strict_dimension_check:
+            raise ValueError(warning_msg)
+        else:
+            logger.warning(warning_msg)
+
+    return gitlab_instance, tenant_id
+
+
 def enqueue(
     repo_id: int,
     job_type: str,
@@ -100,6 +145,9 @@ def enqueue(
     如果同一 (repo_id, job_type, mode) 已存在 pending 或 running 状态的任务，
     则不会创建新任务（由唯一索引 idx_sync_jobs_unique_active 保证）。
 
+    新任务可立即执行（not_before 不晚于当前时间）时，在同一事务内
+    NOTIFY scm_sync_jobs（见 scm_sync_notify），唤醒空闲 worker。
+
     注意：同一 (repo_id, job_type) 可以有不同 mode 的活跃任务同时存在，
     例如 incremental 和 backfill 可以同时入队。
 
@@ -138,49 +186,42 @@ def enqueue(
     payload_json = json.dumps(payload_dict)
     not_before_ts = not_before or datetime.now(timezone.utc)
 
-    # 从 payload 提取 dimension 字段，同步写入到 DB 列（如果列存在）
-    # 这些字段用于 claim 时的快速过滤，避免 json 解析开销
-    gitlab_instance = payload_dict.get("gitlab_instance")
-    tenant_id = payload_dict.get("tenant_id")
-
-    # 对 gitlab_instance 进行规范化（如果提供）
-    if gitlab_instance:
-        gitlab_instance = normalize_instance_key(gitlab_instance)
-
-    # 运行时保护：gitlab 类型任务建议提供 gitlab_instance
-    # 在严格模式下，缺少 gitlab_instance 会抛出异常
-    is_gitlab_job = job_type.startswith("gitlab_")
-    if is_gitlab_job and not gitlab_instance:
-        import logging
-
-        logger = logging.getLogger(__name__)
-        warning_msg = (
-            f"gitlab 类型任务 (repo_id={repo_id}, job_type={job_type}) "
-            f"缺少 gitlab_instance，可能影响 budget 查询和 pool 过滤"
-        )
-        if strict_dimension_check:
-            raise ValueError(warning_msg)
-        else:
-            logger.warning(warning_msg)
+    gitlab_instance, tenant_id = _job_dimensions(
+        repo_id, job_type, payload_dict, strict_dimension_check
+    )
 
     try:
         with conn.cursor() as cur:
             # 使用 ON CONFLICT DO NOTHING 处理唯一约束冲突
             # 同时写入 gitlab_instance 和 tenant_id 列（如果列存在，列不存在时 SQL 会报错）
             # 注意：迁移 11_sync_jobs_dimension_columns.sql 添加了这些列
+            # 新任务立即可 claim 时在同一语句内 pg_notify（事务提交后投递给监听中的 worker）
             cur.execute(
                 """
-                INSERT INTO scm.sync_jobs (
-                    repo_id, job_type, mode, priority, payload_json,
-                    max_attempts, not_before, lease_seconds, status,
-                    gitlab_instance, tenant_id
+                WITH notify AS (
+                    SELECT %s::text AS channel, %s::text AS payload
+                ), ins AS (
+                    INSERT INTO scm.sync_jobs (
+                        repo_id, job_type, mode, priority, payload_json,
+                        max_attempts, not_before, lease_seconds, status,
+                        gitlab_instance, tenant_id
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'pending', %s, %s)
+                    ON CONFLICT (repo_id, job_type, mode) WHERE status IN ('pending', 'running')
+                    DO NOTHING
+                    RETURNING job_id, not_before
+                ),
+                sent AS (
+                    SELECT pg_notify(notify.channel, notify.payload)
+                    FROM ins, notify
+                    WHERE ins.not_before <= now()
                 )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'pending', %s, %s)
-                ON CONFLICT (repo_id, job_type, mode) WHERE status IN ('pending', 'running')
-                DO NOTHING
-                RETURNING job_id
+                SELECT ins.job_id, (SELECT count(*) FROM sent) AS notified
+                FROM ins
             """,
                 (
+                    NOTIFY_CHANNEL,
+                    build_notify_payload(job_type, gitlab_instance, tenant_id),
                     repo_id,
                     job_type,
                     mode,
@@ -212,6 +253,430 @@ def enqueue(
             conn.close()
 
 
+def enqueue_many(
+    jobs: Sequence[Dict[str, Any]],
+    conn: Optional[psycopg.Connection] = None,
+    strict_dimension_check: bool = False,
+) -> List[Optional[str]]:
+    """
+    批量入队（单条多行 INSERT ... ON CONFLICT DO NOTHING RETURNING，一次提交）。
+
+    语义与逐个调用 enqueue() 相同：已存在同一 (repo_id, job_type, mode) 的
+    pending/running 任务时不创建新任务（idx_sync_jobs_unique_active），
+    同一批内的重复键只有第一个会被插入；gitlab_instance/tenant_id 维度列
+    在同一语句中写入；立即可执行的新任务在同一语句内 NOTIFY（相同 payload 只发一次）。
+
+    Args:
+        jobs: 任务字典列表，字段同 enqueue() 参数：
+              repo_id, job_type（必填）, mode, priority, payload（或 payload_json）,
+              max_attempts, not_before, lease_seconds
+        conn: 可选的数据库连接
+        strict_dimension_check: 严格模式，gitlab 类型任务要求 gitlab_instance 非空
+
+    Returns:
+        与 jobs 一一对应的列表：新插入任务的 job_id，被去重的任务为 None
+
+    Raises:
+        ValueError: strict_dimension_check=True 时，gitlab 任务缺少 gitlab_instance
+        DatabaseError: 数据库操作失败（整批回滚）
+    """
+    if not jobs:
+        return []
+
+    now = datetime.now(timezone.utc)
+    columns: Dict[str, List[Any]] = {
+        "repo_id": [],
+        "job_type": [],
+        "mode": [],
+        "priority": [],
+        "payload_json": [],
+        "max_attempts": [],
+        "not_before": [],
+        "lease_seconds": [],
+        "gitlab_instance": [],
+        "tenant_id": [],
+    }
+    for job in jobs:
+        payload_dict = job.get("payload") or job.get("payload_json") or {}
+        gitlab_instance, tenant_id = _job_dimensions(
+            job["repo_id"], job["job_type"], payload_dict, strict_dimension_check
+        )
+        columns["repo_id"].append(job["repo_id"])
+        columns["job_type"].append(job["job_type"])
+        columns["mode"].append(job.get("mode") or "incremental")
+        columns["priority"].append(job.get("priority", DEFAULT_PRIORITY))
+        columns["payload_json"].append(json.dumps(payload_dict))
+        columns["max_attempts"].append(job.get("max_attempts", DEFAULT_MAX_ATTEMPTS))
+        columns["not_before"].append(job.get("not_before") or now)
+        columns["lease_seconds"].append(job.get("lease_seconds", DEFAULT_LEASE_SECONDS))
+        columns["gitlab_instance"].append(gitlab_instance)
+        columns["tenant_id"].append(tenant_id)
+
+    should_close = conn is None
+    if conn is None:
+        conn = get_connection()
+
+    try:
+        with conn.cursor() as cur:
+            # 按输入顺序插入，批内重复键保留第一个；通知 payload 与 build_notify_payload 字段一致
+            cur.execute(
+                """
+                WITH input AS (
+                    SELECT *
+                    FROM unnest(
+                        %s::bigint[], %s::text[], %s::text[], %s::int[], %s::jsonb[],
+                        %s::int[], %s::timestamptz[], %s::int[], %s::text[], %s::text[]
+                    ) WITH ORDINALITY AS t(
+                        repo_id, job_type, mode, priority, payload_json,
+                        max_attempts, not_before, lease_seconds, gitlab_instance, tenant_id, ord
+                    )
+                ), ins AS (
+                    INSERT INTO scm.sync_jobs (
+                        repo_id, job_type, mode, priority, payload_json,
+                        max_attempts, not_before, lease_seconds, status,
+                        gitlab_instance, tenant_id
+                    )
+                    SELECT
+                        repo_id, job_type, mode, priority, payload_json,
+                        max_attempts, not_before, lease_seconds, 'pending',
+                        gitlab_instance, tenant_id
+                    FROM input
+                    ORDER BY ord
+                    ON CONFLICT (repo_id, job_type, mode) WHERE status IN ('pending', 'running')
+                    DO NOTHING
+                    RETURNING job_id, repo_id, job_type, mode, not_before,
+                              gitlab_instance, tenant_id
+                ),
+                sent AS (
+                    SELECT pg_notify(%s::text, p.payload)
+                    FROM (
+                        SELECT DISTINCT json_build_object(
+                            'instance', NULLIF(gitlab_instance, ''),
+                            'job_type', job_type,
+                            'tenant_id', NULLIF(tenant_id, '')
+                        )::text AS payload
+                        FROM ins
+                        WHERE not_before <= now()
+                    ) p
+                )
+                SELECT ins.job_id, ins.repo_id, ins.job_type, ins.mode,
+                       (SELECT count(*) FROM sent) AS notified
+                FROM ins
+            """,
+                (*columns.values(), NOTIFY_CHANNEL),
+            )
+            rows = cur.fetchall()
+            conn.commit()
+
+    except psycopg.Error as e:
+        conn.rollback()
+        raise DatabaseError(
+            f"批量任务入队失败: {e}",
+            {"job_count": len(jobs), "error": str(e)},
+        )
+    finally:
+        if should_close:
+            conn.close()
+
+    # (repo_id, job_type, mode) 在活跃任务中唯一，按键回填到输入位置
+    inserted = {(row[1], row[2], row[3]): str(row[0]) for row in rows}
+    results: List[Optional[str]] = []
+    for repo_id, job_type, mode in zip(columns["repo_id"], columns["job_type"], columns["mode"]):
+        results.append(inserted.pop((repo_id, job_type, mode), None))
+    return results
+
+
+def promote_pending_job(
+    repo_id: int,
+    job_type: str,
+    mode: str = "incremental",
+    priority: int = DEFAULT_PRIORITY,
+    conn: Optional[psycopg.Connection] = None,
+) -> Optional[str]:
+    """
+    提升已存在的 pending 任务，使其尽快被 claim。
+
+    用于外部事件（如 GitLab webhook）要求立即同步、而 enqueue() 因活跃任务去重返回 None 的场景：
+    priority 取原值与给定值中较小者（数值越小越优先），not_before 提前到当前时间，
+    并在同一事务内 NOTIFY scm_sync_jobs 唤醒空闲 worker。
+    running 任务不做处理（增量同步基于游标，事件带来的变更由下一次运行覆盖）。
+
+    Args:
+        repo_id: 仓库 ID
+        job_type: 任务类型
+        mode: 同步模式
+        priority: 目标优先级
+        conn: 可选的数据库连接
+
+    Returns:
+        被提升任务的 job_id，不存在 pending 任务时返回 None
+    """
+    should_close = conn is None
+    if conn is None:
+        conn = get_connection()
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE scm.sync_jobs
+                SET
+                    priority = LEAST(priority, %s),
+                    not_before = LEAST(not_before, now()),
+                    updated_at = now()
+                WHERE repo_id = %s AND job_type = %s AND mode = %s AND status = 'pending'
+                RETURNING job_id, gitlab_instance, tenant_id
+            """,
+                (priority, repo_id, job_type, mode),
+            )
+            row = cur.fetchone()
+            if row is not None:
+                notify_jobs_enqueued(cur, [build_notify_payload(job_type, row[1], row[2])])
+            conn.commit()
+            return str(row[0]) if row is not None else None
+
+    except psycopg.Error as e:
+        conn.rollback()
+        raise DatabaseError(
+            f"提升任务优先级失败: {e}",
+            {"repo_id": repo_id, "job_type": job_type, "mode": mode, "error": str(e)},
+        )
+    finally:
+        if should_close:
+            conn.close()
+
+
+# claim 查询的基础 claimable 条件
+_CLAIMABLE_CONDITIONS = """(
+    -- pending 任务
+    (status = 'pending' AND not_before <= now())
+    -- 或 running 但锁过期的任务
+    OR (status = 'running' AND locked_at + (lease_seconds || ' seconds')::interval < now())
+    -- 或 failed 可重试的任务
+    OR (status = 'failed' AND not_before <= now() AND attempts < max_attempts)
+)"""
+
+_CLAIM_UPDATE_RETURNING = """
+    UPDATE scm.sync_jobs j
+    SET
+        status = 'running',
+        locked_by = %s,
+        locked_at = now(),
+        attempts = attempts + 1,
+        updated_at = now()
+    FROM claimable c
+    WHERE j.job_id = c.job_id
+    RETURNING
+        j.job_id, j.repo_id, j.job_type, j.mode, j.payload_json,
+        j.priority, j.attempts, j.max_attempts, j.last_error,
+        j.lease_seconds, j.created_at
+"""
+
+
+def _build_claim_filters(
+    *,
+    has_job_types: bool,
+    has_instances: bool,
+    has_tenants: bool,
+) -> List[str]:
+    """claim 查询的 pool 过滤条件（参数顺序: [job_types] [instances, instances] [tenants, tenants]）"""
+    filters: List[str] = []
+    if has_job_types:
+        filters.append("job_type = ANY(%s)")
+    if has_instances:
+        # 优先使用 gitlab_instance 列（更高效），同时兼容从 payload_json 读取（向后兼容）
+        # 允许未设置 gitlab_instance 的任务（如 SVN 任务）或值匹配的任务
+        filters.append("""(
+            gitlab_instance IS NULL
+            OR gitlab_instance = ANY(%s)
+            OR (gitlab_instance IS NULL AND payload_json ->> 'gitlab_instance' = ANY(%s))
+        )""")
+    if has_tenants:
+        # 优先使用 tenant_id 列（更高效），同时兼容从 payload_json 读取（向后兼容）
+        # 允许未设置 tenant_id 的任务或值匹配的任务
+        filters.append("""(
+            tenant_id IS NULL
+            OR tenant_id = ANY(%s)
+            OR (tenant_id IS NULL AND payload_json ->> 'tenant_id' = ANY(%s))
+        )""")
+    return filters
+
+
+# 租户公平调度的 tenant 键（与索引 idx_sync_jobs_tenant_claim 的表达式一致，修改时需同步）
+_TENANT_KEY = "COALESCE(tenant_id, payload_json ->> 'tenant_id', '')"
+
+# 可能可 claim 的状态（与 idx_sync_jobs_tenant_claim 的部分索引条件一致）
+_TENANT_CLAIM_STATUSES = "status IN ('pending', 'running', 'failed')"
+
+
+def _tenant_heads_ctes(extra_filter: str, per_tenant_limit: str) -> str:
+    """
+    租户公平调度的候选 CTE（WITH RECURSIVE 之后的部分）
+
+    tenants: 在 idx_sync_jobs_tenant_claim 上逐个跳到下一个 tenant 键（skip-scan），
+             每步一次索引探测，代价与 tenant 数成正比，而非与任务数成正比。
+    tenant_heads: 对每个 tenant 沿同一索引按 (priority, created_at) 取前 per_tenant_limit 个
+             可 claim 任务，带 tenant 内排名 tenant_rank。
+
+    参数顺序: [filters] [per_tenant_limit（per_tenant_limit 为 "%s" 时）]
+    """
+    return f"""
+        tenants AS (
+            (
+                SELECT {_TENANT_KEY} AS tenant_key
+                FROM scm.sync_jobs
+                WHERE {_TENANT_CLAIM_STATUSES}
+                ORDER BY 1
+                LIMIT 1
+            )
+            UNION ALL
+            SELECT (
+                SELECT {_TENANT_KEY}
+                FROM scm.sync_jobs
+                WHERE {_TENANT_CLAIM_STATUSES}
+                  AND {_TENANT_KEY} > t.tenant_key
+                ORDER BY 1
+                LIMIT 1
+            )
+            FROM tenants t
+            WHERE t.tenant_key IS NOT NULL
+        ),
+        tenant_heads AS (
+            SELECT head.job_id, head.tenant_rank
+            FROM tenants t
+            CROSS JOIN LATERAL (
+                SELECT job_id, row_number() OVER (ORDER BY priority ASC, created_at ASC) AS tenant_rank
+                FROM (
+                    SELECT job_id, priority, created_at
+                    FROM scm.sync_jobs
+                    WHERE {_TENANT_KEY} = t.tenant_key
+                      AND {_TENANT_CLAIM_STATUSES}
+                      AND {_CLAIMABLE_CONDITIONS}
+                      {extra_filter}
+                    ORDER BY priority ASC, created_at ASC
+                    LIMIT {per_tenant_limit}
+                ) h
+            ) head
+            WHERE t.tenant_key IS NOT NULL
+        )"""
+
+
+@functools.lru_cache(maxsize=None)
+def _build_claim_query(
+    *,
+    has_job_types: bool,
+    has_instances: bool,
+    has_tenants: bool,
+    tenant_fair: bool,
+) -> str:
+    """
+    构建 claim 查询（每种过滤组合只生成一次，SQL 文本稳定，可在复用连接上作为预备语句）
+
+    参数顺序: [job_types] [instances, instances] [tenants, tenants] worker_id
+    """
+    filters = _build_claim_filters(
+        has_job_types=has_job_types, has_instances=has_instances, has_tenants=has_tenants
+    )
+    extra_filter = "AND " + " AND ".join(filters) if filters else ""
+
+    if tenant_fair:
+        # 租户公平调度模式
+        # 实现方式：
+        # 1. skip-scan 枚举有待处理任务的 tenant，每个 tenant 取最高优先级的可 claim 任务
+        # 2. 从这些候选中按优先级选择一个（再次校验 claimable，防止并发修改）
+        # 3. 使用 FOR UPDATE SKIP LOCKED 确保并发安全
+        return f"""
+            WITH RECURSIVE {_tenant_heads_ctes(extra_filter, "1")},
+            claimable AS (
+                SELECT j.job_id, j.lease_seconds
+                FROM scm.sync_jobs j
+                WHERE j.job_id IN (SELECT job_id FROM tenant_heads)
+                  AND {_CLAIMABLE_CONDITIONS}
+                ORDER BY j.priority ASC, j.created_at ASC
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            {_CLAIM_UPDATE_RETURNING}
+        """
+
+    # 原有模式：按优先级顺序获取
+    return f"""
+        WITH claimable AS (
+            SELECT job_id, lease_seconds
+            FROM scm.sync_jobs
+            WHERE {_CLAIMABLE_CONDITIONS}
+            {extra_filter}
+            ORDER BY priority ASC, created_at ASC
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        {_CLAIM_UPDATE_RETURNING}
+    """
+
+
+def _resolve_claim_config(
+    enable_tenant_fair_claim: Optional[bool],
+    max_consecutive_same_tenant: Optional[int],
+) -> Tuple[bool, int]:
+    """参数优先，缺省项从 get_claim_config() 读取（两项都传入时不读取配置）"""
+    if enable_tenant_fair_claim is None or max_consecutive_same_tenant is None:
+        from .config import get_claim_config
+
+        claim_config = get_claim_config()
+        if enable_tenant_fair_claim is None:
+            enable_tenant_fair_claim = claim_config["enable_tenant_fair_claim"]
+        if max_consecutive_same_tenant is None:
+            max_consecutive_same_tenant = claim_config["max_consecutive_same_tenant"]
+    return bool(enable_tenant_fair_claim), int(max_consecutive_same_tenant)
+
+
+def _claim_filter_params(
+    job_types: Optional[List[str]],
+    instance_allowlist: Optional[List[str]],
+    tenant_allowlist: Optional[List[str]],
+) -> Tuple[List[Any], List[str]]:
+    """
+    构建 claim 过滤参数（列表用数组参数 = ANY(%s) 传递，保证同一过滤组合下 SQL 文本稳定）
+
+    instance 过滤：对 allowlist 做规范化，确保与 scheduler 写入的格式一致（小写、无默认端口）
+
+    Returns:
+        (params, normalized_instances)
+    """
+    normalized_instances: List[str] = []
+    for inst in instance_allowlist or []:
+        normalized = normalize_instance_key(inst)
+        if normalized:
+            normalized_instances.append(normalized)
+
+    params: List[Any] = []
+    if job_types:
+        params.append(list(job_types))
+    if normalized_instances:
+        # 参数需要重复两次（分别用于列和 payload_json）
+        params.extend([normalized_instances, normalized_instances])
+    if tenant_allowlist:
+        params.extend([list(tenant_allowlist), list(tenant_allowlist)])
+    return params, normalized_instances
+
+
+def _claimed_row_to_job(row: Any) -> Dict[str, Any]:
+    """将 _CLAIM_UPDATE_RETURNING 的一行转换为任务字典"""
+    return {
+        "job_id": str(row[0]),
+        "repo_id": row[1],
+        "job_type": row[2],
+        "mode": row[3],
+        "payload": row[4] if row[4] else {},
+        "priority": row[5],
+        "attempts": row[6],
+        "max_attempts": row[7],
+        "last_error": row[8],
+        "lease_seconds": row[9],
+        "created_at": row[10],
+    }
+
+
 def claim(
     worker_id: str,
     job_types: Optional[List[str]] = None,
@@ -235,7 +700,8 @@ def claim(
     - tenant_allowlist: 只处理指定租户的任务
 
     租户公平调度（enable_tenant_fair_claim=True）：
-    - 在候选任务中先选出若干不同 tenant，再从每个 tenant 取最高优先级的 job
+    - 沿 idx_sync_jobs_tenant_claim 逐个枚举 tenant（skip-scan），每个 tenant 取最高优先级的 job，
+      再从这些队首中按优先级选择；代价随 tenant 数增长，与待处理任务总数无关
     - 防止某个 tenant 的大量任务长期占用队列，导致其他 tenant 饥饿
     - max_consecutive_same_tenant: 用于外部跟踪，本函数内部通过多 tenant 选择实现公平
 
@@ -253,17 +719,23 @@ def claim(
         任务信息字典，包含 job_id, repo_id, job_type, mode, payload, attempts 等
         如果没有可用任务返回 None
     """
-    from .config import get_claim_config
-
-    # 读取配置（参数优先，否则从配置文件读取）
-    claim_config = get_claim_config()
-    if enable_tenant_fair_claim is None:
-        enable_tenant_fair_claim = claim_config["enable_tenant_fair_claim"]
-    if max_consecutive_same_tenant is None:
-        max_consecutive_same_tenant = claim_config["max_consecutive_same_tenant"]
-    # max_tenants_per_round 用于限制公平调度时选取的 tenant 数量
-    # 目前未直接使用，但保留配置项以便后续扩展
-    # max_tenants_per_round = claim_config["max_tenants_per_round"]
+    # 读取配置（参数优先，都已传入时不读取配置）
+    enable_tenant_fair_claim, max_consecutive_same_tenant = _resolve_claim_config(
+        enable_tenant_fair_claim, max_consecutive_same_tenant
+    )
+
+    params, normalized_instances = _claim_filter_params(
+        job_types, instance_allowlist, tenant_allowlist
+    )
+    # worker_id 用于 UPDATE SET，位于所有过滤条件之后
+    params.append(worker_id)
+
+    query = _build_claim_query(
+        has_job_types=bool(job_types),
+        has_instances=bool(normalized_instances),
+        has_tenants=bool(tenant_allowlist),
+        tenant_fair=bool(enable_tenant_fair_claim),
+    )
 
     should_close = conn is None
     if conn is None:
@@ -271,137 +743,7 @@ def claim(
 
     try:
         with conn.cursor() as cur:
-            # 构建查询条件
-            filters: List[str] = []
-            params: List[Any] = [worker_id]
-
-            # job_type 过滤
-            if job_types:
-                placeholders = ", ".join(["%s"] * len(job_types))
-                filters.append(f"job_type IN ({placeholders})")
-                params.extend(job_types)
-
-            # instance_allowlist 过滤
-            # 优先使用 gitlab_instance 列（更高效），同时兼容从 payload_json 读取（向后兼容）
-            # 允许未设置 gitlab_instance 的任务（如 SVN 任务）或值匹配的任务
-            # 注意：对 allowlist 做规范化，确保与 scheduler 写入的格式一致（小写、无默认端口）
-            if instance_allowlist:
-                normalized_instances = [
-                    normalize_instance_key(inst)
-                    for inst in instance_allowlist
-                    if normalize_instance_key(inst)
-                ]
-                if normalized_instances:
-                    placeholders = ", ".join(["%s"] * len(normalized_instances))
-                    # 使用列优先，但也兼容 payload_json（向后兼容旧数据）
-                    filters.append(f"""(
-                        gitlab_instance IS NULL
-                        OR gitlab_instance IN ({placeholders})
-                        OR (gitlab_instance IS NULL AND payload_json ->> 'gitlab_instance' IN ({placeholders}))
-                    )""")
-                    # 参数需要重复两次（分别用于列和 payload_json）
-                    params.extend(normalized_instances)
-                    params.extend(normalized_instances)
-
-            # tenant_allowlist 过滤
-            # 优先使用 tenant_id 列（更高效），同时兼容从 payload_json 读取（向后兼容）
-            # 允许未设置 tenant_id 的任务或值匹配的任务
-            if tenant_allowlist:
-                placeholders = ", ".join(["%s"] * len(tenant_allowlist))
-                # 使用列优先，但也兼容 payload_json（向后兼容旧数据）
-                filters.append(f"""(
-                    tenant_id IS NULL
-                    OR tenant_id IN ({placeholders})
-                    OR (tenant_id IS NULL AND payload_json ->> 'tenant_id' IN ({placeholders}))
-                )""")
-                # 参数需要重复两次
-                params.extend(tenant_allowlist)
-                params.extend(tenant_allowlist)
-
-            # 组合额外过滤条件
-            extra_filter = ""
-            if filters:
-                extra_filter = "AND " + " AND ".join(filters)
-
-            # 基础 claimable 条件
-            claimable_conditions = """(
-                -- pending 任务
-                (status = 'pending' AND not_before <= now())
-                -- 或 running 但锁过期的任务
-                OR (status = 'running' AND locked_at + (lease_seconds || ' seconds')::interval < now())
-                -- 或 failed 可重试的任务
-                OR (status = 'failed' AND not_before <= now() AND attempts < max_attempts)
-            )"""
-
-            if enable_tenant_fair_claim:
-                # 租户公平调度模式
-                # 实现方式：
-                # 1. 先用 DISTINCT ON 选出若干不同 tenant 的最高优先级任务
-                # 2. 从这些候选中按优先级选择一个
-                # 3. 使用 FOR UPDATE SKIP LOCKED 确保并发安全
-                query = f"""
-                    WITH tenant_candidates AS (
-                        -- 每个 tenant 的最高优先级任务 ID
-                        -- DISTINCT ON 按 tenant_id 分组，每组取 priority 最小、created_at 最早的一个
-                        SELECT DISTINCT ON (COALESCE(payload_json ->> 'tenant_id', ''))
-                            job_id
-                        FROM scm.sync_jobs
-                        WHERE {claimable_conditions}
-                        {extra_filter}
-                        ORDER BY COALESCE(payload_json ->> 'tenant_id', ''), priority ASC, created_at ASC
-                    ),
-                    claimable AS (
-                        -- 从候选任务中选择优先级最高的一个，使用 FOR UPDATE SKIP LOCKED
-                        SELECT j.job_id, j.lease_seconds
-                        FROM scm.sync_jobs j
-                        WHERE j.job_id IN (SELECT job_id FROM tenant_candidates)
-                        ORDER BY j.priority ASC, j.created_at ASC
-                        LIMIT 1
-                        FOR UPDATE SKIP LOCKED
-                    )
-                    UPDATE scm.sync_jobs j
-                    SET
-                        status = 'running',
-                        locked_by = %s,
-                        locked_at = now(),
-                        attempts = attempts + 1,
-                        updated_at = now()
-                    FROM claimable c
-                    WHERE j.job_id = c.job_id
-                    RETURNING
-                        j.job_id, j.repo_id, j.job_type, j.mode, j.payload_json,
-                        j.priority, j.attempts, j.max_attempts, j.last_error,
-                        j.lease_seconds, j.created_at
-                """
-            else:
-                # 原有模式：按优先级顺序获取
-                query = f"""
-                    WITH claimable AS (
-                        SELECT job_id, lease_seconds
-                        FROM scm.sync_jobs
-                        WHERE {claimable_conditions}
-                        {extra_filter}
-                        ORDER BY priority ASC, created_at ASC
-                        LIMIT 1
-                        FOR UPDATE SKIP LOCKED
-                    )
-                    UPDATE scm.sync_jobs j
-                    SET
-                        status = 'running',
-                        locked_by = %s,
-                        locked_at = now(),
-                        attempts = attempts + 1,
-                        updated_at = now()
-                    FROM claimable c
-                    WHERE j.job_id = c.job_id
-                    RETURNING
-                        j.job_id, j.repo_id, j.job_type, j.mode, j.payload_json,
-                        j.priority, j.attempts, j.max_attempts, j.last_error,
-                        j.lease_seconds, j.created_at
-                """
-
-            # 将 worker_id 放在参数列表开头（用于 UPDATE SET）
-            cur.execute(query, params)
+            cur.execute(query, params, prepare=hot_statement_prepare(long_lived=not should_close))
 
             row = cur.fetchone()
             conn.commit()
@@ -409,19 +751,7 @@ def claim(
             if row is None:
                 return None
 
-            return {
-                "job_id": str(row[0]),
-                "repo_id": row[1],
-                "job_type": row[2],
-                "mode": row[3],
-                "payload": row[4] if row[4] else {},
-                "priority": row[5],
-                "attempts": row[6],
-                "max_attempts": row[7],
-                "last_error": row[8],
-                "lease_seconds": row[9],
-                "created_at": row[10],
-            }
+            return _claimed_row_to_job(row)
 
     except psycopg.Error as e:
         conn.rollback()
@@ -434,6 +764,131 @@ def claim(
             conn.close()
 
 
+@functools.lru_cache(maxsize=None)
+def _build_claim_batch_query(
+    *,
+    has_job_types: bool,
+    has_instances: bool,
+    has_tenants: bool,
+    tenant_fair: bool,
+) -> str:
+    """
+    构建批量 claim 查询（与 _build_claim_query 使用相同的过滤条件）
+
+    参数顺序: [job_types] [instances, instances] [tenants, tenants] [per_tenant_limit] limit worker_id
+
+    租户公平模式下按 tenant 内排名轮转选取：先取每个 tenant 的第 1 个任务，再取第 2 个，
+    依此类推，单个 tenant 在一批中最多 per_tenant_limit 个任务。
+    """
+    filters = _build_claim_filters(
+        has_job_types=has_job_types, has_instances=has_instances, has_tenants=has_tenants
+    )
+    extra_filter = "AND " + " AND ".join(filters) if filters else ""
+
+    if tenant_fair:
+        return f"""
+            WITH RECURSIVE {_tenant_heads_ctes(extra_filter, "%s")},
+            claimable AS (
+                SELECT j.job_id, j.lease_seconds
+                FROM scm.sync_jobs j
+                JOIN tenant_heads r ON r.job_id = j.job_id
+                WHERE {_CLAIMABLE_CONDITIONS}
+                ORDER BY r.tenant_rank ASC, j.priority ASC, j.created_at ASC
+                LIMIT %s
+                FOR UPDATE OF j SKIP LOCKED
+            )
+            {_CLAIM_UPDATE_RETURNING}
+        """
+
+    return f"""
+        WITH claimable AS (
+            SELECT job_id, lease_seconds
+            FROM scm.sync_jobs
+            WHERE {_CLAIMABLE_CONDITIONS}
+            {extra_filter}
+            ORDER BY priority ASC, created_at ASC
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        {_CLAIM_UPDATE_RETURNING}
+    """
+
+
+def claim_batch(
+    worker_id: str,
+    n: int,
+    job_types: Optional[List[str]] = None,
+    instance_allowlist: Optional[List[str]] = None,
+    tenant_allowlist: Optional[List[str]] = None,
+    enable_tenant_fair_claim: Optional[bool] = None,
+    max_consecutive_same_tenant: Optional[int] = None,
+    conn: Optional[psycopg.Connection] = None,
+) -> List[Dict[str, Any]]:
+    """
+    一次获取并锁定最多 n 个待执行任务（单条 UPDATE ... RETURNING，一次提交）。
+
+    获取条件与 pool 过滤与 claim() 相同。租户公平模式下单个 tenant 在一批中
+    最多 max_consecutive_same_tenant 个任务，不足 n 个时不会用同一 tenant 补齐。
+
+    Args:
+        worker_id: 当前 worker 标识符
+        n: 最多获取的任务数
+        job_types: 可选，限制获取的任务类型列表
+        instance_allowlist: 可选，限制获取的 GitLab 实例列表
+        tenant_allowlist: 可选，限制获取的租户 ID 列表
+        enable_tenant_fair_claim: 可选，启用租户公平调度，默认从配置读取
+        max_consecutive_same_tenant: 可选，公平模式下单租户每批最多任务数，默认从配置读取
+        conn: 可选的数据库连接
+
+    Returns:
+        任务信息字典列表（字段同 claim()），按 priority、created_at 排序；无可用任务时返回空列表
+    """
+    if n <= 0:
+        return []
+
+    enable_tenant_fair_claim, max_consecutive_same_tenant = _resolve_claim_config(
+        enable_tenant_fair_claim, max_consecutive_same_tenant
+    )
+    params, normalized_instances = _claim_filter_params(
+        job_types, instance_allowlist, tenant_allowlist
+    )
+    if enable_tenant_fair_claim:
+        params.append(max(1, max_consecutive_same_tenant))
+    params.extend([n, worker_id])
+
+    query = _build_claim_batch_query(
+        has_job_types=bool(job_types),
+        has_instances=bool(normalized_instances),
+        has_tenants=bool(tenant_allowlist),
+        tenant_fair=enable_tenant_fair_claim,
+    )
+
+    should_close = conn is None
+    if conn is None:
+        conn = get_connection()
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params, prepare=hot_statement_prepare(long_lived=not should_close))
+            rows = cur.fetchall()
+            conn.commit()
+
+        # UPDATE ... RETURNING 不保证顺序，按优先级重新排序
+        jobs = [_claimed_row_to_job(row) for row in rows]
+        jobs.sort(key=lambda job: (job["priority"], job["created_at"]))
+        return jobs
+
+    except psycopg.Error as e:
+        conn.rollback()
+        raise DatabaseError(
+            f"批量 claim 任务失败: {e}",
+            {"worker_id": worker_id, "n": n, "error": str(e)},
+        )
+    finally:
+        if should_close:
+            conn.close()
+
+
 def ack(
     job_id: str,
     worker_id: str,
@@ -786,6 +1241,126 @@ def renew_lease(
             conn.close()
 
 
+def renew_lease_batch(
+    job_ids: Sequence[str],
+    worker_id: str,
+    lease_seconds: Optional[int] = None,
+    conn: Optional[psycopg.Connection] = None,
+) -> List[str]:
+    """
+    批量续租任务锁（单条 UPDATE）。
+
+    Args:
+        job_ids: 任务 ID 列表
+        worker_id: 当前 worker 标识符
+        lease_seconds: 可选，新的租约时长（为 None 时保持原值）
+        conn: 可选的数据库连接
+
+    Returns:
+        续租成功的任务 ID 列表；不在列表中的任务已不属于该 worker（被抢占或已结束）
+    """
+    if not job_ids:
+        return []
+
+    should_close = conn is None
+    if conn is None:
+        conn = get_connection()
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE scm.sync_jobs
+                SET
+                    locked_at = now(),
+                    lease_seconds = COALESCE(%s, lease_seconds),
+                    updated_at = now()
+                WHERE job_id = ANY(%s::uuid[]) AND locked_by = %s AND status = 'running'
+                RETURNING job_id
+            """,
+                (lease_seconds, list(job_ids), worker_id),
+                prepare=hot_statement_prepare(long_lived=not should_close),
+            )
+
+            renewed = [str(row[0]) for row in cur.fetchall()]
+            conn.commit()
+            return renewed
+
+    except psycopg.Error as e:
+        conn.rollback()
+        raise DatabaseError(
+            f"批量续租任务失败: {e}",
+            {"job_ids": list(job_ids), "worker_id": worker_id, "error": str(e)},
+        )
+    finally:
+        if should_close:
+            conn.close()
+
+
+def ack_batch(
+    job_ids: Sequence[str],
+    worker_id: str,
+    run_ids: Optional[Sequence[Optional[str]]] = None,
+    conn: Optional[psycopg.Connection] = None,
+) -> List[str]:
+    """
+    批量确认任务完成（单条 UPDATE，一次提交）。
+
+    Args:
+        job_ids: 任务 ID 列表
+        worker_id: 当前 worker 标识符（必须与锁持有者匹配）
+        run_ids: 可选，与 job_ids 一一对应的 sync_run ID
+        conn: 可选的数据库连接
+
+    Returns:
+        成功 ack 的任务 ID 列表
+    """
+    if not job_ids:
+        return []
+    if run_ids is None:
+        run_ids = [None] * len(job_ids)
+    if len(run_ids) != len(job_ids):
+        raise ValueError("run_ids 长度必须与 job_ids 一致")
+
+    should_close = conn is None
+    if conn is None:
+        conn = get_connection()
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE scm.sync_jobs j
+                SET
+                    status = 'completed',
+                    locked_by = NULL,
+                    locked_at = NULL,
+                    last_run_id = a.run_id,
+                    last_error = NULL,
+                    updated_at = now()
+                FROM unnest(%s::uuid[], %s::uuid[]) AS a(job_id, run_id)
+                WHERE j.job_id = a.job_id AND j.locked_by = %s AND j.status = 'running'
+                RETURNING j.job_id
+            """,
+                (list(job_ids), list(run_ids), worker_id),
+                prepare=hot_statement_prepare(long_lived=not should_close),
+            )
+
+            acked = [str(row[0]) for row in cur.fetchall()]
+            conn.commit()
+            return acked
+
+    except psycopg.Error as e:
+        conn.rollback()
+        raise DatabaseError(
+            f"批量 ack 任务失败: {e}",
+            {"job_ids": list(job_ids), "worker_id": worker_id, "error": str(e)},
+        )
+    finally:
+        if should_close:
+            conn.close()
+
+
 def get_job(
     job_id: str,
     conn: Optional[psycopg.Connection] = None,
@@ -151,6 +151,7 @@ class RunCounts:
     # GitLab MRs 相关
     scanned_count: int = 0
     inserted_count: int = 0
+    updated_count: int = 0
 
     # GitLab Reviews 相关
     synced_mr_count: int = 0
@@ -590,6 +591,7 @@ def build_run_finish_payload_from_result(
         "skipped_count": result.get("skipped_count", 0),
         "scanned_count": result.get("scanned_count", 0),
         "inserted_count": result.get("inserted_count", 0),
+        "updated_count": result.get("updated_count", 0),
         "synced_mr_count": result.get("synced_mr_count", 0),
         "synced_event_count": result.get("synced_event_count", 0),
         "skipped_event_count": result.get("skipped_event_count", 0),
@@ -1000,6 +1002,43 @@ def build_payload_for_lease_lost(
     )
 
 
+def build_payload_for_requeued(
+    job_id: str,
+    worker_id: str,
+    reason: str,
+    counts: Optional[Union[Dict[str, Any], RunCounts]] = None,
+    cursor_before: Optional[Dict[str, Any]] = None,
+) -> RunFinishPayload:
+    """
+    构建任务已被让出（重新入队）的 payload
+
+    快捷方法，用于多槽位 worker 退出超时后任务已被重新入队时，
+    结束本次 running 状态的 sync_run（任务本身不再 ack/fail）。
+
+    Args:
+        job_id: 任务 ID
+        worker_id: Worker ID
+        reason: 让出原因
+        counts: 同步计数（可能部分完成）
+        cursor_before: 同步前的游标（用于审计）
+
+    Returns:
+        RunFinishPayload 对象
+    """
+    error_summary = ErrorSummary(
+        error_category=ErrorCategory.LEASE_LOST.value,
+        error_message=f"Job requeued before completion: {reason}",
+        context={"job_id": job_id, "worker_id": worker_id},
+    )
+
+    return build_run_finish_payload(
+        status=RunStatus.FAILED.value,
+        counts=counts,
+        error_summary=error_summary,
+        cursor_before=cursor_before,
+    )
+
+
 def build_payload_for_mark_dead(
     error: str,
     error_category: str,
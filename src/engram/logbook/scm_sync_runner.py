@@ -603,11 +603,16 @@ def get_connection():
 
 def refresh_vfacts(*, dry_run: bool = False, concurrently: bool = False) -> dict:
     """
-    刷新物化视图 scm.v_facts
+    刷新统一事实视图 scm.v_facts
+
+    17_scm_facts_table.sql 之后 scm.v_facts 是 scm.facts 上的普通视图，
+    scm.facts 由来源表触发器随写入增量维护，无需重算；此时只返回 pg_class
+    中的行数估计（mode="incremental"）。scm.facts 不存在（未执行 17 迁移）时
+    回退到 REFRESH MATERIALIZED VIEW（mode="refresh"）。
 
     Args:
         dry_run: 是否模拟运行
-        concurrently: 是否并发刷新
+        concurrently: 是否并发刷新（仅 refresh 模式有效）
 
     Returns:
         刷新结果字典
@@ -628,14 +633,24 @@ def refresh_vfacts(*, dry_run: bool = False, concurrently: bool = False) -> dict
         conn = get_connection()
         try:
             with conn.cursor() as cur:
-                cur.execute("SELECT COUNT(*) FROM scm.v_facts")
-                before = cur.fetchone()[0] or 0
-                if concurrently:
-                    cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY scm.v_facts")
+                cur.execute(
+                    "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class "
+                    "WHERE oid = to_regclass('scm.facts')"
+                )
+                facts_row = cur.fetchone()
+                if facts_row is not None:
+                    mode = "incremental"
+                    before = after = facts_row[0] or 0
                 else:
-                    cur.execute("REFRESH MATERIALIZED VIEW scm.v_facts")
-                cur.execute("SELECT COUNT(*) FROM scm.v_facts")
-                after = cur.fetchone()[0] or 0
+                    mode = "refresh"
+                    cur.execute("SELECT COUNT(*) FROM scm.v_facts")
+                    before = cur.fetchone()[0] or 0
+                    if concurrently:
+                        cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY scm.v_facts")
+                    else:
+                        cur.execute("REFRESH MATERIALIZED VIEW scm.v_facts")
+                    cur.execute("SELECT COUNT(*) FROM scm.v_facts")
+                    after = cur.fetchone()[0] or 0
             conn.commit()
         finally:
             conn.close()
@@ -644,6 +659,7 @@ def refresh_vfacts(*, dry_run: bool = False, concurrently: bool = False) -> dict
         result.update(
             {
                 "refreshed": True,
+                "mode": mode,
                 "before_row_count": int(before),
                 "after_row_count": int(after),
                 "duration_ms": duration_ms,
@@ -8,6 +8,7 @@ scm_sync_scheduler_core - SCM 同步调度器核心实现
 - 注入 bucket 暂停信息、probe 标记、降级建议
 - 支持 tenant/instance 级别熔断跳过
 - 提供主循环 run_scheduler_tick()
+- 提供增量调度状态 IncrementalSchedulerState（只重新评估输入有变化的仓库）
 
 设计原则:
 1. build_jobs_to_insert 是纯函数，不访问数据库或外部状态
@@ -35,11 +36,15 @@ scm_sync_scheduler_core - SCM 同步调度器核心实现
 
 from __future__ import annotations
 
+import heapq
+import threading
 import time
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Set, Tuple
 
+from engram.logbook.kv import KVReadThroughCache
 from engram.logbook.scm_sync_job_types import (
     logical_to_physical,
 )
@@ -54,6 +59,7 @@ from engram.logbook.scm_sync_policy import (
     SchedulerConfig,
     SyncJobCandidate,
     select_jobs_to_enqueue,
+    should_schedule_repo_health,
 )
 
 __all__ = [
@@ -62,6 +68,7 @@ __all__ = [
     "BuildJobsSnapshot",
     "BuildJobsResult",
     "SchedulerTickResult",
+    "IncrementalSchedulerState",
     # 函数
     "build_jobs_to_insert",
     "run_scheduler_tick",
@@ -150,6 +157,7 @@ class SchedulerTickResult:
     Attributes:
         scheduled_at: 调度时间戳
         repos_scanned: 扫描的仓库数
+        repos_evaluated: 本轮重新评估的仓库数（全量模式等于 repos_scanned）
         candidates_selected: 选中的候选任务数
         jobs_enqueued: 成功入队的任务数
         jobs_skipped: 跳过的任务数
@@ -162,6 +170,7 @@ class SchedulerTickResult:
 
     scheduled_at: str
     repos_scanned: int = 0
+    repos_evaluated: int = 0
     candidates_selected: int = 0
     jobs_enqueued: int = 0
     jobs_skipped: int = 0
@@ -177,6 +186,7 @@ class SchedulerTickResult:
         return {
             "scheduled_at": self.scheduled_at,
             "repos_scanned": self.repos_scanned,
+            "repos_evaluated": self.repos_evaluated,
             "candidates_selected": self.candidates_selected,
             "jobs_enqueued": self.jobs_enqueued,
             "jobs_skipped": self.jobs_skipped,
@@ -190,6 +200,116 @@ class SchedulerTickResult:
         }
 
 
+@dataclass
+class IncrementalSchedulerState:
+    """
+    增量调度状态（跨 tick 保存在进程内存中）
+
+    保存上一轮的 RepoSyncState，每轮只重新加载自水位线以来输入有变化的仓库
+    （sync_runs 开始/结束、游标更新、新建仓库，见 scm_db.get_scheduling_changes_since），
+    并用定时器堆记录游标年龄何时越过 cursor_age_threshold_seconds。
+    只有到期仓库（should_schedule_repo_health 为真）参与 select_jobs_to_enqueue，
+    其余仓库无论如何都不会产生候选，因此结果与全量调度一致。
+
+    水位线无法覆盖的变化（仓库删除、URL 变更等）由每 full_refresh_interval_seconds
+    一次的全量重建兜底；change_overlap_seconds 为水位线回看窗口，覆盖在水位线之前
+    开始、之后才提交的事务。
+
+    Attributes:
+        full_refresh_interval_seconds: 全量重建间隔（秒）
+        change_overlap_seconds: 水位线回看窗口（秒）
+        states: repo_id -> 上一次加载的 RepoSyncState
+        due_repo_ids: 当前到期（需要参与选择）的仓库
+        high_water: 变化检测水位线（数据库时间，epoch 秒）
+        last_full_refresh_at: 上次全量重建时间
+    """
+
+    full_refresh_interval_seconds: float = 900.0
+    change_overlap_seconds: float = 60.0
+    states: Dict[int, RepoSyncState] = field(default_factory=dict)
+    due_repo_ids: Set[int] = field(default_factory=set)
+    high_water: Optional[float] = None
+    last_full_refresh_at: Optional[float] = None
+    # 定时器堆 (due_at, repo_id)；_next_due 记录每个仓库当前有效的 due_at，过期条目惰性丢弃
+    _timers: List[Tuple[float, int]] = field(default_factory=list, repr=False)
+    _next_due: Dict[int, float] = field(default_factory=dict, repr=False)
+
+    def needs_full_refresh(self, now: float) -> bool:
+        """是否需要全量重建"""
+        if self.high_water is None or self.last_full_refresh_at is None:
+            return True
+        return now - self.last_full_refresh_at >= self.full_refresh_interval_seconds
+
+    def changes_since(self) -> Optional[float]:
+        """变化检测的起始时间（水位线减去回看窗口）"""
+        if self.high_water is None:
+            return None
+        return self.high_water - self.change_overlap_seconds
+
+    def reset(self) -> None:
+        """清空所有仓库状态（全量重建前调用）"""
+        self.states.clear()
+        self.due_repo_ids.clear()
+        self._timers.clear()
+        self._next_due.clear()
+
+    def update(self, states: List[RepoSyncState], config: SchedulerConfig, now: float) -> None:
+        """替换仓库状态并重新评估"""
+        for state in states:
+            self.states[state.repo_id] = state
+            self._evaluate(state.repo_id, config, now)
+
+    def remove(self, repo_ids: Set[int]) -> None:
+        """移除已不存在的仓库"""
+        for repo_id in repo_ids:
+            self.states.pop(repo_id, None)
+            self.due_repo_ids.discard(repo_id)
+            self._next_due.pop(repo_id, None)
+
+    def expire_timers(self, config: SchedulerConfig, now: float) -> Set[int]:
+        """重新评估游标年龄已越过阈值的仓库，返回被评估的 repo_id"""
+        expired: Set[int] = set()
+        while self._timers and self._timers[0][0] <= now:
+            due_at, repo_id = heapq.heappop(self._timers)
+            if self._next_due.get(repo_id) != due_at:
+                continue
+            del self._next_due[repo_id]
+            self._evaluate(repo_id, config, now)
+            expired.add(repo_id)
+        return expired
+
+    def due_states(self, queued_pairs: Set[Tuple[int, str]]) -> List[RepoSyncState]:
+        """到期仓库的状态（按 repo_id 排序，is_queued 按当前活跃任务刷新）"""
+        return [
+            replace(
+                self.states[repo_id],
+                is_queued=any(
+                    (repo_id, jt) in queued_pairs for jt in ["commits", "mrs", "reviews"]
+                ),
+            )
+            for repo_id in sorted(self.due_repo_ids)
+        ]
+
+    def _evaluate(self, repo_id: int, config: SchedulerConfig, now: float) -> None:
+        state = self.states.get(repo_id)
+        self._next_due.pop(repo_id, None)
+        if state is None:
+            self.due_repo_ids.discard(repo_id)
+            return
+
+        should_schedule, _, _ = should_schedule_repo_health(state, config, now)
+        if should_schedule:
+            self.due_repo_ids.add(repo_id)
+            return
+
+        self.due_repo_ids.discard(repo_id)
+        if state.cursor_updated_at is not None:
+            due_at = state.cursor_updated_at + config.cursor_age_threshold_seconds
+            if due_at > now:
+                self._next_due[repo_id] = due_at
+                heapq.heappush(self._timers, (due_at, repo_id))
+
+
 # ============ 核心纯函数 ============
 
 
@@ -403,6 +523,32 @@ def _build_payload(
 
 # ============ 辅助函数 ============
 
+# 游标读穿缓存（跨 tick 复用）：每次 tick 仍会按 updated_at 校验版本，
+# 但只有变化过的游标才会回传 value。
+# 按连接的 DSN 区分，同一进程内连接不同数据库的调度器不会共享缓存项。
+_CURSOR_CACHE_MAX_DSNS = 8
+_CURSOR_CACHE_MAX_ENTRIES = 10000
+_cursor_caches: "OrderedDict[str, KVReadThroughCache]" = OrderedDict()
+_cursor_caches_lock = threading.Lock()
+
+
+def _get_cursor_cache(conn) -> KVReadThroughCache:
+    """获取连接所属数据库的游标缓存（按 DSN 缓存，最多保留 _CURSOR_CACHE_MAX_DSNS 个）"""
+    try:
+        dsn_key = str(conn.info.dsn)
+    except Exception:
+        dsn_key = f"conn:{id(conn)}"
+    with _cursor_caches_lock:
+        cache = _cursor_caches.get(dsn_key)
+        if cache is None:
+            cache = KVReadThroughCache("scm.sync", max_entries=_CURSOR_CACHE_MAX_ENTRIES)
+            _cursor_caches[dsn_key] = cache
+            while len(_cursor_caches) > _CURSOR_CACHE_MAX_DSNS:
+                _cursor_caches.popitem(last=False)
+        else:
+            _cursor_caches.move_to_end(dsn_key)
+        return cache
+
 
 def _build_repo_sync_states(
     conn,
@@ -425,17 +571,24 @@ def _build_repo_sync_states(
     if db_api is None:
         from engram.logbook import scm_db as db_api
 
+    repo_ids = [repo["repo_id"] for repo in repos]
+
+    # 批量获取游标信息（用于计算游标年龄），使用 commits 作为主游标
+    cursor_infos = db_api.get_cursor_values(
+        conn, repo_ids, "commits", cache=_get_cursor_cache(conn)
+    )
+
+    # 批量获取同步统计（单条窗口查询，避免每个仓库一次查询）
+    stats_by_repo = db_api.get_repo_sync_stats_many(conn, repo_ids)
+
     states = []
     for repo in repos:
         repo_id = repo["repo_id"]
         repo_type = repo["repo_type"]
 
-        # 获取同步统计
-        stats = db_api.get_repo_sync_stats(conn, repo_id)
+        stats = stats_by_repo.get(repo_id) or {}
 
-        # 获取游标信息（用于计算游标年龄）
-        # 使用 commits 作为主游标
-        cursor_info = db_api.get_cursor_value(conn, repo_id, "commits")
+        cursor_info = cursor_infos.get(repo_id)
         cursor_updated_at = cursor_info["updated_at"] if cursor_info else None
 
         # 检查是否有任务在队列中（repo 级别的标志，向后兼容）
@@ -473,6 +626,63 @@ def _build_repo_sync_states(
     return states
 
 
+def _load_incremental_states(
+    conn,
+    incremental: IncrementalSchedulerState,
+    queued_pairs: Set[Tuple[int, str]],
+    config: SchedulerConfig,
+    now: float,
+    db_api=None,
+) -> Tuple[List[RepoSyncState], int]:
+    """
+    增量加载仓库状态
+
+    全量重建时加载所有仓库；否则只加载自水位线以来有变化的仓库，并处理到期定时器。
+    新水位线在加载之前读取，加载期间发生的变化会在下一轮被检测到。
+
+    Returns:
+        (到期仓库的 RepoSyncState 列表, 本轮重新评估的仓库数)
+    """
+    if db_api is None:
+        from engram.logbook import scm_db as db_api
+
+    full_refresh = incremental.needs_full_refresh(now)
+    if full_refresh:
+        _, high_water = db_api.get_scheduling_changes_since(conn, None)
+        repos = db_api.list_repos_for_scheduling(conn)
+        evaluated = {repo["repo_id"] for repo in repos}
+    else:
+        changed_ids, high_water = db_api.get_scheduling_changes_since(
+            conn, incremental.changes_since()
+        )
+        repos = (
+            db_api.list_repos_for_scheduling(conn, repo_ids=changed_ids, limit=len(changed_ids))
+            if changed_ids
+            else []
+        )
+        evaluated = set(changed_ids)
+
+    states = _build_repo_sync_states(conn, repos, queued_pairs, db_api=db_api) if repos else []
+    # 加载成功后才推进水位线，失败时下一轮从原水位线重试
+    if full_refresh:
+        incremental.reset()
+        incremental.last_full_refresh_at = now
+    incremental.high_water = high_water
+    incremental.update(states, config, now)
+    evaluated |= incremental.expire_timers(config, now)
+
+    # 到期仓库可能已被删除（删除不会推进水位线），入队前确认仍存在
+    due_ids = sorted(incremental.due_repo_ids)
+    if due_ids:
+        present = {
+            repo["repo_id"]
+            for repo in db_api.list_repos_for_scheduling(conn, repo_ids=due_ids, limit=len(due_ids))
+        }
+        incremental.remove(set(due_ids) - present)
+
+    return incremental.due_states(queued_pairs), len(evaluated)
+
+
 def _build_budget_snapshot_from_db(conn, db_api=None) -> BudgetSnapshot:
     """从数据库构建 BudgetSnapshot"""
     if db_api is None:
@@ -497,12 +707,11 @@ def _load_bucket_statuses(
     if db_api is None:
         from engram.logbook import scm_db as db_api
 
-    statuses = {}
-    for instance in instances:
-        status_dict = db_api.get_rate_limit_bucket_status(conn, instance)
-        if status_dict:
-            statuses[instance] = InstanceBucketStatus.from_db_status(status_dict)
-    return statuses
+    status_dicts = db_api.get_rate_limit_bucket_statuses(conn, instances)
+    return {
+        instance: InstanceBucketStatus.from_db_status(status_dict)
+        for instance, status_dict in status_dicts.items()
+    }
 
 
 def _load_circuit_breaker_decision(
@@ -510,11 +719,33 @@ def _load_circuit_breaker_decision(
     config: CircuitBreakerConfig,
     key: str = "default:global",
     db_api=None,
+    runtime=None,
+    now: Optional[float] = None,
 ) -> CircuitBreakerDecision:
-    """加载熔断决策"""
+    """
+    加载熔断决策
+
+    提供 runtime（CircuitBreakerRuntime，跨 tick 复用）时，熔断状态保存在内存中，
+    只在持久化间隔到达或状态迁移时与 kv 交换；健康统计优先使用各 worker 上报的窗口快照，
+    窗口内没有任何快照（worker 未启用运行时）时回退到 sync_runs 统计。
+    """
     if db_api is None:
         from engram.logbook import scm_db as db_api
 
+    if runtime is not None:
+        runtime.maybe_sync(conn, now=now)
+        health_stats = None
+        if not runtime.has_samples(now):
+            health_stats = db_api.get_sync_runs_health_stats(
+                conn,
+                window_minutes=config.window_minutes or 30,
+                window_count=config.window_count,
+            )
+        decision: CircuitBreakerDecision = runtime.decide(health_stats, now=now)
+        # 本轮发生状态迁移时立即写回
+        runtime.maybe_sync(conn, now=now)
+        return decision
+
     # 加载熔断器状态
     controller = CircuitBreakerController(config=config, key=key)
 
@@ -551,6 +782,8 @@ def run_scheduler_tick(
     now: Optional[float] = None,
     logger=None,
     db_api=None,
+    incremental: Optional[IncrementalSchedulerState] = None,
+    circuit_runtime=None,
 ) -> SchedulerTickResult:
     """
     执行一次调度 tick
@@ -573,13 +806,17 @@ def run_scheduler_tick(
         now: 当前时间戳，None 时使用 time.time()
         logger: 日志记录器
         db_api: 数据库 API 模块（用于测试注入）
+        incremental: 增量调度状态（跨 tick 复用同一实例）；提供时只重新评估
+                     输入有变化或游标年龄越过阈值的仓库，None 时每轮全量扫描
+        circuit_runtime: 熔断运行时（CircuitBreakerRuntime，跨 tick 复用）；提供时熔断状态
+                         保存在内存中按间隔持久化，None 时每轮从 kv 加载并写回
 
     Returns:
         SchedulerTickResult 调度结果
     """
     if db_api is None:
         from engram.logbook import scm_db as db_api
-    from engram.logbook.scm_sync_queue import enqueue
+    from engram.logbook.scm_sync_queue import enqueue_many
 
     if now is None:
         now = time.time()
@@ -592,14 +829,16 @@ def run_scheduler_tick(
     cb_config = cb_config or CircuitBreakerConfig()
 
     try:
-        # 1. 从 DB 加载仓库列表
-        repos = db_api.list_repos_for_scheduling(conn)
-        result.repos_scanned = len(repos)
+        # 1. 从 DB 加载仓库列表（增量模式在第 5 步只加载有变化的仓库）
+        repos: List[Dict[str, Any]] = []
+        if incremental is None:
+            repos = db_api.list_repos_for_scheduling(conn)
+            result.repos_scanned = len(repos)
 
-        if not repos:
-            if logger:
-                logger.info("无仓库需要调度")
-            return result
+            if not repos:
+                if logger:
+                    logger.info("无仓库需要调度")
+                return result
 
         # 2. 获取当前活跃任务对（用于去重）
         # 注意：queued_pairs 仅表示 DB 中 active jobs
@@ -621,14 +860,28 @@ def run_scheduler_tick(
         result.budget_snapshot = budget_snapshot.to_dict()
 
         # 5. 构建 RepoSyncState 列表
-        states = _build_repo_sync_states(conn, repos, queued_pairs, db_api=db_api)
+        if incremental is None:
+            states = _build_repo_sync_states(conn, repos, queued_pairs, db_api=db_api)
+            result.repos_evaluated = len(states)
+        else:
+            states, result.repos_evaluated = _load_incremental_states(
+                conn, incremental, queued_pairs, scheduler_config, now, db_api=db_api
+            )
+            result.repos_scanned = len(incremental.states)
 
         # 6. 收集所有 gitlab_instance 用于加载 bucket 状态
         instances = list(set(s.gitlab_instance for s in states if s.gitlab_instance))
         bucket_statuses = _load_bucket_statuses(conn, instances, db_api=db_api)
 
         # 7. 加载熔断决策
-        circuit_decision = _load_circuit_breaker_decision(conn, cb_config, db_api=db_api)
+        circuit_decision = _load_circuit_breaker_decision(
+            conn,
+            cb_config,
+            key=circuit_runtime.key if circuit_runtime is not None else "default:global",
+            db_api=db_api,
+            runtime=circuit_runtime,
+            now=now,
+        )
         result.circuit_state = circuit_decision.current_state
 
         # 8. 确定要调度的 job_types（按 repo_type 分组）
@@ -680,36 +933,34 @@ def run_scheduler_tick(
             result.jobs_enqueued = 0
             result.enqueued_jobs = build_result.jobs
         else:
-            enqueued_count = 0
-            for job in build_result.jobs:
-                try:
-                    job_id = enqueue(
-                        repo_id=job["repo_id"],
-                        job_type=job["job_type"],
-                        mode=job.get("mode", "incremental"),
-                        priority=job.get("priority", 100),
-                        payload=job.get("payload_json", {}),
-                        conn=conn,
+            # 单条语句批量入队，被唯一索引去重的任务 job_id 为 None
+            try:
+                job_ids = enqueue_many(build_result.jobs, conn=conn)
+            except Exception as e:
+                error_msg = f"批量入队失败 jobs={len(build_result.jobs)}: {e}"
+                if logger:
+                    logger.warning(error_msg)
+                result.errors.append(error_msg)
+                job_ids = []
+
+            for job, job_id in zip(build_result.jobs, job_ids):
+                if not job_id:
+                    continue
+                job["job_id"] = job_id
+                result.enqueued_jobs.append(job)
+                if logger:
+                    logger.debug(
+                        "入队成功: job_id=%s, repo_id=%d, job_type=%s",
+                        job_id,
+                        job["repo_id"],
+                        job["job_type"],
                     )
-                    if job_id:
-                        enqueued_count += 1
-                        job["job_id"] = job_id
-                        result.enqueued_jobs.append(job)
-                        if logger:
-                            logger.debug(
-                                "入队成功: job_id=%s, repo_id=%d, job_type=%s",
-                                job_id,
-                                job["repo_id"],
-                                job["job_type"],
-                            )
-                except Exception as e:
-                    error_msg = f"入队失败 repo_id={job['repo_id']}: {e}"
-                    if logger:
-                        logger.warning(error_msg)
-                    result.errors.append(error_msg)
-
-            result.jobs_enqueued = enqueued_count
-            conn.commit()
+
+            result.jobs_enqueued = len(result.enqueued_jobs)
+            if logger and job_ids:
+                logger.debug(
+                    "入队去重: %d 个任务已有活跃任务", len(job_ids) - len(result.enqueued_jobs)
+                )
 
         if logger:
             logger.info(
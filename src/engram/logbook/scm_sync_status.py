@@ -346,11 +346,16 @@ def _aggregate_circuit_breakers(entries: List[Dict[str, Any]]) -> Dict[str, Any]
 
 def _load_rate_limit_buckets(conn) -> List[Dict[str, Any]]:
     """加载速率限制桶状态"""
+    # 与 PostgresRateLimiter 共用补充公式（updated_at 为最后补充时间）
+    from engram.logbook.scm_db import _refilled_tokens_sql
+
     buckets: List[Dict[str, Any]] = []
     with conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
-            """
-            SELECT instance_key, tokens, rate, burst, paused_until, meta_json
+            f"""
+            SELECT
+                instance_key, rate, burst, paused_until, meta_json,
+                {_refilled_tokens_sql("now()")} AS tokens
             FROM scm.sync_rate_limits
             """
         )
@@ -375,7 +380,9 @@ def _load_rate_limit_buckets(conn) -> List[Dict[str, Any]]:
                     "instance_key": row["instance_key"],
                     "tokens_remaining": tokens,
                     "pause_until": pause_until.isoformat() if pause_until else None,
-                    "source": meta.get("pause_source") or meta.get("source"),
+                    "source": meta.get("pause_source")
+                    or meta.get("source")
+                    or meta.get("pause_reason"),
                     "is_paused": is_paused,
                     "pause_remaining_seconds": pause_remaining,
                     "wait_seconds": wait_seconds,
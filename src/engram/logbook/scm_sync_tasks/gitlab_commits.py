@@ -21,22 +21,36 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import requests
 
-from engram.logbook.config import DEFAULT_FORWARD_WINDOW_SECONDS
-from engram.logbook.cursor import save_gitlab_cursor
+from engram.logbook.config import DEFAULT_FORWARD_WINDOW_SECONDS, get_incremental_config
+from engram.logbook.cursor import (
+    load_gitlab_cursor,
+    save_gitlab_cursor,
+    should_advance_gitlab_commit_cursor,
+)
 from engram.logbook.gitlab_client import (
     GitLabClient,
     GitLabErrorCategory,
+    GitLabPage,
+    GitLabRateLimitError,
+    GitLabTimeoutError,
+    get_shared_client,
+    map_bounded,
 )
 from engram.logbook.scm_db import (
-    get_conn as get_connection,
+    BulkUpsertResult,
+    bulk_upsert_git_commits,
+    delete_cursor_value,
+    get_cursor_value,
+    set_cursor_value,
+    upsert_patch_blobs,
+    upsert_repo,
 )
 from engram.logbook.scm_db import (
-    upsert_git_commit,
-    upsert_repo,
+    get_conn as get_connection,
 )
 
 # ============ 异常定义 ============
@@ -109,6 +123,19 @@ class GitCommit:
     stats: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class CommitPage:
+    """一页已解析的 commits（iter_commit_pages 逐页产出）"""
+
+    commits: List[GitCommit]
+    page: int
+    next_page: Optional[int] = None
+
+    @property
+    def is_last(self) -> bool:
+        return self.next_page is None
+
+
 class DiffMode(str, Enum):
     """Diff 获取模式"""
 
@@ -129,6 +156,8 @@ class SyncConfig:
     diff_mode: DiffMode = DiffMode.BEST_EFFORT
     strict: bool = False
     timeout: int = 120
+    diff_workers: int = 4
+    max_diff_size_bytes: int = 10 * 1024 * 1024
 
 
 @dataclass
@@ -210,6 +239,40 @@ def parse_commit(data: Dict[str, Any]) -> GitCommit:
     )
 
 
+def iter_commit_pages(
+    client: GitLabClient,
+    project_id: str,
+    *,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    ref_name: Optional[str] = None,
+    per_page: int = 100,
+    start_page: int = 1,
+    max_pages: Optional[int] = None,
+) -> Iterator[CommitPage]:
+    """
+    逐页获取并解析 commits（内存占用为单页大小）
+
+    请求经过 client 的并发/速率限制器；每页处理完成后，调用方可记录
+    page.next_page 作为检查点，之后以 start_page 恢复。
+    """
+    raw_page: GitLabPage
+    for raw_page in client.iter_commits(
+        project_id,
+        since=since,
+        until=until,
+        ref_name=ref_name,
+        per_page=per_page,
+        start_page=start_page,
+        max_pages=max_pages,
+    ):
+        yield CommitPage(
+            commits=[parse_commit(item) for item in raw_page.items],
+            page=raw_page.page,
+            next_page=raw_page.next_page,
+        )
+
+
 # ============ 辅助函数 ============
 
 
@@ -405,6 +468,81 @@ def is_unrecoverable_api_error(
     return False
 
 
+# ============ Diff 并发获取 ============
+
+
+def fetch_commit_diff(
+    client: GitLabClient,
+    project_id: str,
+    sha: str,
+    *,
+    max_size_bytes: int,
+) -> FetchDiffResult:
+    """
+    获取单个 commit 的 diff（不抛异常，失败信息记录在结果中）
+
+    响应体超过 max_size_bytes 时返回 PatchFetchContentTooLargeError。
+    """
+    endpoint = f"/projects/{project_id}/repository/commits/{sha}/diff"
+    try:
+        api_result = client.get_commit_diff_safe(project_id, sha, max_size_bytes=max_size_bytes)
+    except Exception as exc:
+        return _result_from_exception(exc, endpoint)
+
+    if not api_result.success:
+        error: PatchFetchError
+        if api_result.error_category == GitLabErrorCategory.CONTENT_TOO_LARGE:
+            error = PatchFetchContentTooLargeError(
+                api_result.error_message or "content_too_large",
+                details={"max_size_bytes": max_size_bytes},
+            )
+        elif api_result.error_category == GitLabErrorCategory.TIMEOUT:
+            error = PatchFetchTimeoutError(api_result.error_message or "timeout")
+        else:
+            error = PatchFetchHttpError(api_result.error_message or "http_error")
+        return FetchDiffResult(
+            success=False,
+            error=error,
+            error_category=api_result.error_category,
+            error_message=api_result.error_message,
+            endpoint=api_result.endpoint or endpoint,
+            status_code=api_result.status_code,
+        )
+
+    if not isinstance(api_result.data, list):
+        return FetchDiffResult(
+            success=False,
+            error=PatchFetchParseError("diff 响应不是列表"),
+            error_category=GitLabErrorCategory.PARSE_ERROR,
+            error_message="diff 响应不是列表",
+            endpoint=api_result.endpoint or endpoint,
+        )
+    return FetchDiffResult(success=True, diffs=api_result.data, endpoint=api_result.endpoint)
+
+
+def fetch_commit_diffs(
+    client: GitLabClient,
+    project_id: str,
+    commits: List[GitCommit],
+    *,
+    max_workers: int,
+    max_size_bytes: int,
+) -> List[FetchDiffResult]:
+    """
+    并发获取一批 commits 的 diff，结果顺序与 commits 一致
+
+    每个请求仍经过 client 的并发限制器与速率限制器，线程数不超过客户端最大并发数。
+    """
+    return map_bounded(
+        lambda commit: fetch_commit_diff(
+            client, project_id, commit.sha, max_size_bytes=max_size_bytes
+        ),
+        commits,
+        max_workers=max_workers,
+        concurrency_limiter=client.concurrency_limiter,
+    )
+
+
 # ============ 数据库操作 ============
 
 
@@ -430,22 +568,23 @@ def ensure_repo(
     )
 
 
-def insert_git_commits(conn, repo_id: int, commits: List[GitCommit]) -> int:
-    """插入 git commits 到数据库"""
-    count = 0
-    for commit in commits:
-        upsert_git_commit(
-            conn,
-            repo_id,
-            commit.sha,
-            author_raw=commit.author_name or commit.author_email or "unknown",
-            ts=commit.committed_date.isoformat() if commit.committed_date else None,
-            message=commit.message,
-            meta_json=commit.stats,
-            source_id=commit.sha,
-        )
-        count += 1
-    return count
+def insert_git_commits(conn, repo_id: int, commits: List[GitCommit]) -> BulkUpsertResult:
+    """批量写入 git commits（单条 SQL，按 (repo_id, commit_sha) upsert）"""
+    return bulk_upsert_git_commits(
+        conn,
+        repo_id,
+        [
+            {
+                "commit_sha": commit.sha,
+                "author_raw": commit.author_name or commit.author_email or "unknown",
+                "ts": commit.committed_date.isoformat() if commit.committed_date else None,
+                "message": commit.message,
+                "meta_json": commit.stats,
+                "source_id": commit.sha,
+            }
+            for commit in commits
+        ],
+    )
 
 
 def update_sync_cursor(
@@ -462,6 +601,29 @@ def update_sync_cursor(
 # ============ 同步主函数 ============
 
 
+def _get_client(sync_config: SyncConfig) -> GitLabClient:
+    """优先使用 worker 安装的共享客户端（同一实例复用会话），否则新建"""
+    token = sync_config.token_provider.get_token()
+    return get_shared_client(sync_config.gitlab_url, token) or GitLabClient(
+        sync_config.gitlab_url, private_token=token
+    )
+
+
+def _backfill_checkpoint_name(since: Optional[str], until: Optional[str]) -> str:
+    """回填续传检查点的游标名（按仓库 + 时间窗口区分）"""
+    return f"gitlab_commits_backfill:{since or ''}~{until or ''}"
+
+
+def _load_backfill_start_page(conn, repo_id: int, checkpoint: str, per_page: int) -> int:
+    """读取续传检查点（每页数量不同时页码不可复用，从第 1 页开始）"""
+    stored = get_cursor_value(conn, repo_id, checkpoint)
+    value = stored.get("value") if stored else None
+    if not isinstance(value, dict) or value.get("per_page") != per_page:
+        return 1
+    next_page = value.get("next_page")
+    return next_page if isinstance(next_page, int) and next_page > 0 else 1
+
+
 def backfill_gitlab_commits(
     sync_config: SyncConfig,
     *,
@@ -472,10 +634,17 @@ def backfill_gitlab_commits(
     dry_run: bool = False,
     fetch_diffs: bool = False,
     dsn: Optional[str] = None,
+    start_page: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     回填 GitLab commits
 
+    按页遍历 [since, until] 窗口内的全部 commits（不再受 batch_size 截断），
+    batch_size 作为每页数量。
+
+    每页写入后与续传检查点（scm.sync 游标 cursor:<repo_id>:gitlab_commits_backfill:<窗口>）
+    在同一事务中提交；任务失败重试时从检查点记录的下一页继续，窗口回填完成后删除检查点。
+
     Args:
         sync_config: 同步配置
         project_key: 项目标识
@@ -483,24 +652,16 @@ def backfill_gitlab_commits(
         until: 结束时间（ISO 格式）
         update_watermark: 是否更新游标
         dry_run: 是否模拟运行
-        fetch_diffs: 是否获取 diffs
+        fetch_diffs: 是否获取 diffs（按 diff_mode 每页并发获取）
         dsn: 数据库连接字符串（可选）
+        start_page: 起始页码（None 表示从续传检查点继续，无检查点时为第 1 页）
 
     Returns:
-        同步结果字典
+        同步结果字典（next_page 为 None 表示窗口已全部回填）
     """
     import os
 
-    client = GitLabClient(
-        sync_config.gitlab_url, private_token=sync_config.token_provider.get_token()
-    )
-    raw_commits = client.get_commits(
-        sync_config.project_id,
-        since=since,
-        until=until,
-        per_page=sync_config.batch_size,
-    )
-    commits = [parse_commit(item) for item in raw_commits]
+    client = _get_client(sync_config)
 
     # 获取或创建数据库连接
     dsn = dsn or os.environ.get("LOGBOOK_DSN") or os.environ.get("POSTGRES_DSN") or ""
@@ -516,21 +677,76 @@ def backfill_gitlab_commits(
         )
         conn.commit()
 
+        checkpoint = _backfill_checkpoint_name(since, until)
+        if start_page is None:
+            start_page = _load_backfill_start_page(
+                conn, repo_id, checkpoint, sync_config.batch_size
+            )
+            conn.commit()
+
         result: Dict[str, Any] = {
             "success": True,
+            "start_page": start_page,
             "synced_count": 0,
             "watermark_updated": False,
             "dry_run": dry_run,
+            "pages_fetched": 0,
+            "next_page": start_page,
+            "inserted_count": 0,
+            "updated_count": 0,
+            "patches_written": 0,
+            "patches_degraded": 0,
         }
         if dry_run:
             return result
 
-        synced = insert_git_commits(conn, repo_id, commits)
-        conn.commit()
-        result["synced_count"] = synced
+        pages = iter_commit_pages(
+            client,
+            sync_config.project_id,
+            since=since,
+            until=until,
+            per_page=sync_config.batch_size,
+            start_page=start_page,
+        )
 
-        if update_watermark and commits:
-            last_commit = max(commits, key=_get_commit_sort_key)
+        # 逐页写入并与检查点一起提交：中途失败时已完成的页不会丢失，重试从检查点继续
+        last_commit: Optional[GitCommit] = None
+        for page in pages:
+            if page.commits:
+                written = insert_git_commits(conn, repo_id, page.commits)
+                result["synced_count"] += written.total
+                result["inserted_count"] += written.inserted
+                result["updated_count"] += written.updated
+                if fetch_diffs:
+                    patches = sync_commit_patches(
+                        client, conn, repo_id, page.commits, sync_config, project_key=project_key
+                    )
+                    result["patches_written"] += patches["written"]
+                    result["patches_degraded"] += patches["degraded"]
+                page_last = max(page.commits, key=_get_commit_sort_key)
+                if last_commit is None or _get_commit_sort_key(page_last) > _get_commit_sort_key(
+                    last_commit
+                ):
+                    last_commit = page_last
+            if page.next_page is None:
+                delete_cursor_value(conn, repo_id, checkpoint)
+            else:
+                set_cursor_value(
+                    conn,
+                    repo_id,
+                    checkpoint,
+                    {
+                        "next_page": page.next_page,
+                        "per_page": sync_config.batch_size,
+                        "since": since,
+                        "until": until,
+                    },
+                )
+            conn.commit()
+            result["pages_fetched"] += 1
+            result["next_page"] = page.next_page
+
+        if update_watermark and last_commit is not None:
             last_ts = _get_commit_timestamp(last_commit).isoformat().replace("+00:00", "Z")
             update_sync_cursor(
                 repo_id,
@@ -549,29 +765,246 @@ def backfill_gitlab_commits(
             pass
 
 
+# 增量同步单次运行最多处理的时间窗口数
+DEFAULT_INCREMENTAL_MAX_WINDOWS = 50
+
+# 同一窗口因 429/超时连续重试的最大次数
+DEFAULT_INCREMENTAL_MAX_RETRIES = 2
+
+
+def _format_cursor_ts(ts: datetime) -> str:
+    """格式化为游标使用的 UTC 'Z' 时间戳"""
+    return ts.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _fetch_window_commits(
+    client: GitLabClient,
+    project_id: str,
+    window: FetchWindow,
+    *,
+    per_page: int,
+    max_commits: Optional[int],
+) -> Tuple[List[GitCommit], int, bool]:
+    """
+    逐页获取窗口内的 commits
+
+    GitLab 按时间倒序返回，只有取完整个窗口才能确定最旧的 commit，
+    因此窗口是游标推进的最小单位。累计数量超过 max_commits 时提前停止，
+    由调用方缩小窗口重新获取（限制单个窗口的内存占用）。
+
+    Returns:
+        (commits, 已获取页数, 是否超出 max_commits)
+    """
+    commits: List[GitCommit] = []
+    pages = 0
+    for page in iter_commit_pages(
+        client,
+        project_id,
+        since=_format_cursor_ts(window.since),
+        until=_format_cursor_ts(window.until),
+        per_page=per_page,
+    ):
+        pages += 1
+        commits.extend(page.commits)
+        if max_commits is not None and len(commits) > max_commits and not page.is_last:
+            return commits, pages, True
+    return commits, pages, False
+
+
 def sync_gitlab_commits_incremental(
     sync_config: SyncConfig,
     *,
     project_key: str,
     dsn: Optional[str] = None,
+    client: Optional[GitLabClient] = None,
+    max_windows: int = DEFAULT_INCREMENTAL_MAX_WINDOWS,
+    max_retries: int = DEFAULT_INCREMENTAL_MAX_RETRIES,
+    now: Optional[datetime] = None,
 ) -> Dict[str, Any]:
     """
     增量同步 GitLab commits
 
+    从游标水位线 (last_commit_ts, last_commit_sha) 出发，按时间窗口向前推进直到当前时间：
+
+    1. compute_commit_fetch_window 计算窗口（首个窗口向前重叠 overlap_seconds）
+    2. 逐页获取窗口内 commits，按 (ts, sha) 相对游标去重
+    3. 按 batch_size 升序分批写入 commits 及其 diff（按 diff_mode 并发获取），
+       每批提交后按单调规则推进游标
+    4. AdaptiveWindowState 调整下一个窗口：429/超时或 commit 数超过阈值时缩小，
+       稀疏窗口放大，无新 commit 的窗口直接延伸到当前时间
+
+    因此稳态下（游标之后只有少量新 commit）每次运行只需 1~2 次 API 请求，
+    开销与新 commit 数量成正比。
+
     Args:
         sync_config: 同步配置
         project_key: 项目标识
         dsn: 数据库连接字符串（可选）
+        client: GitLab 客户端（可选，默认按 sync_config 创建）
+        max_windows: 单次运行最多处理的窗口数
+        max_retries: 同一窗口因 429/超时连续重试的最大次数
+        now: 当前时间（可选，用于测试）
 
     Returns:
-        同步结果字典
+        同步结果字典（caught_up 为 True 表示已同步到当前时间）
     """
-    # 增量同步暂时返回基本实现
-    return {
-        "success": True,
-        "synced_count": 0,
-        "message": "incremental sync not fully implemented",
-    }
+    import os
+
+    if client is None:
+        client = _get_client(sync_config)
+    if now is None:
+        now = datetime.now(timezone.utc)
+
+    inc = get_incremental_config()
+    commit_threshold = inc["adaptive_commit_threshold"]
+    state = AdaptiveWindowState(
+        current_window_seconds=sync_config.forward_window_seconds,
+        min_window_seconds=inc["forward_window_min_seconds"],
+        max_window_seconds=max(sync_config.forward_window_seconds, inc["time_window_days"] * 86400),
+        shrink_factor=inc["adaptive_shrink_factor"],
+        grow_factor=inc["adaptive_grow_factor"],
+        commit_threshold=commit_threshold,
+    )
+
+    dsn = dsn or os.environ.get("LOGBOOK_DSN") or os.environ.get("POSTGRES_DSN") or ""
+    conn = get_connection(dsn)
+
+    try:
+        repo_id = ensure_repo(
+            conn,
+            repo_type="gitlab",
+            url=f"{sync_config.gitlab_url}/{sync_config.project_id}",
+            project_key=project_key,
+        )
+        conn.commit()
+
+        watermark = load_gitlab_cursor(repo_id).watermark
+        cursor_sha: Optional[str] = str(watermark.get("last_commit_sha") or "") or None
+        cursor_ts_str: Optional[str] = str(watermark.get("last_commit_ts") or "") or None
+        cursor_ts = _parse_dt(cursor_ts_str)
+
+        # 首次同步从 time_window_days 之前开始，不做重叠
+        if cursor_ts is None:
+            scan_from = now - timedelta(days=inc["time_window_days"])
+            overlap_seconds = 0
+        else:
+            scan_from = cursor_ts
+            overlap_seconds = inc["overlap_seconds"]
+
+        result: Dict[str, Any] = {
+            "success": True,
+            "synced_count": 0,
+            "windows": 0,
+            "pages_fetched": 0,
+            "cursor_advanced": False,
+            "caught_up": False,
+            "inserted_count": 0,
+            "updated_count": 0,
+            "patches_written": 0,
+            "patches_degraded": 0,
+            "last_commit_sha": cursor_sha,
+            "last_commit_ts": cursor_ts_str,
+        }
+
+        retries = 0
+        while result["windows"] < max_windows:
+            window = compute_commit_fetch_window(
+                cursor_ts=scan_from,
+                overlap_seconds=overlap_seconds,
+                forward_window_seconds=state.current_window_seconds,
+                now=now,
+            )
+            can_shrink = state.current_window_seconds > state.min_window_seconds
+            try:
+                commits, pages, overflow = _fetch_window_commits(
+                    client,
+                    sync_config.project_id,
+                    window,
+                    per_page=sync_config.batch_size,
+                    max_commits=commit_threshold if can_shrink else None,
+                )
+            except (GitLabRateLimitError, GitLabTimeoutError) as exc:
+                if isinstance(exc, GitLabRateLimitError):
+                    state.record_rate_limit()
+                else:
+                    state.shrink(reason="timeout")
+                retries += 1
+                if retries > max_retries:
+                    # 已完成的窗口已提交并推进游标，下次运行从游标处继续
+                    result["success"] = False
+                    result["error_category"] = exc.category.value
+                    result["error"] = str(exc)
+                    break
+                continue
+
+            retries = 0
+            result["pages_fetched"] += pages
+            if overflow:
+                state.shrink(reason="commit_threshold")
+                continue
+            result["windows"] += 1
+            synced_before = result["synced_count"]
+
+            # 窗口内按 (ts, sha) 升序分批写入，每批提交后推进游标
+            while True:
+                batch = select_next_batch(commits, cursor_sha, cursor_ts, sync_config.batch_size)
+                if not batch:
+                    break
+                written = insert_git_commits(conn, repo_id, batch)
+                result["synced_count"] += written.total
+                result["inserted_count"] += written.inserted
+                result["updated_count"] += written.updated
+                patches = sync_commit_patches(
+                    client, conn, repo_id, batch, sync_config, project_key=project_key
+                )
+                result["patches_written"] += patches["written"]
+                result["patches_degraded"] += patches["degraded"]
+                conn.commit()
+
+                target = compute_batch_cursor_target(batch)
+                if target is None:
+                    break
+                target_ts, target_sha = target
+                target_ts_str = _format_cursor_ts(target_ts)
+                if should_advance_gitlab_commit_cursor(
+                    target_ts_str, target_sha, cursor_ts_str, cursor_sha
+                ):
+                    update_sync_cursor(
+                        repo_id,
+                        last_commit_sha=target_sha,
+                        last_commit_ts=target_ts_str,
+                        synced_count=len(batch),
+                    )
+                    result["cursor_advanced"] = True
+                cursor_ts, cursor_ts_str, cursor_sha = target_ts, target_ts_str, target_sha
+
+            result["last_commit_sha"] = cursor_sha
+            result["last_commit_ts"] = cursor_ts_str
+
+            if window.until >= now:
+                result["caught_up"] = True
+                break
+
+            # 调整下一个窗口：无新 commit 时直接延伸到当前时间，稀疏窗口放大
+            if result["synced_count"] == synced_before:
+                state.current_window_seconds = state.max_window_seconds
+            elif len(commits) > commit_threshold:
+                state.shrink(reason="commit_threshold")
+            elif len(commits) < commit_threshold // 2:
+                state.grow()
+
+            # 后续窗口首尾相接，边界上的重复 commit 由游标去重
+            scan_from = window.until
+            overlap_seconds = 0
+
+        result["window_seconds"] = state.current_window_seconds
+        result["rate_limit_count"] = state.rate_limit_count
+        return result
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
 
 
 def build_mr_id(repo_id: int | str, mr_iid: int | str) -> str:
@@ -652,3 +1085,124 @@ def insert_patch_blob(
     )
 
     return blob_id
+
+
+def write_commit_patches(
+    conn,
+    repo_id: int,
+    commits: List[GitCommit],
+    results: List[FetchDiffResult],
+    *,
+    project_key: str = "default",
+    diff_mode: DiffMode = DiffMode.BEST_EFFORT,
+    max_size_bytes: int = 10 * 1024 * 1024,
+) -> Dict[str, Any]:
+    """
+    将一批 diff 获取结果写入制品存储并批量 upsert 到 patch_blobs（不提交事务）
+
+    按 commits 顺序处理：成功的结果写入完整 diff；失败或格式化后超过 max_size_bytes
+    的降级为 ministat。DiffMode.ALWAYS 下除内容过大外的获取失败直接抛出 PatchFetchError
+    （内容过大重试也无法成功，始终降级）。
+
+    Returns:
+        {"written", "degraded", "blob_ids"}
+    """
+    from engram.logbook.hashing import sha256 as compute_sha256
+    from engram.logbook.scm_artifacts import write_text_artifact
+
+    rows: List[Dict[str, Any]] = []
+    degraded = 0
+    for commit, fetch_result in zip(commits, results):
+        content = ""
+        error: Optional[PatchFetchError] = None
+        if fetch_result.success:
+            content = format_diff_content(fetch_result.diffs or [])
+            size = len(content.encode("utf-8"))
+            if size > max_size_bytes:
+                error = PatchFetchContentTooLargeError(
+                    f"diff 内容过大: {size} bytes > {max_size_bytes} bytes",
+                    details={"max_size_bytes": max_size_bytes},
+                )
+        elif isinstance(fetch_result.error, PatchFetchError):
+            error = fetch_result.error
+        else:
+            error = PatchFetchError(fetch_result.error_message or "unknown")
+
+        meta_json: Dict[str, Any] = {"materialize_status": "done"}
+        patch_format = "diff"
+        if error is not None:
+            if diff_mode == DiffMode.ALWAYS and not isinstance(
+                error, PatchFetchContentTooLargeError
+            ):
+                raise error
+            content = generate_ministat_from_stats(commit.stats, commit.sha)
+            patch_format = "ministat"
+            meta_json.update(
+                {
+                    "degraded": True,
+                    "degrade_reason": error.error_category,
+                    "source_fetch_error": fetch_result.error_message or str(error),
+                }
+            )
+            if fetch_result.endpoint:
+                meta_json["original_endpoint"] = fetch_result.endpoint
+            degraded += 1
+
+        content_sha256 = compute_sha256(content.encode("utf-8"))
+        write_result = write_text_artifact(
+            project_key=project_key,
+            repo_id=repo_id,
+            source_type="git",
+            rev_or_sha=commit.sha,
+            content=content,
+            sha256=content_sha256,
+            ext=patch_format,
+        )
+        rows.append(
+            {
+                "source_type": "git",
+                "source_id": f"{repo_id}:{commit.sha}",
+                "sha256": content_sha256,
+                "uri": write_result["uri"],
+                "size_bytes": write_result["size_bytes"],
+                "format": patch_format,
+                "meta_json": meta_json,
+            }
+        )
+
+    blob_ids = upsert_patch_blobs(conn, rows)
+    return {"written": len(rows), "degraded": degraded, "blob_ids": blob_ids}
+
+
+def sync_commit_patches(
+    client: GitLabClient,
+    conn,
+    repo_id: int,
+    commits: List[GitCommit],
+    sync_config: SyncConfig,
+    *,
+    project_key: str = "default",
+) -> Dict[str, Any]:
+    """
+    并发获取一批 commits 的 diff 并批量写入（diff_mode 为 NONE 时跳过）
+
+    调用方在写入 commits 的同一事务中调用，随后统一提交并推进游标。
+    """
+    if sync_config.diff_mode == DiffMode.NONE or not commits:
+        return {"written": 0, "degraded": 0, "blob_ids": []}
+    results = fetch_commit_diffs(
+        client,
+        sync_config.project_id,
+        commits,
+        max_workers=sync_config.diff_workers,
+        max_size_bytes=sync_config.max_diff_size_bytes,
+    )
+    return write_commit_patches(
+        conn,
+        repo_id,
+        commits,
+        results,
+        project_key=project_key,
+        diff_mode=sync_config.diff_mode,
+        max_size_bytes=sync_config.max_diff_size_bytes,
+    )
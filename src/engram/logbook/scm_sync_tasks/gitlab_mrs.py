@@ -7,6 +7,7 @@ gitlab_mrs - GitLab MRs 同步核心实现
 功能:
 - GitLab MR 获取与解析
 - MR 状态映射
+- MR 详情/评审数据并发获取与 review 事件构建
 - 数据库写入
 
 设计原则:
@@ -16,17 +17,20 @@ gitlab_mrs - GitLab MRs 同步核心实现
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from engram.logbook.gitlab_client import GitLabClient
+from engram.logbook.cursor import load_gitlab_reviews_cursor, save_gitlab_reviews_cursor
+from engram.logbook.gitlab_client import GitLabClient, get_shared_client, map_bounded
 from engram.logbook.scm_db import (
-    get_conn as get_connection,
+    BulkUpsertResult,
+    bulk_insert_review_events,
+    bulk_upsert_mrs,
+    upsert_repo,
 )
 from engram.logbook.scm_db import (
-    upsert_mr,
-    upsert_repo,
+    get_conn as get_connection,
 )
 
 # ============ 数据类定义 ============
@@ -52,6 +56,28 @@ class GitLabMergeRequest:
     web_url: str = ""
 
 
+# 每个 MR 需要获取的详情部分（与 MergeRequestDetails 字段同名）
+MR_DETAIL_PARTS = ("detail", "discussions", "notes", "approvals", "state_events")
+
+
+@dataclass
+class MergeRequestDetails:
+    """单个 MR 的详情与评审数据（任一部分获取失败时 error 非空）"""
+
+    iid: int
+    detail: Dict[str, Any] = field(default_factory=dict)
+    discussions: List[Dict[str, Any]] = field(default_factory=list)
+    notes: List[Dict[str, Any]] = field(default_factory=list)
+    approvals: Dict[str, Any] = field(default_factory=dict)
+    state_events: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    error_category: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
 # ============ 解析函数 ============
 
 
@@ -123,6 +149,243 @@ def ensure_repo(
     )
 
 
+# ============ MR 详情并发获取 ============
+
+# 同一 MR 详情获取连续失败达到该次数后跳过（记入 dead_mr_iids），避免阻塞游标
+DEFAULT_MAX_MR_FAILURES = 3
+
+# 游标中保留的 dead_mr_iids 数量上限
+_MAX_DEAD_MR_IIDS = 100
+
+# resource_state_events 的 state 到 review 事件类型的映射
+_STATE_EVENT_TYPES = {"merged": "merge", "closed": "close", "reopened": "reopen"}
+
+
+def _collect_pages(pages) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    for page in pages:
+        items.extend(page.items)
+    return items
+
+
+def _fetch_mr_part(
+    client: GitLabClient,
+    project_id: str,
+    iid: int,
+    part: str,
+    per_page: int,
+) -> Tuple[Any, Optional[Exception]]:
+    """获取单个 MR 的一个详情部分（不抛异常，失败时返回异常对象）"""
+    try:
+        if part == "detail":
+            return client.get_merge_request_detail(project_id, iid), None
+        if part == "discussions":
+            return _collect_pages(client.iter_mr_discussions(project_id, iid, per_page)), None
+        if part == "notes":
+            return _collect_pages(client.iter_mr_notes(project_id, iid, per_page)), None
+        if part == "approvals":
+            return client.get_mr_approvals(project_id, iid), None
+        pages = client.iter_mr_resource_state_events(project_id, iid, per_page)
+        return _collect_pages(pages), None
+    except Exception as exc:
+        return None, exc
+
+
+def fetch_merge_request_details(
+    client: GitLabClient,
+    project_id: str,
+    iids: List[int],
+    *,
+    max_workers: int,
+    per_page: int = 100,
+) -> List[MergeRequestDetails]:
+    """
+    并发获取一批 MR 的详情、discussions、notes、approvals 与状态事件，结果顺序与 iids 一致
+
+    每个 (MR, 部分) 是一个独立任务，按 MR 顺序排列后交给 map_bounded，
+    因此同一 MR 的多个端点与不同 MR 之间同时并发；discussions/notes/状态事件逐页取全。
+    所有请求仍经过 client 的并发限制器与速率限制器。
+    某个部分失败只标记对应 MR（error 取首个失败部分），不影响其它 MR。
+    """
+    from engram.logbook.scm_sync_errors import classify_exception
+
+    tasks = [(iid, part) for iid in iids for part in MR_DETAIL_PARTS]
+    outcomes = map_bounded(
+        lambda task: _fetch_mr_part(client, project_id, task[0], task[1], per_page),
+        tasks,
+        max_workers=max_workers,
+        concurrency_limiter=client.concurrency_limiter,
+    )
+
+    details = {iid: MergeRequestDetails(iid=iid) for iid in iids}
+    for (iid, part), (data, exc) in zip(tasks, outcomes):
+        item = details[iid]
+        if exc is not None:
+            if item.error is None:
+                item.error_category, message = classify_exception(exc)
+                item.error = f"{part}: {message}"
+            continue
+        if data:
+            setattr(item, part, data)
+    return [details[iid] for iid in iids]
+
+
+def build_review_events(mr_id: str, details: MergeRequestDetails) -> List[Dict[str, Any]]:
+    """
+    将 MR 评审数据转换为 scm.review_events 行
+
+    - 非系统 note -> comment（source_event_id 为 note:<id>，discussions 与 notes 中的同一 note 只保留一条）
+    - approvals.approved_by -> approve（approval:<user_id>，GitLab 不返回审批时间，ts 为写入时间）
+    - 状态事件 merged/closed/reopened -> merge/close/reopen（state_event:<id>）
+
+    reviewer_user_id 需要经过身份映射，这里不填写，用户名保存在 payload_json.author_username。
+    """
+    events: List[Dict[str, Any]] = []
+    seen_notes = set()
+
+    def _add_note(note: Dict[str, Any], discussion_id: Optional[str]) -> None:
+        note_id = note.get("id")
+        if note_id is None or note.get("system") or note_id in seen_notes:
+            return
+        seen_notes.add(note_id)
+        events.append(
+            {
+                "mr_id": mr_id,
+                "source_event_id": f"note:{note_id}",
+                "event_type": "comment",
+                "ts": _parse_dt(note.get("created_at")),
+                "payload_json": {
+                    "author_username": (note.get("author") or {}).get("username"),
+                    "body": note.get("body"),
+                    "discussion_id": discussion_id,
+                    "resolvable": note.get("resolvable"),
+                    "resolved": note.get("resolved"),
+                    "position": note.get("position"),
+                },
+            }
+        )
+
+    for discussion in details.discussions:
+        for note in discussion.get("notes") or []:
+            _add_note(note, discussion.get("id"))
+    for note in details.notes:
+        _add_note(note, None)
+
+    for approver in details.approvals.get("approved_by") or []:
+        user = approver.get("user") or {}
+        if user.get("id") is None:
+            continue
+        events.append(
+            {
+                "mr_id": mr_id,
+                "source_event_id": f"approval:{user['id']}",
+                "event_type": "approve",
+                "ts": None,
+                "payload_json": {"author_username": user.get("username")},
+            }
+        )
+
+    for state_event in details.state_events:
+        event_type = _STATE_EVENT_TYPES.get(state_event.get("state") or "")
+        if event_type is None or state_event.get("id") is None:
+            continue
+        events.append(
+            {
+                "mr_id": mr_id,
+                "source_event_id": f"state_event:{state_event['id']}",
+                "event_type": event_type,
+                "ts": _parse_dt(state_event.get("created_at")),
+                "payload_json": {
+                    "author_username": (state_event.get("user") or {}).get("username"),
+                    "state": state_event.get("state"),
+                },
+            }
+        )
+    return events
+
+
+def _mr_sort_key(mr: GitLabMergeRequest) -> Tuple[datetime, int]:
+    return (mr.updated_at or datetime.min.replace(tzinfo=timezone.utc), mr.iid)
+
+
+def _format_cursor_ts(ts: datetime) -> str:
+    """格式化为游标使用的 UTC 'Z' 时间戳"""
+    return ts.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def compute_reviews_cursor_target(
+    mrs: List[GitLabMergeRequest],
+    details: List[MergeRequestDetails],
+    skip_iids: Optional[Set[int]] = None,
+) -> Optional[Tuple[datetime, int]]:
+    """
+    计算 reviews 游标可推进到的位置
+
+    mrs 已按 (updated_at, iid) 升序排列，details 与之一一对应。
+    游标只推进到从头开始连续成功的最后一个 MR；首个失败之后的 MR 即使已写入，
+    也会在下次运行时重新获取（写入按幂等键去重）。
+    skip_iids 中的 MR（连续失败次数已达上限）视为已处理，游标可越过。
+
+    Returns:
+        (updated_at, iid)，没有可推进的前缀时返回 None
+    """
+    skip_iids = skip_iids or set()
+    target: Optional[Tuple[datetime, int]] = None
+    for mr, item in zip(mrs, details):
+        if (not item.success and mr.iid not in skip_iids) or mr.updated_at is None:
+            break
+        target = (mr.updated_at, mr.iid)
+    return target
+
+
+def list_merge_requests_after(
+    client: GitLabClient,
+    project_id: str,
+    cursor: Optional[Tuple[datetime, int]],
+    *,
+    batch_size: int,
+) -> Tuple[List[GitLabMergeRequest], bool]:
+    """
+    列出 (updated_at, iid) 严格大于游标的一批 MR
+
+    GitLab 只能按 updated_at 排序，updated_after 又包含边界，同一时间戳的 MR
+    在页间顺序不确定。为保证按 (updated_at, iid) 推进游标时不漏掉同时间戳的 MR：
+
+    - 页满时，与本页最后一个 MR 同时间戳的 MR 可能延续到下一页，暂不返回
+    - 若候选 MR 全部落在该时间戳上（或已全部同步），继续翻页直到该时间戳结束，
+      因此超过 batch_size 个 MR 共享同一 updated_at 时游标也不会停滞
+
+    Returns:
+        (按 (updated_at, iid) 升序的 MR 列表, 游标之后是否还有 MR)
+    """
+    updated_after = _format_cursor_ts(cursor[0]) if cursor is not None else None
+    collected: List[GitLabMergeRequest] = []
+    page = 1
+    while True:
+        raw_mrs = client.get_merge_requests(
+            project_id,
+            state="all",
+            updated_after=updated_after,
+            per_page=batch_size,
+            page=page,
+            order_by="updated_at",
+            sort="asc",
+        )
+        collected.extend(parse_merge_request(item) for item in raw_mrs)
+        candidates = sorted(
+            (mr for mr in collected if cursor is None or _mr_sort_key(mr) > cursor),
+            key=_mr_sort_key,
+        )
+        if len(raw_mrs) < batch_size:
+            return candidates, False
+
+        boundary = max(_mr_sort_key(mr)[0] for mr in collected)
+        complete = [mr for mr in candidates if _mr_sort_key(mr)[0] < boundary]
+        if complete:
+            return complete, True
+        page += 1
+
+
 # ============ 数据库操作 ============
 
 
@@ -130,32 +393,29 @@ def insert_merge_requests(
     conn,
     repo_id: int,
     mrs: List[GitLabMergeRequest],
-) -> int:
-    """插入 MRs 到数据库"""
-    count = 0
+) -> BulkUpsertResult:
+    """批量写入 MRs（单条 SQL，按 mr_id upsert）"""
+    rows: List[Dict[str, Any]] = []
     for mr in mrs:
-        mr_id = build_mr_id(repo_id, mr.iid)
-        status = map_gitlab_state_to_status(mr.state)
-        meta_json = {
-            "source_branch": mr.source_branch,
-            "target_branch": mr.target_branch,
-            "merge_commit_sha": mr.merge_commit_sha,
-            "created_at": mr.created_at.isoformat() if mr.created_at else None,
-            "updated_at": mr.updated_at.isoformat() if mr.updated_at else None,
-            "merged_at": mr.merged_at.isoformat() if mr.merged_at else None,
-        }
-        upsert_mr(
-            conn,
-            mr_id=mr_id,
-            repo_id=repo_id,
-            status=status,
-            url=mr.web_url,
-            author_user_id=mr.author_username or str(mr.author_id) if mr.author_id else None,
-            meta_json=meta_json,
-            source_id=f"gitlab_mr:{repo_id}:{mr.iid}",
+        rows.append(
+            {
+                "mr_id": build_mr_id(repo_id, mr.iid),
+                "repo_id": repo_id,
+                "status": map_gitlab_state_to_status(mr.state),
+                "url": mr.web_url,
+                "author_user_id": mr.author_username or str(mr.author_id) if mr.author_id else None,
+                "meta_json": {
+                    "source_branch": mr.source_branch,
+                    "target_branch": mr.target_branch,
+                    "merge_commit_sha": mr.merge_commit_sha,
+                    "created_at": mr.created_at.isoformat() if mr.created_at else None,
+                    "updated_at": mr.updated_at.isoformat() if mr.updated_at else None,
+                    "merged_at": mr.merged_at.isoformat() if mr.merged_at else None,
+                },
+                "source_id": f"gitlab_mr:{repo_id}:{mr.iid}",
+            }
         )
-        count += 1
-    return count
+    return bulk_upsert_mrs(conn, rows)
 
 
 # ============ 同步主函数 ============
@@ -194,7 +454,8 @@ def backfill_gitlab_mrs(
     """
     import os
 
-    client = GitLabClient(gitlab_url, private_token=token)
+    # 优先使用 worker 安装的共享客户端（同一实例复用会话）
+    client = get_shared_client(gitlab_url, token) or GitLabClient(gitlab_url, private_token=token)
 
     # 获取 MRs
     raw_mrs = client.get_merge_requests(
@@ -210,6 +471,7 @@ def backfill_gitlab_mrs(
         "synced_count": 0,
         "scanned_count": len(mrs),
         "inserted_count": 0,
+        "updated_count": 0,
         "watermark_updated": False,
         "dry_run": dry_run,
     }
@@ -231,11 +493,12 @@ def backfill_gitlab_mrs(
         )
         conn.commit()
 
-        synced = insert_merge_requests(conn, repo_id, mrs)
+        written = insert_merge_requests(conn, repo_id, mrs)
         conn.commit()
 
-        result["synced_count"] = synced
-        result["inserted_count"] = synced
+        result["synced_count"] = written.total
+        result["inserted_count"] = written.inserted
+        result["updated_count"] = written.updated
 
         return result
     finally:
@@ -252,9 +515,25 @@ def sync_gitlab_mrs_incremental(
     token: str,
     project_key: str,
     dsn: Optional[str] = None,
+    batch_size: int = 100,
+    max_workers: int = 4,
+    max_mr_failures: int = DEFAULT_MAX_MR_FAILURES,
+    dry_run: bool = False,
+    update_watermark: bool = True,
+    client: Optional[GitLabClient] = None,
 ) -> Dict[str, Any]:
     """
-    增量同步 GitLab MRs
+    增量同步 GitLab MRs 及其评审事件
+
+    从 reviews 游标 (last_mr_updated_at, last_mr_iid) 出发：
+
+    1. list_merge_requests_after 按 updated_at 升序列出 (updated_at, iid) 大于游标的一批 MR
+    2. fetch_merge_request_details 并发获取每个 MR 的详情、discussions、notes、
+       approvals 与状态事件
+    3. 获取成功的 MR 批量写入 scm.mrs，其评审事件批量写入 scm.review_events，然后提交
+    4. 游标只推进到连续成功的前缀末尾（compute_reviews_cursor_target）；
+       失败 MR 的连续失败次数记入游标 mr_failures，达到 max_mr_failures 后
+       跳过该 MR（记入 dead_mr_iids），游标不再被其阻塞
 
     Args:
         gitlab_url: GitLab 实例 URL
@@ -262,15 +541,145 @@ def sync_gitlab_mrs_incremental(
         token: API token
         project_key: 项目标识
         dsn: 数据库连接字符串（可选）
+        batch_size: 每次运行处理的 MR 数（一页）
+        max_workers: 详情获取的最大线程数（仍受客户端并发上限约束）
+        max_mr_failures: 单个 MR 连续失败多少次后跳过
+        dry_run: 是否模拟运行（只获取不写入）
+        update_watermark: 是否推进游标
+        client: GitLab 客户端（可选，默认使用共享客户端）
 
     Returns:
-        同步结果字典
+        同步结果字典（has_more 为 True 表示游标之后仍有待同步的 MR）
     """
-    # 增量同步暂时返回基本实现
-    return {
-        "success": True,
-        "synced_count": 0,
-        "scanned_count": 0,
-        "inserted_count": 0,
-        "message": "gitlab_mrs incremental sync stub",
-    }
+    import os
+
+    if client is None:
+        client = get_shared_client(gitlab_url, token) or GitLabClient(
+            gitlab_url, private_token=token
+        )
+
+    dsn = dsn or os.environ.get("LOGBOOK_DSN") or os.environ.get("POSTGRES_DSN") or ""
+    conn = get_connection(dsn)
+
+    try:
+        repo_id = ensure_repo(
+            conn,
+            repo_type="gitlab",
+            url=f"{gitlab_url}/{project_id}",
+            project_key=project_key,
+        )
+        conn.commit()
+
+        watermark = load_gitlab_reviews_cursor(repo_id).watermark
+        cursor_ts_str: Optional[str] = str(watermark.get("last_mr_updated_at") or "") or None
+        cursor_ts = _parse_dt(cursor_ts_str)
+        cursor_iid = int(str(watermark.get("last_mr_iid") or 0))
+        raw_failures = watermark.get("mr_failures")
+        raw_dead = watermark.get("dead_mr_iids")
+        prior_failures = (
+            {str(iid): int(count) for iid, count in raw_failures.items()}
+            if isinstance(raw_failures, dict)
+            else {}
+        )
+        dead_mr_iids = [int(iid) for iid in raw_dead] if isinstance(raw_dead, list) else []
+
+        mrs, has_more = list_merge_requests_after(
+            client,
+            project_id,
+            (cursor_ts, cursor_iid) if cursor_ts is not None else None,
+            batch_size=batch_size,
+        )
+
+        details = fetch_merge_request_details(
+            client, project_id, [mr.iid for mr in mrs], max_workers=max_workers
+        )
+        failed = [item for item in details if not item.success]
+
+        # 连续失败计数（本次成功或未出现的 MR 清零）；达到上限的 MR 跳过
+        mr_failures = {str(item.iid): prior_failures.get(str(item.iid), 0) + 1 for item in failed}
+        skipped = {item.iid for item in failed if mr_failures[str(item.iid)] >= max_mr_failures}
+
+        result: Dict[str, Any] = {
+            "success": not failed,
+            "synced_count": 0,
+            "scanned_count": len(mrs),
+            "inserted_count": 0,
+            "updated_count": 0,
+            "synced_mr_count": 0,
+            "synced_event_count": 0,
+            "skipped_event_count": 0,
+            "failed_mr_count": len(failed),
+            "has_more": has_more or bool(failed),
+            "watermark_updated": False,
+            "dry_run": dry_run,
+            "last_mr_updated_at": cursor_ts_str,
+            "last_mr_iid": cursor_iid or None,
+        }
+        if failed:
+            result["error"] = failed[0].error
+            result["error_category"] = failed[0].error_category
+            result["failed_mr_iids"] = [item.iid for item in failed]
+        if skipped:
+            result["skipped_mr_iids"] = sorted(skipped)
+
+        if dry_run:
+            return result
+
+        # 详情接口返回的字段更完整，缺失时退回列表数据
+        completed = [
+            (parse_merge_request(item.detail) if item.detail else mr)
+            for mr, item in zip(mrs, details)
+            if item.success
+        ]
+        events: List[Dict[str, Any]] = []
+        for mr, item in zip(mrs, details):
+            if item.success:
+                events.extend(build_review_events(build_mr_id(repo_id, mr.iid), item))
+
+        written = insert_merge_requests(conn, repo_id, completed)
+        written_events = bulk_insert_review_events(conn, events)
+        conn.commit()
+
+        result["synced_count"] = written.total
+        result["inserted_count"] = written.inserted
+        result["updated_count"] = written.updated
+        result["synced_mr_count"] = len(completed)
+        result["synced_event_count"] = written_events.inserted
+        result["skipped_event_count"] = written_events.skipped
+
+        target = compute_reviews_cursor_target(mrs, details, skip_iids=skipped)
+        # 被越过的 MR 不会再被列出：跳过的记入 dead_mr_iids，其余失败计数保留
+        if target is not None:
+            passed = {mr.iid for mr in mrs if _mr_sort_key(mr) <= target}
+            mr_failures = {k: v for k, v in mr_failures.items() if int(k) not in passed}
+            dead_mr_iids = (dead_mr_iids + sorted(skipped & passed))[-_MAX_DEAD_MR_IIDS:]
+        if update_watermark and (target is not None or mr_failures != prior_failures):
+            extra: Dict[str, Any] = {}
+            if mr_failures:
+                extra["mr_failures"] = mr_failures
+            if dead_mr_iids:
+                extra["dead_mr_iids"] = dead_mr_iids
+            if target is not None:
+                target_ts_str: Optional[str] = _format_cursor_ts(target[0])
+                target_iid: Optional[int] = target[1]
+            else:
+                target_ts_str, target_iid = cursor_ts_str, cursor_iid or None
+            save_gitlab_reviews_cursor(
+                repo_id,
+                last_mr_updated_at=target_ts_str,
+                last_mr_iid=target_iid,
+                synced_mr_count=len(completed),
+                synced_event_count=written_events.inserted,
+                **extra,
+            )
+            if target is not None:
+                result["watermark_updated"] = True
+                result["last_mr_updated_at"] = target_ts_str
+                result["last_mr_iid"] = target_iid
+
+        return result
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
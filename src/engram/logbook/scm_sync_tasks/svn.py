@@ -19,22 +19,29 @@ svn - SVN 同步核心实现
 from __future__ import annotations
 
 import subprocess
+import tempfile
+import threading
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime
 from types import SimpleNamespace
-from typing import Any, Dict, Iterable, List, Optional
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
 
 from engram.logbook.config import get_svn_auth
 from engram.logbook.cursor import load_svn_cursor, save_svn_cursor
 from engram.logbook.errors import ValidationError
+from engram.logbook.gitlab_client import ConcurrencyLimiter
 from engram.logbook.scm_db import (
-    get_conn as get_connection,
+    bulk_upsert_svn_revisions,
+    upsert_patch_blobs,
+    upsert_repo,
 )
 from engram.logbook.scm_db import (
-    upsert_repo,
-    upsert_svn_revision,
+    get_conn as get_connection,
 )
+from engram.logbook.scm_sync_policy import SvnPatchFetchController
 
 # ============ 异常定义 ============
 
@@ -117,6 +124,12 @@ class SyncConfig:
     username: Optional[str] = None
     password: Optional[str] = None
     timeout: int = 120
+    # 流模式：边读 svn log 边解析，每 batch_size 个 revision 写库并推进游标
+    stream: bool = False
+    # patch 获取并发：线程数与同一 SVN 服务器的并发上限
+    patch_workers: int = 4
+    patch_host_limit: int = 4
+    max_patch_size_bytes: int = 10 * 1024 * 1024
 
 
 # ============ 解析函数 ============
@@ -134,6 +147,34 @@ def _parse_dt(value: Optional[str]) -> Optional[datetime]:
         return None
 
 
+def _parse_logentry(entry: ET.Element) -> SvnRevision:
+    """解析单个 <logentry> 元素"""
+    changed_paths: List[Dict[str, Any]] = []
+    for path in entry.findall("./paths/path"):
+        item: Dict[str, Any] = {
+            "path": path.text or "",
+            "action": path.get("action"),
+            "kind": path.get("kind"),
+        }
+        copyfrom_path = path.get("copyfrom-path")
+        copyfrom_rev = path.get("copyfrom-rev")
+        if copyfrom_path:
+            item["copyfrom_path"] = copyfrom_path
+        if copyfrom_rev:
+            try:
+                item["copyfrom_rev"] = int(copyfrom_rev)
+            except Exception:
+                item["copyfrom_rev"] = copyfrom_rev
+        changed_paths.append(item)
+    return SvnRevision(
+        revision=int(entry.get("revision", "0")),
+        author=entry.findtext("author") or "",
+        date=_parse_dt(entry.findtext("date")),
+        message=entry.findtext("msg") or "",
+        changed_paths=changed_paths,
+    )
+
+
 def parse_svn_log_xml(xml_content: str) -> List[SvnRevision]:
     """解析 SVN log XML 输出"""
     if not xml_content.strip():
@@ -142,39 +183,43 @@ def parse_svn_log_xml(xml_content: str) -> List[SvnRevision]:
         root = ET.fromstring(xml_content)
     except Exception as exc:
         raise SvnParseError(f"无法解析 SVN log XML: {exc}") from exc
-    revisions: List[SvnRevision] = []
-    for entry in root.findall("logentry"):
-        revision = int(entry.get("revision", "0"))
-        author = entry.findtext("author") or ""
-        date = _parse_dt(entry.findtext("date"))
-        message = entry.findtext("msg") or ""
-        changed_paths: List[Dict[str, Any]] = []
-        for path in entry.findall("./paths/path"):
-            item: Dict[str, Any] = {
-                "path": path.text or "",
-                "action": path.get("action"),
-                "kind": path.get("kind"),
-            }
-            copyfrom_path = path.get("copyfrom-path")
-            copyfrom_rev = path.get("copyfrom-rev")
-            if copyfrom_path:
-                item["copyfrom_path"] = copyfrom_path
-            if copyfrom_rev:
-                try:
-                    item["copyfrom_rev"] = int(copyfrom_rev)
-                except Exception:
-                    item["copyfrom_rev"] = copyfrom_rev
-            changed_paths.append(item)
-        revisions.append(
-            SvnRevision(
-                revision=revision,
-                author=author,
-                date=date,
-                message=message,
-                changed_paths=changed_paths,
-            )
-        )
-    return revisions
+    return [_parse_logentry(entry) for entry in root.findall("logentry")]
+
+
+def iter_svn_log_entries(stream: IO[bytes]) -> Iterator[SvnRevision]:
+    """
+    流式解析 SVN log XML
+
+    使用 iterparse 逐个产出 <logentry>，产出后立即清理已处理的元素，
+    内存占用只与单个 revision 的大小有关，与日志总长度无关。
+    """
+    root: Optional[ET.Element] = None
+    try:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag != "logentry":
+                continue
+            yield _parse_logentry(elem)
+            elem.clear()
+            if root is not None:
+                root.remove(elem)
+    except ET.ParseError as exc:
+        raise SvnParseError(f"无法解析 SVN log XML: {exc}") from exc
+
+
+def iter_batches(items: Iterable[SvnRevision], size: int) -> Iterator[List[SvnRevision]]:
+    """按 size 切分为批次（size <= 0 时整体作为一批）"""
+    batch: List[SvnRevision] = []
+    for item in items:
+        batch.append(item)
+        if size > 0 and len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 
 # ============ SVN 命令函数 ============
@@ -226,6 +271,58 @@ def fetch_svn_log_xml(
     return proc.stdout
 
 
+def stream_svn_log(
+    svn_url: str,
+    *,
+    start_rev: int,
+    end_rev: int,
+    verbose: bool = False,
+    timeout: int = 120,
+) -> Iterator[SvnRevision]:
+    """
+    以流模式获取 SVN log
+
+    svn log 的 stdout 通过管道直接交给 iter_svn_log_entries，不再一次性读入整个输出。
+    timeout 仅约束输出结束后等待进程退出的时间；调用方提前停止迭代时进程会被终止。
+    """
+    cmd = ["svn", "log", "--xml", "-r", f"{start_rev}:{end_rev}"]
+    if verbose:
+        cmd.append("-v")
+    cmd.append(svn_url)
+    # stderr 写入临时文件，避免长时间流式读取 stdout 时 stderr 管道写满阻塞 svn 进程
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+
+        def _wait() -> int:
+            # 超时转换为 SvnTimeoutError，进程由 finally 终止
+            try:
+                return proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired as exc:
+                raise SvnTimeoutError("svn log 超时") from exc
+
+        finished = False
+        try:
+            assert proc.stdout is not None
+            try:
+                yield from iter_svn_log_entries(proc.stdout)
+            except SvnParseError:
+                # svn 异常退出时输出被截断，优先报告命令错误
+                if _wait() == 0:
+                    raise
+            returncode = _wait()
+            if returncode != 0:
+                stderr_file.seek(0)
+                detail = stderr_file.read().decode("utf-8", errors="replace").strip()
+                raise SvnCommandError(f"svn log 命令执行失败: {detail}")
+            finished = True
+        finally:
+            if proc.stdout is not None:
+                proc.stdout.close()
+            if not finished and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+
 def _mask_svn_command_for_log(cmd: List[str]) -> str:
     """掩码 SVN 命令中的密码"""
     masked: List[str] = []
@@ -427,20 +524,147 @@ def insert_svn_revisions(
     revisions: List[SvnRevision],
     config: Optional[SyncConfig] = None,
 ) -> int:
-    """插入 SVN revisions 到数据库"""
-    count = 0
-    for rev in revisions:
-        upsert_svn_revision(
-            conn,
-            repo_id,
-            rev.revision,
-            author_raw=rev.author,
-            ts=rev.date.isoformat() if rev.date else None,
-            message=rev.message,
-            source_id=str(rev.revision),
+    """批量写入 SVN revisions（单条 SQL，按 (repo_id, rev_num) upsert），返回写入行数"""
+    return bulk_upsert_svn_revisions(
+        conn,
+        repo_id,
+        [
+            {
+                "rev_num": rev.revision,
+                "author_raw": rev.author,
+                "ts": rev.date.isoformat() if rev.date else None,
+                "message": rev.message,
+                "source_id": str(rev.revision),
+            }
+            for rev in revisions
+        ],
+    ).total
+
+
+_host_limiters: Dict[str, ConcurrencyLimiter] = {}
+_host_limiters_lock = threading.Lock()
+
+
+def get_host_limiter(svn_url: str, max_concurrency: int) -> ConcurrencyLimiter:
+    """
+    获取 SVN 服务器级并发限制器
+
+    同一进程内按 host 共享，多个仓库/任务同时获取同一服务器的 diff 时合计并发不超过上限。
+    上限以首次创建时的 max_concurrency 为准。
+    """
+    host = urlparse(svn_url).netloc or svn_url
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = ConcurrencyLimiter(max_concurrency)
+            _host_limiters[host] = limiter
+        return limiter
+
+
+def iter_svn_diffs(
+    svn_url: str,
+    revisions: List[SvnRevision],
+    *,
+    max_workers: int = 1,
+    per_host_limit: int = 4,
+    timeout: int = 120,
+    max_size_bytes: Optional[int] = None,
+    controller: Optional[SvnPatchFetchController] = None,
+) -> Iterator[Tuple[SvnRevision, Optional[FetchDiffResult]]]:
+    """
+    并发获取 revisions 的 diff，按完成顺序产出 (revision, result)
+
+    每个 svn diff 子进程受 get_host_limiter 的服务器级并发上限约束，超时与大小限制逐个生效。
+    controller 按完成顺序记录结果；触发暂停后取消尚未开始的获取，对应 result 为 None。
+    """
+    limiter = get_host_limiter(svn_url, per_host_limit)
+    paused = False
+
+    def _fetch(rev: SvnRevision) -> Optional[FetchDiffResult]:
+        if controller is not None and controller.should_skip_patches:
+            return None
+        with limiter:
+            return fetch_svn_diff(
+                svn_url, revision=rev.revision, timeout=timeout, max_size_bytes=max_size_bytes
+            )
+
+    def _record(result: Optional[FetchDiffResult]) -> bool:
+        if controller is None or result is None or paused:
+            return paused
+        if result.success:
+            controller.record_success()
+            return False
+        return controller.record_error(result.error_category or "error")
+
+    workers = min(max_workers, per_host_limit, len(revisions))
+    if workers <= 1:
+        for rev in revisions:
+            result = None if paused else _fetch(rev)
+            paused = _record(result)
+            yield rev, result
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="svn-diff") as pool:
+        futures = {pool.submit(_fetch, rev): rev for rev in revisions}
+        for future in as_completed(futures):
+            if future.cancelled():
+                yield futures[future], None
+                continue
+            result = future.result()
+            if _record(result) and not paused:
+                paused = True
+                for pending in futures:
+                    pending.cancel()
+            yield futures[future], result
+
+
+def _build_patch_row(
+    repo_id: int,
+    rev: SvnRevision,
+    result: FetchDiffResult,
+    *,
+    project_key: str,
+) -> Dict[str, Any]:
+    """写入单个 revision 的 diff 制品（失败时降级为 ministat），返回 patch_blobs 行"""
+    from engram.logbook.hashing import sha256 as compute_sha256
+    from engram.logbook.scm_artifacts import write_text_artifact
+
+    meta_json: Dict[str, Any] = {"materialize_status": "done"}
+    if result.success:
+        content = result.content
+        patch_format = "diff"
+    else:
+        content = generate_ministat_from_changed_paths(rev.changed_paths, revision=rev.revision)
+        patch_format = "ministat"
+        meta_json.update(
+            {
+                "degraded": True,
+                "degrade_reason": result.error_category,
+                "source_fetch_error": result.error_message,
+            }
         )
-        count += 1
-    return count
+        if result.endpoint:
+            meta_json["original_endpoint"] = result.endpoint
+
+    content_sha256 = compute_sha256(content.encode("utf-8"))
+    write_result = write_text_artifact(
+        project_key=project_key,
+        repo_id=repo_id,
+        source_type="svn",
+        rev_or_sha=f"r{rev.revision}",
+        content=content,
+        sha256=content_sha256,
+        ext=patch_format,
+    )
+    return {
+        "source_type": "svn",
+        "source_id": f"{repo_id}:{rev.revision}",
+        "sha256": content_sha256,
+        "uri": write_result["uri"],
+        "size_bytes": write_result["size_bytes"],
+        "format": patch_format,
+        "meta_json": meta_json,
+    }
 
 
 def sync_patches_for_revisions(
@@ -448,14 +672,52 @@ def sync_patches_for_revisions(
     revisions: List[SvnRevision],
     *,
     max_size_bytes: Optional[int] = None,
+    conn=None,
+    repo_id: Optional[int] = None,
+    project_key: str = "default",
+    max_workers: int = 1,
+    per_host_limit: int = 4,
+    timeout: int = 120,
+    controller: Optional[SvnPatchFetchController] = None,
+    flush_size: int = 100,
 ) -> Dict[str, Any]:
-    """同步 revisions 的 patches"""
-    total = len(revisions)
+    """
+    同步 revisions 的 patches
+
+    diff 通过 iter_svn_diffs 并发获取；传入 conn 与 repo_id 时，结果按完成顺序写入制品，
+    每累积 flush_size 行批量 upsert 一次 patch_blobs（不提交事务）。
+    """
+    controller = controller or SvnPatchFetchController()
     success = 0
     failed = 0
+    skipped = 0
+    degraded = 0
+    bulk_count = 0
     patches: List[Dict[str, Any]] = []
-    for rev in revisions:
-        result = fetch_svn_diff(svn_url, revision=rev.revision, max_size_bytes=max_size_bytes)
+    pending_rows: List[Dict[str, Any]] = []
+
+    def _flush() -> None:
+        nonlocal bulk_count
+        if pending_rows:
+            upsert_patch_blobs(conn, pending_rows)
+            bulk_count += len(pending_rows)
+            pending_rows.clear()
+
+    for rev, result in iter_svn_diffs(
+        svn_url,
+        revisions,
+        max_workers=max_workers,
+        per_host_limit=per_host_limit,
+        timeout=timeout,
+        max_size_bytes=max_size_bytes,
+        controller=controller,
+    ):
+        if result is None:
+            skipped += 1
+            patches.append(
+                {"revision": rev.revision, "success": False, "error_category": "skipped"}
+            )
+            continue
         if result.success:
             success += 1
         else:
@@ -467,16 +729,100 @@ def sync_patches_for_revisions(
                 "error_category": result.error_category,
             }
         )
+        if conn is not None and repo_id is not None:
+            pending_rows.append(_build_patch_row(repo_id, rev, result, project_key=project_key))
+            degraded += 0 if result.success else 1
+            if len(pending_rows) >= flush_size:
+                _flush()
+    if conn is not None:
+        _flush()
+
+    patches.sort(key=lambda item: item["revision"])
     return {
-        "total": total,
+        "total": len(revisions),
         "success": success,
         "failed": failed,
-        "skipped": 0,
-        "bulk_count": 0,
+        "skipped": skipped,
+        "degraded": degraded,
+        "bulk_count": bulk_count,
+        "skip_reason": controller.skip_reason,
         "patches": patches,
     }
 
 
+def sync_revision_patches(
+    conn,
+    repo_id: int,
+    revisions: List[SvnRevision],
+    sync_config: SyncConfig,
+    *,
+    project_key: str = "default",
+    controller: Optional[SvnPatchFetchController] = None,
+) -> Dict[str, Any]:
+    """按 SyncConfig 的并发与大小限制获取并写入一批 revisions 的 patches（不提交事务）"""
+    return sync_patches_for_revisions(
+        sync_config.svn_url,
+        revisions,
+        max_size_bytes=sync_config.max_patch_size_bytes,
+        conn=conn,
+        repo_id=repo_id,
+        project_key=project_key,
+        max_workers=sync_config.patch_workers,
+        per_host_limit=sync_config.patch_host_limit,
+        timeout=sync_config.timeout,
+        controller=controller,
+    )
+
+
+def flush_revision_batches(
+    conn,
+    repo_id: int,
+    revisions: Iterable[SvnRevision],
+    sync_config: SyncConfig,
+    *,
+    advance_cursor: bool = True,
+    fetch_patches: bool = False,
+    project_key: str = "default",
+) -> Dict[str, Any]:
+    """
+    分批写入 revisions 并逐批提交
+
+    每批写入后立即 commit，advance_cursor 时同时把游标推进到该批最大 revision；
+    中途失败时已提交批次保留，下次同步从最后一次推进的游标处继续。
+    fetch_patches 时该批的 patch 与 revisions 在同一事务中写入，各批共享同一个
+    SvnPatchFetchController，暂停后后续批次不再获取。
+    """
+    synced = 0
+    batches = 0
+    last_rev: Optional[int] = None
+    patch_stats: Optional[Dict[str, Any]] = None
+    controller = SvnPatchFetchController()
+    for batch in iter_batches(revisions, sync_config.batch_size):
+        synced += insert_svn_revisions(conn, repo_id, batch, sync_config)
+        if fetch_patches:
+            stats = sync_revision_patches(
+                conn, repo_id, batch, sync_config, project_key=project_key, controller=controller
+            )
+            if patch_stats is None:
+                patch_stats = stats
+            else:
+                for key in ("total", "success", "failed", "skipped", "degraded", "bulk_count"):
+                    patch_stats[key] += stats[key]
+                patch_stats["skip_reason"] = stats["skip_reason"]
+                patch_stats["patches"].extend(stats["patches"])
+        conn.commit()
+        batches += 1
+        last_rev = max(last_rev or 0, max(r.revision for r in batch))
+        if advance_cursor:
+            save_svn_cursor(repo_id, last_rev, synced, config=None)
+    return {
+        "synced_count": synced,
+        "batches": batches,
+        "last_rev": last_rev,
+        "patch_stats": patch_stats,
+    }
+
+
 # ============ 同步主函数 ============
 
 
@@ -522,6 +868,28 @@ def sync_svn_revisions(
             return {"success": True, "synced_count": 0, "message": "无需同步"}
 
         start_rev = 1 if last_rev <= 0 else max(1, last_rev - sync_config.overlap + 1)
+        if sync_config.stream:
+            flushed = flush_revision_batches(
+                conn,
+                repo_id,
+                stream_svn_log(
+                    sync_config.svn_url,
+                    start_rev=start_rev,
+                    end_rev=head_rev,
+                    verbose=verbose,
+                    timeout=sync_config.timeout,
+                ),
+                sync_config,
+            )
+            if not flushed["batches"]:
+                return {"success": True, "synced_count": 0, "message": "无需同步"}
+            return {
+                "success": True,
+                "synced_count": flushed["synced_count"],
+                "last_rev": flushed["last_rev"],
+                "batches": flushed["batches"],
+            }
+
         xml_content = fetch_svn_log_xml(
             sync_config.svn_url,
             start_rev=start_rev,
@@ -578,6 +946,8 @@ def backfill_svn_revisions(
     if end_rev is not None and start_rev > end_rev:
         raise ValidationError("起始 revision 大于结束 revision", {})
 
+    result: Dict[str, Any]
+
     # 获取或创建数据库连接
     dsn = dsn or os.environ.get("LOGBOOK_DSN") or os.environ.get("POSTGRES_DSN") or ""
     conn = get_connection(dsn)
@@ -594,6 +964,36 @@ def backfill_svn_revisions(
 
         if end_rev is None:
             end_rev = get_svn_head_revision(sync_config.svn_url)
+        if sync_config.stream and not dry_run:
+            flushed = flush_revision_batches(
+                conn,
+                repo_id,
+                stream_svn_log(
+                    sync_config.svn_url,
+                    start_rev=start_rev,
+                    end_rev=end_rev,
+                    verbose=False,
+                    timeout=sync_config.timeout,
+                ),
+                sync_config,
+                advance_cursor=update_watermark,
+                fetch_patches=fetch_patches,
+                project_key=project_key,
+            )
+            result = {
+                "success": True,
+                "synced_count": flushed["synced_count"],
+                "watermark_updated": update_watermark and flushed["batches"] > 0,
+                "last_rev": flushed["last_rev"] or end_rev,
+                "dry_run": False,
+                "batches": flushed["batches"],
+            }
+            if fetch_patches:
+                result["patch_stats"] = flushed["patch_stats"] or sync_revision_patches(
+                    conn, repo_id, [], sync_config, project_key=project_key
+                )
+            return result
+
         xml_content = fetch_svn_log_xml(
             sync_config.svn_url,
             start_rev=start_rev,
@@ -602,7 +1002,7 @@ def backfill_svn_revisions(
             timeout=sync_config.timeout,
         )
         revisions = parse_svn_log_xml(xml_content)
-        result: Dict[str, Any] = {
+        result = {
             "success": True,
             "synced_count": 0,
             "watermark_updated": False,
@@ -624,7 +1024,10 @@ def backfill_svn_revisions(
             result["last_rev"] = max_rev
 
         if fetch_patches:
-            result["patch_stats"] = sync_patches_for_revisions(sync_config.svn_url, revisions)
+            result["patch_stats"] = sync_revision_patches(
+                conn, repo_id, revisions, sync_config, project_key=project_key
+            )
+            conn.commit()
 
         return result
     finally:
@@ -39,7 +39,7 @@ from __future__ import annotations
 import threading
 import uuid
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
 
 from engram.logbook import scm_sync_lock
 from engram.logbook.scm_auth import redact
@@ -66,10 +66,14 @@ from engram.logbook.scm_sync_run_contract import (
     RunStatus,
     build_payload_for_exception,
     build_payload_for_lease_lost,
+    build_payload_for_requeued,
     build_run_finish_payload_from_result,
     validate_run_finish_payload,
 )
 
+if TYPE_CHECKING:
+    from engram.logbook.scm_sync_worker_pool import SharedHeartbeat
+
 __all__ = [
     # 类型
     "SyncExecutorType",
@@ -90,6 +94,7 @@ __all__ = [
     "default_sync_handler",
     "execute_sync_job",
     "process_one_job",
+    "process_claimed_job",
 ]
 
 
@@ -516,16 +521,7 @@ def process_one_job(
 
     流程:
     1. 从队列 claim 一个任务
-    2. 获取 (repo_id, job_type) 分布式锁
-       - 锁获取失败则 requeue_without_penalty 并返回（error_category=lock_held）
-    3. 生成 run_id，读取 cursor_before
-    4. 调用 insert_sync_run_start 写入 status=running
-    5. 启动心跳续租线程
-    6. 执行同步任务
-    7. 调用 build_run_finish_payload_from_result + validate_run_finish_payload
-    8. 调用 insert_sync_run_finish
-    9. 根据结果 ack/fail_retry/mark_dead/requeue（ack 时传入 run_id）
-    10. finally 中确保释放锁
+    2. 交给 process_claimed_job 执行（锁、sync_runs、心跳、ack/fail/requeue）
 
     Args:
         worker_id: worker 标识符
@@ -538,10 +534,7 @@ def process_one_job(
     Returns:
         True 表示处理了一个任务（无论成功失败），False 表示队列为空
     """
-    base_cfg = get_worker_config_from_module()
-    merged_cfg = dict(base_cfg)
-    if worker_cfg:
-        merged_cfg.update(worker_cfg)
+    merged_cfg = _merge_worker_cfg(worker_cfg)
 
     job = claim(
         conn=conn,
@@ -552,6 +545,63 @@ def process_one_job(
     if not job:
         return False
 
+    return process_claimed_job(
+        job,
+        worker_id=worker_id,
+        worker_cfg=merged_cfg,
+        conn=conn,
+        circuit_breaker=circuit_breaker,
+        enable_sync_runs=enable_sync_runs,
+    )
+
+
+def _merge_worker_cfg(worker_cfg: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并模块默认配置与调用方覆盖"""
+    merged_cfg: Dict[str, Any] = dict(get_worker_config_from_module())
+    if worker_cfg:
+        merged_cfg.update(worker_cfg)
+    return merged_cfg
+
+
+def process_claimed_job(
+    job: Dict[str, Any],
+    *,
+    worker_id: str,
+    worker_cfg: Optional[Dict[str, Any]] = None,
+    conn=None,
+    circuit_breaker=None,
+    enable_sync_runs: bool = True,
+    heartbeat: Optional["SharedHeartbeat"] = None,
+) -> bool:
+    """
+    执行一个已 claim 的任务
+
+    流程:
+    1. 获取 (repo_id, job_type) 分布式锁
+       - 锁获取失败则 requeue_without_penalty 并返回（error_category=lock_held）
+    2. 生成 run_id，读取 cursor_before
+    3. 调用 insert_sync_run_start 写入 status=running
+    4. 启动心跳续租（传入 heartbeat 时由共享心跳线程批量续租，否则使用独立的 HeartbeatManager）
+    5. 执行同步任务
+    6. 调用 build_run_finish_payload_from_result + validate_run_finish_payload
+    7. 调用 insert_sync_run_finish
+    8. 根据结果 ack/fail_retry/mark_dead/requeue（ack 时传入 run_id）
+    9. finally 中确保释放锁
+
+    Args:
+        job: claim/claim_batch 返回的任务字典
+        worker_id: worker 标识符
+        worker_cfg: worker 配置覆盖
+        conn: 数据库连接
+        circuit_breaker: 熔断器实例
+        enable_sync_runs: 是否启用 sync_runs 写入（默认 True）
+        heartbeat: 可选的共享心跳（多槽位 worker）
+
+    Returns:
+        True 表示处理了任务（无论成功失败）
+    """
+    merged_cfg = _merge_worker_cfg(worker_cfg)
+
     job_id = str(job.get("job_id"))
     repo_id_raw = job.get("repo_id")
     job_type_raw = job.get("job_type")
@@ -615,13 +665,17 @@ def process_one_job(
     run_payload = None
 
     try:
-        hb = HeartbeatManager(
-            job_id=job_id,
-            worker_id=worker_id,
-            renew_interval_seconds=float(merged_cfg["renew_interval_seconds"]),
-            lease_seconds=int(merged_cfg["lease_seconds"]),
-            max_failures=int(merged_cfg["max_renew_failures"]),
-        )
+        hb: Any
+        if heartbeat is not None:
+            hb = heartbeat.track(job_id)
+        else:
+            hb = HeartbeatManager(
+                job_id=job_id,
+                worker_id=worker_id,
+                renew_interval_seconds=float(merged_cfg["renew_interval_seconds"]),
+                lease_seconds=int(merged_cfg["lease_seconds"]),
+                max_failures=int(merged_cfg["max_renew_failures"]),
+            )
 
         with hb:
             result = execute_sync_job(job)
@@ -630,6 +684,26 @@ def process_one_job(
                 result["cursor_before"] = cursor_before
 
         # ============ 处理心跳中止 ============
+        if getattr(hb, "cancelled", False) is True:
+            # worker 退出时任务已被重新入队：只结束本次 sync_run，
+            # 不再 ack/fail（避免覆盖新持有者的状态）
+            if enable_sync_runs:
+                payload_dict = build_payload_for_requeued(
+                    job_id=job_id,
+                    worker_id=worker_id,
+                    reason=hb.last_error or "worker_shutdown",
+                    counts=build_run_finish_payload_from_result(result).counts,
+                    cursor_before=cursor_before,
+                ).to_dict()
+                insert_sync_run_finish(
+                    run_id=run_id,
+                    status=payload_dict["status"],
+                    counts=payload_dict.get("counts"),
+                    error_summary_json=payload_dict.get("error_summary_json"),
+                    conn=conn,
+                )
+            return True
+
         if hb.should_abort:
             abort_error = hb.get_abort_error()
 
@@ -710,6 +784,12 @@ def process_one_job(
         if success:
             # ack 时传入 run_id，写回 job.last_run_id
             ack(job_id=job_id, worker_id=worker_id, run_id=run_id, conn=conn)
+            # skipped 结果不计入熔断（不代表一次真实的同步）
+            if circuit_breaker is not None and not result.get("skipped"):
+                circuit_breaker.record_result(
+                    success=True,
+                    counts=run_payload.to_dict().get("counts"),
+                )
             return True
 
         error_category = result.get("error_category") or ErrorCategory.UNKNOWN.value
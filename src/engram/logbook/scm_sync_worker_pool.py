@@ -0,0 +1,630 @@
+# -*- coding: utf-8 -*-
+"""
+scm_sync_worker_pool - 多槽位 SCM 同步 Worker
+
+在单个进程内以线程运行 N 个任务槽位，共享以下资源:
+- ConnectionPool: 有界数据库连接池（槽位借出/归还，归还时回滚未提交事务）
+- SharedHeartbeat: 单个心跳线程，以一条 UPDATE 批量续租所有在执行任务的租约
+- GitLabClientRegistry: 每个 GitLab 实例一个 HTTP 会话（见 gitlab_client.set_shared_client_registry）
+
+调度流程:
+1. 调度线程按空闲槽位数调用 claim_batch 批量获取任务
+2. 任务放入内部队列，由槽位线程调用 process_claimed_job 执行
+3. 槽位完成任务后唤醒调度线程；空闲时等待入队通知（LISTEN），poll_interval 兜底
+
+优雅退出（SIGTERM/SIGINT -> request_stop）:
+- 停止 claim 新任务
+- 已 claim 但尚未开始的任务立即 requeue_without_penalty
+- 等待执行中的任务最多 drain_timeout 秒，超时仍未完成的任务 requeue_without_penalty
+
+使用示例:
+    from engram.logbook.scm_sync_worker_pool import MultiSlotWorker
+
+    worker = MultiSlotWorker(worker_id="worker-1", concurrency=4, dsn=dsn)
+    signal.signal(signal.SIGTERM, lambda *_: worker.request_stop())
+    worker.run()
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from engram.logbook.gitlab_client import GitLabClientRegistry, set_shared_client_registry
+from engram.logbook.scm_sync_errors import DEFAULT_MAX_RENEW_FAILURES, ErrorCategory
+from engram.logbook.scm_sync_notify import JobNotificationListener
+from engram.logbook.scm_sync_queue import (
+    claim_batch,
+    renew_lease_batch,
+    requeue_without_penalty,
+)
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "ConnectionPool",
+    "LeaseHeartbeat",
+    "SharedHeartbeat",
+    "MultiSlotWorker",
+]
+
+
+# ============ 连接池 ============
+
+
+class ConnectionPool:
+    """
+    有界数据库连接池
+
+    连接按需创建，最多 size 个；借出的连接在归还时回滚未提交的事务，
+    已关闭的连接直接丢弃，下次借出时重新创建。
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str],
+        size: int,
+        connect: Optional[Callable[[Optional[str]], Any]] = None,
+    ):
+        if size < 1:
+            raise ValueError("size 必须 >= 1")
+        self.dsn = dsn
+        self.size = size
+        self._connect = connect or _default_connect
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all: List[Any] = []
+        self._closed = False
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        """借出一个连接（连接数已满时阻塞）"""
+        if self._closed:
+            raise RuntimeError("连接池已关闭")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("等待数据库连接超时")
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect(self.dsn)
+                    with self._lock:
+                        self._all.append(conn)
+                    return conn
+                if not getattr(conn, "closed", False):
+                    return conn
+                self._forget(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: Any) -> None:
+        """归还连接"""
+        try:
+            if getattr(conn, "closed", False):
+                self._forget(conn)
+                return
+            try:
+                conn.rollback()
+            except Exception:
+                self._discard(conn)
+                return
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """借出连接的上下文管理器"""
+        conn = self.acquire(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self, *, include_borrowed: bool = True) -> None:
+        """
+        关闭连接池
+
+        Args:
+            include_borrowed: True 时同时关闭仍被借出的连接；
+                False 时只关闭空闲连接，借出的连接在归还时关闭
+        """
+        self._closed = True
+        if not include_borrowed:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return
+                self._discard(conn)
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _forget(self, conn: Any) -> None:
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+
+    def _discard(self, conn: Any) -> None:
+        self._forget(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _default_connect(dsn: Optional[str]) -> Any:
+    if dsn:
+        from engram.logbook.scm_db import get_conn
+
+        return get_conn(dsn)
+    from engram.logbook.db import get_connection
+
+    return get_connection()
+
+
+# ============ 共享心跳 ============
+
+
+class LeaseHeartbeat:
+    """
+    单个任务在共享心跳中的租约句柄
+
+    接口与 HeartbeatManager 一致（上下文管理器 + should_abort/get_abort_error），
+    可直接传给 process_claimed_job。
+    """
+
+    def __init__(self, owner: "SharedHeartbeat", job_id: str):
+        self._owner = owner
+        self.job_id = job_id
+        self.worker_id = owner.worker_id
+        self.max_failures = owner.max_failures
+        self.should_abort = False
+        self.cancelled = False
+        self.failure_count = 0
+        self.last_error: Optional[str] = None
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        self._owner._register(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._owner._unregister(self)
+
+    def record(self, renewed: bool, error: Optional[str] = None) -> None:
+        """记录一次续租结果"""
+        if renewed:
+            self.failure_count = 0
+            return
+        self.failure_count += 1
+        if error:
+            self.last_error = error
+        if self.failure_count >= self.max_failures:
+            self.should_abort = True
+
+    def cancel(self, reason: str) -> None:
+        """标记任务已被让出（不再续租，处理方不得再 ack/fail）"""
+        self.cancelled = True
+        self.should_abort = True
+        self.last_error = reason
+
+    def get_abort_error(self) -> Dict[str, Any]:
+        """获取中止错误信息"""
+        return {
+            "error": self.last_error or "lease_lost",
+            "error_category": ErrorCategory.LEASE_LOST.value,
+            "failure_count": self.failure_count,
+            "max_failures": self.max_failures,
+            "job_id": self.job_id,
+            "worker_id": self.worker_id,
+        }
+
+
+class SharedHeartbeat:
+    """
+    共享心跳 - 一个线程批量续租所有在执行任务的租约
+
+    每个周期对所有已登记的 job_id 调用一次 renew_lease_batch（单条 UPDATE）；
+    未被续租的任务（租约已被回收或转移）与异常时的全部任务计一次失败，
+    连续失败达到 max_failures 后对应句柄 should_abort=True。
+    """
+
+    def __init__(
+        self,
+        *,
+        worker_id: str,
+        renew_interval_seconds: float,
+        lease_seconds: int,
+        max_failures: int = DEFAULT_MAX_RENEW_FAILURES,
+        pool: Optional[ConnectionPool] = None,
+    ):
+        self.worker_id = worker_id
+        self.renew_interval_seconds = renew_interval_seconds
+        self.lease_seconds = lease_seconds
+        self.max_failures = max_failures
+        self._pool = pool
+        self._handles: Dict[str, LeaseHeartbeat] = {}
+        self._cancelled: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, job_id: str) -> LeaseHeartbeat:
+        """为任务创建租约句柄（进入上下文时开始续租）"""
+        return LeaseHeartbeat(self, job_id)
+
+    def tracked_job_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._handles)
+
+    def cancel(self, job_ids: List[str], reason: str) -> None:
+        """
+        取消任务的租约句柄（任务已重新入队）
+
+        已登记的句柄立即标记为 cancelled；尚未登记的句柄在登记时标记。
+        """
+        with self._lock:
+            for job_id in job_ids:
+                self._cancelled[job_id] = reason
+                handle = self._handles.get(job_id)
+                if handle is not None:
+                    handle.cancel(reason)
+
+    def renew_once(self) -> List[str]:
+        """对所有登记任务执行一次批量续租，返回成功续租的 job_id"""
+        with self._lock:
+            handles = [h for h in self._handles.values() if not h.cancelled]
+        if not handles:
+            return []
+
+        job_ids = [h.job_id for h in handles]
+        try:
+            if self._pool is not None:
+                with self._pool.connection() as conn:
+                    renewed = renew_lease_batch(
+                        job_ids, self.worker_id, lease_seconds=self.lease_seconds, conn=conn
+                    )
+            else:
+                renewed = renew_lease_batch(
+                    job_ids, self.worker_id, lease_seconds=self.lease_seconds
+                )
+        except Exception as exc:
+            error = f"Exception during renew: {exc}"
+            for handle in handles:
+                handle.record(False, error)
+            return []
+
+        renewed_set = set(renewed)
+        for handle in handles:
+            handle.record(handle.job_id in renewed_set)
+        return list(renewed)
+
+    def start(self) -> None:
+        """启动心跳线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.worker_id}-heartbeat", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 2.0) -> None:
+        """停止心跳线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.renew_interval_seconds):
+            self.renew_once()
+
+    def _register(self, handle: LeaseHeartbeat) -> None:
+        with self._lock:
+            self._handles[handle.job_id] = handle
+            reason = self._cancelled.get(handle.job_id)
+            if reason is not None:
+                handle.cancel(reason)
+
+    def _unregister(self, handle: LeaseHeartbeat) -> None:
+        with self._lock:
+            if self._handles.get(handle.job_id) is handle:
+                del self._handles[handle.job_id]
+
+
+# ============ 多槽位 Worker ============
+
+
+ProcessJobFn = Callable[..., bool]
+
+# 监听线程单次等待时长（用于及时响应 request_stop）
+_LISTEN_WAIT_SECONDS = 1.0
+
+
+class MultiSlotWorker:
+    """
+    多槽位 Worker - 单进程内并发执行 N 个同步任务
+
+    Args:
+        worker_id: worker 标识符（所有槽位共享，租约与锁均归属该 worker）
+        concurrency: 槽位数
+        dsn: 数据库连接字符串（None 时使用默认连接配置）
+        job_types: 限制处理的任务类型列表
+        worker_cfg: worker 配置覆盖（lease_seconds/renew_interval_seconds/max_renew_failures）
+        poll_interval: 队列为空时的轮询间隔（秒）
+        drain_timeout: 退出时等待执行中任务的最长时间（秒）
+        enable_sync_runs: 是否写入 sync_runs
+        circuit_breaker: 熔断器实例
+        connect: 自定义连接工厂（测试用）
+        process_job: 自定义任务处理函数（默认 process_claimed_job）
+        listener: 入队通知监听器（JobNotificationListener），收到匹配通知时立即 claim
+    """
+
+    def __init__(
+        self,
+        *,
+        worker_id: str,
+        concurrency: int,
+        dsn: Optional[str] = None,
+        job_types: Optional[List[str]] = None,
+        worker_cfg: Optional[Dict[str, Any]] = None,
+        poll_interval: float = 10.0,
+        drain_timeout: float = 60.0,
+        enable_sync_runs: bool = True,
+        circuit_breaker=None,
+        connect: Optional[Callable[[Optional[str]], Any]] = None,
+        process_job: Optional[ProcessJobFn] = None,
+        listener: Optional[JobNotificationListener] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency 必须 >= 1")
+
+        from engram.logbook.scm_sync_worker_core import (
+            _merge_worker_cfg,
+            process_claimed_job,
+        )
+
+        self.worker_id = worker_id
+        self.concurrency = concurrency
+        self.job_types = job_types
+        self.worker_cfg = _merge_worker_cfg(worker_cfg)
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self.enable_sync_runs = enable_sync_runs
+        self.circuit_breaker = circuit_breaker
+        self._process_job = process_job or process_claimed_job
+        self.listener = listener
+
+        # 每个槽位一个连接，调度与心跳各一个
+        self.pool = ConnectionPool(dsn, concurrency + 2, connect=connect)
+        self.heartbeat = SharedHeartbeat(
+            worker_id=worker_id,
+            renew_interval_seconds=float(self.worker_cfg["renew_interval_seconds"]),
+            lease_seconds=int(self.worker_cfg["lease_seconds"]),
+            max_failures=int(self.worker_cfg["max_renew_failures"]),
+            pool=self.pool,
+        )
+
+        self._jobs: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._inflight: Set[str] = set()
+        self._processed = 0
+
+    @property
+    def processed_count(self) -> int:
+        return self._processed
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_event.is_set()
+
+    def request_stop(self) -> None:
+        """请求优雅退出（可在信号处理函数中调用）"""
+        self._stop_event.set()
+        self._wakeup.set()
+
+    def run(self, *, once: bool = False) -> int:
+        """
+        运行调度循环直到 request_stop()
+
+        Args:
+            once: True 时只 claim 一批任务，处理完成后退出
+
+        Returns:
+            处理的任务数
+        """
+        registry = GitLabClientRegistry()
+        set_shared_client_registry(registry)
+        slots = [
+            threading.Thread(target=self._slot_loop, name=f"{self.worker_id}-slot-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in slots:
+            thread.start()
+        self.heartbeat.start()
+        listen_thread = None
+        if self.listener is not None:
+            listen_thread = threading.Thread(
+                target=self._listen_loop, name=f"{self.worker_id}-listen", daemon=True
+            )
+            listen_thread.start()
+
+        try:
+            self._dispatch_loop(once=once)
+        finally:
+            self._stop_event.set()
+            abandoned = self._drain(slots)
+            self.heartbeat.stop()
+            if listen_thread is not None:
+                listen_thread.join(timeout=2.0)
+            set_shared_client_registry(None)
+            if abandoned:
+                # 仍有槽位在执行已让出的任务：不关闭其正在使用的连接与客户端，
+                # 连接在槽位归还时关闭
+                logger.warning(f"{abandoned} 个槽位在退出时仍未结束，已放弃等待")
+                self.pool.close(include_borrowed=False)
+            else:
+                registry.close()
+                self.pool.close()
+
+        return self._processed
+
+    # ---------- 调度 ----------
+
+    def _free_slots(self) -> int:
+        with self._lock:
+            return self.concurrency - self._pending
+
+    def _dispatch_loop(self, *, once: bool) -> None:
+        while not self._stop_event.is_set():
+            self._wakeup.clear()
+            free = self._free_slots()
+            claimed = 0
+            if free > 0:
+                try:
+                    claimed = self._claim(free)
+                except Exception as exc:
+                    logger.error(f"批量 claim 失败: {exc}", exc_info=True)
+
+            if once:
+                if claimed == 0 and self._free_slots() == self.concurrency:
+                    return
+                if claimed == 0:
+                    self._wakeup.wait(self.poll_interval)
+                    continue
+                self._wait_idle()
+                return
+
+            if claimed == 0 or self._free_slots() == 0:
+                # 队列为空或槽位已满：等待槽位完成或轮询间隔
+                self._wakeup.wait(self.poll_interval)
+
+    def _listen_loop(self) -> None:
+        assert self.listener is not None
+        try:
+            while not self._stop_event.is_set():
+                if self.listener.wait(_LISTEN_WAIT_SECONDS):
+                    self._wakeup.set()
+        finally:
+            self.listener.close()
+
+    def _claim(self, n: int) -> int:
+        with self.pool.connection() as conn:
+            jobs = claim_batch(self.worker_id, n, job_types=self.job_types, conn=conn)
+        for job in jobs:
+            with self._lock:
+                self._pending += 1
+            self._jobs.put(job)
+        if jobs:
+            logger.debug(f"claim {len(jobs)} 个任务（空闲槽位 {n}）")
+        return len(jobs)
+
+    def _wait_idle(self) -> None:
+        while not self._stop_event.is_set() and self._free_slots() < self.concurrency:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    # ---------- 槽位 ----------
+
+    def _slot_loop(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job_id = str(job.get("job_id"))
+            try:
+                if self._stop_event.is_set():
+                    self._requeue(job_id, "worker_shutdown: job not started")
+                    continue
+                with self._lock:
+                    self._inflight.add(job_id)
+                self._run_job(job)
+            finally:
+                with self._lock:
+                    self._inflight.discard(job_id)
+                    self._pending -= 1
+                self._wakeup.set()
+
+    def _run_job(self, job: Dict[str, Any]) -> None:
+        try:
+            with self.pool.connection() as conn:
+                self._process_job(
+                    job,
+                    worker_id=self.worker_id,
+                    worker_cfg=self.worker_cfg,
+                    conn=conn,
+                    circuit_breaker=self.circuit_breaker,
+                    enable_sync_runs=self.enable_sync_runs,
+                    heartbeat=self.heartbeat,
+                )
+            with self._lock:
+                self._processed += 1
+        except Exception as exc:
+            logger.error(f"处理任务 {job.get('job_id')} 时出错: {exc}", exc_info=True)
+
+    # ---------- 退出 ----------
+
+    def _drain(self, slots: List[threading.Thread]) -> int:
+        """
+        等待槽位退出，让出未完成的任务
+
+        Returns:
+            超时后仍未退出的槽位数
+        """
+        for _ in slots:
+            self._jobs.put(None)
+        deadline = time.monotonic() + self.drain_timeout
+        for thread in slots:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+
+        # 槽位全部卡住时，队列中尚未开始的任务也需要让出
+        unfinished: List[str] = []
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                unfinished.append(str(job.get("job_id")))
+        with self._lock:
+            inflight = sorted(self._inflight)
+        unfinished.extend(inflight)
+        # 先取消租约句柄再入队：槽位完成后不会再 ack/fail，心跳也不再续租
+        self.heartbeat.cancel(inflight, "worker_shutdown: requeued after drain timeout")
+        for job_id in unfinished:
+            self._requeue(job_id, "worker_shutdown: drain timeout")
+        if unfinished:
+            logger.warning(f"退出时 {len(unfinished)} 个任务未完成，已重新入队")
+
+        # 队列中的哨兵已被取走，为仍在运行的槽位补回，使其完成当前任务后退出
+        alive = [thread for thread in slots if thread.is_alive()]
+        for _ in alive:
+            self._jobs.put(None)
+        return len(alive)
+
+    def _requeue(self, job_id: str, reason: str) -> None:
+        try:
+            with self.pool.connection(timeout=5.0) as conn:
+                requeue_without_penalty(
+                    job_id=job_id, worker_id=self.worker_id, reason=reason, conn=conn
+                )
+        except Exception as exc:
+            logger.warning(f"任务 {job_id} 重新入队失败: {exc}")
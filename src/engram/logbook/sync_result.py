@@ -635,6 +635,7 @@ def validate_sync_result(
         "diff_none_count",
         "scanned_count",
         "inserted_count",
+        "updated_count",
         "synced_mr_count",
         "synced_event_count",
         "skipped_event_count",
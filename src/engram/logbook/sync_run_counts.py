@@ -43,7 +43,8 @@ COUNTS_OPTIONAL_FIELDS = {
     "skipped_count",  # int: 跳过的记录数（去重/过滤/已存在）
     # GitLab MRs 相关
     "scanned_count",  # int: 扫描的 MR 数（API 返回数）
-    "inserted_count",  # int: 新插入的 MR 数
+    "inserted_count",  # int: 新插入的记录数（MR/commit/revision，批量 upsert 统计）
+    "updated_count",  # int: 已存在而被更新的记录数（批量 upsert 统计）
     # GitLab Reviews 相关
     "synced_mr_count",  # int: 同步的 MR 数
     "synced_event_count",  # int: 同步的事件数
@@ -87,6 +88,7 @@ class SyncRunCounts:
     # 可选字段 - GitLab MRs
     scanned_count: int = 0
     inserted_count: int = 0
+    updated_count: int = 0
 
     # 可选字段 - GitLab Reviews
     synced_mr_count: int = 0
@@ -135,6 +137,7 @@ def build_counts(
     # GitLab MRs
     scanned_count: int = 0,
     inserted_count: int = 0,
+    updated_count: int = 0,
     # GitLab Reviews
     synced_mr_count: int = 0,
     synced_event_count: int = 0,
@@ -165,7 +168,8 @@ def build_counts(
         diff_none_count: diff_mode=none 时跳过 diff 获取的数量
         skipped_count: 跳过的记录数
         scanned_count: 扫描的 MR 数
-        inserted_count: 新插入的 MR 数
+        inserted_count: 新插入的记录数
+        updated_count: 已存在而被更新的记录数
         synced_mr_count: 同步的 MR 数
         synced_event_count: 同步的事件数
         skipped_event_count: 跳过的事件数
@@ -195,6 +199,7 @@ def build_counts(
         skipped_count=int(skipped_count),
         scanned_count=int(scanned_count),
         inserted_count=int(inserted_count),
+        updated_count=int(updated_count),
         synced_mr_count=int(synced_mr_count),
         synced_event_count=int(synced_event_count),
         skipped_event_count=int(skipped_event_count),
@@ -244,6 +249,7 @@ def build_counts_from_result(
         skipped_count=result.get("skipped_count", 0),
         scanned_count=result.get("scanned_count", 0),
         inserted_count=result.get("inserted_count", 0),
+        updated_count=result.get("updated_count", 0),
         synced_mr_count=result.get("synced_mr_count", 0),
         synced_event_count=result.get("synced_event_count", 0),
         skipped_event_count=result.get("skipped_event_count", 0),
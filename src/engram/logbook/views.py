@@ -7,6 +7,10 @@ engram_logbook.views - 生成 logbook 的视图文件
     - 生成 index.md（最近 N 条 item 的导航）
     - 默认输出到 ./.agentx/logbook/views/，支持 --out-dir
     - 渲染完成后可选写入 logbook.events 记录（event_type=render_views）
+    - 增量模式（incremental=True）：在 .views_meta.json 中记录高水位，
+      数据与渲染参数均未变化时直接返回，不重写文件
+    - 流式模式（stream=True）：服务端游标逐行写入 CSV/Markdown，写入时同步计算哈希，
+      内存占用与视图大小无关
 
 输出格式:
     - 成功: {ok: true, ...}
@@ -14,17 +18,19 @@ engram_logbook.views - 生成 logbook 的视图文件
 """
 
 import csv
+import hashlib
 import json as _json
+import os
 import shutil
-from collections.abc import Sequence
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Dict, List, Optional
 
 from engram.logbook import db
 from engram.logbook.config import get_effective_artifacts_root
 from engram.logbook.db import ItemWithLatestEventRow
-from engram.logbook.hashing import get_file_info
 from engram.logbook.io import log_info
 from engram.logbook.uri import normalize_uri
 
@@ -34,6 +40,12 @@ DEFAULT_OUT_DIR = "./.agentx/logbook/views"
 # 默认最近条目数量
 DEFAULT_LIMIT = 50
 
+# 流式模式下每批从服务端游标拉取的行数
+DEFAULT_STREAM_BATCH_SIZE = 1000
+
+# 元数据文件名
+META_FILENAME = ".views_meta.json"
+
 # 自动生成文件标识
 AUTO_GENERATED_MARKER = "AUTO-GENERATED by render_views.py - DO NOT EDIT"
 AUTO_GENERATED_MARKER_CN = "此文件由 render_views.py 自动生成，请勿手动修改"
@@ -48,6 +60,58 @@ def ensure_directory(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+class _HashingWriter:
+    """
+    文本写入包装：按 UTF-8 编码写入底层二进制文件，同时累计 sha256 与字节数
+
+    写完即得到文件哈希，无需再读回整个文件。
+    """
+
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text: str) -> int:
+        data = text.encode("utf-8")
+        self._hasher.update(data)
+        self._f.write(data)
+        self.size += len(data)
+        return len(text)
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+
+
+@contextmanager
+def _open_hashing_writer(out_path: Path) -> Iterator[_HashingWriter]:
+    """
+    写入临时文件并在成功后原子替换目标文件
+
+    渲染中途失败时保留旧文件，读取方不会看到写了一半的视图。
+    """
+    ensure_directory(out_path.parent)
+    tmp_path = out_path.with_name(f".{out_path.name}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            yield _HashingWriter(f)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _written_file_info(out_path: Path, writer: _HashingWriter) -> Dict[str, Any]:
+    """构造与 hashing.get_file_info 相同结构的文件信息"""
+    return {
+        "path": str(out_path.absolute()),
+        "name": out_path.name,
+        "size": writer.size,
+        "hash": writer.hexdigest(),
+        "algorithm": "sha256",
+    }
+
+
 def format_datetime(dt: Optional[datetime]) -> str:
     """格式化日期时间"""
     if dt is None:
@@ -56,19 +120,18 @@ def format_datetime(dt: Optional[datetime]) -> str:
 
 
 def generate_manifest_csv(
-    items: Sequence[ItemWithLatestEventRow], out_path: Path
+    items: Iterable[ItemWithLatestEventRow], out_path: Path
 ) -> Dict[str, Any]:
     """
     生成 manifest.csv
 
     Args:
-        items: item 列表（类型化字典序列）
+        items: item 序列或迭代器（逐行写入，不要求整体驻留内存）
         out_path: 输出路径
 
     Returns:
         文件信息（路径、大小、哈希）
     """
-    ensure_directory(out_path.parent)
 
     fieldnames = [
         "item_id",
@@ -83,7 +146,7 @@ def generate_manifest_csv(
         "latest_event_ts",
     ]
 
-    with open(out_path, "w", newline="", encoding="utf-8") as f:
+    with _open_hashing_writer(out_path) as f:
         # 写入自动生成警告注释（CSV 标准允许 # 开头的注释行）
         f.write(f"# {AUTO_GENERATED_MARKER}\n")
         f.write(f"# {AUTO_GENERATED_MARKER_CN}\n")
@@ -107,11 +170,14 @@ def generate_manifest_csv(
             }
             writer.writerow(row)
 
-    return get_file_info(str(out_path))
+    return _written_file_info(out_path, f)
 
 
 def generate_index_md(
-    items: Sequence[ItemWithLatestEventRow], out_path: Path, limit: int = DEFAULT_LIMIT
+    items: Sequence[ItemWithLatestEventRow],
+    out_path: Path,
+    limit: int = DEFAULT_LIMIT,
+    total_count: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     生成 index.md（最近 N 条 item 的导航）
@@ -120,14 +186,15 @@ def generate_index_md(
         items: item 列表（类型化字典序列）
         out_path: 输出路径
         limit: 显示的最大条目数
+        total_count: 总条目数（流式模式下 items 只含前 limit 条；默认 len(items)）
 
     Returns:
         文件信息（路径、大小、哈希）
     """
-    ensure_directory(out_path.parent)
-
     # 截取最近 N 条
     recent_items = items[:limit]
+    if total_count is None:
+        total_count = len(items)
 
     lines = [
         f"<!-- {AUTO_GENERATED_MARKER} -->",
@@ -136,7 +203,7 @@ def generate_index_md(
         "# Logbook Items Index",
         "",
         f"> Generated at: {_utc_now_iso_z()}",
-        f"> Total items: {len(items)}, Showing: {len(recent_items)}",
+        f"> Total items: {total_count}, Showing: {len(recent_items)}",
         "",
         "> **⚠️ 注意**: 此文件由工具自动生成，请勿手动编辑。如需更新，请运行 `engram-logbook render_views`。",
         "",
@@ -175,10 +242,40 @@ def generate_index_md(
 
     content = "\n".join(lines)
 
-    with open(out_path, "w", encoding="utf-8") as f:
+    with _open_hashing_writer(out_path) as f:
         f.write(content)
 
-    return get_file_info(str(out_path))
+    return _written_file_info(out_path, f)
+
+
+def _load_meta(meta_path: Path) -> Optional[Dict[str, Any]]:
+    """读取上次渲染的元数据（不存在或损坏时返回 None）"""
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = _json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if isinstance(meta, dict) else None
+
+
+def _is_up_to_date(
+    meta: Optional[Dict[str, Any]],
+    out_path: Path,
+    high_water_mark: Dict[str, Any],
+    params: Dict[str, Any],
+) -> bool:
+    """上次渲染的高水位、渲染参数一致，且输出文件仍在（大小未变）时视为无需重渲染"""
+    if not meta:
+        return False
+    if meta.get("high_water_mark") != high_water_mark or meta.get("params") != params:
+        return False
+    files = meta.get("files") or {}
+    for filename in ("manifest.csv", "index.md"):
+        info = files.get(filename)
+        path = out_path / filename
+        if not info or not path.is_file() or path.stat().st_size != info.get("size"):
+            return False
+    return True
 
 
 def render_views(
@@ -190,6 +287,10 @@ def render_views(
     item_id_for_log: Optional[int] = None,
     config: Optional[Any] = None,
     quiet: bool = False,
+    incremental: bool = False,
+    stream: bool = False,
+    manifest_limit: Optional[int] = None,
+    batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
 ) -> Dict[str, Any]:
     """
     渲染视图文件
@@ -203,32 +304,107 @@ def render_views(
         item_id_for_log: 用于记录事件的 item_id（log_event=True 时需要）
         config: 配置实例
         quiet: 静默模式
+        incremental: 增量模式，高水位与参数未变化时跳过渲染（结果中 skipped=True）
+        stream: 流式模式，服务端游标逐行写入（index.md 仅在内存中保留前 limit 条）
+        manifest_limit: manifest.csv 的条目上限（默认 limit * 2；<= 0 表示不限制）
+        batch_size: 流式模式下每批拉取的行数
 
     Returns:
         渲染结果信息
     """
     out_path = Path(out_dir)
+    meta_path = out_path / META_FILENAME
 
     log_info(f"输出目录: {out_path}", quiet=quiet)
 
-    # 查询 items（联表取最近事件）
-    items = db.get_items_with_latest_event(
-        limit=limit * 2,  # 多查一些以便筛选
-        item_type=item_type,
-        status=status,
-        config=config,
-    )
-
-    log_info(f"查询到 {len(items)} 条记录", quiet=quiet)
+    if manifest_limit is None:
+        manifest_limit = limit * 2  # 多查一些以便筛选
+    query_limit: Optional[int] = manifest_limit if manifest_limit > 0 else None
+
+    # 增量模式：先记录高水位（在读取数据之前获取，渲染期间的写入会在下次触发重渲染）
+    high_water_mark: Optional[Dict[str, Any]] = None
+    render_params = {
+        "limit": limit,
+        "manifest_limit": query_limit,
+        "item_type": item_type,
+        "status": status,
+    }
+    if incremental:
+        high_water_mark = db.get_items_high_water_mark(
+            item_type=item_type, status=status, config=config
+        )
+        previous = _load_meta(meta_path)
+        if previous is not None and _is_up_to_date(
+            previous, out_path, high_water_mark, render_params
+        ):
+            log_info("数据未变化，跳过渲染", quiet=quiet)
+            previous_files = previous["files"]
+            return {
+                "out_dir": str(out_path.resolve()),
+                "items_count": previous.get("items_count", 0),
+                "files": {
+                    key: {
+                        "path": str((out_path / filename).absolute()),
+                        "size": previous_files[filename]["size"],
+                        "sha256": previous_files[filename]["sha256"],
+                    }
+                    for key, filename in (("manifest", "manifest.csv"), ("index", "index.md"))
+                },
+                "rendered_at": previous.get("rendered_at"),
+                "meta_path": str(meta_path.resolve()),
+                "skipped": True,
+                "high_water_mark": high_water_mark,
+            }
 
     # 生成文件
     manifest_path = out_path / "manifest.csv"
     index_path = out_path / "index.md"
 
-    manifest_info = generate_manifest_csv(items, manifest_path)
-    log_info(f"生成 manifest.csv: {manifest_info['size']} bytes", quiet=quiet)
+    if stream:
+        # 流式：manifest 逐行写出，同时只保留 index 需要的前 limit 条
+        recent: List[ItemWithLatestEventRow] = []
+        items_count = 0
+
+        def _tap(rows: Iterable[ItemWithLatestEventRow]) -> Iterator[ItemWithLatestEventRow]:
+            nonlocal items_count
+            for row in rows:
+                items_count += 1
+                if len(recent) < limit:
+                    recent.append(row)
+                yield row
+
+        manifest_info = generate_manifest_csv(
+            _tap(
+                db.iter_items_with_latest_event(
+                    limit=query_limit,
+                    item_type=item_type,
+                    status=status,
+                    batch_size=batch_size,
+                    config=config,
+                )
+            ),
+            manifest_path,
+        )
+        log_info(f"流式写入 {items_count} 条记录", quiet=quiet)
+        log_info(f"生成 manifest.csv: {manifest_info['size']} bytes", quiet=quiet)
+
+        index_info = generate_index_md(recent, index_path, limit=limit, total_count=items_count)
+    else:
+        # 查询 items（联表取最近事件）
+        items = db.get_items_with_latest_event(
+            limit=query_limit,
+            item_type=item_type,
+            status=status,
+            config=config,
+        )
+        items_count = len(items)
+
+        log_info(f"查询到 {items_count} 条记录", quiet=quiet)
+
+        manifest_info = generate_manifest_csv(items, manifest_path)
+        log_info(f"生成 manifest.csv: {manifest_info['size']} bytes", quiet=quiet)
 
-    index_info = generate_index_md(items, index_path, limit=limit)
+        index_info = generate_index_md(items, index_path, limit=limit)
     log_info(f"生成 index.md: {index_info['size']} bytes", quiet=quiet)
 
     # 仅当需要写入 DB 附件记录时，才将渲染产物复制到 artifacts_root 并生成 artifact key
@@ -239,7 +415,7 @@ def render_views(
 
     result: Dict[str, Any] = {
         "out_dir": str(out_path.resolve()),
-        "items_count": len(items),
+        "items_count": items_count,
         "files": {
             "manifest": {
                 "path": manifest_info["path"],
@@ -255,13 +431,12 @@ def render_views(
         "rendered_at": rendered_at,
     }
 
-    # 生成元数据文件（用于 validate 验证）
-    meta_path = out_path / ".views_meta.json"
-    meta_data = {
+    # 生成元数据文件（用于 validate 验证；增量模式下同时记录高水位与渲染参数）
+    meta_data: Dict[str, Any] = {
         "generator": "render_views.py",
         "marker": AUTO_GENERATED_MARKER,
         "rendered_at": rendered_at,
-        "items_count": len(items),
+        "items_count": items_count,
         "files": {
             "manifest.csv": {
                 "sha256": manifest_info["hash"],
@@ -273,9 +448,14 @@ def render_views(
             },
         },
     }
+    if high_water_mark is not None:
+        meta_data["high_water_mark"] = high_water_mark
+        meta_data["params"] = render_params
+        result["skipped"] = False
+        result["high_water_mark"] = high_water_mark
 
-    with open(meta_path, "w", encoding="utf-8") as f:
-        _json.dump(meta_data, f, indent=2, ensure_ascii=False)
+    with _open_hashing_writer(meta_path) as f:
+        f.write(_json.dumps(meta_data, indent=2, ensure_ascii=False))
 
     result["meta_path"] = str(meta_path.resolve())
     log_info(f"生成元数据: {meta_path}", quiet=quiet)
@@ -300,8 +480,9 @@ def render_views(
         except Exception as e:
             raise RuntimeError(f"将视图文件复制到 artifacts 目录失败: {e}")
 
-        manifest_artifacts_info = get_file_info(str(manifest_artifacts_path))
-        index_artifacts_info = get_file_info(str(index_artifacts_path))
+        # 复制是逐字节的，直接复用写入时计算的哈希，无需再读回文件
+        manifest_artifacts_info = manifest_info
+        index_artifacts_info = index_info
 
         result["files"]["manifest"]["artifact_key"] = manifest_artifact_key
         result["files"]["index"]["artifact_key"] = index_artifact_key
@@ -311,7 +492,7 @@ def render_views(
             event_type="render_views",
             payload_json={
                 "out_dir": str(out_path.resolve()),
-                "items_count": len(items),
+                "items_count": items_count,
                 "files": list(result["files"].keys()),
             },
             source="render_views",
@@ -663,6 +663,7 @@ class FakeLogbookAdapter:
         top_k: int = 10,
         evidence_filter: Optional[str] = None,
         space_filter: Optional[str] = None,
+        mode: str = "keyword",
     ) -> List[Dict[str, Any]]:
         """查询 knowledge_candidates（用于 fallback）"""
         self.query_calls.append(
@@ -671,6 +672,7 @@ class FakeLogbookAdapter:
                 "top_k": top_k,
                 "evidence_filter": evidence_filter,
                 "space_filter": space_filter,
+                "mode": mode,
             }
         )
         return self._knowledge_candidates
@@ -841,8 +843,11 @@ class FakeGatewayConfig:
     # 新增必需字段
     minio_audit_webhook_auth_token: Optional[str] = None
     minio_audit_max_payload_size: int = 1024 * 1024
+    gitlab_webhook_secret_token: Optional[str] = None
+    gitlab_webhook_max_payload_size: int = 1024 * 1024
     validate_evidence_refs: bool = False
     strict_mode_enforce_validate_refs: bool = True
+    memory_fallback_mode: str = "keyword"
 
 
 # ============== 集成工厂方法 ==============
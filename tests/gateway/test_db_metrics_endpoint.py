@@ -0,0 +1,52 @@
+"""
+/metrics/db 端点测试
+
+验证 Gateway 暴露 Logbook 语句级统计（JSON 与 Prometheus 两种格式）。
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from engram.logbook import db_instrumentation
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.delenv("GATEWAY_AUTH_TOKEN", raising=False)
+    monkeypatch.delenv("GATEWAY_AUTH_TOKENS_JSON", raising=False)
+    db_instrumentation.reset_registry()
+    registry = db_instrumentation.get_registry()
+    registry.record("SELECT * FROM logbook.outbox_memory WHERE status = 'pending'", 12.0, 3)
+    registry.record("SELECT 1", 1.0, 1)
+
+    from engram.gateway.app import create_app
+
+    with TestClient(create_app()) as test_client:
+        yield test_client
+    db_instrumentation.reset_registry()
+    db_instrumentation.set_correlation_id_provider(None)
+
+
+def test_db_metrics_json(client):
+    response = client.get("/metrics/db", params={"top": 1})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ok"] is True
+    assert body["statement_count"] == 2
+    assert len(body["statements"]) == 1
+    assert body["statements"][0]["query"] == (
+        "SELECT * FROM logbook.outbox_memory WHERE status = ?"
+    )
+
+
+def test_db_metrics_prometheus(client):
+    response = client.get("/metrics/db", params={"format": "prometheus"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "engram_db_statement_calls_total" in response.text
+
+
+def test_db_metrics_invalid_sort(client):
+    response = client.get("/metrics/db", params={"sort": "bogus"})
+    assert response.status_code == 400
+    assert response.json()["ok"] is False
@@ -289,6 +289,7 @@ class TestMemoryQueryFallback:
         assert call_kwargs["top_k"] == top_k
         assert call_kwargs["space_filter"] == spaces[0]
         assert call_kwargs["evidence_filter"] == filters["evidence"]
+        assert call_kwargs["mode"] == fake_config.memory_fallback_mode
 
     @pytest.mark.asyncio
     async def test_fallback_also_fails_returns_error(self):
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+test_db_instrumentation.py - 语句级数据库埋点测试
+
+测试覆盖:
+    - SQL 归一化与指纹
+    - QueryStatsRegistry 聚合（count/total/p95/rows/errors）与慢查询记录
+    - correlation_id 提供函数
+    - 快照落盘/读取与 Prometheus 输出
+    - get_connection 按开关安装 InstrumentedCursor（需要 PostgreSQL）
+"""
+
+import logging
+
+import pytest
+
+from engram.logbook import db_instrumentation
+from engram.logbook.db_instrumentation import (
+    ENV_DB_INSTRUMENTATION,
+    InstrumentedCursor,
+    QueryStatsRegistry,
+    dump_snapshot,
+    fingerprint_query,
+    format_prometheus_metrics,
+    load_snapshot,
+    maybe_install,
+    normalize_query,
+    set_correlation_id,
+    set_correlation_id_provider,
+)
+
+
+@pytest.fixture(autouse=True)
+def _isolate_registry():
+    db_instrumentation.reset_registry()
+    set_correlation_id_provider(None)
+    yield
+    db_instrumentation.reset_registry()
+    set_correlation_id_provider(None)
+
+
+# ---------- 测试：归一化 ----------
+
+
+class TestNormalizeQuery:
+    def test_literals_and_whitespace(self):
+        query = """
+            SELECT * FROM logbook.kv
+            WHERE namespace = 'scm.sync' AND key = 'cursor:1'   LIMIT 10
+        """
+        assert (
+            normalize_query(query)
+            == "SELECT * FROM logbook.kv WHERE namespace = ? AND key = ? LIMIT ?"
+        )
+
+    def test_in_list_collapsed(self):
+        assert normalize_query("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == (
+            "SELECT ? FROM t WHERE id IN (...)"
+        )
+        assert normalize_query("DELETE FROM t WHERE id IN (%s,%s)") == (
+            "DELETE FROM t WHERE id IN (...)"
+        )
+
+    def test_identifiers_and_placeholders_kept(self):
+        normalized = normalize_query("SELECT col1 FROM t2 WHERE x = %s AND y = $1")
+        assert normalized == "SELECT col1 FROM t2 WHERE x = %s AND y = $1"
+
+    def test_same_shape_same_fingerprint(self):
+        a = normalize_query("SELECT * FROM t WHERE id = 1")
+        b = normalize_query("SELECT *  FROM t\n WHERE id = 42")
+        assert fingerprint_query(a) == fingerprint_query(b)
+
+
+# ---------- 测试：聚合 ----------
+
+
+class TestQueryStatsRegistry:
+    def test_aggregates_by_fingerprint(self):
+        registry = QueryStatsRegistry(slow_query_ms=10_000)
+        for i in range(1, 101):
+            registry.record(f"SELECT * FROM t WHERE id = {i}", float(i), 1)
+        registry.record("SELECT * FROM t WHERE id = 0", 5.0, -1, error=True)
+
+        snapshot = registry.snapshot()
+        assert snapshot["statement_count"] == 1
+        stmt = snapshot["statements"][0]
+        assert stmt["count"] == 101
+        assert stmt["errors"] == 1
+        assert stmt["rows"] == 100
+        assert stmt["max_ms"] == 100.0
+        assert stmt["p95_ms"] == 95.0
+        assert stmt["total_ms"] == pytest.approx(5055.0)
+        assert snapshot["slow_queries"] == []
+
+    def test_top_and_sort(self):
+        registry = QueryStatsRegistry(slow_query_ms=10_000)
+        registry.record("SELECT a FROM t", 1.0, 0)
+        registry.record("SELECT a FROM t", 1.0, 0)
+        registry.record("SELECT b FROM t", 50.0, 0)
+
+        by_total = registry.snapshot(top=1)
+        assert by_total["statements"][0]["query"] == "SELECT b FROM t"
+        by_count = registry.snapshot(top=1, sort_by="count")
+        assert by_count["statements"][0]["query"] == "SELECT a FROM t"
+
+        with pytest.raises(ValueError):
+            registry.snapshot(sort_by="nope")
+
+    def test_slow_query_logged_with_correlation_id(self, caplog):
+        registry = QueryStatsRegistry(slow_query_ms=100)
+        token = set_correlation_id("corr-0123456789abcdef")
+        try:
+            with caplog.at_level(logging.WARNING, logger="engram.logbook.db.slow"):
+                registry.record("SELECT pg_sleep(1)", 1000.0, 1)
+                registry.record("SELECT 1", 1.0, 1)
+        finally:
+            db_instrumentation._correlation_id.reset(token)
+
+        slow = registry.snapshot()["slow_queries"]
+        assert len(slow) == 1
+        assert slow[0]["correlation_id"] == "corr-0123456789abcdef"
+        assert "corr-0123456789abcdef" in caplog.text
+
+    def test_provider_takes_precedence(self):
+        registry = QueryStatsRegistry(slow_query_ms=0)
+        set_correlation_id_provider(lambda: "corr-fedcba9876543210")
+        registry.record("SELECT 1", 1.0, 1)
+        assert registry.snapshot()["slow_queries"][0]["correlation_id"] == "corr-fedcba9876543210"
+
+
+# ---------- 测试：快照 ----------
+
+
+class TestSnapshotIO:
+    def test_dump_and_load_roundtrip(self, tmp_path):
+        registry = QueryStatsRegistry(slow_query_ms=10_000)
+        registry.record("SELECT a FROM t", 3.0, 2)
+        registry.record("SELECT b FROM t", 1.0, 1)
+        path = tmp_path / "stats.json"
+        dump_snapshot(path, registry.snapshot())
+
+        loaded = load_snapshot(path, top=1, sort_by="rows")
+        assert loaded["statement_count"] == 2
+        assert [s["query"] for s in loaded["statements"]] == ["SELECT a FROM t"]
+
+    def test_prometheus_format(self):
+        registry = QueryStatsRegistry(slow_query_ms=10_000)
+        registry.record("SELECT a FROM t", 3.0, 2)
+        text = format_prometheus_metrics(registry.snapshot())
+        fp = fingerprint_query("SELECT a FROM t")
+        assert f'engram_db_statement_calls_total{{fingerprint="{fp}"}} 1' in text
+        assert "engram_db_slow_queries 0" in text
+
+
+# ---------- 测试：安装开关 ----------
+
+
+class _Conn:
+    cursor_factory = None
+
+
+class TestMaybeInstall:
+    def test_disabled_leaves_connection_untouched(self, monkeypatch):
+        monkeypatch.delenv(ENV_DB_INSTRUMENTATION, raising=False)
+        conn = _Conn()
+        maybe_install(conn)
+        assert conn.cursor_factory is None
+
+    def test_enabled_installs_cursor_factory(self, monkeypatch):
+        monkeypatch.setenv(ENV_DB_INSTRUMENTATION, "1")
+        conn = _Conn()
+        maybe_install(conn)
+        assert conn.cursor_factory is InstrumentedCursor
+
+    def test_get_connection_records_statements(self, monkeypatch, migrated_db):
+        from engram.logbook.db import get_connection
+
+        monkeypatch.setenv(ENV_DB_INSTRUMENTATION, "1")
+        conn = get_connection(dsn=migrated_db["dsn"])
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT generate_series(1, %s)", (3,))
+                cur.fetchall()
+        finally:
+            conn.close()
+
+        stmts = db_instrumentation.get_registry().snapshot()["statements"]
+        match = [s for s in stmts if s["query"] == "SELECT generate_series(?, %s)"]
+        assert match and match[0]["count"] == 1 and match[0]["rows"] == 3
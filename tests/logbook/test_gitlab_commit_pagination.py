@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+test_gitlab_commit_pagination.py - GitLabClient 分页遍历测试
+
+覆盖:
+- iter_pages 按 X-Next-Page / Link 头翻页，无分页头时按满页推断
+- start_page / max_pages 断点续传
+- 每页请求经过速率限制器
+- iter_commit_pages 逐页解析为 GitCommit
+- backfill_gitlab_commits 每页提交续传检查点，失败重试从检查点继续
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook.gitlab_client import (
+    GitLabAPIError,
+    GitLabClient,
+    HttpConfig,
+    resolve_next_page,
+)
+from engram.logbook.scm_db import BulkUpsertResult
+from engram.logbook.scm_sync_tasks import gitlab_commits
+from engram.logbook.scm_sync_tasks.gitlab_commits import (
+    DiffMode,
+    SyncConfig,
+    backfill_gitlab_commits,
+    iter_commit_pages,
+)
+
+COMMITS_URL = "https://gitlab.example.com/api/v4/projects/123/repository/commits"
+
+
+@pytest.fixture
+def requests_mock():
+    import requests_mock as rm
+
+    with rm.Mocker() as m:
+        yield m
+
+
+@pytest.fixture
+def client():
+    provider = MagicMock()
+    provider.get_token.return_value = "test-token"
+    return GitLabClient(
+        base_url="https://gitlab.example.com",
+        token_provider=provider,
+        http_config=HttpConfig(max_attempts=1),
+    )
+
+
+def _commit(i):
+    return {
+        "id": f"{i:040x}",
+        "author_name": "dev",
+        "committed_date": f"2024-01-{i % 28 + 1:02d}T10:00:00Z",
+        "message": f"commit {i}",
+    }
+
+
+def _register_offset_pages(requests_mock, pages):
+    """按 page 参数返回对应页，带 X-Next-Page 头"""
+
+    def _callback(request, context):
+        page = int(request.qs["page"][0])
+        context.headers["X-Next-Page"] = str(page + 1) if page < len(pages) else ""
+        return pages[page - 1]
+
+    requests_mock.get(COMMITS_URL, json=_callback)
+
+
+class TestIterPages:
+    def test_follows_x_next_page(self, client, requests_mock):
+        pages = [[_commit(1), _commit(2)], [_commit(3), _commit(4)], [_commit(5)]]
+        _register_offset_pages(requests_mock, pages)
+
+        result = list(client.iter_commits("123", since="2024-01-01T00:00:00Z", per_page=2))
+
+        assert [p.page for p in result] == [1, 2, 3]
+        assert [p.next_page for p in result] == [2, 3, None]
+        assert result[-1].is_last
+        assert [c["id"] for p in result for c in p.items] == [_commit(i)["id"] for i in range(1, 6)]
+        # 每页都带原始过滤参数
+        for request in requests_mock.request_history:
+            assert request.qs["since"] == ["2024-01-01t00:00:00z"]
+            assert request.qs["per_page"] == ["2"]
+
+    def test_start_page_and_max_pages(self, client, requests_mock):
+        pages = [[_commit(i)] for i in range(1, 6)]
+        _register_offset_pages(requests_mock, pages)
+
+        result = list(client.iter_commits("123", per_page=1, start_page=3, max_pages=2))
+
+        assert [p.page for p in result] == [3, 4]
+        assert result[-1].next_page == 5
+        assert [r.qs["page"] for r in requests_mock.request_history] == [["3"], ["4"]]
+
+    def test_follows_link_header_for_keyset(self, client, requests_mock):
+        next_link = f'<{COMMITS_URL}?cursor=abc&per_page=2&pagination=keyset>; rel="next"'
+        requests_mock.get(
+            COMMITS_URL,
+            [
+                {"json": [_commit(1), _commit(2)], "headers": {"Link": next_link}},
+                {"json": [_commit(3)]},
+            ],
+        )
+
+        result = list(client.iter_pages("/projects/123/repository/commits", per_page=2))
+
+        assert len(result) == 2
+        assert result[0].next_page is None
+        assert result[0].next_params == {"cursor": "abc", "per_page": "2", "pagination": "keyset"}
+        assert requests_mock.request_history[1].qs["cursor"] == ["abc"]
+        assert result[1].is_last
+
+    def test_without_headers_full_page_means_more(self, client, requests_mock):
+        requests_mock.get(
+            COMMITS_URL,
+            [{"json": [_commit(1), _commit(2)]}, {"json": []}],
+        )
+
+        result = list(client.iter_commits("123", per_page=2))
+
+        assert [len(p.items) for p in result] == [2, 0]
+        assert result[-1].is_last
+
+    def test_non_list_response_raises(self, client, requests_mock):
+        requests_mock.get(COMMITS_URL, json={"message": "unexpected"})
+
+        with pytest.raises(GitLabAPIError):
+            list(client.iter_commits("123"))
+
+    def test_each_page_acquires_rate_limiter(self, client, requests_mock):
+        limiter = MagicMock()
+        limiter.acquire.return_value = True
+        client._rate_limiter = limiter
+        _register_offset_pages(requests_mock, [[_commit(1)], [_commit(2)], [_commit(3)]])
+
+        list(client.iter_commits("123", per_page=1))
+
+        assert limiter.acquire.call_count == 3
+
+
+class TestResolveNextPage:
+    def test_empty_x_next_page_is_last(self):
+        response = MagicMock(headers={"X-Next-Page": ""}, links={})
+        assert resolve_next_page(response, {"page": 4}, 100, 100) == (None, None)
+
+    def test_partial_page_without_headers_is_last(self):
+        response = MagicMock(headers={}, links={})
+        assert resolve_next_page(response, {"page": 1}, 10, 100) == (None, None)
+
+
+class TestIterCommitPages:
+    def test_yields_parsed_commits_per_page(self, client, requests_mock):
+        _register_offset_pages(requests_mock, [[_commit(1), _commit(2)], [_commit(3)]])
+
+        pages = list(iter_commit_pages(client, "123", per_page=2))
+
+        assert [len(p.commits) for p in pages] == [2, 1]
+        assert pages[0].commits[0].sha == _commit(1)["id"]
+        assert pages[0].commits[0].committed_date is not None
+        assert pages[0].next_page == 2
+        assert pages[1].is_last
+
+
+class TestBackfillCheckpoint:
+    def test_retry_resumes_from_checkpoint(self, client, requests_mock, monkeypatch):
+        pages = [[_commit(1), _commit(2)], [_commit(3), _commit(4)], [_commit(5)]]
+        fail_page = {"page": 2}
+
+        def _callback(request, context):
+            page = int(request.qs["page"][0])
+            if page == fail_page["page"]:
+                context.status_code = 500
+                return {"message": "boom"}
+            context.headers["X-Next-Page"] = str(page + 1) if page < len(pages) else ""
+            return pages[page - 1]
+
+        requests_mock.get(COMMITS_URL, json=_callback)
+
+        store = {}
+        written = []
+        monkeypatch.setattr(gitlab_commits, "_get_client", lambda cfg: client)
+        monkeypatch.setattr(gitlab_commits, "get_connection", lambda dsn: MagicMock())
+        monkeypatch.setattr(gitlab_commits, "ensure_repo", lambda *a, **kw: 7)
+        monkeypatch.setattr(
+            gitlab_commits,
+            "insert_git_commits",
+            lambda conn, repo_id, commits: (
+                written.extend(c.sha for c in commits) or BulkUpsertResult(inserted=len(commits))
+            ),
+        )
+        monkeypatch.setattr(
+            gitlab_commits,
+            "get_cursor_value",
+            lambda conn, repo_id, name: {"value": store[name]} if name in store else None,
+        )
+        monkeypatch.setattr(
+            gitlab_commits,
+            "set_cursor_value",
+            lambda conn, repo_id, name, value: store.__setitem__(name, value),
+        )
+        monkeypatch.setattr(
+            gitlab_commits, "delete_cursor_value", lambda conn, repo_id, name: store.pop(name)
+        )
+        sync_config = SyncConfig(
+            gitlab_url="https://gitlab.example.com",
+            project_id="123",
+            token_provider=MagicMock(),
+            batch_size=2,
+            diff_mode=DiffMode.NONE,
+        )
+
+        def _run():
+            return backfill_gitlab_commits(
+                sync_config, project_key="p", since="2024-01-01", until="2024-02-01"
+            )
+
+        with pytest.raises(GitLabAPIError):
+            _run()
+        (checkpoint,) = store.values()
+        assert checkpoint["next_page"] == 2
+        assert checkpoint["per_page"] == 2
+
+        fail_page["page"] = None
+        result = _run()
+
+        assert result["start_page"] == 2
+        assert result["pages_fetched"] == 2
+        assert result["next_page"] is None
+        assert written == [_commit(i)["id"] for i in range(1, 6)]
+        assert store == {}
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+test_gitlab_commits_incremental_sync.py - GitLab commits 增量同步引擎测试
+
+覆盖:
+- 从游标水位线出发按窗口推进，重叠窗口内的已同步 commit 被去重
+- 每批写入后按 (ts, sha) 单调推进游标
+- 稳态下请求数与新 commit 数量成正比（空窗口直接延伸到当前时间）
+- 429/超时缩小窗口并重试，超过重试次数返回错误分类且保留已完成的进度
+- commit 数超过阈值时缩小窗口重新获取
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook.cursor import Cursor
+from engram.logbook.gitlab_client import GitLabPage, GitLabRateLimitError
+from engram.logbook.scm_db import BulkUpsertResult
+from engram.logbook.scm_sync_tasks import gitlab_commits
+from engram.logbook.scm_sync_tasks.gitlab_commits import (
+    DiffMode,
+    SyncConfig,
+    sync_gitlab_commits_incremental,
+)
+
+NOW = datetime(2024, 6, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+INCREMENTAL_CONFIG = {
+    "overlap_seconds": 300,
+    "time_window_days": 30,
+    "forward_window_seconds": 3600,
+    "forward_window_min_seconds": 60,
+    "adaptive_shrink_factor": 0.5,
+    "adaptive_grow_factor": 1.5,
+    "adaptive_commit_threshold": 200,
+}
+
+
+def _ts(dt):
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+def _commit(sha, dt):
+    return {"id": sha, "author_name": "dev", "committed_date": _ts(dt), "message": sha}
+
+
+class FakeGitLabClient:
+    """按 since/until 过滤并以时间倒序分页返回 commits"""
+
+    def __init__(self, commits, errors=None):
+        self.commits = commits
+        self.errors = list(errors or [])
+        self.calls = []
+
+    def iter_commits(self, project_id, since=None, until=None, per_page=100, **kwargs):
+        self.calls.append((since, until))
+        if self.errors:
+            raise self.errors.pop(0)
+        since_dt = datetime.fromisoformat(since.replace("Z", "+00:00"))
+        until_dt = datetime.fromisoformat(until.replace("Z", "+00:00"))
+        items = sorted(
+            (
+                c
+                for c in self.commits
+                if since_dt
+                <= datetime.fromisoformat(c["committed_date"].replace("Z", "+00:00"))
+                <= until_dt
+            ),
+            key=lambda c: (c["committed_date"], c["id"]),
+            reverse=True,
+        )
+        chunks = [items[i : i + per_page] for i in range(0, len(items), per_page)] or [[]]
+        for index, chunk in enumerate(chunks, start=1):
+            last = index == len(chunks)
+            yield GitLabPage(
+                items=chunk,
+                page=index,
+                next_page=None if last else index + 1,
+                next_params=None if last else {"page": index + 1},
+            )
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """替换数据库与游标读写，记录写入的 commits 与游标"""
+    state = {"watermark": {}, "inserted": [], "cursor_updates": []}
+
+    def _insert(conn, repo_id, commits):
+        state["inserted"].extend(c.sha for c in commits)
+        return BulkUpsertResult(inserted=len(commits))
+
+    def _update_cursor(repo_id, *, last_commit_sha, last_commit_ts, synced_count):
+        state["cursor_updates"].append((last_commit_ts, last_commit_sha))
+        state["watermark"] = {"last_commit_sha": last_commit_sha, "last_commit_ts": last_commit_ts}
+        return True
+
+    monkeypatch.setattr(gitlab_commits, "get_connection", lambda dsn: MagicMock())
+    monkeypatch.setattr(gitlab_commits, "ensure_repo", lambda conn, **kwargs: 1)
+    monkeypatch.setattr(
+        gitlab_commits,
+        "load_gitlab_cursor",
+        lambda repo_id: Cursor(watermark=dict(state["watermark"])),
+    )
+    monkeypatch.setattr(gitlab_commits, "insert_git_commits", _insert)
+    monkeypatch.setattr(gitlab_commits, "update_sync_cursor", _update_cursor)
+    monkeypatch.setattr(gitlab_commits, "get_incremental_config", lambda: INCREMENTAL_CONFIG)
+    return state
+
+
+def _sync(client, batch_size=100, **kwargs):
+    config = SyncConfig(
+        gitlab_url="https://gitlab.example.com",
+        project_id="123",
+        token_provider=MagicMock(),
+        batch_size=batch_size,
+        diff_mode=DiffMode.NONE,
+    )
+    return sync_gitlab_commits_incremental(
+        config, project_key="proj", client=client, now=NOW, dsn="postgresql://unused", **kwargs
+    )
+
+
+class TestIncrementalSync:
+    def test_first_sync_then_steady_state(self, store):
+        base = NOW - timedelta(days=2)
+        commits = [_commit(f"{i:02d}", base + timedelta(minutes=i)) for i in range(5)]
+        client = FakeGitLabClient(commits)
+
+        first = _sync(client)
+        assert first["success"] and first["caught_up"]
+        assert store["inserted"] == [c["id"] for c in commits]
+        assert store["watermark"]["last_commit_sha"] == "04"
+
+        # 游标之后没有新 commit：重叠窗口只返回已同步的 commit，不重复写入
+        client.calls.clear()
+        second = _sync(client)
+        assert second["synced_count"] == 0
+        assert second["cursor_advanced"] is False
+        assert len(client.calls) <= 2
+
+        # 新增 commit 只同步增量部分
+        client.commits.append(_commit("99", NOW - timedelta(minutes=5)))
+        third = _sync(client)
+        assert third["synced_count"] == 1
+        assert store["inserted"][-1] == "99"
+        assert store["watermark"]["last_commit_sha"] == "99"
+
+    def test_overlap_window_starts_before_cursor(self, store):
+        cursor_ts = NOW - timedelta(minutes=30)
+        store["watermark"] = {"last_commit_sha": "aa", "last_commit_ts": _ts(cursor_ts)}
+        client = FakeGitLabClient([_commit("aa", cursor_ts)])
+
+        _sync(client)
+
+        since = client.calls[0][0]
+        assert since == _ts(cursor_ts - timedelta(seconds=300))
+
+    def test_cursor_advances_per_batch_in_ascending_order(self, store):
+        store["watermark"] = {
+            "last_commit_sha": "00",
+            "last_commit_ts": _ts(NOW - timedelta(hours=1)),
+        }
+        same_second = NOW - timedelta(minutes=10)
+        commits = [_commit(sha, same_second) for sha in ("c", "a", "b")]
+        commits.append(_commit("d", NOW - timedelta(minutes=20)))
+
+        result = _sync(FakeGitLabClient(commits), batch_size=2)
+
+        assert result["synced_count"] == 4
+        assert store["inserted"] == ["d", "a", "b", "c"]
+        assert [sha for _, sha in store["cursor_updates"]] == ["a", "c"]
+
+    def test_empty_window_extends_to_now(self, store):
+        last = NOW - timedelta(days=10)
+        store["watermark"] = {"last_commit_sha": "aa", "last_commit_ts": _ts(last)}
+        client = FakeGitLabClient([_commit("aa", last), _commit("bb", NOW - timedelta(hours=1))])
+
+        result = _sync(client)
+
+        assert result["caught_up"]
+        assert result["synced_count"] == 1
+        # 第一个窗口为空，第二个窗口直接到当前时间
+        assert len(client.calls) == 2
+        assert client.calls[-1][1] == _ts(NOW)
+
+
+class TestIncrementalSyncAdaptive:
+    def test_rate_limit_shrinks_and_retries(self, store):
+        store["watermark"] = {
+            "last_commit_sha": "00",
+            "last_commit_ts": _ts(NOW - timedelta(hours=3)),
+        }
+        client = FakeGitLabClient(
+            [_commit("bb", NOW - timedelta(hours=2, minutes=50))],
+            errors=[GitLabRateLimitError("429")],
+        )
+
+        result = _sync(client)
+
+        assert result["success"]
+        assert result["rate_limit_count"] == 1
+        assert store["inserted"] == ["bb"]
+        # 重试窗口按 shrink_factor 缩小
+        first_until = datetime.fromisoformat(client.calls[0][1].replace("Z", "+00:00"))
+        retry_until = datetime.fromisoformat(client.calls[1][1].replace("Z", "+00:00"))
+        assert retry_until < first_until
+
+    def test_retries_exhausted_keeps_progress(self, store):
+        start = NOW - timedelta(hours=3)
+        store["watermark"] = {"last_commit_sha": "00", "last_commit_ts": _ts(start)}
+        client = FakeGitLabClient([_commit("bb", start + timedelta(minutes=10))])
+        # 第一个窗口成功，之后持续限流
+        original = client.iter_commits
+
+        def _iter(*args, **kwargs):
+            if len(client.calls) >= 1:
+                client.calls.append((kwargs.get("since"), kwargs.get("until")))
+                raise GitLabRateLimitError("429")
+            return original(*args, **kwargs)
+
+        client.iter_commits = _iter
+
+        result = _sync(client, max_retries=2)
+
+        assert result["success"] is False
+        assert result["error_category"] == "rate_limited"
+        assert result["synced_count"] == 1
+        assert store["watermark"]["last_commit_sha"] == "bb"
+
+    def test_dense_window_is_refetched_smaller(self, store):
+        start = NOW - timedelta(minutes=50)
+        store["watermark"] = {"last_commit_sha": "0", "last_commit_ts": _ts(start)}
+        commits = [_commit(f"{i:04d}", start + timedelta(seconds=5 * (i + 1))) for i in range(400)]
+        client = FakeGitLabClient(commits)
+
+        result = _sync(client)
+
+        assert result["caught_up"]
+        assert result["synced_count"] == 400
+        assert store["inserted"] == [c["id"] for c in commits]
+        # 首个窗口超过阈值后缩小重取，之后的窗口仍首尾相接
+        assert len(client.calls) > 2
+        assert result["window_seconds"] < 3600
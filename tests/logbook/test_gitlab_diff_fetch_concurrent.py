@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+test_gitlab_diff_fetch_concurrent.py - commit diff 并发获取与批量写入测试
+
+覆盖:
+- map_bounded 保持输入顺序，线程数受 ConcurrencyLimiter 约束
+- fetch_commit_diffs 并发获取，超过 max_size_bytes 返回 PatchFetchContentTooLargeError
+- write_commit_patches 降级/严格模式与批量 upsert 顺序
+- scm_db.upsert_patch_blobs 批量写入与冲突复用（需要 PostgreSQL）
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook.gitlab_client import (
+    ConcurrencyLimiter,
+    GitLabClient,
+    HttpConfig,
+    map_bounded,
+)
+from engram.logbook.scm_sync_tasks import gitlab_commits
+from engram.logbook.scm_sync_tasks.gitlab_commits import (
+    DiffMode,
+    FetchDiffResult,
+    GitCommit,
+    PatchFetchContentTooLargeError,
+    PatchFetchHttpError,
+    fetch_commit_diffs,
+    write_commit_patches,
+)
+
+DIFF_URL = "https://gitlab.example.com/api/v4/projects/123/repository/commits/{sha}/diff"
+
+
+@pytest.fixture
+def requests_mock():
+    import requests_mock as rm
+
+    with rm.Mocker() as m:
+        yield m
+
+
+@pytest.fixture
+def client():
+    provider = MagicMock()
+    provider.get_token.return_value = "test-token"
+    return GitLabClient(
+        base_url="https://gitlab.example.com",
+        token_provider=provider,
+        http_config=HttpConfig(max_attempts=1),
+        concurrency_limiter=ConcurrencyLimiter(4),
+    )
+
+
+def _diff(path):
+    return {"old_path": path, "new_path": path, "diff": f"@@ -1 +1 @@\n-a\n+{path}\n"}
+
+
+# ---------- 测试：有界并发 ----------
+
+
+class TestMapBounded:
+    def test_preserves_order_and_caps_workers(self):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def _work(i):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            # 逆序完成，验证结果仍按输入顺序返回
+            time.sleep(0.002 * (10 - i))
+            with lock:
+                active -= 1
+            return i * i
+
+        results = map_bounded(
+            _work, list(range(10)), max_workers=8, concurrency_limiter=ConcurrencyLimiter(3)
+        )
+
+        assert results == [i * i for i in range(10)]
+        assert 1 < peak <= 3
+
+    def test_single_worker_runs_inline(self):
+        assert map_bounded(str, [1, 2], max_workers=1) == ["1", "2"]
+
+
+# ---------- 测试：并发获取 ----------
+
+
+class TestFetchCommitDiffs:
+    def test_results_follow_commit_order(self, client, requests_mock):
+        shas = [f"{i:040x}" for i in range(6)]
+        for sha in shas:
+            requests_mock.get(DIFF_URL.format(sha=sha), json=[_diff(f"{sha[-1]}.py")])
+
+        results = fetch_commit_diffs(
+            client,
+            "123",
+            [GitCommit(sha=sha) for sha in shas],
+            max_workers=4,
+            max_size_bytes=1024 * 1024,
+        )
+
+        assert [r.success for r in results] == [True] * 6
+        assert [r.diffs[0]["new_path"] for r in results] == [f"{s[-1]}.py" for s in shas]
+
+    def test_too_large_and_http_errors(self, client, requests_mock):
+        requests_mock.get(DIFF_URL.format(sha="big"), json=[_diff("x" * 2048)])
+        requests_mock.get(DIFF_URL.format(sha="gone"), status_code=404, json={})
+
+        big, gone = fetch_commit_diffs(
+            client,
+            "123",
+            [GitCommit(sha="big"), GitCommit(sha="gone")],
+            max_workers=2,
+            max_size_bytes=1024,
+        )
+
+        assert isinstance(big.error, PatchFetchContentTooLargeError)
+        assert isinstance(gone.error, PatchFetchHttpError)
+        assert gone.status_code == 404
+
+    def test_each_request_acquires_rate_limiter(self, client, requests_mock):
+        limiter = MagicMock()
+        limiter.acquire.return_value = True
+        client._rate_limiter = limiter
+        shas = [f"s{i}" for i in range(5)]
+        for sha in shas:
+            requests_mock.get(DIFF_URL.format(sha=sha), json=[])
+
+        fetch_commit_diffs(
+            client, "123", [GitCommit(sha=s) for s in shas], max_workers=3, max_size_bytes=1024
+        )
+
+        assert limiter.acquire.call_count == 5
+
+
+# ---------- 测试：批量写入 ----------
+
+
+@pytest.fixture
+def captured(monkeypatch, tmp_path):
+    """制品写入临时目录，记录批量 upsert 的行"""
+    from engram.logbook import scm_artifacts
+
+    calls = []
+    original = scm_artifacts.write_text_artifact
+    monkeypatch.setattr(
+        scm_artifacts,
+        "write_text_artifact",
+        lambda **kwargs: original(artifacts_root=tmp_path, **kwargs),
+    )
+
+    def _upsert(conn, rows):
+        calls.append(rows)
+        return list(range(1, len(rows) + 1))
+
+    monkeypatch.setattr(gitlab_commits, "upsert_patch_blobs", _upsert)
+    return calls
+
+
+class TestWriteCommitPatches:
+    def test_best_effort_degrades_failures(self, captured):
+        commits = [
+            GitCommit(sha="a" * 40),
+            GitCommit(sha="b" * 40, stats={"total": 2, "additions": 3, "deletions": 1}),
+        ]
+        results = [
+            FetchDiffResult(success=True, diffs=[_diff("a.py")]),
+            FetchDiffResult(
+                success=False,
+                error=PatchFetchContentTooLargeError("too large"),
+                error_message="too large",
+                endpoint="/projects/123/repository/commits/bbb/diff",
+            ),
+        ]
+
+        stats = write_commit_patches(MagicMock(), 7, commits, results, project_key="proj")
+
+        assert stats == {"written": 2, "degraded": 1, "blob_ids": [1, 2]}
+        (rows,) = captured
+        assert [r["source_id"] for r in rows] == [f"7:{'a' * 40}", f"7:{'b' * 40}"]
+        assert [r["format"] for r in rows] == ["diff", "ministat"]
+        assert rows[1]["meta_json"]["degrade_reason"] == "content_too_large"
+        assert rows[0]["uri"].endswith(".diff")
+
+    def test_formatted_content_over_limit_degrades(self, captured):
+        stats = write_commit_patches(
+            MagicMock(),
+            7,
+            [GitCommit(sha="c" * 40)],
+            [FetchDiffResult(success=True, diffs=[_diff("y" * 100)])],
+            max_size_bytes=64,
+        )
+        assert stats["degraded"] == 1
+        assert captured[0][0]["format"] == "ministat"
+
+    def test_always_mode_raises_fetch_errors(self, captured):
+        with pytest.raises(PatchFetchHttpError):
+            write_commit_patches(
+                MagicMock(),
+                7,
+                [GitCommit(sha="d" * 40)],
+                [FetchDiffResult(success=False, error=PatchFetchHttpError("500"))],
+                diff_mode=DiffMode.ALWAYS,
+            )
+        assert captured == []
+
+
+# ---------- 测试：批量 upsert（需要数据库） ----------
+
+
+class TestUpsertPatchBlobsDb:
+    def test_ids_follow_input_order_and_reuse_existing(self, db_conn):
+        from engram.logbook import scm_db
+
+        existing = scm_db.upsert_patch_blob(db_conn, "git", "990001:aaa", "0" * 64, uri="a.diff")
+        rows = [
+            {"source_type": "git", "source_id": "990001:bbb", "sha256": "1" * 64, "uri": "b"},
+            {"source_type": "git", "source_id": "990001:aaa", "sha256": "0" * 64, "uri": "a"},
+            {"source_type": "git", "source_id": "990001:bbb", "sha256": "1" * 64, "uri": "b"},
+        ]
+
+        ids = scm_db.upsert_patch_blobs(db_conn, rows)
+
+        assert ids[1] == existing
+        assert ids[0] == ids[2] != existing
+        assert scm_db.upsert_patch_blobs(db_conn, rows) == ids
+        blob = scm_db.get_patch_blob(db_conn, "git", "990001:bbb", "1" * 64)
+        assert blob["meta_json"]["materialize_status"] == "done"
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+test_gitlab_mr_details_concurrent.py - MR 详情/评审数据并发获取测试
+
+覆盖:
+- fetch_merge_request_details 并发获取、discussions/notes 分页取全、失败只影响对应 MR
+- build_review_events 事件类型映射与 note 去重
+- compute_reviews_cursor_target 只推进到连续成功的前缀，可越过已跳过的 MR
+- list_merge_requests_after 按 (updated_at, iid) 列出，同时间戳 MR 跨页时不漏不停滞
+- sync_gitlab_mrs_incremental 批量写入与游标推进、连续失败计数与跳过（模拟数据库与游标）
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook.gitlab_client import ConcurrencyLimiter, GitLabClient, HttpConfig
+from engram.logbook.scm_db import BulkUpsertResult
+from engram.logbook.scm_sync_executor import validate_sync_result_contract
+from engram.logbook.scm_sync_tasks import gitlab_mrs
+from engram.logbook.scm_sync_tasks.gitlab_mrs import (
+    MergeRequestDetails,
+    build_review_events,
+    compute_reviews_cursor_target,
+    fetch_merge_request_details,
+    list_merge_requests_after,
+    parse_merge_request,
+)
+
+MR_URL = "https://gitlab.example.com/api/v4/projects/123/merge_requests/{iid}"
+
+
+@pytest.fixture
+def requests_mock():
+    import requests_mock as rm
+
+    with rm.Mocker() as m:
+        yield m
+
+
+@pytest.fixture
+def client():
+    provider = MagicMock()
+    provider.get_token.return_value = "test-token"
+    return GitLabClient(
+        base_url="https://gitlab.example.com",
+        token_provider=provider,
+        http_config=HttpConfig(max_attempts=1),
+        concurrency_limiter=ConcurrencyLimiter(4),
+    )
+
+
+def _paged(pages):
+    """按 page 参数返回对应页，带 X-Next-Page 头"""
+
+    def _callback(request, context):
+        page = int(request.qs.get("page", ["1"])[0])
+        context.headers["X-Next-Page"] = str(page + 1) if page < len(pages) else ""
+        return pages[page - 1]
+
+    return _callback
+
+
+def _register_mr(requests_mock, iid, *, approvals_status=200):
+    base = MR_URL.format(iid=iid)
+    requests_mock.get(base, json={"iid": iid, "state": "opened", "project_id": 123})
+    requests_mock.get(
+        f"{base}/discussions",
+        json=_paged(
+            [
+                [{"id": f"d{iid}a", "notes": [{"id": iid * 10 + 1, "body": "a"}]}],
+                [{"id": f"d{iid}b", "notes": [{"id": iid * 10 + 2, "body": "b"}]}],
+            ]
+        ),
+    )
+    requests_mock.get(
+        f"{base}/notes", json=_paged([[{"id": iid * 10 + 1}], [{"id": iid * 10 + 3}]])
+    )
+    requests_mock.get(
+        f"{base}/approvals",
+        status_code=approvals_status,
+        json={"approved_by": [{"user": {"id": 7, "username": "rev"}}]},
+    )
+    requests_mock.get(f"{base}/resource_state_events", json=[{"id": 1, "state": "merged"}])
+
+
+def _mr(iid, updated_at):
+    return parse_merge_request(
+        {"iid": iid, "state": "opened", "updated_at": updated_at, "project_id": 123}
+    )
+
+
+# ---------- 测试：并发获取 ----------
+
+
+class TestFetchMergeRequestDetails:
+    def test_fetches_all_parts_with_pagination(self, client, requests_mock):
+        for iid in (1, 2):
+            _register_mr(requests_mock, iid)
+
+        details = fetch_merge_request_details(client, "123", [2, 1], max_workers=4)
+
+        assert [item.iid for item in details] == [2, 1]
+        assert all(item.success for item in details)
+        assert [d["id"] for d in details[0].discussions] == ["d2a", "d2b"]
+        assert [n["id"] for n in details[0].notes] == [21, 23]
+        assert details[1].approvals["approved_by"][0]["user"]["id"] == 7
+        assert details[1].state_events == [{"id": 1, "state": "merged"}]
+
+    def test_failure_marks_only_that_mr(self, client, requests_mock):
+        _register_mr(requests_mock, 1)
+        _register_mr(requests_mock, 2, approvals_status=500)
+
+        details = fetch_merge_request_details(client, "123", [1, 2], max_workers=4)
+
+        assert details[0].success
+        assert not details[1].success
+        assert details[1].error.startswith("approvals:")
+        assert details[1].error_category
+
+
+# ---------- 测试：事件构建 ----------
+
+
+class TestBuildReviewEvents:
+    def test_maps_notes_approvals_and_state_events(self):
+        details = MergeRequestDetails(
+            iid=5,
+            discussions=[
+                {
+                    "id": "abc",
+                    "notes": [
+                        {"id": 11, "body": "lgtm", "created_at": "2025-01-01T00:00:00Z"},
+                        {"id": 12, "system": True, "body": "changed the description"},
+                    ],
+                }
+            ],
+            notes=[
+                {"id": 11, "body": "lgtm"},
+                {"id": 13, "body": "nit", "author": {"username": "bob"}},
+            ],
+            approvals={"approved_by": [{"user": {"id": 7, "username": "rev"}}]},
+            state_events=[
+                {"id": 3, "state": "closed", "created_at": "2025-01-02T00:00:00Z"},
+                {"id": 4, "state": "opened"},
+            ],
+        )
+
+        events = build_review_events("1:5", details)
+
+        assert [(e["source_event_id"], e["event_type"]) for e in events] == [
+            ("note:11", "comment"),
+            ("note:13", "comment"),
+            ("approval:7", "approve"),
+            ("state_event:3", "close"),
+        ]
+        assert events[0]["payload_json"]["discussion_id"] == "abc"
+        assert events[0]["ts"] == datetime(2025, 1, 1, tzinfo=timezone.utc)
+        assert events[1]["payload_json"]["author_username"] == "bob"
+        assert all(e["mr_id"] == "1:5" for e in events)
+
+
+class TestReviewsCursorTarget:
+    def test_stops_at_first_failure(self):
+        mrs = [_mr(i, f"2025-01-0{i}T00:00:00Z") for i in (1, 2, 3)]
+        details = [
+            MergeRequestDetails(iid=1),
+            MergeRequestDetails(iid=2, error="notes: boom"),
+            MergeRequestDetails(iid=3),
+        ]
+
+        assert compute_reviews_cursor_target(mrs, details) == (
+            datetime(2025, 1, 1, tzinfo=timezone.utc),
+            1,
+        )
+        details[0].error = "detail: boom"
+        assert compute_reviews_cursor_target(mrs, details) is None
+
+    def test_skipped_failures_do_not_block(self):
+        mrs = [_mr(i, f"2025-01-0{i}T00:00:00Z") for i in (1, 2, 3)]
+        details = [
+            MergeRequestDetails(iid=1, error="detail: boom"),
+            MergeRequestDetails(iid=2),
+            MergeRequestDetails(iid=3, error="notes: boom"),
+        ]
+
+        assert compute_reviews_cursor_target(mrs, details, skip_iids={1}) == (
+            datetime(2025, 1, 2, tzinfo=timezone.utc),
+            2,
+        )
+
+
+# ---------- 测试：按 (updated_at, iid) 列出 MR ----------
+
+
+def _paged_client(pages):
+    client = MagicMock()
+    client.get_merge_requests.side_effect = lambda *a, page=1, **kw: (
+        pages[page - 1] if page <= len(pages) else []
+    )
+    return client
+
+
+class TestListMergeRequestsAfter:
+    TS = "2025-01-01T00:00:00Z"
+    CURSOR = (datetime(2025, 1, 1, tzinfo=timezone.utc), 2)
+
+    def test_pages_past_tie_group_larger_than_batch(self):
+        client = _paged_client(
+            [
+                [{"iid": 1, "updated_at": self.TS}, {"iid": 2, "updated_at": self.TS}],
+                [{"iid": 3, "updated_at": self.TS}, {"iid": 4, "updated_at": self.TS}],
+                [{"iid": 5, "updated_at": "2025-01-02T00:00:00Z"}],
+            ]
+        )
+
+        mrs, has_more = list_merge_requests_after(client, "123", self.CURSOR, batch_size=2)
+
+        assert [mr.iid for mr in mrs] == [3, 4, 5]
+        assert has_more is False
+        assert client.get_merge_requests.call_args_list[0].kwargs["updated_after"] == self.TS
+
+    def test_holds_back_tie_group_at_page_boundary(self):
+        client = _paged_client(
+            [
+                [
+                    {"iid": 9, "updated_at": "2025-01-02T00:00:00Z"},
+                    {"iid": 8, "updated_at": "2025-01-03T00:00:00Z"},
+                ],
+                [{"iid": 7, "updated_at": "2025-01-03T00:00:00Z"}],
+            ]
+        )
+
+        mrs, has_more = list_merge_requests_after(client, "123", self.CURSOR, batch_size=2)
+
+        # iid 7 与 8 同时间戳且可能跨页，只返回完整的时间戳组
+        assert [mr.iid for mr in mrs] == [9]
+        assert has_more is True
+        assert client.get_merge_requests.call_count == 1
+
+
+# ---------- 测试：增量同步（模拟数据库） ----------
+
+
+class TestSyncGitLabMrsIncremental:
+    def _run(self, monkeypatch, raw_mrs, details_by_iid, watermark, **kwargs):
+        saved = []
+        written = {}
+        conn = MagicMock()
+        client = MagicMock()
+        client.get_merge_requests.return_value = raw_mrs
+
+        monkeypatch.setattr(gitlab_mrs, "get_connection", lambda dsn: conn)
+        monkeypatch.setattr(gitlab_mrs, "ensure_repo", lambda *a, **kw: 9)
+        monkeypatch.setattr(
+            gitlab_mrs, "load_gitlab_reviews_cursor", lambda repo_id: MagicMock(watermark=watermark)
+        )
+        monkeypatch.setattr(
+            gitlab_mrs, "save_gitlab_reviews_cursor", lambda *a, **kw: saved.append(kw)
+        )
+        monkeypatch.setattr(
+            gitlab_mrs,
+            "fetch_merge_request_details",
+            lambda client, project_id, iids, **kw: [details_by_iid[i] for i in iids],
+        )
+
+        def fake_insert(conn, repo_id, mrs):
+            written["mrs"] = [mr.iid for mr in mrs]
+            return BulkUpsertResult(inserted=len(mrs))
+
+        def fake_events(conn, events):
+            written["events"] = [e["source_event_id"] for e in events]
+            return BulkUpsertResult(inserted=len(events))
+
+        monkeypatch.setattr(gitlab_mrs, "insert_merge_requests", fake_insert)
+        monkeypatch.setattr(gitlab_mrs, "bulk_insert_review_events", fake_events)
+
+        result = gitlab_mrs.sync_gitlab_mrs_incremental(
+            gitlab_url="https://gitlab.example.com",
+            project_id="123",
+            token="t",
+            project_key="proj",
+            dsn="postgresql://test",
+            batch_size=10,
+            client=client,
+            **kwargs,
+        )
+        return result, saved, written, client
+
+    def test_partial_failure_advances_contiguous_prefix(self, monkeypatch):
+        raw = [
+            {"iid": 3, "updated_at": "2025-01-03T00:00:00Z"},
+            {"iid": 1, "updated_at": "2025-01-01T00:00:00Z"},  # 与游标相同，已同步
+            {"iid": 2, "updated_at": "2025-01-02T00:00:00Z"},
+            {"iid": 4, "updated_at": "2025-01-04T00:00:00Z"},
+        ]
+        details = {
+            2: MergeRequestDetails(iid=2, notes=[{"id": 21}]),
+            3: MergeRequestDetails(iid=3, error="discussions: 503", error_category="server_error"),
+            4: MergeRequestDetails(iid=4, approvals={"approved_by": [{"user": {"id": 7}}]}),
+        }
+
+        result, saved, written, client = self._run(
+            monkeypatch,
+            raw,
+            details,
+            {"last_mr_updated_at": "2025-01-01T00:00:00Z", "last_mr_iid": 1},
+        )
+
+        assert client.get_merge_requests.call_args.kwargs["updated_after"] == (
+            "2025-01-01T00:00:00Z"
+        )
+        assert written == {"mrs": [2, 4], "events": ["note:21", "approval:7"]}
+        assert saved == [
+            {
+                "last_mr_updated_at": "2025-01-02T00:00:00Z",
+                "last_mr_iid": 2,
+                "synced_mr_count": 2,
+                "synced_event_count": 2,
+                "mr_failures": {"3": 1},
+            }
+        ]
+        assert result["success"] is False
+        assert result["failed_mr_iids"] == [3]
+        assert result["error_category"] == "server_error"
+        assert result["has_more"] is True
+        assert result["synced_mr_count"] == 2
+        assert validate_sync_result_contract(result) == (True, [])
+
+    def test_first_failure_keeps_cursor(self, monkeypatch):
+        raw = [{"iid": 1, "updated_at": "2025-01-01T00:00:00Z"}]
+        details = {1: MergeRequestDetails(iid=1, error="detail: 429", error_category="rate_limit")}
+
+        result, saved, written, _ = self._run(monkeypatch, raw, details, {})
+
+        # 游标位置不变，只记录失败次数
+        assert [(kw["last_mr_updated_at"], kw["mr_failures"]) for kw in saved] == [(None, {"1": 1})]
+        assert written == {"mrs": [], "events": []}
+        assert result["watermark_updated"] is False
+        assert result["last_mr_updated_at"] is None
+
+    def test_repeatedly_failing_mr_is_skipped(self, monkeypatch):
+        raw = [
+            {"iid": 1, "updated_at": "2025-01-01T00:00:00Z"},
+            {"iid": 2, "updated_at": "2025-01-02T00:00:00Z"},
+        ]
+        details = {
+            1: MergeRequestDetails(iid=1, error="detail: 500", error_category="server_error"),
+            2: MergeRequestDetails(iid=2),
+        }
+
+        result, saved, written, _ = self._run(
+            monkeypatch,
+            raw,
+            details,
+            {"mr_failures": {"1": 2}, "dead_mr_iids": [42]},
+            max_mr_failures=3,
+        )
+
+        assert written["mrs"] == [2]
+        assert result["skipped_mr_iids"] == [1]
+        assert result["last_mr_iid"] == 2
+        assert saved[0]["last_mr_updated_at"] == "2025-01-02T00:00:00Z"
+        assert saved[0]["dead_mr_iids"] == [42, 1]
+        assert "mr_failures" not in saved[0]
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+test_gitlab_rate_limit_lease.py - PostgresRateLimiter 令牌租约模式测试
+
+测试覆盖:
+    - 租约大小 = min(burst / workers, rate * ttl)
+    - 一次 DB 预留服务 lease_size 次 acquire
+    - 租约过期后剩余令牌作废
+    - 429 立即作废本地租约并持久化暂停
+    - release() 归还未用完的令牌
+    - lease_rate_limit_tokens / return_rate_limit_tokens 的桶语义（需要 PostgreSQL）
+"""
+
+import time
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook import scm_db
+from engram.logbook.gitlab_client import PostgresRateLimiter
+from engram.logbook.scm_db import RateLimitLeaseResult
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """替换 scm_db 的租约函数，记录调用"""
+    db = MagicMock()
+    db.lease_rate_limit_tokens.side_effect = lambda conn, key, n, **kw: RateLimitLeaseResult(
+        granted=n, wait_seconds=0.0
+    )
+    for name in ("lease_rate_limit_tokens", "return_rate_limit_tokens", "pause_rate_limit_bucket"):
+        monkeypatch.setattr(scm_db, name, getattr(db, name))
+    monkeypatch.setattr(
+        PostgresRateLimiter, "_get_conn", lambda self: contextmanager(lambda: (yield None))()
+    )
+    return db
+
+
+def _limiter(**kwargs):
+    kwargs.setdefault("rate", 10.0)
+    kwargs.setdefault("burst", 20)
+    return PostgresRateLimiter(
+        "gitlab.example.com", dsn="postgresql://unused", lease_enabled=True, **kwargs
+    )
+
+
+class TestLeaseSize:
+    def test_formula(self):
+        assert _limiter(lease_workers=1, lease_ttl_seconds=2.0).lease_size == 20
+        assert _limiter(lease_workers=4, lease_ttl_seconds=2.0).lease_size == 5
+        assert _limiter(lease_workers=1, lease_ttl_seconds=0.5).lease_size == 5
+        assert _limiter(rate=0.1, lease_ttl_seconds=1.0).lease_size == 1
+        assert _limiter(lease_size=3).lease_size == 3
+
+
+class TestLeasedAcquire:
+    def test_one_round_trip_per_lease(self, fake_db):
+        limiter = _limiter(lease_workers=4)
+
+        assert all(limiter.acquire() for _ in range(10))
+
+        assert fake_db.lease_rate_limit_tokens.call_count == 2
+        stats = limiter.get_stats()
+        assert stats["db_round_trips"] == 2
+        assert stats["leased_tokens"] == 10
+        assert stats["lease_tokens"] == 0
+        assert stats["total_requests"] == 10
+
+    def test_expired_lease_discarded(self, fake_db):
+        limiter = _limiter(lease_size=5, lease_ttl_seconds=0.05)
+        assert limiter.acquire()
+
+        time.sleep(0.06)
+        assert limiter.acquire()
+
+        assert fake_db.lease_rate_limit_tokens.call_count == 2
+        assert limiter.get_stats()["expired_lease_tokens"] == 4
+
+    def test_waits_when_bucket_empty(self, fake_db, monkeypatch):
+        fake_db.lease_rate_limit_tokens.side_effect = [
+            RateLimitLeaseResult(granted=0, wait_seconds=0.3),
+            RateLimitLeaseResult(granted=2, wait_seconds=0.0),
+        ]
+        sleeps = []
+        monkeypatch.setattr("engram.logbook.gitlab_client.time.sleep", sleeps.append)
+        limiter = _limiter()
+
+        assert limiter.acquire()
+        assert sleeps == [pytest.approx(0.3)]
+        assert limiter.get_stats()["throttled_count"] == 1
+
+    def test_rate_limit_drops_lease(self, fake_db, monkeypatch):
+        limiter = _limiter(lease_workers=4)
+        assert limiter.acquire()
+        assert limiter.get_stats()["lease_tokens"] == 4
+
+        limiter.notify_rate_limit(retry_after=30)
+
+        fake_db.pause_rate_limit_bucket.assert_called_once()
+        assert limiter.get_stats()["lease_tokens"] == 0
+        # 暂停期间不访问 DB，超时后拒绝
+        sleeps = []
+        monkeypatch.setattr("engram.logbook.gitlab_client.time.sleep", sleeps.append)
+        assert limiter.acquire(timeout=0) is False
+        assert fake_db.lease_rate_limit_tokens.call_count == 1
+        # 429 作废的令牌不归还
+        assert limiter.release() == 0
+        fake_db.return_rate_limit_tokens.assert_not_called()
+
+    def test_release_returns_unused_tokens(self, fake_db):
+        limiter = _limiter(lease_workers=4)
+        assert limiter.acquire()
+
+        assert limiter.release() == 4
+        fake_db.return_rate_limit_tokens.assert_called_once_with(None, "gitlab.example.com", 4)
+        assert limiter.release() == 0
+        assert limiter.get_stats()["returned_lease_tokens"] == 4
+
+    def test_lease_failure_fails_open(self, fake_db):
+        fake_db.lease_rate_limit_tokens.side_effect = RuntimeError("db down")
+        assert _limiter().acquire()
+
+    def test_lease_disabled_uses_per_request_consume(self, fake_db, monkeypatch):
+        consume = MagicMock(return_value=MagicMock(allowed=True))
+        monkeypatch.setattr(scm_db, "consume_rate_limit_token", consume)
+        limiter = PostgresRateLimiter("gitlab.example.com", dsn="postgresql://unused")
+
+        assert limiter.acquire() and limiter.acquire()
+
+        assert consume.call_count == 2
+        fake_db.lease_rate_limit_tokens.assert_not_called()
+
+
+# ---------- 测试：桶语义（需要数据库） ----------
+
+
+class TestLeaseTokensDb:
+    def test_lease_and_return(self, db_conn):
+        key = f"lease-test-{time.time_ns()}"
+
+        first = scm_db.lease_rate_limit_tokens(db_conn, key, 15, default_rate=1.0, default_burst=20)
+        assert first.granted == 15
+        second = scm_db.lease_rate_limit_tokens(
+            db_conn, key, 15, default_rate=1.0, default_burst=20
+        )
+        assert 5 <= second.granted < 6
+        empty = scm_db.lease_rate_limit_tokens(db_conn, key, 15, default_rate=1.0, default_burst=20)
+        assert empty.granted == 0
+        assert 0 < empty.wait_seconds <= 1.0
+
+        assert scm_db.return_rate_limit_tokens(db_conn, key, 100)
+        status = scm_db.get_rate_limit_status(db_conn, key)
+        assert status["current_tokens"] == pytest.approx(20)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+test_gitlab_response_cache.py - GitLab 条件请求响应缓存测试
+
+覆盖:
+- 带 ETag 的响应被缓存，下次请求携带 If-None-Match，304 时复用缓存内容
+- 不可变资源（按完整 SHA 定位的 diff）命中后不发请求、不获取限流令牌
+- 304 响应保留分页头，iter_pages 可继续翻页；限流头取自实际的 304 响应
+- 认证失败刷新 token 后，响应按新 token 的缓存键存储
+- 容量上限与 LRU 淘汰、磁盘持久化
+- 统计字段（cache_hits / cache_not_modified / rate_limit_tokens_saved）
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook.gitlab_client import (
+    CachedResponse,
+    GitLabClient,
+    HttpConfig,
+    ResponseCache,
+    is_immutable_endpoint,
+)
+
+BASE = "https://gitlab.example.com/api/v4/projects/123"
+SHA = "a" * 40
+
+
+@pytest.fixture
+def requests_mock():
+    import requests_mock as rm
+
+    with rm.Mocker() as m:
+        yield m
+
+
+def _client(cache, **kwargs):
+    provider = MagicMock()
+    provider.get_token.return_value = "test-token"
+    return GitLabClient(
+        base_url="https://gitlab.example.com",
+        token_provider=provider,
+        http_config=HttpConfig(max_attempts=1),
+        response_cache=cache,
+        **kwargs,
+    )
+
+
+def _entry(size, url="u"):
+    return CachedResponse(url=url, content=b"x" * size, headers={"ETag": '"e"'})
+
+
+class TestConditionalRequests:
+    def test_etag_revalidation_serves_304_from_cache(self, requests_mock):
+        client = _client(ResponseCache())
+        url = f"{BASE}/merge_requests/5"
+        requests_mock.get(url, json={"iid": 5}, headers={"ETag": 'W/"v1"'})
+
+        assert client._request("GET", "/projects/123/merge_requests/5").data == {"iid": 5}
+        assert "If-None-Match" not in requests_mock.last_request.headers
+
+        requests_mock.get(url, status_code=304)
+        result = client._request("GET", "/projects/123/merge_requests/5")
+
+        assert requests_mock.last_request.headers["If-None-Match"] == 'W/"v1"'
+        assert result.success and result.data == {"iid": 5}
+        stats = client.stats.to_dict()
+        assert stats["total_requests"] == 2
+        assert stats["cache_not_modified"] == 1
+        assert stats["cache_bytes_saved"] == len(b'{"iid": 5}')
+        assert stats["rate_limit_tokens_saved"] == 0
+
+    def test_response_without_validators_not_cached(self, requests_mock):
+        cache = ResponseCache()
+        client = _client(cache)
+        requests_mock.get(f"{BASE}/merge_requests/5", json={"iid": 5})
+
+        client._request("GET", "/projects/123/merge_requests/5")
+
+        assert len(cache) == 0
+        assert "cache_hits" not in client.stats.to_dict()
+
+    def test_304_keeps_pagination_headers(self, requests_mock):
+        client = _client(ResponseCache())
+        url = f"{BASE}/merge_requests"
+        requests_mock.get(url, json=[{"iid": 1}], headers={"ETag": '"p1"', "X-Next-Page": "2"})
+        list(client.iter_pages("/projects/123/merge_requests", per_page=1, max_pages=1))
+
+        requests_mock.get(url, status_code=304)
+        pages = list(client.iter_pages("/projects/123/merge_requests", per_page=1, max_pages=1))
+
+        assert pages[0].items == [{"iid": 1}]
+        assert pages[0].next_page == 2
+
+    def test_304_rate_limit_headers_come_from_fresh_response(self, requests_mock):
+        client = _client(ResponseCache())
+        url = f"{BASE}/merge_requests/5"
+        requests_mock.get(
+            url, json={"iid": 5}, headers={"ETag": '"v1"', "RateLimit-Remaining": "100"}
+        )
+        client._request("GET", "/projects/123/merge_requests/5")
+
+        requests_mock.get(url, status_code=304, headers={"RateLimit-Remaining": "42"})
+        result = client._request("GET", "/projects/123/merge_requests/5")
+
+        assert result.data == {"iid": 5}
+        assert result.response.headers["RateLimit-Remaining"] == "42"
+        assert client.stats.request_history[-1].rate_limit_remaining == 42
+        assert client.stats.to_dict()["last_rate_limit_remaining"] == 42
+
+    def test_auth_retry_stores_under_refreshed_token_key(self, requests_mock):
+        cache = ResponseCache()
+        provider = MagicMock()
+        provider.get_token.side_effect = ["old-token", "old-token", "new-token"]
+        client = GitLabClient(
+            base_url="https://gitlab.example.com",
+            token_provider=provider,
+            http_config=HttpConfig(max_attempts=2),
+            response_cache=cache,
+        )
+        url = f"{BASE}/merge_requests/5"
+        cache.put(
+            ResponseCache.make_key(url, None, "old-token"),
+            CachedResponse(url=url, content=b'{"iid": 0}', headers={"ETag": '"stale"'}),
+        )
+        requests_mock.get(
+            url,
+            [
+                {"status_code": 401, "json": {"message": "401 Unauthorized"}},
+                {"json": {"iid": 5}, "headers": {"ETag": '"v2"'}},
+            ],
+        )
+
+        result = client._request("GET", "/projects/123/merge_requests/5")
+
+        assert result.data == {"iid": 5}
+        assert provider.invalidate.called
+        assert "If-None-Match" not in requests_mock.last_request.headers
+        assert cache.get(ResponseCache.make_key(url, None, "new-token")).etag == '"v2"'
+        assert cache.get(ResponseCache.make_key(url, None, "old-token")).etag == '"stale"'
+
+
+class TestImmutableResources:
+    def test_diff_by_sha_skips_network_and_limiter(self, requests_mock):
+        limiter = MagicMock()
+        limiter.acquire.return_value = True
+        client = _client(ResponseCache(), rate_limiter=limiter)
+        requests_mock.get(f"{BASE}/repository/commits/{SHA}/diff", json=[{"diff": "+a"}])
+
+        first = client.get_commit_diff_safe("123", SHA)
+        second = client.get_commit_diff_safe("123", SHA)
+
+        assert requests_mock.call_count == 1
+        assert limiter.acquire.call_count == 1
+        assert second.data == first.data == [{"diff": "+a"}]
+        assert len(second.response.content) == len(first.response.content)
+        stats = client.stats.to_dict()
+        assert stats["total_requests"] == 1
+        assert stats["cache_hits"] == 1
+        assert stats["rate_limit_tokens_saved"] == 1
+
+    def test_is_immutable_endpoint(self):
+        assert is_immutable_endpoint(f"/projects/1/repository/commits/{SHA}/diff")
+        assert is_immutable_endpoint(f"/projects/1/repository/commits/{'b' * 64}")
+        assert not is_immutable_endpoint("/projects/1/repository/commits/main/diff")
+        assert not is_immutable_endpoint("/projects/1/repository/commits")
+
+
+class TestResponseCacheStore:
+    def test_lru_eviction_within_max_bytes(self):
+        cache = ResponseCache(max_bytes=10)
+        cache.put("a", _entry(4))
+        cache.put("b", _entry(4))
+        cache.get("a")
+        cache.put("c", _entry(4))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.total_bytes == 8
+        assert not cache.put("big", _entry(11))
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_disk_cache_survives_restart(self, tmp_path):
+        cache = ResponseCache(cache_dir=str(tmp_path))
+        cache.put("k", _entry(3, url="https://x"))
+
+        reloaded = ResponseCache(cache_dir=str(tmp_path))
+
+        entry = reloaded.get("k")
+        assert entry is not None
+        assert (entry.url, entry.content, entry.etag) == ("https://x", b"xxx", '"e"')
+        assert reloaded.get_stats()["storage"] == "disk"
+        reloaded.discard("k")
+        assert list(tmp_path.iterdir()) == []
+
+    def test_key_includes_sorted_params_and_token(self):
+        key = ResponseCache.make_key("u", {"a": 1, "b": 2}, "t1")
+
+        assert key == ResponseCache.make_key("u", {"b": 2, "a": 1}, "t1")
+        assert key != ResponseCache.make_key("u", {"a": 1, "b": 2}, "t2")
+        assert key != ResponseCache.make_key("u", {"a": 1}, "t1")
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+test_knowledge_candidate_embedding.py - knowledge_candidates 语义检索测试
+
+测试覆盖:
+    - HashingEmbedder 确定性、归一化与语义相近度
+    - embedder 注册表与配置解析
+    - query_knowledge_candidates 模式校验
+    - backfill_embeddings 批量回填 + vector 模式查询（需要 PostgreSQL + pgvector）
+"""
+
+import math
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook import embedding
+from engram.logbook.embedding import (
+    EMBEDDING_DIM,
+    ENV_EMBEDDER,
+    HashingEmbedder,
+    get_embedder,
+    register_embedder,
+    to_vector_literal,
+    tokenize,
+)
+from engram.logbook.errors import ConfigError, ValidationError
+
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+# ---------- 测试：HashingEmbedder ----------
+
+
+class TestHashingEmbedder:
+    def test_dimension_and_unit_norm(self):
+        vector = HashingEmbedder().embed_one("GitLab 同步任务超时 timeout")
+        assert len(vector) == EMBEDDING_DIM
+        assert math.isclose(math.sqrt(sum(v * v for v in vector)), 1.0, rel_tol=1e-9)
+
+    def test_deterministic_across_instances(self):
+        text = "outbox 补偿队列 lease 过期"
+        assert HashingEmbedder().embed_one(text) == HashingEmbedder().embed_one(text)
+
+    def test_empty_text_returns_zero_vector(self):
+        assert HashingEmbedder().embed_one("") == [0.0] * EMBEDDING_DIM
+
+    def test_related_texts_score_higher(self):
+        embedder = HashingEmbedder()
+        query, related, unrelated = embedder.embed(
+            ["数据库连接超时", "排查数据库连接失败的步骤", "前端按钮样式调整"]
+        )
+        assert _cosine(query, related) > _cosine(query, unrelated)
+
+    def test_tokenize_mixes_words_and_cjk_bigrams(self):
+        tokens = tokenize("Fix 连接池")
+        assert "fix" in tokens
+        assert "连接" in tokens
+        assert "接池" in tokens
+
+    def test_invalid_dimension_rejected(self):
+        with pytest.raises(ValidationError):
+            HashingEmbedder(dim=0)
+
+
+# ---------- 测试：embedder 解析 ----------
+
+
+class TestGetEmbedder:
+    def test_default_is_hashing(self, monkeypatch):
+        monkeypatch.delenv(ENV_EMBEDDER, raising=False)
+        assert get_embedder("hashing").name == HashingEmbedder.name
+
+    def test_env_var_selects_embedder(self, monkeypatch):
+        monkeypatch.setattr(embedding, "_EMBEDDER_REGISTRY", dict(embedding._EMBEDDER_REGISTRY))
+        register_embedder("test-env", HashingEmbedder)
+        monkeypatch.setenv(ENV_EMBEDDER, "test-env")
+        assert isinstance(get_embedder(), HashingEmbedder)
+
+    def test_unknown_embedder_raises(self):
+        with pytest.raises(ConfigError):
+            get_embedder("no-such-embedder")
+
+    def test_dotted_factory_path(self):
+        embedder = get_embedder("engram.logbook.embedding:HashingEmbedder")
+        assert embedder.dim == EMBEDDING_DIM
+
+    def test_dimension_mismatch_raises(self, monkeypatch):
+        monkeypatch.setattr(embedding, "_EMBEDDER_REGISTRY", dict(embedding._EMBEDDER_REGISTRY))
+        register_embedder("test-small", lambda: HashingEmbedder(dim=8))
+        with pytest.raises(ConfigError):
+            get_embedder("test-small")
+
+    def test_vector_literal_format(self):
+        assert to_vector_literal([0.5, -1, 0]) == "[0.5,-1.0,0.0]"
+
+
+# ---------- 测试：查询模式校验 ----------
+
+
+def test_query_knowledge_candidates_rejects_unknown_mode():
+    from engram.logbook.db import query_knowledge_candidates
+
+    with pytest.raises(ValidationError):
+        query_knowledge_candidates("q", mode="fuzzy", dsn="postgresql://unused")
+
+
+def _mock_conn(monkeypatch, results):
+    from engram.logbook import db
+
+    cursor = MagicMock()
+    cursor.fetchall.side_effect = results
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__ = MagicMock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    monkeypatch.setattr(db, "get_connection", lambda dsn=None, config=None: conn)
+    return cursor
+
+
+def _row(candidate_id):
+    return (candidate_id, 1, "FACT", "t", "c", "high", None, False, None)
+
+
+def test_vector_query_applies_distance_cutoff_and_fills_unembedded(monkeypatch):
+    from engram.logbook.db import query_knowledge_candidates
+
+    cursor = _mock_conn(monkeypatch, [[_row(1)], [_row(2)]])
+
+    rows = query_knowledge_candidates("数据库连接", top_k=3, mode="vector", max_distance=0.5)
+
+    assert [r["candidate_id"] for r in rows] == [1, 2]
+    vector_sql, vector_params = cursor.execute.call_args_list[0][0]
+    assert "<= %s" in vector_sql
+    assert vector_params[1] == 0.5
+    keyword_sql, keyword_params = cursor.execute.call_args_list[1][0]
+    assert "kc.embedding IS NULL" in keyword_sql
+    assert keyword_params[-1] == 2
+
+
+def test_vector_query_with_zero_vector_uses_keyword(monkeypatch):
+    from engram.logbook.db import query_knowledge_candidates
+
+    cursor = _mock_conn(monkeypatch, [[_row(3)]])
+
+    rows = query_knowledge_candidates("", mode="vector")
+
+    assert [r["candidate_id"] for r in rows] == [3]
+    cursor.execute.assert_called_once()
+    assert "ILIKE" in cursor.execute.call_args[0][0]
+
+
+# ---------- 测试：回填 + vector 查询（需要数据库） ----------
+
+
+def _insert_candidate(conn, run_id, title, content_md):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO analysis.knowledge_candidates (run_id, kind, title, content_md)
+            VALUES (%s, 'FACT', %s, %s)
+            RETURNING candidate_id
+            """,
+            (run_id, title, content_md),
+        )
+        return cur.fetchone()[0]
+
+
+class TestVectorQuery:
+    @pytest.fixture
+    def seeded(self, db_conn_committed):
+        conn = db_conn_committed
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO analysis.runs (source_type, source_id, pipeline_version) "
+                "VALUES ('git', 'test:embedding', 'test') RETURNING run_id"
+            )
+            run_id = cur.fetchone()[0]
+        ids = {
+            "db": _insert_candidate(conn, run_id, "数据库连接超时", "连接池耗尽导致超时"),
+            "ui": _insert_candidate(conn, run_id, "按钮样式", "前端按钮颜色调整"),
+        }
+        conn.commit()
+        yield conn, ids
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM analysis.runs WHERE run_id = %s", (run_id,))
+        conn.commit()
+
+    def test_backfill_then_vector_query(self, seeded, migrated_db):
+        from engram.logbook.backfill_candidate_embeddings import backfill_embeddings
+        from engram.logbook.db import query_knowledge_candidates
+
+        conn, ids = seeded
+        stats = backfill_embeddings(conn, HashingEmbedder(), batch_size=1)
+        assert stats["total_failed"] == 0
+        assert stats["total_updated"] >= 2
+
+        # 再次回填不应重复处理
+        again = backfill_embeddings(conn, HashingEmbedder(), batch_size=1)
+        assert again["total_processed"] == 0
+
+        rows = query_knowledge_candidates(
+            "数据库连接问题", top_k=1, dsn=migrated_db["dsn"], mode="vector"
+        )
+        assert [r["candidate_id"] for r in rows] == [ids["db"]]
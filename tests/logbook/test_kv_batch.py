@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+test_kv_batch.py - logbook.kv 批量接口与读穿缓存测试
+
+测试覆盖:
+    - escape_like_prefix 通配符转义
+    - kv_get_many / kv_set_many / kv_scan_prefix（需要 PostgreSQL）
+    - KVReadThroughCache 按 updated_at 版本失效
+    - scm_db.get_cursor_values 与逐个 get_cursor_value 结果一致
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from engram.logbook.kv import (
+    KVReadThroughCache,
+    escape_like_prefix,
+    kv_get_many,
+    kv_scan_prefix,
+    kv_set_many,
+)
+
+# ---------- 测试：纯函数 ----------
+
+
+class TestEscapeLikePrefix:
+    def test_plain_prefix(self):
+        assert escape_like_prefix("repo:") == "repo:%"
+
+    def test_wildcards_escaped(self):
+        assert escape_like_prefix("a_b%c") == "a\\_b\\%c%"
+
+    def test_backslash_escaped(self):
+        assert escape_like_prefix("a\\b") == "a\\\\b%"
+
+
+class TestEmptyInputs:
+    def test_get_many_without_keys_skips_query(self):
+        assert kv_get_many(None, "ns", []) == {}
+
+    def test_set_many_without_items_skips_query(self):
+        assert kv_set_many(None, "ns", {}) == {}
+
+    def test_empty_namespace_rejected(self):
+        with pytest.raises(ValueError):
+            KVReadThroughCache("")
+
+
+# ---------- 测试：读穿缓存（模拟连接） ----------
+
+
+class _FakeCursor:
+    def __init__(self, store, log):
+        self._store = store
+        self._log = log
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        keys, seen_versions, _namespace = params
+        self._log.append(list(keys))
+        self._rows = []
+        for key, seen in zip(keys, seen_versions):
+            if key not in self._store:
+                continue
+            updated_at, value = self._store[key]
+            changed = updated_at != seen
+            self._rows.append((key, updated_at, value if changed else None, changed))
+
+    def fetchall(self):
+        return self._rows
+
+
+class _FakeConn:
+    """模拟 KVReadThroughCache 的版本校验查询（store: {key: (updated_at, value)}）"""
+
+    def __init__(self, store):
+        self.store = store
+        self.queries = []
+
+    def cursor(self):
+        return _FakeCursor(self.store, self.queries)
+
+
+class TestKVReadThroughCache:
+    T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def test_unchanged_entries_are_hits(self):
+        conn = _FakeConn({"a": (self.T0, {"v": 1}), "b": (self.T0, {"v": 2})})
+        cache = KVReadThroughCache("scm.sync")
+
+        first = cache.get_many(conn, ["a", "b", "missing"])
+        assert {k: e.value for k, e in first.items()} == {"a": {"v": 1}, "b": {"v": 2}}
+        assert cache.misses == 2
+
+        second = cache.get_many(conn, ["a", "b"])
+        assert second["a"].value == {"v": 1}
+        assert cache.hits == 2
+        assert len(conn.queries) == 2
+
+    def test_changed_version_reloads_value(self):
+        conn = _FakeConn({"a": (self.T0, {"v": 1})})
+        cache = KVReadThroughCache("scm.sync")
+        cache.get_many(conn, ["a"])
+
+        conn.store["a"] = (self.T0 + timedelta(seconds=1), {"v": 2})
+        assert cache.get(conn, "a").value == {"v": 2}
+
+    def test_deleted_key_evicted(self):
+        conn = _FakeConn({"a": (self.T0, {"v": 1})})
+        cache = KVReadThroughCache("scm.sync")
+        cache.get_many(conn, ["a"])
+        assert len(cache) == 1
+
+        del conn.store["a"]
+        assert cache.get(conn, "a") is None
+        assert len(cache) == 0
+
+    def test_ttl_skips_revalidation(self):
+        conn = _FakeConn({"a": (self.T0, {"v": 1})})
+        cache = KVReadThroughCache("scm.sync", ttl_seconds=60)
+        cache.get_many(conn, ["a"])
+        cache.get_many(conn, ["a"])
+        assert len(conn.queries) == 1
+
+    def test_lru_bounded(self):
+        conn = _FakeConn({k: (self.T0, {"v": k}) for k in "abc"})
+        cache = KVReadThroughCache("scm.sync", ttl_seconds=60, max_entries=2)
+        cache.get_many(conn, ["a", "b"])
+        cache.get_many(conn, ["a"])
+        cache.get_many(conn, ["c"])
+
+        assert len(cache) == 2
+        cache.get_many(conn, ["a", "c"])
+        assert len(conn.queries) == 2
+        cache.get_many(conn, ["b"])
+        assert len(conn.queries) == 3
+
+    def test_invalidate(self):
+        conn = _FakeConn({"a": (self.T0, {"v": 1})})
+        cache = KVReadThroughCache("scm.sync", ttl_seconds=60)
+        cache.get_many(conn, ["a"])
+        cache.invalidate("a")
+        cache.get_many(conn, ["a"])
+        assert len(conn.queries) == 2
+
+
+# ---------- 测试：批量读写（需要数据库） ----------
+
+
+class TestKVBatchDb:
+    NS = "test.kv_batch"
+
+    def test_set_many_then_get_many(self, db_conn):
+        versions = kv_set_many(db_conn, self.NS, {"a": {"n": 1}, "b": [1, 2], "c": "x"})
+        assert set(versions) == {"a", "b", "c"}
+
+        entries = kv_get_many(db_conn, self.NS, ["a", "b", "missing"])
+        assert entries["a"].value == {"n": 1}
+        assert entries["b"].value == [1, 2]
+        assert "missing" not in entries
+
+        # upsert 覆盖已有值
+        kv_set_many(db_conn, self.NS, {"a": {"n": 2}})
+        assert kv_get_many(db_conn, self.NS, ["a"])["a"].value == {"n": 2}
+
+    def test_scan_prefix_streams_in_key_order(self, db_conn):
+        items = {f"repo:{i:03d}:commits": {"i": i} for i in range(25)}
+        items["repo_x"] = {"i": -1}
+        items["other:1"] = {"i": -2}
+        kv_set_many(db_conn, self.NS, items)
+
+        scanned = list(kv_scan_prefix(db_conn, self.NS, "repo:", batch_size=7))
+        assert [e.key for e in scanned] == sorted(k for k in items if k.startswith("repo:"))
+
+    def test_cache_detects_update(self, db_conn):
+        kv_set_many(db_conn, self.NS, {"a": {"n": 1}})
+        cache = KVReadThroughCache(self.NS)
+        assert cache.get(db_conn, "a").value == {"n": 1}
+
+        # 同一事务内 now() 不变，显式推进 updated_at 模拟另一个事务的写入
+        with db_conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE logbook.kv
+                SET value_json = '{"n": 2}', updated_at = updated_at + interval '1 second'
+                WHERE namespace = %s AND key = 'a'
+                """,
+                (self.NS,),
+            )
+        assert cache.get(db_conn, "a").value == {"n": 2}
+
+    def test_get_cursor_values_matches_single_lookup(self, db_conn):
+        from engram.logbook import scm_db
+
+        scm_db.set_cursor_value(db_conn, 990001, "commits", {"sha": "a"})
+        scm_db.set_cursor_value(db_conn, 990002, "commits", {"sha": "b"})
+
+        batch = scm_db.get_cursor_values(db_conn, [990001, 990002, 990003], "commits")
+        assert set(batch) == {990001, 990002}
+        for repo_id in (990001, 990002):
+            assert batch[repo_id] == scm_db.get_cursor_value(db_conn, repo_id, "commits")
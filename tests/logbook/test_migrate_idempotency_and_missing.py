@@ -145,9 +145,10 @@ class TestMigrateIdempotency:
         # 验证索引模板非空
         assert len(REQUIRED_INDEX_TEMPLATES) > 0
 
-        # 验证物化视图模板包含 v_facts
+        # scm.v_facts 改为 scm.facts 上的普通视图：校验 facts 表，不再要求物化视图
+        assert ("scm", "facts") in REQUIRED_TABLE_TEMPLATES
         matview_names = [t[1] for t in REQUIRED_MATVIEW_TEMPLATES]
-        assert "v_facts" in matview_names
+        assert "v_facts" not in matview_names
 
 
 class TestMissingItemDetection:
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+test_prepared_statements.py - 热点语句预备模式测试
+
+测试覆盖:
+    - hot_statement_prepare 在 auto/on/off 模式下的返回值
+    - claim 查询文本在不同过滤列表长度下保持稳定（可复用同一预备语句）
+    - 复用连接上 prepare=False 与 prepare=True 的延迟对比（需要 PostgreSQL）
+"""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook.db import (
+    ENV_DB_PREPARE,
+    PREPARE_MODE_AUTO,
+    get_prepare_mode,
+    hot_statement_prepare,
+)
+from engram.logbook.scm_sync_queue import _build_claim_query, claim
+
+# ---------- 测试：预备模式 ----------
+
+
+class TestHotStatementPrepare:
+    def test_auto_prepares_only_long_lived(self, monkeypatch):
+        monkeypatch.delenv(ENV_DB_PREPARE, raising=False)
+        assert hot_statement_prepare(long_lived=True) is True
+        assert hot_statement_prepare(long_lived=False) is None
+
+    def test_on_forces_prepare(self, monkeypatch):
+        monkeypatch.setenv(ENV_DB_PREPARE, "on")
+        assert hot_statement_prepare(long_lived=False) is True
+
+    def test_off_disables_prepare(self, monkeypatch):
+        monkeypatch.setenv(ENV_DB_PREPARE, "OFF")
+        assert hot_statement_prepare(long_lived=True) is False
+
+    def test_invalid_value_falls_back_to_auto(self, monkeypatch):
+        monkeypatch.setenv(ENV_DB_PREPARE, "sometimes")
+        assert get_prepare_mode() == PREPARE_MODE_AUTO
+
+
+# ---------- 测试：claim 查询文本稳定 ----------
+
+
+def _claim_sql(**kwargs):
+    cursor = MagicMock()
+    cursor.fetchone.return_value = None
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__ = MagicMock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+
+    claim(
+        worker_id="w1",
+        enable_tenant_fair_claim=False,
+        max_consecutive_same_tenant=3,
+        conn=conn,
+        **kwargs,
+    )
+    args, call_kwargs = cursor.execute.call_args
+    return args[0], args[1], call_kwargs["prepare"]
+
+
+class TestClaimQueryStability:
+    def test_sql_text_independent_of_list_length(self):
+        sql_one, _, _ = _claim_sql(job_types=["gitlab_commits"], tenant_allowlist=["t1"])
+        sql_many, params, _ = _claim_sql(
+            job_types=["gitlab_commits", "gitlab_mrs", "svn"],
+            tenant_allowlist=["t1", "t2", "t3", "t4"],
+        )
+        assert sql_one is sql_many
+        assert params == [
+            ["gitlab_commits", "gitlab_mrs", "svn"],
+            ["t1", "t2", "t3", "t4"],
+            ["t1", "t2", "t3", "t4"],
+            "w1",
+        ]
+
+    def test_placeholder_count_matches_params(self):
+        sql, params, _ = _claim_sql(
+            job_types=["svn"],
+            instance_allowlist=["gitlab.example.com"],
+            tenant_allowlist=["t1"],
+        )
+        assert sql.count("%s") == len(params)
+        # worker_id 对应 UPDATE SET 中的最后一个占位符
+        assert params[-1] == "w1"
+
+    def test_caller_connection_uses_prepare(self, monkeypatch):
+        monkeypatch.delenv(ENV_DB_PREPARE, raising=False)
+        _, _, prepare = _claim_sql()
+        assert prepare is True
+
+    def test_builder_is_cached(self):
+        kwargs = dict(has_job_types=True, has_instances=False, has_tenants=False, tenant_fair=True)
+        assert _build_claim_query(**kwargs) is _build_claim_query(**kwargs)
+
+
+# ---------- 测试：复用连接上的预备语句延迟（需要数据库） ----------
+
+_BENCH_ITERATIONS = 200
+
+
+def _bench(conn, query, params, prepare):
+    with conn.cursor() as cur:
+        start = time.perf_counter()
+        for _ in range(_BENCH_ITERATIONS):
+            cur.execute(query, params, prepare=prepare)
+            if cur.description:
+                cur.fetchall()
+        return (time.perf_counter() - start) / _BENCH_ITERATIONS
+
+
+@pytest.mark.integration
+class TestPreparedStatementLatency:
+    """
+    对比热点语句在同一连接上 prepare=False / prepare=True 的平均延迟
+
+    断言语句可以正常预备，且预备后的平均延迟不明显高于未预备（留出余量以容忍环境抖动）。
+    """
+
+    def _hot_statements(self):
+        from engram.logbook.outbox import _CHECK_DEDUP_SQL
+        from engram.logbook.scm_db import _TAKE_RATE_LIMIT_TOKENS_SQL
+
+        claim_sql = _build_claim_query(
+            has_job_types=True, has_instances=False, has_tenants=True, tenant_fair=False
+        )
+        return {
+            "check_dedup": (_CHECK_DEDUP_SQL, ("team:bench", "0" * 64)),
+            "rate_limit_bucket": (
+                _TAKE_RATE_LIMIT_TOKENS_SQL,
+                {"instance_key": "bench", "tokens": 1.0, "partial": False},
+            ),
+            "claim": (claim_sql, (["gitlab_commits"], ["t1"], ["t1"], "bench-worker")),
+        }
+
+    def test_prepared_vs_unprepared(self, db_conn):
+        for name, (query, params) in self._hot_statements().items():
+            unprepared = _bench(db_conn, query, params, prepare=False)
+            prepared = _bench(db_conn, query, params, prepare=True)
+            assert prepared <= unprepared * 1.5, (
+                f"{name}: unprepared={unprepared * 1000:.3f}ms prepared={prepared * 1000:.3f}ms"
+            )
+
+        with db_conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM pg_prepared_statements WHERE NOT from_sql")
+            assert cur.fetchone()[0] >= len(self._hot_statements())
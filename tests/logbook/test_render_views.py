@@ -7,6 +7,7 @@ test_render_views.py - render_views 模块测试
     - 少量数据场景（几条 items 的正常渲染）
     - 包含 attachment 的场景（验证 attachment 不影响渲染）
     - 默认路径、文件命名、覆盖策略验证
+    - 增量模式（高水位未变化时跳过）与流式模式（写入时计算哈希）
 """
 
 import json
@@ -493,6 +494,137 @@ class TestRenderViewsEdgeCases:
                 assert "| - | - |" in line
 
 
+# ---------- 测试：增量与流式渲染 ----------
+
+HWM = {
+    "items_count": 3,
+    "max_item_id": 3,
+    "max_item_updated_at": "2025-01-01T12:00:00",
+    "max_event_id": 102,
+}
+
+
+class TestRenderViewsIncremental:
+    """测试增量模式：高水位与参数未变化时不重写文件"""
+
+    @patch("engram.logbook.views.db.get_items_high_water_mark")
+    @patch("engram.logbook.views.db.get_items_with_latest_event")
+    def test_unchanged_high_water_mark_skips_render(self, mock_get_items, mock_hwm):
+        from engram.logbook.views import render_views
+
+        mock_get_items.return_value = create_mock_items(3)
+        mock_hwm.return_value = dict(HWM)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = render_views(out_dir=tmp_dir, quiet=True, incremental=True)
+            assert first["skipped"] is False
+
+            meta = json.loads((Path(tmp_dir) / ".views_meta.json").read_text(encoding="utf-8"))
+            assert meta["high_water_mark"] == HWM
+
+            manifest_mtime = (Path(tmp_dir) / "manifest.csv").stat().st_mtime_ns
+            second = render_views(out_dir=tmp_dir, quiet=True, incremental=True)
+
+            assert second["skipped"] is True
+            assert mock_get_items.call_count == 1
+            assert second["files"] == first["files"]
+            assert second["items_count"] == 3
+            assert (Path(tmp_dir) / "manifest.csv").stat().st_mtime_ns == manifest_mtime
+
+    @patch("engram.logbook.views.db.get_items_high_water_mark")
+    @patch("engram.logbook.views.db.get_items_with_latest_event")
+    def test_new_event_triggers_render(self, mock_get_items, mock_hwm):
+        from engram.logbook.views import render_views
+
+        mock_get_items.return_value = create_mock_items(3)
+        mock_hwm.return_value = dict(HWM)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            render_views(out_dir=tmp_dir, quiet=True, incremental=True)
+
+            mock_hwm.return_value = dict(HWM, max_event_id=103)
+            result = render_views(out_dir=tmp_dir, quiet=True, incremental=True)
+
+            assert result["skipped"] is False
+            assert mock_get_items.call_count == 2
+
+    @patch("engram.logbook.views.db.get_items_high_water_mark")
+    @patch("engram.logbook.views.db.get_items_with_latest_event")
+    def test_changed_params_or_missing_file_triggers_render(self, mock_get_items, mock_hwm):
+        from engram.logbook.views import render_views
+
+        mock_get_items.return_value = create_mock_items(3)
+        mock_hwm.return_value = dict(HWM)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            render_views(out_dir=tmp_dir, limit=50, quiet=True, incremental=True)
+
+            assert (
+                render_views(out_dir=tmp_dir, limit=10, quiet=True, incremental=True)["skipped"]
+                is False
+            )
+
+            (Path(tmp_dir) / "index.md").unlink()
+            assert (
+                render_views(out_dir=tmp_dir, limit=10, quiet=True, incremental=True)["skipped"]
+                is False
+            )
+            assert (Path(tmp_dir) / "index.md").exists()
+
+
+class TestRenderViewsStreaming:
+    """测试流式模式：逐行写入，哈希与落盘文件一致"""
+
+    @patch("engram.logbook.views.db.iter_items_with_latest_event")
+    def test_stream_matches_file_hash_and_truncates_index(self, mock_iter_items):
+        from engram.logbook.hashing import get_file_info
+        from engram.logbook.views import render_views
+
+        mock_iter_items.return_value = iter(create_mock_items(30))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result = render_views(out_dir=tmp_dir, limit=5, quiet=True, stream=True)
+
+            assert result["items_count"] == 30
+            for key, filename in (("manifest", "manifest.csv"), ("index", "index.md")):
+                info = get_file_info(str(Path(tmp_dir) / filename))
+                assert result["files"][key]["sha256"] == info["hash"]
+                assert result["files"][key]["size"] == info["size"]
+
+            index_content = (Path(tmp_dir) / "index.md").read_text(encoding="utf-8")
+            assert "Total items: 30, Showing: 5" in index_content
+
+            # 未残留临时文件
+            assert {p.name for p in Path(tmp_dir).iterdir()} == EXPECTED_FILES
+
+        # manifest_limit 默认 limit * 2
+        assert mock_iter_items.call_args.kwargs["limit"] == 10
+
+    @patch("engram.logbook.views.db.iter_items_with_latest_event")
+    @patch("engram.logbook.views.db.get_items_with_latest_event")
+    def test_stream_output_matches_full_render(self, mock_get_items, mock_iter_items):
+        from engram.logbook.views import render_views
+
+        items = create_mock_items(8)
+        mock_get_items.return_value = items
+        mock_iter_items.return_value = iter(items)
+
+        def _strip_timestamps(text):
+            return [ln for ln in text.splitlines() if "Generated at" not in ln]
+
+        with tempfile.TemporaryDirectory() as full_dir, tempfile.TemporaryDirectory() as stream_dir:
+            render_views(out_dir=full_dir, limit=3, quiet=True)
+            render_views(out_dir=stream_dir, limit=3, quiet=True, stream=True, manifest_limit=0)
+
+            for filename in ("manifest.csv", "index.md"):
+                full = (Path(full_dir) / filename).read_text(encoding="utf-8")
+                streamed = (Path(stream_dir) / filename).read_text(encoding="utf-8")
+                assert _strip_timestamps(full) == _strip_timestamps(streamed)
+
+        # manifest_limit <= 0 表示不限制
+        assert mock_iter_items.call_args.kwargs["limit"] is None
+
+
 # ---------- 集成测试（需要数据库） ----------
 
 
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+test_scm_bulk_upsert.py - scm_db 批量写入测试
+
+测试覆盖:
+    - 冲突键去重（保留最后一次）、分块执行与 ids 顺序（模拟游标）
+    - bulk_upsert_git_commits / bulk_upsert_svn_revisions / bulk_upsert_mrs 的
+      inserted/updated 统计与逐行 upsert 语义一致（需要 PostgreSQL）
+    - bulk_insert_review_events 已存在事件计入 skipped（需要 PostgreSQL）
+"""
+
+import pytest
+
+from engram.logbook import scm_db
+from engram.logbook.scm_db import (
+    bulk_insert_review_events,
+    bulk_upsert_git_commits,
+    bulk_upsert_mrs,
+    bulk_upsert_svn_revisions,
+)
+
+# ---------- 测试：去重与分块（模拟游标） ----------
+
+
+class _RecordingCursor:
+    def __init__(self, log):
+        self._log = log
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        shas = params[1]
+        self._log.append(list(shas))
+        # 偶数长度的 sha 视为已存在（updated）
+        self._rows = [(sha, f"id-{sha}", len(sha) % 2 == 1) for sha in shas]
+
+    def fetchall(self):
+        return self._rows
+
+
+class _RecordingConn:
+    def __init__(self):
+        self.chunks = []
+
+    def cursor(self):
+        return _RecordingCursor(self.chunks)
+
+
+def _commit_row(sha, message="m"):
+    return {"commit_sha": sha, "author_raw": "dev", "ts": None, "message": message}
+
+
+class TestBulkWriteChunking:
+    def test_duplicate_keys_keep_last_and_share_id(self):
+        conn = _RecordingConn()
+        rows = [_commit_row("a", "first"), _commit_row("bb"), _commit_row("a", "second")]
+
+        result = bulk_upsert_git_commits(conn, 1, rows)
+
+        assert conn.chunks == [["a", "bb"]]
+        assert result.ids == ["id-a", "id-bb", "id-a"]
+        assert (result.inserted, result.updated, result.skipped) == (1, 1, 0)
+
+    def test_rows_split_into_chunks(self):
+        conn = _RecordingConn()
+        rows = [_commit_row(f"c{i}") for i in range(5)]
+
+        result = bulk_upsert_git_commits(conn, 1, rows, chunk_size=2)
+
+        assert [len(chunk) for chunk in conn.chunks] == [2, 2, 1]
+        assert result.total == 5
+
+    def test_empty_input_skips_query(self):
+        result = bulk_upsert_git_commits(None, 1, [])
+        assert result.ids == []
+        assert result.total == 0
+
+
+# ---------- 测试：批量写入（需要数据库） ----------
+
+
+@pytest.fixture
+def repo_id(db_conn):
+    return scm_db.upsert_repo(
+        db_conn, repo_type="git", url="https://gitlab.example.com/bulk/test", project_key="bulk"
+    )
+
+
+class TestBulkUpsertDb:
+    def test_git_commits_insert_then_update(self, db_conn, repo_id):
+        rows = [
+            {"commit_sha": f"{i:040x}", "author_raw": "dev", "ts": "2024-01-01T00:00:00Z"}
+            for i in range(3)
+        ]
+        first = bulk_upsert_git_commits(db_conn, repo_id, rows)
+        assert (first.inserted, first.updated) == (3, 0)
+
+        rows[0]["message"] = "amended"
+        rows.append({"commit_sha": "f" * 40, "author_raw": "dev", "ts": None})
+        second = bulk_upsert_git_commits(db_conn, repo_id, rows)
+        assert (second.inserted, second.updated) == (1, 3)
+        assert second.ids[:3] == first.ids
+
+        # 与逐行 upsert 命中同一行
+        single = scm_db.upsert_git_commit(
+            db_conn, repo_id, rows[0]["commit_sha"], author_raw="dev", ts=None
+        )
+        assert single == first.ids[0]
+        with db_conn.cursor() as cur:
+            cur.execute(
+                "SELECT source_id FROM scm.git_commits WHERE git_commit_id = %s", (first.ids[1],)
+            )
+            assert cur.fetchone()[0] == f"git:{repo_id}:{rows[1]['commit_sha']}"
+
+    def test_svn_revisions_counts(self, db_conn, repo_id):
+        rows = [{"rev_num": r, "author_raw": "dev", "ts": None} for r in (10, 11)]
+        assert bulk_upsert_svn_revisions(db_conn, repo_id, rows).inserted == 2
+
+        rows.append({"rev_num": 12, "author_raw": "dev", "ts": None, "message": "new"})
+        result = bulk_upsert_svn_revisions(db_conn, repo_id, rows)
+        assert (result.inserted, result.updated) == (1, 2)
+
+    def test_mrs_and_review_events(self, db_conn, repo_id):
+        mr_id = f"{repo_id}:7"
+        mrs = bulk_upsert_mrs(db_conn, [{"mr_id": mr_id, "repo_id": repo_id, "status": "open"}])
+        assert mrs.ids == [mr_id]
+        assert mrs.inserted == 1
+
+        again = bulk_upsert_mrs(db_conn, [{"mr_id": mr_id, "repo_id": repo_id, "status": "merged"}])
+        assert (again.inserted, again.updated) == (0, 1)
+
+        events = [
+            {"mr_id": mr_id, "event_type": "comment", "source_event_id": "note:1"},
+            {"mr_id": mr_id, "event_type": "approve", "source_event_id": "approval:1"},
+        ]
+        first = bulk_insert_review_events(db_conn, events)
+        assert first.inserted == 2
+
+        events.append({"mr_id": mr_id, "event_type": "comment", "source_event_id": "note:2"})
+        second = bulk_insert_review_events(db_conn, events)
+        assert (second.inserted, second.skipped) == (1, 2)
+        assert second.ids[:2] == [None, None]
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+test_scm_facts.py - scm.facts 增量维护测试
+
+测试覆盖:
+    - 17_scm_facts_table.sql 结构：来源表触发器、物化视图转为普通视图
+    - reconcile_facts 差异统计与修复语句（模拟连接）
+    - admin facts reconcile 退出码与输出
+    - 来源表写入/更新/删除后 scm.facts 同步，reconcile 修复手工破坏（需要 PostgreSQL）
+"""
+
+import json
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from engram.logbook import scm_db
+from engram.logbook.cli.scm_sync import admin_main
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "sql"
+
+
+def _mock_conn(fetchall_rows):
+    cursor = MagicMock()
+    cursor.fetchall.return_value = fetchall_rows
+    cursor.rowcount = 2
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__ = MagicMock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    return conn, cursor
+
+
+# ---------- 测试：迁移脚本结构 ----------
+
+
+class TestFactsMigrationSql:
+    def test_triggers_on_all_sources(self):
+        sql = (SQL_DIR / "17_scm_facts_table.sql").read_text(encoding="utf-8")
+
+        for table in ("svn_revisions", "git_commits", "mrs"):
+            for event in ("insert", "update", "delete"):
+                assert f"CREATE TRIGGER trg_{table}_facts_{event}" in sql
+        assert sql.count("FOR EACH STATEMENT") == 9
+        assert "CREATE OR REPLACE VIEW scm.v_facts" in sql
+
+    def test_matview_no_longer_created(self):
+        for name in ("01_logbook_schema.sql", "02_scm_migration.sql", "17_scm_facts_table.sql"):
+            sql = (SQL_DIR / name).read_text(encoding="utf-8")
+            assert not re.search(r"CREATE\s+MATERIALIZED\s+VIEW", sql, re.IGNORECASE), name
+
+
+# ---------- 测试：reconcile_facts（模拟连接） ----------
+
+
+class TestReconcileFacts:
+    def test_reports_counts_and_samples(self):
+        conn, cursor = _mock_conn(
+            [
+                {"kind": "missing", "count": 3, "sample": ["git:1:a", "git:1:b"]},
+                {"kind": "orphaned", "count": 1, "sample": ["mr:1:9"]},
+            ]
+        )
+
+        result = scm_db.reconcile_facts(conn, repo_id=1, sample_limit=2)
+
+        assert result["missing"] == 3
+        assert result["stale"] == 0
+        assert result["orphaned"] == 1
+        assert result["samples"]["missing"] == ["git:1:a", "git:1:b"]
+        assert result["repaired"] is False
+        cursor.execute.assert_called_once()
+        assert cursor.execute.call_args[0][1] == {"repo_id": 1, "sample_limit": 2}
+
+    def test_repair_upserts_then_deletes(self):
+        conn, cursor = _mock_conn([{"kind": "stale", "count": 2, "sample": ["svn:1:5"]}])
+
+        result = scm_db.reconcile_facts(conn, repair=True)
+
+        assert result["repaired"] is True
+        assert result["upserted"] == 2
+        assert result["deleted"] == 2
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert len(statements) == 3
+        assert "ON CONFLICT (source_id) DO UPDATE" in statements[1]
+        assert "DELETE FROM scm.facts" in statements[2]
+
+
+class TestFactsAdminCommand:
+    def _run(self, monkeypatch, capsys, result, argv):
+        conn = MagicMock()
+        calls = []
+
+        def fake_reconcile(conn, **kwargs):
+            calls.append(kwargs)
+            return result
+
+        monkeypatch.setattr(scm_db, "reconcile_facts", fake_reconcile)
+        monkeypatch.setattr("engram.logbook.cli.scm_sync._get_connection", lambda dsn: conn)
+        code = admin_main(["--dsn", "postgresql://test", "--json", "facts", "reconcile", *argv])
+        return code, json.loads(capsys.readouterr().out), calls, conn
+
+    def _result(self, **counts):
+        base = {"repo_id": None, "missing": 0, "stale": 0, "orphaned": 0, "repaired": False}
+        base["samples"] = {"missing": [], "stale": [], "orphaned": []}
+        base.update(counts)
+        return base
+
+    def test_drift_exits_nonzero(self, monkeypatch, capsys):
+        code, output, calls, conn = self._run(
+            monkeypatch, capsys, self._result(missing=2), ["--repo-id", "7"]
+        )
+
+        assert code == 1
+        assert output["in_sync"] is False
+        assert calls == [{"repo_id": 7, "repair": False, "sample_limit": 20}]
+        conn.commit.assert_not_called()
+
+    def test_repair_commits(self, monkeypatch, capsys):
+        code, output, calls, conn = self._run(
+            monkeypatch,
+            capsys,
+            self._result(stale=1, repaired=True, upserted=1, deleted=0),
+            ["--repair"],
+        )
+
+        assert code == 0
+        assert output["upserted"] == 1
+        conn.commit.assert_called_once()
+
+
+# ---------- 测试：触发器维护与修复（需要数据库） ----------
+
+
+def _facts(conn, repo_id):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT source_id, source_type, author_raw, is_bulk
+            FROM scm.v_facts WHERE repo_id = %s ORDER BY source_id
+            """,
+            (repo_id,),
+        )
+        return cur.fetchall()
+
+
+class TestFactsTriggersDb:
+    def test_source_writes_maintain_facts(self, db_conn):
+        repo_id = scm_db.upsert_repo(db_conn, "git", "https://gitlab.example.com/facts/triggers")
+        ts = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        scm_db.bulk_upsert_git_commits(
+            db_conn,
+            repo_id,
+            [
+                {"commit_sha": "a1", "author_raw": "alice", "ts": ts},
+                {"commit_sha": "b2", "author_raw": "bob", "ts": ts},
+            ],
+        )
+        scm_db.upsert_mr(db_conn, f"{repo_id}:5", repo_id, status="opened")
+
+        assert _facts(db_conn, repo_id) == [
+            (f"git:{repo_id}:a1", "git", "alice", False),
+            (f"git:{repo_id}:b2", "git", "bob", False),
+            (f"mr:{repo_id}:5", "mr", None, False),
+        ]
+
+        with db_conn.cursor() as cur:
+            cur.execute(
+                "UPDATE scm.git_commits SET is_bulk = true WHERE repo_id = %s AND commit_sha = 'a1'",
+                (repo_id,),
+            )
+            cur.execute(
+                "DELETE FROM scm.git_commits WHERE repo_id = %s AND commit_sha = 'b2'",
+                (repo_id,),
+            )
+
+        assert [row[0] for row in _facts(db_conn, repo_id)] == [
+            f"git:{repo_id}:a1",
+            f"mr:{repo_id}:5",
+        ]
+        assert _facts(db_conn, repo_id)[0][3] is True
+        assert scm_db.reconcile_facts(db_conn, repo_id=repo_id)["missing"] == 0
+
+    def test_reconcile_repairs_drift(self, db_conn):
+        repo_id = scm_db.upsert_repo(db_conn, "git", "https://gitlab.example.com/facts/drift")
+        ts = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        scm_db.upsert_git_commit(db_conn, repo_id, "c3", author_raw="carol", ts=ts)
+        scm_db.upsert_git_commit(db_conn, repo_id, "d4", author_raw="dave", ts=ts)
+        with db_conn.cursor() as cur:
+            cur.execute("DELETE FROM scm.facts WHERE source_id = %s", (f"git:{repo_id}:c3",))
+            cur.execute(
+                "UPDATE scm.facts SET author_raw = 'x' WHERE source_id = %s",
+                (f"git:{repo_id}:d4",),
+            )
+            cur.execute(
+                """
+                INSERT INTO scm.facts (source_id, source_type, repo_id)
+                VALUES (%s, 'git', %s)
+                """,
+                (f"git:{repo_id}:gone", repo_id),
+            )
+
+        report = scm_db.reconcile_facts(db_conn, repo_id=repo_id, repair=True)
+
+        assert (report["missing"], report["stale"], report["orphaned"]) == (1, 1, 1)
+        assert report["samples"]["orphaned"] == [f"git:{repo_id}:gone"]
+        after = scm_db.reconcile_facts(db_conn, repo_id=repo_id)
+        assert (after["missing"], after["stale"], after["orphaned"]) == (0, 0, 0)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+test_scm_rate_limit_buckets.py - scm.sync_rate_limits 令牌桶测试
+
+测试覆盖:
+    - 取令牌为单条语句（桶已存在时一次 execute），不再读写 logbook.kv
+    - 桶不存在时按默认配置初始化满桶后重试
+    - 消费/拒绝/暂停/租约/归还的桶语义（需要 PostgreSQL）
+    - 16_scm_rate_limit_buckets.sql 将 kv 中的桶迁移到 scm.sync_rate_limits（需要 PostgreSQL）
+"""
+
+import json
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook import scm_db
+from engram.logbook.scm_db import _TAKE_RATE_LIMIT_TOKENS_SQL
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "sql"
+
+
+def _mock_conn(rows):
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = list(rows)
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__ = MagicMock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    return conn, cursor
+
+
+# ---------- 测试：语句结构 ----------
+
+
+class TestTakeTokensStatement:
+    def test_single_statement_on_typed_table(self):
+        assert "scm.sync_rate_limits" in _TAKE_RATE_LIMIT_TOKENS_SQL
+        assert "logbook.kv" not in _TAKE_RATE_LIMIT_TOKENS_SQL
+        assert "FOR UPDATE" in _TAKE_RATE_LIMIT_TOKENS_SQL
+        assert "UPDATE scm.sync_rate_limits" in _TAKE_RATE_LIMIT_TOKENS_SQL
+
+    def test_existing_bucket_one_round_trip(self):
+        conn, cursor = _mock_conn([{"granted": 1.0, "wait_seconds": 0.0}])
+
+        result = scm_db.consume_rate_limit_token(conn, "gitlab.example.com")
+
+        assert result.allowed is True
+        cursor.execute.assert_called_once()
+        sql, params = cursor.execute.call_args[0]
+        assert sql is _TAKE_RATE_LIMIT_TOKENS_SQL
+        assert params == {"instance_key": "gitlab.example.com", "tokens": 1.0, "partial": False}
+
+    def test_missing_bucket_initialized_then_retried(self):
+        conn, cursor = _mock_conn([None, {"granted": 0.0, "wait_seconds": 0.25}])
+
+        result = scm_db.consume_rate_limit_token(
+            conn, "gitlab.example.com", default_rate=4.0, default_burst=8
+        )
+
+        assert result.allowed is False
+        assert result.wait_seconds == 0.25
+        assert cursor.execute.call_count == 3
+        init_sql, init_params = cursor.execute.call_args_list[1][0]
+        assert "ON CONFLICT (instance_key) DO NOTHING" in init_sql
+        assert init_params == ("gitlab.example.com", 8.0, 4.0, 8)
+
+    def test_lease_uses_partial_take(self):
+        conn, cursor = _mock_conn([{"granted": 3.0, "wait_seconds": 0.0}])
+
+        result = scm_db.lease_rate_limit_tokens(conn, "gitlab.example.com", 5)
+
+        assert result.granted == 3
+        assert cursor.execute.call_args[0][1]["partial"] is True
+
+
+# ---------- 测试：桶语义（需要数据库） ----------
+
+
+def _key():
+    return f"bucket-test-{time.time_ns()}"
+
+
+class TestRateLimitBucketDb:
+    def test_consume_until_empty(self, db_conn):
+        key = _key()
+        results = [
+            scm_db.consume_rate_limit_token(db_conn, key, default_rate=0.01, default_burst=3)
+            for _ in range(4)
+        ]
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert results[-1].wait_seconds > 0
+        status = scm_db.get_rate_limit_status(db_conn, key)
+        assert status["burst"] == 3
+        assert status["current_tokens"] < 1
+
+    def test_pause_blocks_consume(self, db_conn):
+        key = _key()
+        scm_db.pause_rate_limit_bucket(db_conn, key, 30, reason="test", record_429=True)
+
+        result = scm_db.consume_rate_limit_token(db_conn, key)
+
+        assert result.allowed is False
+        assert 25 < result.wait_seconds <= 30
+        status = scm_db.get_rate_limit_status(db_conn, key)
+        assert status["is_paused"] is True
+        assert status["meta_json"]["pause_reason"] == "test"
+        assert "last_429_at" in status["meta_json"]
+
+        assert scm_db.unpause_rate_limit_bucket(db_conn, key)["status"] == "unpaused"
+        assert scm_db.consume_rate_limit_token(db_conn, key).allowed is True
+
+    def test_statuses_and_list(self, db_conn):
+        key = _key()
+        scm_db.upsert_rate_limit_bucket(
+            db_conn, key, rate=2.0, burst=5, current_tokens=1.0, pause_duration_seconds=60
+        )
+
+        statuses = scm_db.get_rate_limit_bucket_statuses(db_conn, [key, "missing"])
+        assert list(statuses) == [key]
+        assert statuses[key]["is_paused"] is True
+        assert statuses[key]["rate"] == 2.0
+        listed = [b for b in scm_db.list_rate_limit_buckets(db_conn) if b["instance_key"] == key]
+        assert listed and listed[0]["remaining_pause_seconds"] > 0
+
+        assert scm_db.delete_rate_limit_bucket(db_conn, key) is True
+        assert scm_db.get_rate_limit_status(db_conn, key) is None
+
+
+class TestKvBucketMigrationDb:
+    def test_migrates_kv_buckets(self, db_conn):
+        key = _key()
+        paused_until = time.time() + 600
+        with db_conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO logbook.kv (namespace, key, value_json)
+                VALUES ('scm.rate_limit', %s, %s::jsonb)
+                """,
+                (
+                    f"bucket:{key}",
+                    json.dumps(
+                        {
+                            "tokens": 3.5,
+                            "rate": 2.0,
+                            "burst": 8,
+                            "last_refill": time.time(),
+                            "paused_until": paused_until,
+                            "pause_reason": "manual_pause",
+                            "meta_json": {"last_429_at": 1.0},
+                        }
+                    ),
+                ),
+            )
+            # 在测试事务内执行（去掉文件自身的 BEGIN/COMMIT）
+            sql = (SQL_DIR / "16_scm_rate_limit_buckets.sql").read_text(encoding="utf-8")
+            cur.execute(sql.replace("BEGIN;", "").replace("COMMIT;", ""))
+
+            cur.execute(
+                "SELECT count(*) FROM logbook.kv WHERE namespace = 'scm.rate_limit' AND key = %s",
+                (f"bucket:{key}",),
+            )
+            assert cur.fetchone()[0] == 0
+
+        status = scm_db.get_rate_limit_status(db_conn, key)
+        assert status["rate"] == 2.0
+        assert status["burst"] == 8
+        assert status["current_tokens"] >= 3.5
+        assert status["paused_until"] == pytest.approx(paused_until, abs=1e-3)
+        assert status["meta_json"] == {"last_429_at": 1.0, "pause_reason": "manual_pause"}
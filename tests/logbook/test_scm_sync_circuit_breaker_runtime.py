@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+test_scm_sync_circuit_breaker_runtime.py - 进程内熔断运行时测试
+
+测试覆盖:
+    - 任务结果只更新内存计数，按持久化间隔写一次快照（模拟 db_api）
+    - 滑动窗口裁剪过期的桶
+    - 多个进程的快照合并后参与熔断决策
+    - 状态迁移立即写回共享状态，其他进程在下一次 sync 时加载
+    - 调度器复用运行时：无迁移时不写回状态，无快照时回退到 sync_runs 统计
+    - worker CLI 构建的运行时使用配置文件中的熔断配置
+    - save/load_circuit_breaker_window 的 kv 读写（需要 PostgreSQL）
+"""
+
+import argparse
+import time
+from unittest.mock import MagicMock
+
+from engram.logbook import config as config_module
+from engram.logbook import scm_db
+from engram.logbook.cli.scm_sync import _build_circuit_runtime
+from engram.logbook.scm_sync_circuit_breaker import CircuitBreakerRuntime, SlidingWindowCounter
+from engram.logbook.scm_sync_policy import CircuitBreakerConfig, SchedulerConfig
+from engram.logbook.scm_sync_scheduler_core import run_scheduler_tick
+
+NOW = 1_700_000_000.0
+
+
+class _FakeKv:
+    """内存中的熔断 kv（窗口快照 + 共享状态），记录写入次数"""
+
+    def __init__(self):
+        self.windows = {}
+        self.states = {}
+        self.window_writes = 0
+        self.state_writes = 0
+        self.health_queries = 0
+
+    def save_circuit_breaker_window(self, conn, key, worker_id, snapshot):
+        self.window_writes += 1
+        self.windows[(key, worker_id)] = snapshot
+
+    def load_circuit_breaker_windows(self, conn, key, *, max_age_seconds):
+        return {w: s for (k, w), s in self.windows.items() if k == key}
+
+    def load_circuit_breaker_state(self, conn, key):
+        return self.states.get(key)
+
+    def save_circuit_breaker_state(self, conn, key, state):
+        self.state_writes += 1
+        self.states[key] = dict(state)
+
+    def get_sync_runs_health_stats(self, conn, **kwargs):
+        self.health_queries += 1
+        return {}
+
+
+def _config():
+    return CircuitBreakerConfig(min_samples=4, failure_rate_threshold=0.5, enable_smoothing=False)
+
+
+def _runtime(db, worker_id, **kwargs):
+    kwargs.setdefault("persist_interval_seconds", 5.0)
+    return CircuitBreakerRuntime(
+        worker_id=worker_id,
+        config=_config(),
+        connect=lambda dsn: MagicMock(),
+        db_api=db,
+        **kwargs,
+    )
+
+
+class TestSlidingWindowCounter:
+    def test_prunes_expired_buckets(self):
+        counter = SlidingWindowCounter(60, bucket_seconds=10)
+        counter.add(NOW, runs=1, failed=1)
+        counter.add(NOW + 30, runs=2, requests=5)
+
+        assert counter.totals(NOW + 35) == [3, 1, 5, 0, 0]
+        assert counter.totals(NOW + 75) == [2, 0, 5, 0, 0]
+        assert [b[0] for b in counter.to_snapshot(NOW + 75)["buckets"]] == [NOW + 30]
+
+
+class TestRuntimePersistence:
+    def test_outcomes_batched_into_interval_snapshots(self):
+        db = _FakeKv()
+        runtime = _runtime(db, "w1")
+
+        for i in range(100):
+            runtime.record_result(
+                success=i % 10 != 0, counts={"total_requests": 3}, now=NOW + i * 0.01
+            )
+
+        # 第一次记录时与共享状态对齐，之后间隔内不再访问数据库
+        assert runtime.sync_count == 1
+        stats = runtime.health_stats(NOW + 1)
+        assert stats["total_runs"] == 100
+        assert stats["failed_count"] == 10
+        assert stats["total_requests"] == 300
+
+        runtime.record_result(success=False, error_category="rate_limit", now=NOW + 5)
+        assert runtime.sync_count == 2
+        assert db.window_writes == 2
+        assert db.windows[("default:global", "w1")]["buckets"][0][1:] == [101, 11, 301, 1, 0]
+        assert db.state_writes == 0
+
+    def test_merges_peer_snapshots(self):
+        db = _FakeKv()
+        w1, w2 = _runtime(db, "w1"), _runtime(db, "w2")
+        for _ in range(3):
+            w1.record_result(success=False, error_category="timeout", now=NOW)
+            w2.record_result(success=True, counts={"total_requests": 7}, now=NOW)
+
+        w2.sync(now=NOW + 1)
+        w1.sync(now=NOW + 1)
+
+        stats = w1.health_stats(NOW + 2)
+        assert stats["total_runs"] == 6
+        assert stats["failed_count"] == 3
+        assert stats["total_requests"] == 24
+        assert stats["total_timeout_count"] == 3
+        # 超过窗口的快照桶不计入
+        assert w1.health_stats(NOW + 31 * 60)["total_runs"] == 0
+
+    def test_transition_shared_across_workers(self):
+        db = _FakeKv()
+        w1, w2 = _runtime(db, "w1"), _runtime(db, "w2")
+        for _ in range(4):
+            w1.record_result(success=False, now=NOW)
+        w2.sync(now=NOW)
+
+        assert w1.decide(now=NOW + 1).current_state == "open"
+        assert w1.maybe_sync(now=NOW + 1)
+        assert db.state_writes == 1
+        assert db.states["default:global"]["state"] == "open"
+        assert db.states["default:global"]["changed_at"] == NOW + 1
+
+        # w2 在间隔内仍使用本地状态，下一次 sync 时加载 w1 的迁移
+        assert w2.decide(now=NOW + 2).current_state == "closed"
+        w2.sync(now=NOW + 6)
+        assert w2.get_state_dict()["state"] == "open"
+        assert w2.decide(now=NOW + 6).current_state == "open"
+
+    def test_decision_reused_within_bucket(self):
+        db = _FakeKv()
+        runtime = _runtime(db, "w1")
+        first = runtime.decide(now=NOW)
+
+        assert runtime.decide(now=NOW + 1) is first
+        assert runtime.decide(now=NOW + 10) is not first
+
+    def test_sync_failure_does_not_raise(self):
+        db = _FakeKv()
+        db.load_circuit_breaker_windows = None  # 调用时 TypeError
+        runtime = _runtime(db, "w1")
+
+        runtime.record_result(success=True, now=NOW)
+        runtime.record_result(success=True, now=NOW + 1)
+
+        assert runtime.sync_errors == 1
+        assert runtime.health_stats(NOW + 1)["total_runs"] == 2
+
+
+class _SchedulerDbApi(_FakeKv):
+    def list_repos_for_scheduling(self, conn, **kwargs):
+        return [{"repo_id": 1, "repo_type": "svn", "url": "svn://svn/1"}]
+
+    def get_cursor_values(self, conn, repo_ids, job_type, cache=None):
+        return {}
+
+    def get_repo_sync_stats_many(self, conn, repo_ids):
+        return {repo_id: {} for repo_id in repo_ids}
+
+    def get_active_job_pairs(self, conn):
+        return []
+
+    def get_pause_snapshot(self, conn):
+        return {"paused_pairs": set(), "pause_count": 0, "by_reason_code": {}, "snapshot_at": NOW}
+
+    def get_budget_snapshot(self, conn):
+        return {}
+
+    def get_rate_limit_bucket_statuses(self, conn, instances):
+        return {}
+
+
+class TestSchedulerRuntime:
+    def _tick(self, db, runtime, now):
+        return run_scheduler_tick(
+            None,
+            scheduler_config=SchedulerConfig(),
+            cb_config=_config(),
+            dry_run=True,
+            now=now,
+            db_api=db,
+            circuit_runtime=runtime,
+        )
+
+    def test_no_state_write_without_transition(self):
+        db = _SchedulerDbApi()
+        runtime = _runtime(db, "scheduler")
+
+        for i in range(5):
+            assert self._tick(db, runtime, NOW + i * 60).circuit_state == "closed"
+
+        assert db.state_writes == 0
+        # 调度器自身不记录结果，不写窗口快照
+        assert db.window_writes == 0
+        # 无 worker 快照时回退到 sync_runs 统计
+        assert db.health_queries == 5
+
+    def test_uses_worker_snapshots(self):
+        db = _SchedulerDbApi()
+        worker = _runtime(db, "w1")
+        for _ in range(4):
+            worker.record_result(success=False, now=NOW)
+        worker.flush(now=NOW)
+        runtime = _runtime(db, "scheduler")
+
+        result = self._tick(db, runtime, NOW + 1)
+
+        assert result.circuit_state == "open"
+        assert db.health_queries == 0
+        assert db.states["default:global"]["state"] == "open"
+
+
+class TestWorkerCliRuntime:
+    def test_configured_window_reaches_worker_runtime(self, tmp_path, monkeypatch):
+        config_path = tmp_path / "config.toml"
+        config_path.write_text("[scm.circuit_breaker]\nwindow_minutes = 5\n")
+        monkeypatch.delenv("SCM_CB_WINDOW_MINUTES", raising=False)
+        monkeypatch.setattr(config_module, "_global_config", None)
+        args = argparse.Namespace(
+            worker_id="w1",
+            dsn=None,
+            config=str(config_path),
+            cb_snapshot_interval=10.0,
+        )
+
+        runtime = _build_circuit_runtime(args)
+
+        assert runtime.config.window_minutes == 5
+        assert runtime._counter.window_seconds == 300
+
+
+# ---------- 测试：kv 读写（需要数据库） ----------
+
+
+class TestCircuitBreakerWindowDb:
+    def test_save_and_load_windows(self, db_conn):
+        key = f"cb-window-test-{time.time_ns()}"
+        snapshot = {"v": 1, "bucket_seconds": 10, "buckets": [[1700000000, 3, 1, 9, 0, 0]]}
+
+        scm_db.save_circuit_breaker_window(db_conn, key, "w1", snapshot)
+        scm_db.save_circuit_breaker_window(db_conn, key, "w2", {**snapshot, "buckets": []})
+        scm_db.save_circuit_breaker_window(db_conn, f"{key}x", "w3", snapshot)
+
+        windows = scm_db.load_circuit_breaker_windows(db_conn, key, max_age_seconds=60)
+        assert windows == {"w1": snapshot, "w2": {**snapshot, "buckets": []}}
+
+        with db_conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE logbook.kv SET updated_at = now() - interval '1 hour'
+                WHERE namespace = 'scm.sync_health.window' AND key = %s
+                """,
+                (f"{key}|w2",),
+            )
+        assert list(scm_db.load_circuit_breaker_windows(db_conn, key, max_age_seconds=60)) == ["w1"]
@@ -589,11 +589,15 @@ class TestEnqueueClaimDimensionFiltering:
         params = call_args[0][1]
 
         # SQL 应包含列过滤条件
-        assert "gitlab_instance IS NULL" in sql or "gitlab_instance IN" in sql
+        assert "gitlab_instance IS NULL" in sql
+        assert "gitlab_instance = ANY(%s)" in sql
 
-        # 参数应包含规范化的实例名
-        assert "gitlab.example.com" in params
-        assert "gitlab2.example.com" in params
+        # 参数应包含规范化的实例名（数组参数，列与 payload_json 各一次），worker_id 位于最后
+        assert params == [
+            ["gitlab.example.com", "gitlab2.example.com"],
+            ["gitlab.example.com", "gitlab2.example.com"],
+            "test-worker",
+        ]
 
     def test_claim_with_tenant_allowlist_generates_correct_sql(self):
         """claim(tenant_allowlist) 应生成包含列过滤的 SQL"""
@@ -619,11 +623,11 @@ class TestEnqueueClaimDimensionFiltering:
         params = call_args[0][1]
 
         # SQL 应包含列过滤条件
-        assert "tenant_id IS NULL" in sql or "tenant_id IN" in sql
+        assert "tenant_id IS NULL" in sql
+        assert "tenant_id = ANY(%s)" in sql
 
-        # 参数应包含租户 ID
-        assert "tenant-a" in params
-        assert "tenant-b" in params
+        # 参数应包含租户 ID（数组参数），worker_id 位于最后
+        assert params == [["tenant-a", "tenant-b"], ["tenant-a", "tenant-b"], "test-worker"]
 
     def test_claim_combined_allowlists(self):
         """claim 同时使用 instance_allowlist 和 tenant_allowlist"""
@@ -653,8 +657,8 @@ class TestEnqueueClaimDimensionFiltering:
         assert "tenant_id" in sql
 
         # 参数应包含两种过滤值
-        assert "gitlab.example.com" in params
-        assert "tenant-x" in params
+        assert ["gitlab.example.com"] in params
+        assert ["tenant-x"] in params
 
 
 class TestDimensionColumnPayloadConsistency:
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+test_scm_sync_notify.py - 入队通知（LISTEN/NOTIFY）测试
+
+覆盖:
+- enqueue 在 INSERT 语句内对立即可执行的新任务发送通知
+- notify_jobs_enqueued 对相同 payload 去重
+- JobNotificationListener 仅在通知匹配 job_types/实例/租户白名单时提前唤醒
+- 监听连接不可用时退化为按超时等待，重连按上限指数退避且只在首次失败时告警
+"""
+
+import json
+import logging
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import psycopg
+
+from engram.logbook.scm_sync_notify import (
+    NOTIFY_CHANNEL,
+    JobNotificationListener,
+    build_notify_payload,
+    notify_jobs_enqueued,
+)
+from engram.logbook.scm_sync_queue import enqueue
+
+
+def _mock_conn(fetchone):
+    cursor = MagicMock()
+    cursor.fetchone.return_value = fetchone
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__ = MagicMock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    return conn, cursor
+
+
+class TestEnqueueNotify:
+    def test_insert_and_notify_in_one_statement(self):
+        conn, cursor = _mock_conn(("job-1", None))
+
+        job_id = enqueue(
+            1,
+            "gitlab_commits",
+            payload={"gitlab_instance": "https://GitLab.Example.com", "tenant_id": "t1"},
+            conn=conn,
+        )
+
+        assert job_id == "job-1"
+        cursor.execute.assert_called_once()
+        sql, params = cursor.execute.call_args[0]
+        assert "pg_notify" in sql
+        # 仅立即可执行的新插入行发送通知（延迟任务、冲突未插入时不发送）
+        assert "ins.not_before <= now()" in sql
+        assert params[0] == NOTIFY_CHANNEL
+        assert json.loads(params[1]) == {
+            "job_type": "gitlab_commits",
+            "instance": "gitlab.example.com",
+            "tenant_id": "t1",
+        }
+        conn.commit.assert_called_once()
+
+    def test_identical_payloads_sent_once(self):
+        cursor = MagicMock()
+        payload = build_notify_payload("svn")
+
+        assert notify_jobs_enqueued(cursor, [payload, payload]) == 1
+        assert notify_jobs_enqueued(cursor, []) == 0
+        assert cursor.execute.call_count == 1
+
+
+class _FakeListenConn:
+    def __init__(self, payloads):
+        self.payloads = list(payloads)
+        self.executed = []
+        self.closed = False
+
+    def execute(self, query):
+        self.executed.append(query)
+
+    def notifies(self, timeout=None, stop_after=None):
+        if self.payloads:
+            yield SimpleNamespace(payload=self.payloads.pop(0))
+
+    def close(self):
+        self.closed = True
+
+
+class TestJobNotificationListener:
+    def test_filters_by_allowlists(self):
+        listener = JobNotificationListener(
+            None,
+            job_types=["gitlab_commits", "svn"],
+            instance_allowlist=["https://gitlab.a.com"],
+            tenant_allowlist=["t1"],
+        )
+
+        assert listener.matches(build_notify_payload("gitlab_commits", "gitlab.a.com", "t1"))
+        assert listener.matches(build_notify_payload("svn"))
+        assert not listener.matches(build_notify_payload("gitlab_mrs", "gitlab.a.com", "t1"))
+        assert not listener.matches(build_notify_payload("gitlab_commits", "gitlab.b.com"))
+        assert not listener.matches(build_notify_payload("svn", None, "t2"))
+        # 无法解析的 payload 宁可唤醒
+        assert listener.matches("not-json")
+
+    def test_wait_skips_unmatched_notifications(self):
+        conn = _FakeListenConn(
+            [build_notify_payload("gitlab_mrs"), build_notify_payload("gitlab_commits")]
+        )
+        listener = JobNotificationListener(
+            None, job_types=["gitlab_commits"], connect=lambda dsn: conn
+        )
+
+        assert listener.wait(5) is True
+        assert conn.payloads == []
+        assert conn.executed == [f"LISTEN {NOTIFY_CHANNEL}"]
+
+        listener.close()
+        assert conn.closed
+
+    def test_wait_times_out_without_notifications(self):
+        listener = JobNotificationListener(None, connect=lambda dsn: _FakeListenConn([]))
+        assert listener.wait(0.02) is False
+
+    def test_falls_back_to_sleep_when_listen_unavailable(self, monkeypatch):
+        def _connect(dsn):
+            raise psycopg.OperationalError("connection refused")
+
+        sleeps = []
+        monkeypatch.setattr("engram.logbook.scm_sync_notify.time.sleep", sleeps.append)
+        listener = JobNotificationListener(None, connect=_connect)
+
+        assert listener.wait(3) is False
+        assert sleeps == [3]
+
+    def test_reconnect_backoff_is_capped_and_logged_once(self, monkeypatch, caplog):
+        attempts = []
+        clock = {"now": 1000.0}
+
+        def _connect(dsn):
+            attempts.append(clock["now"])
+            if len(attempts) <= 5:
+                raise psycopg.OperationalError("connection refused")
+            return _FakeListenConn([])
+
+        monkeypatch.setattr("engram.logbook.scm_sync_notify.time.sleep", lambda s: None)
+        monkeypatch.setattr("engram.logbook.scm_sync_notify.time.monotonic", lambda: clock["now"])
+        listener = JobNotificationListener(
+            None, connect=_connect, reconnect_initial_delay=1.0, reconnect_max_delay=4.0
+        )
+
+        with caplog.at_level(logging.DEBUG, logger="engram.logbook.scm_sync_notify"):
+            # 每秒调用一次 wait（与多槽位 worker 的监听循环一致）
+            for _ in range(20):
+                listener.wait(0)
+                clock["now"] += 1.0
+
+        # 退避 1, 2, 4, 4（上限）秒后重连成功
+        assert attempts == [1000.0, 1001.0, 1003.0, 1007.0, 1011.0, 1015.0]
+        warnings = [r for r in caplog.records if r.levelno == logging.WARNING]
+        assert len(warnings) == 1
+        assert any("已恢复" in r.getMessage() for r in caplog.records)
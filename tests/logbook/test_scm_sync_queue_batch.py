@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+SCM Sync Queue 批量操作测试
+
+测试:
+- claim_batch: 参数布局、显式传入公平参数时不读取配置、按优先级返回
+- enqueue_many: 单条语句写入维度列与通知、按输入位置报告插入/去重
+- promote_pending_job: 提升 pending 任务优先级并发送通知
+- claim_batch / renew_lease_batch / ack_batch / enqueue_many 的数据库语义（需要 PostgreSQL）
+"""
+
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import psycopg
+import pytest
+
+from engram.logbook.scm_sync_queue import (
+    _build_claim_batch_query,
+    ack_batch,
+    claim_batch,
+    enqueue_many,
+    promote_pending_job,
+    renew_lease_batch,
+)
+
+# ---------- 测试：查询构建（模拟连接） ----------
+
+
+def _mock_conn(rows):
+    cursor = MagicMock()
+    cursor.fetchall.return_value = rows
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__ = MagicMock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    return conn, cursor
+
+
+def _row(priority, created_second):
+    created_at = datetime(2024, 1, 1, 0, 0, created_second, tzinfo=timezone.utc)
+    return (
+        uuid.uuid4(),
+        1,
+        "gitlab_commits",
+        "incremental",
+        {},
+        priority,
+        1,
+        3,
+        None,
+        300,
+        created_at,
+    )
+
+
+class TestClaimBatchQuery:
+    def test_params_and_priority_order(self):
+        conn, cursor = _mock_conn([_row(50, 2), _row(10, 5), _row(50, 1)])
+
+        with patch("engram.logbook.config.get_claim_config") as mock_config:
+            jobs = claim_batch(
+                "w1",
+                5,
+                job_types=["gitlab_commits"],
+                tenant_allowlist=["t1"],
+                enable_tenant_fair_claim=True,
+                max_consecutive_same_tenant=2,
+                conn=conn,
+            )
+
+        mock_config.assert_not_called()
+        sql, params = cursor.execute.call_args[0]
+        assert sql.count("%s") == len(params)
+        assert params == [["gitlab_commits"], ["t1"], ["t1"], 2, 5, "w1"]
+        assert [(j["priority"], j["created_at"].second) for j in jobs] == [
+            (10, 5),
+            (50, 1),
+            (50, 2),
+        ]
+        conn.commit.assert_called_once()
+
+    def test_non_fair_has_no_tenant_limit(self):
+        conn, cursor = _mock_conn([])
+
+        assert (
+            claim_batch(
+                "w1", 3, enable_tenant_fair_claim=False, max_consecutive_same_tenant=3, conn=conn
+            )
+            == []
+        )
+
+        sql, params = cursor.execute.call_args[0]
+        assert params == [3, "w1"]
+        assert "PARTITION BY" not in sql
+
+    def test_zero_batch_skips_query(self):
+        assert claim_batch("w1", 0, conn=None) == []
+
+    def test_builder_is_cached(self):
+        kwargs = dict(has_job_types=True, has_instances=False, has_tenants=False, tenant_fair=True)
+        assert _build_claim_batch_query(**kwargs) is _build_claim_batch_query(**kwargs)
+
+    def test_ack_batch_rejects_mismatched_run_ids(self):
+        with pytest.raises(ValueError):
+            ack_batch(["a", "b"], "w1", run_ids=[None], conn=MagicMock())
+
+
+class TestEnqueueManyQuery:
+    def test_single_statement_with_dimensions(self):
+        conn, cursor = _mock_conn([("job-b", 2, "gitlab_mrs", "incremental", 1)])
+        jobs = [
+            {"repo_id": 1, "job_type": "svn", "payload_json": {"tenant_id": "t1"}},
+            {
+                "repo_id": 2,
+                "job_type": "gitlab_mrs",
+                "priority": 5,
+                "payload_json": {"gitlab_instance": "https://GitLab.Example.com"},
+            },
+        ]
+
+        job_ids = enqueue_many(jobs, conn=conn)
+
+        assert job_ids == [None, "job-b"]
+        cursor.execute.assert_called_once()
+        sql, params = cursor.execute.call_args[0]
+        assert sql.count("%s") == len(params)
+        assert "ON CONFLICT (repo_id, job_type, mode)" in sql
+        assert "pg_notify" in sql
+        repo_ids, job_types, modes, priorities = params[:4]
+        assert (repo_ids, job_types, modes, priorities) == (
+            [1, 2],
+            ["svn", "gitlab_mrs"],
+            ["incremental", "incremental"],
+            [100, 5],
+        )
+        # gitlab_instance / tenant_id 维度列
+        assert params[8] == [None, "gitlab.example.com"]
+        assert params[9] == ["t1", None]
+        conn.commit.assert_called_once()
+
+    def test_empty_batch_skips_query(self):
+        conn = MagicMock()
+        assert enqueue_many([], conn=conn) == []
+        conn.cursor.assert_not_called()
+
+    def test_strict_dimension_check(self):
+        with pytest.raises(ValueError):
+            enqueue_many(
+                [{"repo_id": 1, "job_type": "gitlab_commits"}],
+                conn=MagicMock(),
+                strict_dimension_check=True,
+            )
+
+
+class TestPromotePendingJobQuery:
+    def test_promotes_and_notifies(self):
+        conn, cursor = _mock_conn([])
+        cursor.fetchone.return_value = ("job-a", "gitlab.example.com", None)
+
+        job_id = promote_pending_job(3, "gitlab_mrs", priority=10, conn=conn)
+
+        assert job_id == "job-a"
+        update_sql, params = cursor.execute.call_args_list[0][0]
+        assert "LEAST(priority, %s)" in update_sql
+        assert "status = 'pending'" in update_sql
+        assert params == (10, 3, "gitlab_mrs", "incremental")
+        assert "pg_notify" in cursor.execute.call_args_list[1][0][0]
+        conn.commit.assert_called_once()
+
+    def test_no_pending_job(self):
+        conn, cursor = _mock_conn([])
+        cursor.fetchone.return_value = None
+
+        assert promote_pending_job(3, "gitlab_mrs", conn=conn) is None
+        assert cursor.execute.call_count == 1
+
+
+# ---------- 测试：批量操作（需要数据库） ----------
+
+
+@pytest.fixture
+def queue_conn(migrated_db):
+    """独立连接 + 测试仓库，结束时删除仓库（级联删除任务）"""
+    scm_schema = migrated_db["schemas"]["scm"]
+    conn = psycopg.connect(migrated_db["dsn"], autocommit=False)
+    with conn.cursor() as cur:
+        cur.execute(f"SET search_path TO {scm_schema}")
+        cur.execute(
+            f"""
+            INSERT INTO {scm_schema}.repos (vcs_type, remote_url)
+            VALUES ('git', %s)
+            RETURNING repo_id
+            """,
+            (f"https://example.com/batch_{uuid.uuid4().hex[:8]}.git",),
+        )
+        repo_id = cur.fetchone()[0]
+    conn.commit()
+    try:
+        yield conn, repo_id, scm_schema
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DELETE FROM {scm_schema}.repos WHERE repo_id = %s", (repo_id,))
+        conn.commit()
+        conn.close()
+
+
+def _insert_jobs(conn, scm_schema, repo_id, specs):
+    """specs: [(job_type, mode, priority, tenant_id)]"""
+    ids = []
+    with conn.cursor() as cur:
+        for job_type, mode, priority, tenant_id in specs:
+            cur.execute(
+                f"""
+                INSERT INTO {scm_schema}.sync_jobs (repo_id, job_type, mode, priority, payload_json)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING job_id
+                """,
+                (
+                    repo_id,
+                    job_type,
+                    mode,
+                    priority,
+                    psycopg.types.json.Jsonb({"tenant_id": tenant_id}),
+                ),
+            )
+            ids.append(str(cur.fetchone()[0]))
+    conn.commit()
+    return ids
+
+
+class TestBatchOperationsDb:
+    def test_claim_renew_ack_round_trip(self, queue_conn):
+        conn, repo_id, scm_schema = queue_conn
+        ids = _insert_jobs(
+            conn,
+            scm_schema,
+            repo_id,
+            [
+                ("gitlab_commits", "incremental", 30, "t1"),
+                ("gitlab_mrs", "incremental", 10, "t1"),
+                ("svn", "incremental", 20, "t1"),
+            ],
+        )
+
+        jobs = claim_batch(
+            "w-batch", 2, enable_tenant_fair_claim=False, max_consecutive_same_tenant=3, conn=conn
+        )
+
+        assert [j["job_id"] for j in jobs] == [ids[1], ids[2]]
+        assert all(j["attempts"] == 1 for j in jobs)
+
+        claimed = [j["job_id"] for j in jobs]
+        assert sorted(
+            renew_lease_batch(claimed + [ids[0]], "w-batch", lease_seconds=600, conn=conn)
+        ) == sorted(claimed)
+        assert renew_lease_batch(claimed, "other-worker", conn=conn) == []
+
+        assert sorted(ack_batch(claimed, "w-batch", conn=conn)) == sorted(claimed)
+        assert ack_batch(claimed, "w-batch", conn=conn) == []
+
+    def test_tenant_fair_batch_round_robins_tenants(self, queue_conn):
+        conn, repo_id, scm_schema = queue_conn
+        _insert_jobs(
+            conn,
+            scm_schema,
+            repo_id,
+            [
+                ("gitlab_commits", "incremental", 10, "big"),
+                ("gitlab_mrs", "incremental", 11, "big"),
+                ("svn", "incremental", 12, "big"),
+                ("gitlab_commits", "backfill", 50, "small"),
+            ],
+        )
+
+        jobs = claim_batch(
+            "w-fair", 3, enable_tenant_fair_claim=True, max_consecutive_same_tenant=1, conn=conn
+        )
+
+        assert sorted(j["payload"]["tenant_id"] for j in jobs) == ["big", "small"]
+
+    def test_enqueue_many_reports_inserted_and_deduplicated(self, queue_conn):
+        conn, repo_id, scm_schema = queue_conn
+        _insert_jobs(conn, scm_schema, repo_id, [("gitlab_commits", "incremental", 10, "t1")])
+        payload = {"gitlab_instance": "https://gitlab.example.com", "tenant_id": "t1"}
+
+        job_ids = enqueue_many(
+            [
+                {"repo_id": repo_id, "job_type": "gitlab_commits", "payload_json": payload},
+                {"repo_id": repo_id, "job_type": "gitlab_mrs", "payload_json": payload},
+                {"repo_id": repo_id, "job_type": "gitlab_mrs", "payload_json": payload},
+                {"repo_id": repo_id, "job_type": "gitlab_mrs", "mode": "backfill"},
+            ],
+            conn=conn,
+        )
+
+        # 已有活跃任务、批内重复键均被去重
+        assert job_ids[0] is None
+        assert job_ids[1] is not None
+        assert job_ids[2] is None
+        assert job_ids[3] is not None
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT gitlab_instance, tenant_id FROM {scm_schema}.sync_jobs WHERE job_id = %s",
+                (job_ids[1],),
+            )
+            assert cur.fetchone() == ("gitlab.example.com", "t1")
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+test_scm_sync_scheduler_incremental.py - 增量调度测试
+
+测试覆盖:
+    - 增量模式只重新加载水位线以来有变化的仓库，候选与全量模式一致（模拟 db_api）
+    - 游标年龄越过阈值时由定时器触发重新评估
+    - 到期仓库被删除后不再参与选择；全量重建间隔到达时重新加载全部仓库
+    - get_scheduling_changes_since 检测 sync_runs/游标/新仓库变化（需要 PostgreSQL）
+"""
+
+import time
+
+from engram.logbook import scm_db
+from engram.logbook.scm_sync_policy import SchedulerConfig
+from engram.logbook.scm_sync_scheduler_core import (
+    IncrementalSchedulerState,
+    run_scheduler_tick,
+)
+
+NOW = 1_700_000_000.0
+THRESHOLD = 3600
+
+
+class _FakeDbApi:
+    """内存中的调度数据源，记录加载过的仓库"""
+
+    def __init__(self, cursors):
+        self.repos = {
+            repo_id: {"repo_id": repo_id, "repo_type": "svn", "url": f"svn://svn/{repo_id}"}
+            for repo_id in cursors
+        }
+        self.cursors = dict(cursors)
+        self.changed = []
+        self.loaded = []
+
+    def list_repos_for_scheduling(self, conn, *, repo_ids=None, limit=1000):
+        ids = sorted(self.repos) if repo_ids is None else sorted(set(repo_ids) & set(self.repos))
+        return [dict(self.repos[repo_id]) for repo_id in ids[:limit]]
+
+    def get_scheduling_changes_since(self, conn, since):
+        changed, self.changed = self.changed, []
+        return ([] if since is None else sorted(changed)), NOW
+
+    def get_cursor_values(self, conn, repo_ids, job_type, cache=None):
+        repo_ids = list(repo_ids)
+        self.loaded.append(sorted(repo_ids))
+        return {
+            repo_id: {"value": {}, "updated_at": self.cursors[repo_id]}
+            for repo_id in repo_ids
+            if self.cursors.get(repo_id) is not None
+        }
+
+    def get_repo_sync_stats_many(self, conn, repo_ids):
+        return {repo_id: {} for repo_id in repo_ids}
+
+    def get_active_job_pairs(self, conn):
+        return []
+
+    def get_pause_snapshot(self, conn):
+        return {"paused_pairs": set(), "pause_count": 0, "by_reason_code": {}, "snapshot_at": NOW}
+
+    def get_budget_snapshot(self, conn):
+        return {}
+
+    def get_rate_limit_bucket_statuses(self, conn, instances):
+        return {}
+
+    def load_circuit_breaker_state(self, conn, key):
+        return None
+
+    def get_sync_runs_health_stats(self, conn, **kwargs):
+        return {}
+
+    def save_circuit_breaker_state(self, conn, key, state):
+        pass
+
+
+def _config():
+    return SchedulerConfig(
+        cursor_age_threshold_seconds=THRESHOLD,
+        max_running=100,
+        max_queue_depth=100,
+        max_enqueue_per_scan=100,
+        per_tenant_concurrency=100,
+        per_instance_concurrency=100,
+    )
+
+
+def _tick(db_api, now, incremental=None):
+    return run_scheduler_tick(
+        None,
+        scheduler_config=_config(),
+        dry_run=True,
+        now=now,
+        db_api=db_api,
+        incremental=incremental,
+    )
+
+
+def _repo_ids(result):
+    return sorted({job["repo_id"] for job in result.enqueued_jobs})
+
+
+class TestIncrementalScheduler:
+    def test_only_changed_repos_reloaded(self):
+        # 1: 从未同步（始终到期）；2: 游标新鲜；3: 游标过期
+        db_api = _FakeDbApi({1: None, 2: NOW - 60, 3: NOW - 2 * THRESHOLD})
+        incremental = IncrementalSchedulerState()
+
+        first = _tick(db_api, NOW, incremental)
+        assert first.repos_scanned == 3
+        assert first.repos_evaluated == 3
+        assert _repo_ids(first) == [1, 3]
+        assert first.enqueued_jobs == _tick(db_api, NOW).enqueued_jobs
+
+        db_api.loaded.clear()
+        idle = _tick(db_api, NOW + 1, incremental)
+        assert idle.repos_evaluated == 0
+        assert db_api.loaded == []
+        assert _repo_ids(idle) == [1, 3]
+
+        # 仓库 3 同步完成（游标更新），只重新加载仓库 3
+        db_api.cursors[3] = NOW + 1
+        db_api.changed = [3]
+        changed = _tick(db_api, NOW + 2, incremental)
+        assert db_api.loaded == [[3]]
+        assert changed.repos_evaluated == 1
+        assert _repo_ids(changed) == [1]
+        assert changed.enqueued_jobs == _tick(db_api, NOW + 2).enqueued_jobs
+
+    def test_cursor_age_timer_triggers_reevaluation(self):
+        db_api = _FakeDbApi({1: NOW - 60})
+        incremental = IncrementalSchedulerState(full_refresh_interval_seconds=10 * THRESHOLD)
+
+        assert _repo_ids(_tick(db_api, NOW, incremental)) == []
+        db_api.loaded.clear()
+
+        assert _repo_ids(_tick(db_api, NOW - 61 + THRESHOLD, incremental)) == []
+        expired = _tick(db_api, NOW - 60 + THRESHOLD, incremental)
+        assert expired.repos_evaluated == 1
+        assert _repo_ids(expired) == [1]
+        # 定时器触发只重新评估内存中的状态，不重新加载
+        assert db_api.loaded == []
+
+    def test_deleted_repo_dropped_and_full_refresh(self):
+        db_api = _FakeDbApi({1: None, 2: None})
+        incremental = IncrementalSchedulerState(full_refresh_interval_seconds=600)
+        _tick(db_api, NOW, incremental)
+
+        del db_api.repos[2]
+        dropped = _tick(db_api, NOW + 1, incremental)
+        assert _repo_ids(dropped) == [1]
+        assert sorted(incremental.states) == [1]
+
+        db_api.repos[4] = {"repo_id": 4, "repo_type": "svn", "url": "svn://svn/4"}
+        db_api.loaded.clear()
+        refreshed = _tick(db_api, NOW + 600, incremental)
+        assert db_api.loaded == [[1, 4]]
+        assert refreshed.repos_scanned == 2
+        assert _repo_ids(refreshed) == [1, 4]
+
+
+# ---------- 测试：变化检测（需要数据库） ----------
+
+
+class TestSchedulingChangesDb:
+    def test_detects_runs_cursors_and_new_repos(self, db_conn):
+        with db_conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO scm.repos (repo_type, url)
+                SELECT 'git', 'https://changes.example.com/r' || g || '-' || md5(random()::text)
+                FROM generate_series(1, 3) g
+                RETURNING repo_id
+                """
+            )
+            run_repo, cursor_repo, idle_repo = [row[0] for row in cur.fetchall()]
+            # 把 created_at 挪到水位线之前，避免新建本身被计为变化
+            cur.execute(
+                "UPDATE scm.repos SET created_at = now() - interval '1 day' WHERE repo_id = ANY(%s)",
+                ([run_repo, cursor_repo, idle_repo],),
+            )
+
+        _, high_water = scm_db.get_scheduling_changes_since(db_conn, None)
+        since = high_water - 1
+        assert scm_db.get_scheduling_changes_since(db_conn, time.time() + 3600)[0] == []
+
+        with db_conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO scm.sync_runs (run_id, repo_id, job_type, started_at, status)
+                VALUES (gen_random_uuid(), %s, 'gitlab_commits', now() - interval '1 day', 'running')
+                """,
+                (run_repo,),
+            )
+            cur.execute(
+                "UPDATE scm.sync_runs SET finished_at = clock_timestamp(), status = 'completed' "
+                "WHERE repo_id = %s",
+                (run_repo,),
+            )
+            cur.execute(
+                """
+                INSERT INTO logbook.kv (namespace, key, value_json, updated_at)
+                VALUES ('scm.sync', %s, '{}'::jsonb, clock_timestamp())
+                """,
+                (f"cursor:{cursor_repo}:commits",),
+            )
+            cur.execute(
+                """
+                INSERT INTO scm.repos (repo_type, url, created_at)
+                VALUES ('svn', 'svn://changes.example.com/' || md5(random()::text), clock_timestamp())
+                RETURNING repo_id
+                """
+            )
+            new_repo = cur.fetchone()[0]
+
+        changed, _ = scm_db.get_scheduling_changes_since(db_conn, since)
+        assert {run_repo, cursor_repo, new_repo} <= set(changed)
+        assert idle_repo not in changed
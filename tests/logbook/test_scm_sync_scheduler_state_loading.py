@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+test_scm_sync_scheduler_state_loading.py - 调度 tick 批量状态加载测试
+
+测试覆盖:
+    - _build_repo_sync_states 每个 tick 只做一次统计查询与一次游标查询（模拟 db_api）
+    - get_repo_sync_stats_many 与逐仓库 get_repo_sync_stats 结果一致（需要 PostgreSQL）
+    - 10k 仓库下逐仓库加载与批量加载的耗时对比（需要 PostgreSQL）
+"""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook import scm_db
+from engram.logbook.scm_sync_policy import RepoSyncState
+from engram.logbook.scm_sync_scheduler_core import _build_repo_sync_states
+
+# ---------- 测试：调用次数（模拟 db_api） ----------
+
+
+class TestBuildRepoSyncStates:
+    def test_loads_stats_and_cursors_once(self):
+        db_api = MagicMock()
+        db_api.get_cursor_values.return_value = {1: {"value": {}, "updated_at": 1700000000.0}}
+        db_api.get_repo_sync_stats_many.return_value = {
+            1: {
+                "total_runs": 3,
+                "failed_count": 1,
+                "total_429_hits": 4,
+                "total_requests": 40,
+                "last_run_status": "failed",
+                "last_run_at": 1700000100.0,
+            },
+            2: {"total_runs": 0, "failed_count": 0, "total_429_hits": 0, "total_requests": 0},
+        }
+        repos = [
+            {"repo_id": 1, "repo_type": "git", "url": "https://GitLab.example.com/a/b"},
+            {"repo_id": 2, "repo_type": "svn", "url": "svn://svn.example.com/repo"},
+        ]
+
+        states = _build_repo_sync_states(MagicMock(), repos, {(2, "mrs")}, db_api=db_api)
+
+        db_api.get_repo_sync_stats_many.assert_called_once()
+        assert db_api.get_repo_sync_stats_many.call_args[0][1] == [1, 2]
+        db_api.get_repo_sync_stats.assert_not_called()
+        assert states == [
+            RepoSyncState(
+                repo_id=1,
+                repo_type="git",
+                gitlab_instance="gitlab.example.com",
+                cursor_updated_at=1700000000.0,
+                recent_run_count=3,
+                recent_failed_count=1,
+                recent_429_hits=4,
+                recent_total_requests=40,
+                last_run_status="failed",
+                last_run_at=1700000100.0,
+            ),
+            RepoSyncState(repo_id=2, repo_type="svn", is_queued=True),
+        ]
+
+    def test_cursor_cache_scoped_by_dsn(self):
+        db_api = MagicMock()
+        db_api.get_cursor_values.return_value = {}
+        db_api.get_repo_sync_stats_many.return_value = {}
+        repos = [{"repo_id": 1, "repo_type": "git", "url": ""}]
+
+        caches = []
+        for dsn in ("host=a dbname=x", "host=b dbname=x", "host=a dbname=x"):
+            conn = MagicMock()
+            conn.info.dsn = dsn
+            _build_repo_sync_states(conn, repos, set(), db_api=db_api)
+            caches.append(db_api.get_cursor_values.call_args.kwargs["cache"])
+
+        assert caches[0] is caches[2]
+        assert caches[0] is not caches[1]
+
+
+# ---------- 测试：批量统计（需要数据库） ----------
+
+
+def _insert_repos(cur, count):
+    cur.execute(
+        """
+        INSERT INTO scm.repos (repo_type, url)
+        SELECT 'git', 'https://stats.example.com/r' || g || '-' || md5(random()::text)
+        FROM generate_series(1, %s) g
+        RETURNING repo_id
+        """,
+        (count,),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def _insert_runs(cur, repo_ids, runs_per_repo):
+    """每个仓库 runs_per_repo 次运行，状态与 counts 按序变化（部分 counts 为空）"""
+    cur.execute(
+        """
+        INSERT INTO scm.sync_runs (run_id, repo_id, job_type, started_at, status, counts)
+        SELECT
+            gen_random_uuid(),
+            r.repo_id,
+            'gitlab_commits',
+            now() - make_interval(mins => g * 7 + r.ord::int),
+            CASE WHEN g %% 3 = 0 THEN 'failed' ELSE 'completed' END,
+            CASE
+                WHEN g %% 5 = 0 THEN '{}'::jsonb
+                ELSE jsonb_build_object('total_429_hits', g %% 4, 'total_requests', g * 10)
+            END
+        FROM unnest(%s::bigint[]) WITH ORDINALITY AS r(repo_id, ord)
+        CROSS JOIN generate_series(1, %s) g
+        """,
+        (repo_ids, runs_per_repo),
+    )
+
+
+class TestRepoSyncStatsManyDb:
+    def test_matches_per_repo_stats(self, db_conn):
+        with db_conn.cursor() as cur:
+            repo_ids = _insert_repos(cur, 4)
+            _insert_runs(cur, repo_ids[:3], 14)
+            _insert_runs(cur, repo_ids[2:3], 1)
+
+        batch = scm_db.get_repo_sync_stats_many(db_conn, repo_ids)
+
+        assert batch == {
+            repo_id: scm_db.get_repo_sync_stats(db_conn, repo_id) for repo_id in repo_ids
+        }
+        assert batch[repo_ids[2]]["total_runs"] == 10
+        assert batch[repo_ids[3]]["total_runs"] == 0
+
+
+# ---------- 基准：10k 仓库状态加载（需要数据库） ----------
+
+
+@pytest.mark.integration
+def test_state_loading_10k_repos(db_conn):
+    """
+    对比 10k 仓库（每仓库 10 次运行）下逐仓库查询与批量查询的耗时
+
+    断言两种方式构建的 RepoSyncState 完全一致；耗时仅输出供参考。
+    """
+
+    class _PerRepoApi:
+        get_cursor_values = staticmethod(scm_db.get_cursor_values)
+
+        @staticmethod
+        def get_repo_sync_stats_many(conn, repo_ids):
+            return {repo_id: scm_db.get_repo_sync_stats(conn, repo_id) for repo_id in repo_ids}
+
+    with db_conn.cursor() as cur:
+        repo_ids = _insert_repos(cur, 10_000)
+        _insert_runs(cur, repo_ids, 10)
+        cur.execute("ANALYZE scm.sync_runs")
+    repos = [{"repo_id": repo_id, "repo_type": "git", "url": ""} for repo_id in repo_ids]
+
+    start = time.perf_counter()
+    per_repo = _build_repo_sync_states(db_conn, repos, set(), db_api=_PerRepoApi)
+    per_repo_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = _build_repo_sync_states(db_conn, repos, set(), db_api=scm_db)
+    batched_seconds = time.perf_counter() - start
+
+    assert batched == per_repo
+    print(f"repos=10000: per_repo={per_repo_seconds:.2f}s batched={batched_seconds:.2f}s")
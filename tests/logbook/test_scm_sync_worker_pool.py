@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+test_scm_sync_worker_pool.py - 多槽位 Worker 测试
+
+覆盖:
+- ConnectionPool 复用连接、归还时回滚、连接数上限
+- SharedHeartbeat 一次批量续租所有任务，未续租的任务累计失败后中止
+- GitLabClientRegistry 按实例与 token 复用客户端
+- MultiSlotWorker 并发执行、按空闲槽位批量 claim、退出时让出未开始与未完成的任务
+- 已让出任务的 sync_run 以失败状态结束，任务本身不再 ack/fail
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook import gitlab_client, scm_sync_worker_core, scm_sync_worker_pool
+from engram.logbook.gitlab_client import GitLabClientRegistry, get_shared_client
+from engram.logbook.scm_sync_worker_pool import (
+    ConnectionPool,
+    MultiSlotWorker,
+    SharedHeartbeat,
+)
+
+# ---------- ConnectionPool ----------
+
+
+class TestConnectionPool:
+    def test_reuses_and_rolls_back(self):
+        created = []
+
+        def _connect(dsn):
+            conn = MagicMock(closed=False)
+            created.append(conn)
+            return conn
+
+        pool = ConnectionPool("postgresql://unused", 2, connect=_connect)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert len(created) == 1
+        assert first.rollback.call_count == 2
+
+    def test_size_limits_outstanding_connections(self):
+        pool = ConnectionPool(None, 1, connect=lambda dsn: MagicMock(closed=False))
+        conn = pool.acquire()
+
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0.01)
+
+        pool.release(conn)
+        assert pool.acquire(timeout=0.01) is conn
+
+    def test_closed_connection_is_replaced(self):
+        pool = ConnectionPool(None, 1, connect=lambda dsn: MagicMock(closed=False))
+        conn = pool.acquire()
+        conn.closed = True
+        pool.release(conn)
+
+        assert pool.acquire() is not conn
+
+    def test_close_keeps_borrowed_connections_until_release(self):
+        pool = ConnectionPool(None, 2, connect=lambda dsn: MagicMock(closed=False))
+        borrowed = pool.acquire()
+        idle = pool.acquire()
+        pool.release(idle)
+
+        pool.close(include_borrowed=False)
+
+        assert idle.close.called
+        assert not borrowed.close.called
+        pool.release(borrowed)
+        assert borrowed.close.called
+
+
+# ---------- SharedHeartbeat ----------
+
+
+class TestSharedHeartbeat:
+    def test_single_batch_renews_all_tracked_jobs(self, monkeypatch):
+        calls = []
+
+        def _renew(job_ids, worker_id, lease_seconds=None, conn=None):
+            calls.append(sorted(job_ids))
+            return [j for j in job_ids if j != "lost"]
+
+        monkeypatch.setattr(scm_sync_worker_pool, "renew_lease_batch", _renew)
+        hb = SharedHeartbeat(
+            worker_id="w1", renew_interval_seconds=60, lease_seconds=300, max_failures=2
+        )
+
+        with hb.track("a") as a, hb.track("lost") as lost:
+            hb.renew_once()
+            hb.renew_once()
+
+        assert calls == [["a", "lost"], ["a", "lost"]]
+        assert a.should_abort is False
+        assert lost.should_abort is True
+        assert lost.get_abort_error()["error_category"] == "lease_lost"
+        assert hb.tracked_job_ids() == []
+
+    def test_exception_counts_against_all_jobs(self, monkeypatch):
+        def _renew(*args, **kwargs):
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(scm_sync_worker_pool, "renew_lease_batch", _renew)
+        hb = SharedHeartbeat(
+            worker_id="w1", renew_interval_seconds=60, lease_seconds=300, max_failures=1
+        )
+
+        with hb.track("a") as a:
+            assert hb.renew_once() == []
+
+        assert a.should_abort
+        assert "db down" in a.last_error
+
+    def test_cancelled_jobs_are_not_renewed(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            scm_sync_worker_pool,
+            "renew_lease_batch",
+            lambda job_ids, *a, **k: calls.append(sorted(job_ids)) or list(job_ids),
+        )
+        hb = SharedHeartbeat(worker_id="w1", renew_interval_seconds=60, lease_seconds=300)
+
+        with hb.track("a") as a, hb.track("b") as b:
+            hb.cancel(["a", "late"], "worker_shutdown")
+            hb.renew_once()
+            with hb.track("late") as late:
+                pass
+
+        assert calls == [["b"]]
+        assert a.cancelled and a.should_abort and not b.cancelled
+        assert late.cancelled
+
+
+# ---------- GitLabClientRegistry ----------
+
+
+class TestGitLabClientRegistry:
+    def test_one_client_per_instance_and_token(self):
+        registry = GitLabClientRegistry(factory=lambda url, token: MagicMock())
+
+        first = registry.get("https://GitLab.example.com/", "t1")
+        again = registry.get("https://gitlab.example.com", "t1")
+        other = registry.get("https://gitlab.example.com", "t2")
+
+        assert first is again
+        assert other is not first
+        assert len(registry) == 2
+
+    def test_shared_client_only_when_installed(self):
+        assert get_shared_client("https://gitlab.example.com", "t") is None
+
+        registry = GitLabClientRegistry(factory=lambda url, token: MagicMock())
+        gitlab_client.set_shared_client_registry(registry)
+        try:
+            assert get_shared_client("https://gitlab.example.com", "t") is registry.get(
+                "https://gitlab.example.com", "t"
+            )
+        finally:
+            gitlab_client.set_shared_client_registry(None)
+
+
+# ---------- MultiSlotWorker ----------
+
+
+@pytest.fixture
+def queue_stub(monkeypatch):
+    """替换 claim_batch / requeue_without_penalty / renew_lease_batch"""
+    state = {"pending": [], "claims": [], "requeued": []}
+    lock = threading.Lock()
+
+    def _claim_batch(worker_id, n, job_types=None, conn=None, **kwargs):
+        with lock:
+            state["claims"].append(n)
+            jobs, state["pending"] = state["pending"][:n], state["pending"][n:]
+        return jobs
+
+    def _requeue(job_id, worker_id, reason=None, conn=None, **kwargs):
+        state["requeued"].append(job_id)
+        return True
+
+    monkeypatch.setattr(scm_sync_worker_pool, "claim_batch", _claim_batch)
+    monkeypatch.setattr(scm_sync_worker_pool, "requeue_without_penalty", _requeue)
+    monkeypatch.setattr(
+        scm_sync_worker_pool, "renew_lease_batch", lambda job_ids, *a, **k: list(job_ids)
+    )
+    return state
+
+
+def _job(i):
+    return {"job_id": f"job-{i}", "repo_id": i, "job_type": "gitlab_commits"}
+
+
+def _worker(process_job, concurrency=3, **kwargs):
+    return MultiSlotWorker(
+        worker_id="w-pool",
+        concurrency=concurrency,
+        poll_interval=0.01,
+        worker_cfg={"renew_interval_seconds": 60},
+        connect=lambda dsn: MagicMock(closed=False),
+        process_job=process_job,
+        **kwargs,
+    )
+
+
+class TestMultiSlotWorker:
+    def test_runs_jobs_concurrently_with_shared_heartbeat(self, queue_stub):
+        queue_stub["pending"] = [_job(i) for i in range(6)]
+        state = {"active": 0, "peak": 0, "heartbeats": set()}
+        lock = threading.Lock()
+
+        def _process(job, *, heartbeat, **kwargs):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                state["heartbeats"].add(id(heartbeat))
+            time.sleep(0.02)
+            with lock:
+                state["active"] -= 1
+            return True
+
+        worker = _worker(_process)
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while worker.processed_count < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        worker.request_stop()
+        thread.join(timeout=5)
+
+        assert worker.processed_count == 6
+        assert state["peak"] == 3
+        assert len(state["heartbeats"]) == 1
+        # 首次按全部槽位 claim，之后只 claim 空闲槽位
+        assert queue_stub["claims"][0] == 3
+        assert all(n <= 3 for n in queue_stub["claims"])
+        assert queue_stub["requeued"] == []
+
+    def test_once_processes_single_batch(self, queue_stub):
+        queue_stub["pending"] = [_job(i) for i in range(5)]
+
+        processed = _worker(lambda job, **kwargs: True, concurrency=2).run(once=True)
+
+        assert processed == 2
+        assert queue_stub["claims"] == [2]
+
+    def test_drain_requeues_unfinished_jobs(self, queue_stub):
+        queue_stub["pending"] = [_job(i) for i in range(3)]
+        started = threading.Event()
+        release = threading.Event()
+
+        handles = {}
+        finished = threading.Event()
+
+        def _process(job, *, conn, heartbeat, **kwargs):
+            with heartbeat.track(job["job_id"]) as hb:
+                handles[job["job_id"]] = (hb, conn)
+                started.set()
+                release.wait(5)
+            # 让出后的任务不得再 ack：连接仍可用，句柄已取消
+            handles["after"] = (hb.cancelled, conn.close.called)
+            finished.set()
+            return True
+
+        worker = _worker(_process, concurrency=1, drain_timeout=0.05)
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+        assert started.wait(5)
+        # 槽位忙时再塞入一个已 claim 未开始的任务
+        worker._jobs.put(_job(99))
+        worker.request_stop()
+        thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert sorted(queue_stub["requeued"]) == ["job-0", "job-99"]
+        hb, conn = handles["job-0"]
+        assert hb.cancelled
+        assert not conn.close.called
+
+        release.set()
+        assert finished.wait(5)
+        assert handles["after"] == (True, False)
+        # 槽位结束后归还的连接随即关闭
+        deadline = time.monotonic() + 5
+        while not conn.close.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert conn.close.called
+
+
+class TestRequeuedJobRun:
+    def test_cancelled_job_finishes_run_without_ack(self, monkeypatch):
+        core = scm_sync_worker_core
+        finished = []
+        queue_calls = []
+        hb = SharedHeartbeat(worker_id="w1", renew_interval_seconds=60, lease_seconds=300)
+
+        def _execute(job):
+            # 执行期间 worker 退出超时，任务被重新入队
+            hb.cancel([job["job_id"]], "worker_shutdown: requeued after drain timeout")
+            return {"success": True, "synced_count": 3}
+
+        monkeypatch.setattr(core.scm_sync_lock, "claim", lambda **kw: True)
+        monkeypatch.setattr(core.scm_sync_lock, "release", lambda **kw: True)
+        monkeypatch.setattr(core, "read_cursor_before", lambda *a: None)
+        monkeypatch.setattr(core, "insert_sync_run_start", lambda **kw: None)
+        monkeypatch.setattr(core, "insert_sync_run_finish", lambda **kw: finished.append(kw))
+        monkeypatch.setattr(core, "execute_sync_job", _execute)
+        for name in ("ack", "fail_retry", "mark_dead", "requeue_without_penalty"):
+            monkeypatch.setattr(core, name, lambda *a, _n=name, **kw: queue_calls.append(_n))
+
+        assert core.process_claimed_job(_job(1), worker_id="w1", conn=MagicMock(), heartbeat=hb)
+
+        assert queue_calls == []
+        assert len(finished) == 1
+        assert finished[0]["status"] == "failed"
+        assert finished[0]["counts"]["synced_count"] == 3
+        assert "requeued" in finished[0]["error_summary_json"]["error_message"]
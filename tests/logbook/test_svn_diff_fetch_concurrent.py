@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+test_svn_diff_fetch_concurrent.py - SVN diff 并发获取与批量写入测试
+
+覆盖:
+- iter_svn_diffs 并发数受同一 SVN 服务器的并发上限约束（跨调用共享）
+- SvnPatchFetchController 触发暂停后取消尚未开始的获取
+- sync_patches_for_revisions 按完成顺序写入制品，按 flush_size 批量 upsert patch_blobs，失败降级为 ministat
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook.scm_sync_policy import SvnPatchFetchController
+from engram.logbook.scm_sync_tasks import svn
+from engram.logbook.scm_sync_tasks.svn import (
+    FetchDiffResult,
+    SvnRevision,
+    get_host_limiter,
+    iter_svn_diffs,
+    sync_patches_for_revisions,
+)
+
+
+def _revision(rev):
+    return SvnRevision(
+        revision=rev,
+        author="dev",
+        date=None,
+        message="",
+        changed_paths=[{"path": f"/trunk/f{rev}.py", "action": "M", "kind": "file"}],
+    )
+
+
+@pytest.fixture
+def fake_diff(monkeypatch):
+    """替换 fetch_svn_diff，记录峰值并发；failures 中的 revision 返回超时"""
+    state = {"active": 0, "peak": 0, "calls": [], "failures": set()}
+    lock = threading.Lock()
+
+    def _fetch(svn_url, *, revision, timeout=120, max_size_bytes=None):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["calls"].append(revision)
+        time.sleep(0.005)
+        with lock:
+            state["active"] -= 1
+        if revision in state["failures"]:
+            return FetchDiffResult(
+                success=False,
+                error_category="timeout",
+                error_message="timeout",
+                endpoint=f"svn diff -c {revision}",
+            )
+        return FetchDiffResult(success=True, content=f"Index: f{revision}.py\n+x\n")
+
+    monkeypatch.setattr(svn, "fetch_svn_diff", _fetch)
+    return state
+
+
+class TestIterSvnDiffs:
+    def test_host_limit_caps_concurrency(self, fake_diff):
+        url = "svn://cap.example.com/repo/trunk"
+
+        results = list(
+            iter_svn_diffs(url, [_revision(r) for r in range(12)], max_workers=8, per_host_limit=3)
+        )
+
+        assert sorted(rev.revision for rev, _ in results) == list(range(12))
+        assert all(result.success for _, result in results)
+        assert 1 < fake_diff["peak"] <= 3
+
+    def test_host_limiter_shared_across_repos(self):
+        first = get_host_limiter("svn://shared.example.com/a/trunk", 2)
+        second = get_host_limiter("svn://shared.example.com/b/trunk", 8)
+
+        assert first is second
+        assert second.max_concurrency == 2
+
+    def test_controller_pause_skips_remaining(self, fake_diff):
+        fake_diff["failures"].update(range(100))
+        controller = SvnPatchFetchController(timeout_threshold=2)
+
+        results = list(
+            iter_svn_diffs(
+                "svn://pause.example.com/repo",
+                [_revision(r) for r in range(10)],
+                max_workers=1,
+                controller=controller,
+            )
+        )
+
+        assert fake_diff["calls"] == [0, 1]
+        assert [result for _, result in results[2:]] == [None] * 8
+        assert controller.should_skip_patches
+
+
+@pytest.fixture
+def captured(monkeypatch, tmp_path):
+    """制品写入临时目录，记录每次批量 upsert 的行"""
+    from engram.logbook import scm_artifacts
+
+    calls = []
+    original = scm_artifacts.write_text_artifact
+    monkeypatch.setattr(
+        scm_artifacts,
+        "write_text_artifact",
+        lambda **kwargs: original(artifacts_root=tmp_path, **kwargs),
+    )
+    monkeypatch.setattr(svn, "upsert_patch_blobs", lambda conn, rows: calls.append(list(rows)))
+    return calls
+
+
+class TestSyncPatchesForRevisions:
+    def test_writes_blobs_in_flush_batches(self, fake_diff, captured):
+        fake_diff["failures"].add(3)
+
+        stats = sync_patches_for_revisions(
+            "svn://write.example.com/repo",
+            [_revision(r) for r in range(1, 6)],
+            conn=MagicMock(),
+            repo_id=9,
+            project_key="proj",
+            max_workers=4,
+            flush_size=2,
+        )
+
+        assert [len(rows) for rows in captured] == [2, 2, 1]
+        rows = {row["source_id"]: row for batch in captured for row in batch}
+        assert set(rows) == {f"9:{r}" for r in range(1, 6)}
+        assert rows["9:3"]["format"] == "ministat"
+        assert rows["9:3"]["meta_json"]["degrade_reason"] == "timeout"
+        assert rows["9:1"]["uri"].startswith("scm/proj/9/svn/r1/")
+        assert (stats["success"], stats["failed"], stats["degraded"]) == (4, 1, 1)
+        assert stats["bulk_count"] == 5
+        assert [p["revision"] for p in stats["patches"]] == [1, 2, 3, 4, 5]
+
+    def test_without_connection_only_fetches(self, fake_diff, captured):
+        stats = sync_patches_for_revisions(
+            "svn://fetch-only.example.com/repo", [_revision(1), _revision(2)]
+        )
+
+        assert captured == []
+        assert stats["success"] == 2
+        assert stats["bulk_count"] == 0
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+test_svn_log_streaming.py - SVN log 流式解析与分批写入测试
+
+覆盖:
+- iter_svn_log_entries 逐条产出 revision，解析结果与 parse_svn_log_xml 一致，已处理元素被清理
+- stream_svn_log 通过管道读取 svn 输出，非零退出码抛出 SvnCommandError，
+  输出截断后进程不退出时抛出 SvnTimeoutError 并终止进程
+- flush_revision_batches 每批提交并推进游标，中途失败时保留已提交批次的游标
+"""
+
+import io
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from engram.logbook.scm_sync_tasks import svn
+from engram.logbook.scm_sync_tasks.svn import (
+    SvnCommandError,
+    SvnParseError,
+    SvnRevision,
+    SvnTimeoutError,
+    SyncConfig,
+    flush_revision_batches,
+    iter_svn_log_entries,
+    parse_svn_log_xml,
+    stream_svn_log,
+)
+
+
+def _log_xml(revisions):
+    entries = "".join(
+        f'<logentry revision="{rev}"><author>dev</author>'
+        f"<date>2024-01-01T00:00:{rev % 60:02d}.000000Z</date>"
+        f'<paths><path action="M" kind="file">/trunk/f{rev}.py</path></paths>'
+        f"<msg>r{rev}</msg></logentry>"
+        for rev in revisions
+    )
+    return f'<?xml version="1.0"?>\n<log>{entries}</log>'
+
+
+class TestIterSvnLogEntries:
+    def test_matches_full_parse(self):
+        xml = _log_xml(range(1, 6))
+
+        streamed = list(iter_svn_log_entries(io.BytesIO(xml.encode("utf-8"))))
+
+        assert streamed == parse_svn_log_xml(xml)
+        assert streamed[2].changed_paths == [
+            {"path": "/trunk/f3.py", "action": "M", "kind": "file"}
+        ]
+
+    def test_processed_entries_are_released(self, monkeypatch):
+        retained = []
+        original = svn._parse_logentry
+
+        def _spy(entry):
+            retained.append(entry)
+            return original(entry)
+
+        monkeypatch.setattr(svn, "_parse_logentry", _spy)
+        xml = _log_xml(range(1, 4))
+
+        for _ in iter_svn_log_entries(io.BytesIO(xml.encode("utf-8"))):
+            pass
+
+        # 每个 logentry 产出后被清空
+        assert all(len(entry) == 0 for entry in retained)
+
+    def test_truncated_xml_raises_parse_error(self):
+        stream = io.BytesIO(_log_xml([1, 2]).encode("utf-8")[:-20])
+
+        with pytest.raises(SvnParseError):
+            list(iter_svn_log_entries(stream))
+
+
+def _fake_svn(monkeypatch, stdout, returncode=0, hang_seconds=0, procs=None):
+    """用输出固定内容的 python 子进程替代 svn 命令（hang_seconds > 0 时关闭输出后挂起）"""
+    script = (
+        "import os, sys, time;"
+        f"sys.stdout.write({stdout!r});"
+        "sys.stderr.write('svn: E170013');"
+        "sys.stdout.flush();"
+        "os.close(1);"
+        f"time.sleep({hang_seconds});"
+        f"sys.exit({returncode})"
+    )
+    real_popen = subprocess.Popen
+    calls = []
+
+    def _popen(cmd, **kwargs):
+        calls.append(cmd)
+        proc = real_popen([sys.executable, "-c", script], **kwargs)
+        if procs is not None:
+            procs.append(proc)
+        return proc
+
+    monkeypatch.setattr(svn.subprocess, "Popen", _popen)
+    return calls
+
+
+class TestStreamSvnLog:
+    def test_streams_revisions_from_pipe(self, monkeypatch):
+        calls = _fake_svn(monkeypatch, _log_xml([7, 8, 9]))
+
+        revisions = list(
+            stream_svn_log("svn://example/trunk", start_rev=7, end_rev=9, verbose=True)
+        )
+
+        assert [r.revision for r in revisions] == [7, 8, 9]
+        assert calls[0][:5] == ["svn", "log", "--xml", "-r", "7:9"]
+        assert "-v" in calls[0]
+
+    def test_nonzero_exit_raises_command_error(self, monkeypatch):
+        _fake_svn(monkeypatch, _log_xml([]), returncode=1)
+
+        with pytest.raises(SvnCommandError, match="E170013"):
+            list(stream_svn_log("svn://example/trunk", start_rev=1, end_rev=2))
+
+    def test_empty_output_on_failure_reports_command_error(self, monkeypatch):
+        _fake_svn(monkeypatch, "", returncode=1)
+
+        with pytest.raises(SvnCommandError):
+            list(stream_svn_log("svn://example/trunk", start_rev=1, end_rev=2))
+
+    def test_truncated_output_with_hung_process_times_out(self, monkeypatch):
+        procs = []
+        _fake_svn(monkeypatch, "<log><logentry", hang_seconds=30, procs=procs)
+
+        with pytest.raises(SvnTimeoutError):
+            list(stream_svn_log("svn://example/trunk", start_rev=1, end_rev=2, timeout=1))
+
+        assert procs[0].poll() is not None
+
+
+def _revision(rev):
+    return SvnRevision(revision=rev, author="dev", date=None, message="")
+
+
+class TestFlushRevisionBatches:
+    @pytest.fixture
+    def store(self, monkeypatch):
+        state = {"inserted": [], "cursor": []}
+
+        def _insert(conn, repo_id, revisions, config=None):
+            state["inserted"].append([r.revision for r in revisions])
+            return len(revisions)
+
+        monkeypatch.setattr(svn, "insert_svn_revisions", _insert)
+        monkeypatch.setattr(
+            svn,
+            "save_svn_cursor",
+            lambda repo_id, last_rev, synced, config=None: state["cursor"].append(last_rev),
+        )
+        return state
+
+    def test_commits_and_advances_cursor_per_batch(self, store):
+        conn = MagicMock()
+        config = SyncConfig(svn_url="svn://example/trunk", batch_size=2, stream=True)
+
+        result = flush_revision_batches(conn, 1, map(_revision, range(1, 6)), config)
+
+        assert store["inserted"] == [[1, 2], [3, 4], [5]]
+        assert store["cursor"] == [2, 4, 5]
+        assert conn.commit.call_count == 3
+        assert result == {"synced_count": 5, "batches": 3, "last_rev": 5, "patch_stats": None}
+
+    def test_failure_keeps_flushed_progress(self, store):
+        def _revisions():
+            yield from map(_revision, range(1, 4))
+            raise SvnParseError("truncated")
+
+        config = SyncConfig(svn_url="svn://example/trunk", batch_size=2, stream=True)
+
+        with pytest.raises(SvnParseError):
+            flush_revision_batches(MagicMock(), 1, _revisions(), config)
+
+        # 第二批未满即失败，游标停在第一批末尾
+        assert store["cursor"] == [2]
+
+    def test_backfill_without_watermark_does_not_touch_cursor(self, store):
+        config = SyncConfig(svn_url="svn://example/trunk", batch_size=10, stream=True)
+
+        result = flush_revision_batches(
+            MagicMock(), 1, map(_revision, [3, 1, 2]), config, advance_cursor=False
+        )
+
+        assert store["cursor"] == []
+        assert result["last_rev"] == 3
@@ -6,6 +6,7 @@ test_vfacts_refresh.py - scm.v_facts 物化视图刷新测试
 - refresh_vfacts 函数的正确性
 - CLI scm refresh-vfacts 命令
 - 刷新后行数/时间戳更新符合预期
+- scm.facts 增量维护时跳过 REFRESH
 """
 
 import json
@@ -56,7 +57,8 @@ class TestRefreshVfactsFunction:
         mock_get_connection.return_value = mock_conn
 
         # 模拟查询结果
-        mock_cursor.fetchone.side_effect = [(100,), (120,)]  # before=100, after=120
+        # scm.facts 不存在（未执行 17 迁移）时回退到 REFRESH；before=100, after=120
+        mock_cursor.fetchone.side_effect = [None, (100,), (120,)]
 
         result = refresh_vfacts()
 
@@ -85,7 +87,7 @@ class TestRefreshVfactsFunction:
         mock_get_connection.return_value = mock_conn
 
         # 模拟查询结果
-        mock_cursor.fetchone.side_effect = [(50,), (55,)]
+        mock_cursor.fetchone.side_effect = [None, (50,), (55,)]
 
         result = refresh_vfacts(concurrently=True)
 
@@ -98,6 +100,27 @@ class TestRefreshVfactsFunction:
             "REFRESH MATERIALIZED VIEW CONCURRENTLY scm.v_facts" in str(call) for call in calls
         )
 
+    @patch("engram.logbook.scm_sync_runner.get_connection")
+    def test_incremental_facts_skips_refresh(self, mock_get_connection):
+        """scm.facts 存在时不执行 REFRESH，只读取 pg_class 行数估计"""
+        from engram.logbook.scm_sync_runner import refresh_vfacts
+
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_get_connection.return_value = mock_conn
+        mock_cursor.fetchone.side_effect = [(1200,)]
+
+        result = refresh_vfacts(concurrently=True)
+
+        assert result["refreshed"] is True
+        assert result["mode"] == "incremental"
+        assert result["before_row_count"] == result["after_row_count"] == 1200
+        mock_cursor.execute.assert_called_once()
+        assert "to_regclass('scm.facts')" in mock_cursor.execute.call_args[0][0]
+        assert "REFRESH" not in str(mock_cursor.execute.call_args_list)
+
     @patch("engram.logbook.scm_sync_runner.get_connection")
     def test_refresh_error_handling(self, mock_get_connection):
         """测试刷新失败时的错误处理"""
@@ -127,7 +150,7 @@ class TestRefreshVfactsResultFields:
         mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
         mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
         mock_get_connection.return_value = mock_conn
-        mock_cursor.fetchone.side_effect = [(10,), (15,)]
+        mock_cursor.fetchone.side_effect = [None, (10,), (15,)]
 
         result = refresh_vfacts()
 
@@ -343,7 +366,7 @@ class TestVfactsRefreshIntegration:
         """测试 CONCURRENTLY 模式（需要唯一索引）"""
         from engram.logbook.scm_sync_runner import refresh_vfacts
 
-        # v_facts 上已有唯一索引 idx_v_facts_source_id
+        # scm.facts 增量维护时 concurrently 不触发刷新，结果同样为 refreshed
         result = refresh_vfacts(concurrently=True)
 
         assert result["refreshed"] is True